@@ -5,8 +5,7 @@ import json
 import base64
 import aiohttp
 import asyncio
-import google.generativeai as genai
-from google.api_core import exceptions as google_exceptions
+from utils.llm import get_llm, PRIORITY_BACKGROUND
 import re
 
 class IslamicDataUpdater(commands.Cog):
@@ -19,35 +18,8 @@ class IslamicDataUpdater(commands.Cog):
         self.github_repo = os.getenv("ISLAMIC_GITHUB_REPO")
         self.github_branch = os.getenv("ISLAMIC_GITHUB_BRANCH", "main")
         
-        self.api_keys = []
-        if os.getenv("GOOGLE_API_KEY"):
-            self.api_keys.append(os.getenv("GOOGLE_API_KEY"))
-            
-        key_idx = 2
-        while True:
-            extra_key = os.getenv(f"GOOGLE_API_KEY_{key_idx}")
-            if extra_key:
-                self.api_keys.append(extra_key)
-                key_idx += 1
-            else:
-                break
-                
-        self.current_key_idx = 0
-        self.configure_genai()
         self.update_loop.start()
 
-    def configure_genai(self):
-        if self.api_keys:
-            key_to_use = self.api_keys[self.current_key_idx]
-            genai.configure(api_key=key_to_use)
-
-    def rotate_api_key(self):
-        if len(self.api_keys) > 1:
-            self.current_key_idx = (self.current_key_idx + 1) % len(self.api_keys)
-            self.configure_genai()
-            return True
-        return False
-
     def cog_unload(self):
         self.update_loop.cancel()
 
@@ -89,21 +61,13 @@ class IslamicDataUpdater(commands.Cog):
         return text.strip()
 
     async def generate_new_data(self, prompt):
-        attempts = max(1, len(self.api_keys))
-        for _ in range(attempts):
-            try:
-                model = genai.GenerativeModel('gemini-2.0-flash-exp')
-                response = await model.generate_content_async(prompt)
-                raw_text = response.text
-                clean_text = self.clean_json_response(raw_text)
-                return json.loads(clean_text)
-            except google_exceptions.ResourceExhausted:
-                if self.rotate_api_key():
-                    await asyncio.sleep(1)
-                    continue
-                break
-            except Exception:
-                break
+        try:
+            response = await get_llm().generate('gemini-2.0-flash-exp', prompt, priority=PRIORITY_BACKGROUND)
+            raw_text = response.text
+            clean_text = self.clean_json_response(raw_text)
+            return json.loads(clean_text)
+        except Exception:
+            pass
         raise Exception("Gagal mengekstrak data dari AI.")
 
     async def update_inspirasi(self):
@@ -8,10 +8,20 @@ from datetime import datetime, timedelta, time
 import string
 import pytz # Import pytz untuk zona waktu
 import sys # Import sys untuk mencetak error ke stderr
+from utils.datastore import get_store
+from utils.msgpipeline import PRIORITY_RESTRICTION
+
+# Timer pembersih: tiap job selalu diarahkan ke deadline terdekat (sembuh / perlindungan habis)
+SICK_SWEEP_TIMER = "dunia.sick_sweep"
+PROTECTION_SWEEP_TIMER = "dunia.protection_sweep"
+SWEEP_RETRY_MINUTES = 30
 
 # --- Helper Functions (Diulang agar cog ini mandiri) ---
 def load_json_from_root(file_path, default_value=None):
     """Memuat data JSON dari file yang berada di root direktori proyek."""
+    store = get_store()
+    if store.handles(file_path):
+        return store.get(file_path)
     try:
         base_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
         full_path = os.path.join(base_dir, file_path)
@@ -42,6 +52,10 @@ def load_json_from_root(file_path, default_value=None):
 
 def save_json_to_root(data, file_path):
     """Menyimpan data ke file JSON di root direktori proyek."""
+    store = get_store()
+    if store.handles(file_path):
+        store.put(file_path, data)
+        return
     base_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
     full_path = os.path.join(base_dir, file_path)
     os.makedirs(os.path.dirname(full_path), exist_ok=True) # Pastikan direktori 'data/' ada
@@ -187,8 +201,11 @@ class DuniaHidup(commands.Cog):
         # Memulai tasks loop
         self.world_event_loop.start()
         self.monster_attack_processor.start()
-        self.protection_cleaner.start()
-        self.sick_status_cleaner.start() 
+        self.bot.timers.register(PROTECTION_SWEEP_TIMER, self.protection_cleaner)
+        self.bot.timers.register(SICK_SWEEP_TIMER, self.sick_status_cleaner)
+        self.arm_protection_sweep()
+        self.arm_sick_sweep()
+        self.bot.message_pipeline.register("dunia", self.handle_message, PRIORITY_RESTRICTION)
         print(f"[{datetime.now()}] [DEBUG DUNIA] Cog DuniaHidup diinisialisasi.")
 
 
@@ -197,12 +214,57 @@ class DuniaHidup(commands.Cog):
         print(f"[{datetime.now()}] [DEBUG DUNIA] Cog DuniaHidup sedang dibongkar...")
         self.world_event_loop.cancel()
         self.monster_attack_processor.cancel()
-        self.protection_cleaner.cancel()
-        self.sick_status_cleaner.cancel()
+        self.bot.timers.unregister(PROTECTION_SWEEP_TIMER, self.protection_cleaner)
+        self.bot.timers.unregister(SICK_SWEEP_TIMER, self.sick_status_cleaner)
+        self.bot.message_pipeline.unregister("dunia", self.handle_message)
         print(f"[{datetime.now()}] [DEBUG DUNIA] Cog DuniaHidup berhasil dibongkar.")
 
-    @tasks.loop(minutes=30)
-    async def sick_status_cleaner(self):
+    # --- Timer pembersih ---
+    def _arm_sweep(self, timer_id, deadlines):
+        """Majukan timer `timer_id` ke deadline (datetime UTC) paling awal, kalau ada."""
+        if deadlines:
+            self.bot.timers.schedule_earliest(timer_id, timer_id, min(deadlines))
+
+    def arm_sick_sweep(self):
+        deadlines = []
+        for user_data in self.sick_users_cooldown.values():
+            if not isinstance(user_data, dict):
+                continue
+            # Akhir sakit (role dicabut) dan akhir kebal (entri dibuang) sama-sama butuh sweep
+            for field in ('sickness_end_time', 'cooldown_immunity_end_time'):
+                end_time = user_data.get(field)
+                if isinstance(end_time, str):
+                    try:
+                        deadlines.append(datetime.fromisoformat(end_time))
+                    except ValueError:
+                        pass
+        self._arm_sweep(SICK_SWEEP_TIMER, deadlines)
+
+    def arm_protection_sweep(self):
+        deadlines = []
+        for expiry in self.protected_users.values():
+            try:
+                deadlines.append(datetime.fromisoformat(expiry))
+            except (TypeError, ValueError):
+                pass
+        if self.quiz_punishment_active and self.quiz_punishment_details.get('end_time'):
+            deadlines.append(datetime.fromisoformat(self.quiz_punishment_details['end_time']))
+        self._arm_sweep(PROTECTION_SWEEP_TIMER, deadlines)
+
+    def save_sick_users(self):
+        """Simpan status sakit dan majukan timer pembersih sesuai data terbaru."""
+        save_json_to_root(self.sick_users_cooldown, 'data/sick_users_cooldown.json')
+        self.arm_sick_sweep()
+
+    def save_protected_users(self):
+        save_json_to_root(self.protected_users, 'data/protected_users.json')
+        self.arm_protection_sweep()
+
+    def _retry_sweep(self, timer_id):
+        # Guild/role belum siap: coba lagi nanti, seperti interval loop lama
+        self.bot.timers.schedule_earliest(timer_id, timer_id, datetime.utcnow() + timedelta(minutes=SWEEP_RETRY_MINUTES))
+
+    async def sick_status_cleaner(self, timer_id=None, payload=None):
         """Membersihkan status 'sakit' dari pengguna yang sudah melewati durasinya."""
         print(f"[{datetime.now()}] [DEBUG DUNIA] sick_status_cleaner dijalankan.")
         now = datetime.utcnow()
@@ -212,11 +274,13 @@ class DuniaHidup(commands.Cog):
         guild = self.bot.get_guild(self.main_guild_id) 
         if not guild:
             print(f"[{datetime.now()}] [DEBUG DUNIA] sick_status_cleaner: Guild dengan ID {self.main_guild_id} tidak ditemukan. Melewatkan pembersihan status sakit.")
+            self._retry_sweep(SICK_SWEEP_TIMER)
             return
 
         sick_role = guild.get_role(self.sick_role_id)
         if not sick_role: 
             print(f"[{datetime.now()}] [DEBUG DUNIA] sick_status_cleaner: Role 'Sakit' dengan ID {self.sick_role_id} tidak ditemukan di guild {guild.name}.")
+            self._retry_sweep(SICK_SWEEP_TIMER)
             return
 
         users_to_check = list(self.sick_users_cooldown.keys()) 
@@ -225,8 +289,14 @@ class DuniaHidup(commands.Cog):
             user_data = self.sick_users_cooldown.get(user_id_str)
             if not user_data: continue
 
+            # Entri yang tinggal cooldown kebal: buang kalau kebalnya sudah habis
+            if 'sickness_end_time' not in user_data and isinstance(user_data.get('cooldown_immunity_end_time'), str):
+                if now >= datetime.fromisoformat(user_data['cooldown_immunity_end_time']):
+                    del self.sick_users_cooldown[user_id_str]
+                    print(f"[{datetime.now()}] [DEBUG DUNIA] {user_id_str} cooldown kebal wabah berakhir.")
+                continue
+
             # --- Perbaikan: Pastikan ini adalah end_time wabah, bukan cooldown kebal ---
-            # Cooldown kebal dari wabah sebelumnya akan ditangani saat infeksi baru
             if 'sickness_end_time' not in user_data or not isinstance(user_data['sickness_end_time'], str):
                 print(f"[{datetime.now()}] [DEBUG DUNIA] Warning: 'sickness_end_time' for user {user_id_str} is malformed. Skipping cleanup for this user.")
                 continue
@@ -260,7 +330,7 @@ class DuniaHidup(commands.Cog):
                 del self.sick_users_cooldown[user_id_str]
                 print(f"[{datetime.now()}] [DEBUG DUNIA] {user_id_str} cooldown kebal wabah berakhir.")
 
-        save_json_to_root(self.sick_users_cooldown, 'data/sick_users_cooldown.json')
+        self.save_sick_users()
         print(f"[{datetime.now()}] [DEBUG DUNIA] sick_status_cleaner selesai. Jumlah user di cooldown: {len(self.sick_users_cooldown)}.")
 
 
@@ -297,8 +367,7 @@ class DuniaHidup(commands.Cog):
             print(f"[{datetime.now()}] [DEBUG DUNIA] Warning: Tidak cukup data untuk event tipe {event_type} atau data malformed.")
 
 
-    @tasks.loop(minutes=30)
-    async def protection_cleaner(self):
+    async def protection_cleaner(self, timer_id=None, payload=None):
         """Membersihkan perlindungan pengguna yang sudah kadaluarsa."""
         print(f"[{datetime.now()}] [DEBUG DUNIA] protection_cleaner dijalankan.")
         now = datetime.utcnow()
@@ -306,7 +375,7 @@ class DuniaHidup(commands.Cog):
         expired_users = [uid for uid, expiry in list(self.protected_users.items()) if now >= datetime.fromisoformat(expiry)]
         for uid in expired_users:
             del self.protected_users[uid]
-        if expired_users: save_json_to_root(self.protected_users, 'data/protected_users.json')
+        if expired_users: self.save_protected_users()
         print(f"[{datetime.now()}] [DEBUG DUNIA] protection_cleaner: Protected users dibersihkan. Jumlah: {len(self.protected_users)}.")
 
         # Membersihkan hukuman kuis jika sudah kadaluarsa
@@ -318,6 +387,7 @@ class DuniaHidup(commands.Cog):
                 if channel:
                     await channel.send("✅ **Dampak kegagalan kuis telah berakhir.** Server kembali ke keadaan normal. Untuk sementara...")
                 print(f"[{datetime.now()}] [DEBUG DUNIA] Hukuman kuis telah berakhir.")
+        self.arm_protection_sweep()
 
 
     async def spawn_monster(self):
@@ -762,6 +832,7 @@ class DuniaHidup(commands.Cog):
                 'infect_users': True,
                 'end_time': (datetime.utcnow() + timedelta(hours=3)).isoformat()
             }
+            self.arm_protection_sweep()
             print(f"[{datetime.now()}] [DEBUG DUNIA] Kuis monster: Waktu habis, hukuman diaktifkan.")
 
             await channel.send(f"Waktu habis! Tidak ada yang bisa menjawab. Jawaban yang benar adalah: **{quiz_monster['answer']}**.")
@@ -898,7 +969,7 @@ class DuniaHidup(commands.Cog):
                  except Exception as e:
                     print(f"[{datetime.now()}] [DEBUG DUNIA] Error saat menginfeksi {member.display_name} (wabah normal): {e}")
         
-        save_json_to_root(self.sick_users_cooldown, 'data/sick_users_cooldown.json')
+        self.save_sick_users()
         save_json_to_root(inventory_data, 'data/inventory.json')
         
         if channel and infected_mentions_for_log_and_embed:
@@ -937,18 +1008,18 @@ class DuniaHidup(commands.Cog):
              await channel.send("✅ **Penduduk Selamat!** Wabah penyakit datang menghampiri, namun entah bagaimana, semua penduduk berhasil selamat kali ini! Syukurlah...")
              print(f"[{datetime.now()}] [DEBUG DUNIA] Wabah Normal: Semua penduduk selamat (0 terinfeksi).")
 
-    @commands.Cog.listener()
-    async def on_message(self, message):
+    async def handle_message(self, ctx):
         """
-        Listener untuk setiap pesan. Digunakan untuk logika cooldown pesan bagi pengguna yang sakit.
+        Handler pipeline pesan untuk cooldown pesan pengguna yang sakit. True kalau pesannya dihapus.
         """
-        if message.author.bot or not message.guild:
+        if self.sick_role_id not in ctx.role_ids:
             return
         
+        message = ctx.message
         user_id_str = str(message.author.id)
         sick_role = message.guild.get_role(self.sick_role_id)
 
-        if sick_role and sick_role in message.author.roles:
+        if sick_role:
             now = datetime.utcnow()
             user_sickness_data = self.sick_users_cooldown.get(user_id_str)
             
@@ -1006,12 +1077,12 @@ class DuniaHidup(commands.Cog):
                         except (discord.Forbidden, discord.NotFound): 
                             print(f"[{datetime.now()}] [DEBUG DUNIA] Gagal hapus pesan atau DM ke {message.author.display_name} (sakit).")
                             pass 
-                        return # Hentikan pemrosesan pesan lebih lanjut jika user dalam cooldown pesan
+                        return True # Hentikan pemrosesan pesan lebih lanjut jika user dalam cooldown pesan
                 
                 # Update waktu pesan terakhir pengguna
                 user_sickness_data['last_message_time'] = now.isoformat()
                 self.sick_users_cooldown[user_id_str] = user_sickness_data # Update data di dictionary
-                save_json_to_root(self.sick_users_cooldown, 'data/sick_users_cooldown.json')
+                self.save_sick_users()
                 print(f"[{datetime.now()}] [DEBUG DUNIA] {message.author.display_name} waktu pesan terakhir diupdate.")
             else:
                 # Jika user punya role sakit tapi datanya tidak ada di sick_users_cooldown,
@@ -1021,7 +1092,7 @@ class DuniaHidup(commands.Cog):
                     # Hapus juga dari sick_users_cooldown sepenuhnya jika tidak ada data sama sekali
                     if user_id_str in self.sick_users_cooldown:
                         del self.sick_users_cooldown[user_id_str]
-                    save_json_to_root(self.sick_users_cooldown, 'data/sick_users_cooldown.json')
+                    self.save_sick_users()
                     print(f"[{datetime.now()}] [DEBUG DUNIA] Role sakit {message.author.display_name} dihapus (data tidak konsisten).")
                 except Exception as e:
                     print(f"[{datetime.now()}] [DEBUG DUNIA] Error membersihkan role sakit {message.author.display_name} (data tidak konsisten): {e}")
@@ -1045,7 +1116,7 @@ class DuniaHidup(commands.Cog):
         if has_free_medicine:
             # Set has_free_medicine ke False, tapi jangan hapus entri sakitnya
             self.sick_users_cooldown[user_id_str]['has_free_medicine'] = False
-            save_json_to_root(self.sick_users_cooldown, 'data/sick_users_cooldown.json')
+            self.save_sick_users()
             await ctx.send("Kamu menggunakan Kotak Obat Misterius GRATIS yang kamu dapatkan dari kutukan kuis!", ephemeral=True)
             print(f"[{datetime.now()}] [DEBUG DUNIA] {ctx.author.display_name} menggunakan obat gratis.")
         else:
@@ -1095,13 +1166,13 @@ class DuniaHidup(commands.Cog):
             self.sick_users_cooldown[user_id_str] = {
                 'cooldown_immunity_end_time': (datetime.utcnow() + timedelta(days=2)).isoformat() # Kebal 2 hari
             }
-            save_json_to_root(self.sick_users_cooldown, 'data/sick_users_cooldown.json')
+            self.save_sick_users()
             print(f"[{datetime.now()}] [DEBUG DUNIA] !minumobat: {ctx.author.display_name} sembuh dan kebal 2 hari.")
 
             if chosen_medicine['heal_chance'] == 100:
                 expiry = datetime.utcnow() + timedelta(hours=24)
                 self.protected_users[user_id_str] = expiry.isoformat()
-                save_json_to_root(self.protected_users, 'data/protected_users.json')
+                self.save_protected_users()
                 heal_embed.description = "Kamu sembuh total dari penderitaanmu! Role 'Sakit' telah dilepas dan kamu mendapat **perlindungan 24 jam** dari serangan monster! Nikmati kelegaan sesaat ini..."
                 print(f"[{datetime.now()}] [DEBUG DUNIA] !minumobat: {ctx.author.display_name} dapat perlindungan 24 jam.")
             else:
@@ -1136,7 +1207,7 @@ class DuniaHidup(commands.Cog):
             self.sick_users_cooldown[str(member.id)] = {
                 'cooldown_immunity_end_time': (datetime.utcnow() + timedelta(days=2)).isoformat() # Kebal 2 hari
             }
-            save_json_to_root(self.sick_users_cooldown, 'data/sick_users_cooldown.json')
+            self.save_sick_users()
             
             await ctx.send(f"✨ **Kekuatan admin telah menyembuhkan!** {member.display_name} ({member.mention}) telah pulih dari sakitnya!")
             print(f"[{datetime.now()}] [DEBUG DUNIA] Admin {ctx.author.display_name} menyembuhkan {member.display_name} dan memberinya kebal 2 hari.")
@@ -27,14 +27,14 @@ class Economy(commands.Cog):
     @commands.has_permissions(administrator=True)  
     async def add_money(self, ctx, member: discord.Member, amount: int):  
         """Add money to a user's account (Admin only)"""
-        bank_data = self.load_data("bank_data.json")  
+        bank_data = self.bot.store.get("data/bank_data.json")  
         user_id = str(member.id)  
           
         if user_id not in bank_data:  
             bank_data[user_id] = {"balance": 0, "debt": 0}  
           
         bank_data[user_id]["balance"] += amount  
-        self.save_data(bank_data, "bank_data.json")  
+        self.bot.store.mark_dirty("data/bank_data.json", user_id)  
         await ctx.send(f"✅ Added {amount} RSWN to {member.mention}'s account!")
 
 async def setup(bot):
@@ -8,8 +8,12 @@ import aiohttp
 from io import BytesIO
 from datetime import datetime, time, timedelta
 import pytz
+from utils.datastore import get_store
 
 def load_json_from_root(file_path):
+    store = get_store()
+    if store.handles(file_path):
+        return store.get(file_path)
     base_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
     full_path = os.path.join(base_dir, file_path)
     os.makedirs(os.path.dirname(full_path), exist_ok=True)
@@ -28,6 +32,10 @@ def load_json_from_root(file_path):
         return {}
 
 def save_json_to_root(data, file_path):
+    store = get_store()
+    if store.handles(file_path):
+        store.put(file_path, data)
+        return
     base_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
     full_path = os.path.join(base_dir, file_path)
     os.makedirs(os.path.dirname(full_path), exist_ok=True)
@@ -257,15 +265,12 @@ class Games1(commands.Cog):
 
         user_id_str, guild_id_str = str(user.id), str(user.guild.id)
         
-        self.bank_data = load_json_from_root('data/bank_data.json')
-        self.level_data = load_json_from_root('data/level_data.json')
-        
-        self.bank_data.setdefault(user_id_str, {'balance': 0, 'debt': 0})['balance'] += final_rsw
-        user_level_data = self.level_data.setdefault(guild_id_str, {}).setdefault(user_id_str, {'exp': 0, 'level': 1})
-        user_level_data['exp'] += final_exp
+        store = self.bot.store
+        self.bank_data = store.get('data/bank_data.json')
+        self.level_data = store.get('data/level_data.json')
         
-        save_json_to_root(self.bank_data, 'data/bank_data.json')
-        save_json_to_root(self.level_data, 'data/level_data.json')
+        self.level_data.setdefault(guild_id_str, {}).setdefault(user_id_str, {'exp': 0, 'level': 1})
+        self.bot.ledger.record(user_id_str, guild_id_str, rswn=final_rsw, exp=final_exp, reason="endgame")
         
         if anomaly_multiplier > 1 and channel:
             await channel.send(f"✨ **BONUS ANOMALI!** {user.mention} mendapatkan hadiah yang dilipatgandakan!", delete_after=15)
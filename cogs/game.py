@@ -8,6 +8,8 @@ from datetime import datetime, time, timedelta
 import string
 import sys # Untuk stderr
 from collections import Counter # Untuk menghitung suara
+from utils.datastore import get_store
+from utils.msgpipeline import PRIORITY_DEFAULT
 
 # --- Helper Functions ---
 def load_json_from_root(file_path, default_value=None):
@@ -15,6 +17,9 @@ def load_json_from_root(file_path, default_value=None):
     Memuat data JSON dari file yang berada di root direktori proyek bot.
     Menambahkan `default_value` yang lebih fleksibel.
     """
+    store = get_store()
+    if store.handles(file_path):
+        return store.get(file_path)
     try:
         # Menyesuaikan path agar selalu relatif ke root proyek jika cog berada di subfolder
         base_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
@@ -39,6 +44,10 @@ def load_json_from_root(file_path, default_value=None):
 
 def save_json_to_root(data, file_path):
     """Menyimpan data ke file JSON di root direktori proyek."""
+    store = get_store()
+    if store.handles(file_path):
+        store.put(file_path, data)
+        return
     base_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
     full_path = os.path.join(base_dir, file_path)
     os.makedirs(os.path.dirname(full_path), exist_ok=True)
@@ -363,6 +372,7 @@ class Games2(commands.Cog):
 
         # --- Interaksi Cog Lain ---
         self.dunia_cog = None # Akan diisi di on_ready listener dari DuniaHidup.py
+        self.bot.message_pipeline.register("game.werewolf", self.handle_message, PRIORITY_DEFAULT, dm=True)
         print(f"[{datetime.now()}] [DEBUG GLOBAL EVENTS] Cog GamesGlobalEvents diinisialisasi.")
 
     @commands.Cog.listener()
@@ -378,6 +388,7 @@ class Games2(commands.Cog):
     def cog_unload(self):
         """Dipanggil saat cog dibongkar, membatalkan semua task loop."""
         print(f"[{datetime.now()}] [DEBUG GLOBAL EVENTS] Cog GamesGlobalEvents sedang dibongkar...")
+        self.bot.message_pipeline.unregister("game.werewolf", self.handle_message)
 
         for channel_id in list(self.werewolf_game_states.keys()):
             game_state = self.werewolf_game_states.get(channel_id)
@@ -420,17 +431,13 @@ class Games2(commands.Cog):
             print(f"[{datetime.now()}] [DEBUG GLOBAL EVENTS] Hadiah via DuniaHidup: {user.display_name} mendapat {final_rsw} RSWN & {final_exp} EXP.")
         else:
             # Fallback jika DuniaHidup tidak ada/fungsi tidak ditemukan
-            bank_data = load_json_from_root('data/bank_data.json')
-            level_data = load_json_from_root('data/level_data.json')
+            level_data = self.bot.store.get('data/level_data.json')
 
             user_id_str = str(user.id)
             guild_id_str = str(guild_id)
 
-            bank_data.setdefault(user_id_str, {'balance': 0})['balance'] += final_rsw
-            level_data.setdefault(guild_id_str, {}).setdefault(user_id_str, {'exp': 0})['exp'] += final_exp
-
-            save_json_to_root(bank_data, 'data/bank_data.json')
-            save_json_to_root(level_data, 'data/level_data.json')
+            level_data.setdefault(guild_id_str, {}).setdefault(user_id_str, {'exp': 0})
+            self.bot.ledger.record(user_id_str, guild_id_str, rswn=final_rsw, exp=final_exp, reason="game")
             print(f"[{datetime.now()}] [DEBUG GLOBAL EVENTS] Hadiah (fallback): {user.display_name} mendapat {final_rsw} RSWN & {final_exp} EXP.")
 
         if anomaly_multiplier > 1 and channel:
@@ -833,12 +840,8 @@ class Games2(commands.Cog):
         embed.set_footer(text="Catatan: Untuk perintah DM, pastikan DM-mu terbuka!")
         await ctx.send(embed=embed)
 
-    @commands.Cog.listener()
-    async def on_message(self, message):
-        # Ignore messages from bots themselves
-        if message.author.bot:
-            return
-
+    async def handle_message(self, ctx):
+        message = ctx.message
         # Check if it's a DM (for role actions)
         if isinstance(message.channel, discord.DMChannel):
             await self._process_dm_werewolf_command(message)
@@ -2324,7 +2327,6 @@ class Games2(commands.Cog):
         race_state = self.horse_racing_states.get(channel_id)
         if not race_state: return
 
-        bank_data = load_json_from_root('data/bank_data.json', default_value={})
         odds = race_state['odds'].get(winning_horse_id, 1.0)
 
         winners = []
@@ -2336,17 +2338,16 @@ class Games2(commands.Cog):
 
             if bet_info['horse_id'] == winning_horse_id:
                 winnings = int(bet_info['amount'] * odds)
-                bank_data.setdefault(user_id_str, {'balance': 0, 'debt': 0})['balance'] += winnings
+                self.bot.ledger.credit(user_id_str, winnings, reason="horse_race")
                 winners.append(f"{user.mention} (Menang: **{winnings} RSWN**)")
-                await self.give_rewards_with_bonus_check(user, ctx.guild.id, custom_rsw=winnings, custom_exp=50) # Assuming 50 exp for winning a bet
+                # Kemenangan sudah dikreditkan di atas, helper hanya memberi EXP
+                await self.give_rewards_with_bonus_check(user, ctx.guild.id, custom_rsw=0, custom_exp=50) # Assuming 50 exp for winning a bet
                 print(f"[{datetime.now()}] [DEBUG GLOBAL EVENTS] Balapan Kuda: {user.display_name} menang {winnings} RSWN.")
             else:
                 losers.append(f"{user.mention} (Kalah: {bet_info['amount']} RSWN)")
                 # No reward for losers, their money is already deducted
                 print(f"[{datetime.now()}] [DEBUG GLOBAL EVENTS] Balapan Kuda: {user.display_name} kalah {bet_info['amount']} RSWN.")
 
-        save_json_to_root(bank_data, 'data/bank_data.json')
-
         winning_horse_name = next((h['name'] for h in race_state['horses'] if h['id'] == winning_horse_id), "Kuda Misterius")
 
         result_embed = discord.Embed(
@@ -2411,15 +2412,14 @@ class Games2(commands.Cog):
         if user_id_str in race_state['bets']:
             old_bet = race_state['bets'][user_id_str]
             # Kembalikan saldo taruhan lama
-            bank_data[user_id_str]['balance'] += old_bet['amount']
+            self.bot.ledger.credit(user_id_str, old_bet['amount'], reason="horse_race_refund")
             await ctx.send(f"Taruhanmu sebelumnya ({old_bet['amount']} RSWN pada kuda #{old_bet['horse_id']}) telah dikembalikan. Memasang taruhan baru...", delete_after=5)
             print(f"[{datetime.now()}] [DEBUG GLOBAL EVENTS] Balapan Kuda: Taruhan {ctx.author.display_name} diperbarui (saldo dikembalikan).")
 
 
         # Kurangi saldo dan simpan taruhan baru
-        bank_data[user_id_str]['balance'] -= amount
+        self.bot.ledger.debit(user_id_str, amount, reason="horse_race_bet")
         race_state['bets'][user_id_str] = {'amount': amount, 'horse_id': horse_num}
-        save_json_to_root(bank_data, 'data/bank_data.json')
 
         await ctx.send(f"✅ **{ctx.author.display_name}** berhasil bertaruh **{amount} RSWN** pada **{target_horse['name']}** (Kuda #{horse_num}).", delete_after=5)
         print(f"[{datetime.now()}] [DEBUG GLOBAL EVENTS] Balapan Kuda: {ctx.author.display_name} berhasil bertaruh.")
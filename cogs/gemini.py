@@ -5,17 +5,26 @@ import random
 import asyncio
 import os
 import time
+import uuid
 from datetime import datetime, timedelta, timezone
-import google.generativeai as genai
 from google.generativeai.types import HarmCategory, HarmBlockThreshold
-from google.api_core import exceptions as google_exceptions
 import logging
 import re
-import aiohttp
-import io
-from PIL import Image
 from collections import deque
-from pymongo import MongoClient
+from utils.mongo import get_mongo
+from utils.llm import get_llm, PRIORITY_MODERATION, PRIORITY_INTERACTIVE, PRIORITY_BACKGROUND
+from utils.urlcheck import normalize_url, registrable_domain
+from utils.verdictcache import VerdictCache
+from utils.modpipeline import LocalScorer, ModerationPipeline
+from utils.textindex import BM25Index
+from utils.promptbudget import PromptBudgeter, DEFAULT_BUDGETS
+from utils.streamreply import StreamingReply
+from utils.timers import next_time_of_day
+from utils.actiontags import ActionContext, ActionDispatcher, parse_action_tags
+from utils.wordfilter import KeywordAutomaton
+from utils.summarizer import SUMMARY_STATE_FILE, get_summary_engine
+from utils.msgpipeline import PRIORITY_SCREENING, PRIORITY_REPLY
+from utils.outbox import PRIORITY_HIGH
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s:%(levelname)s:%(name)s: %(message)s')
 log = logging.getLogger('UnifiedAI')
@@ -38,126 +47,118 @@ SCHEDULE_FILE_PATH = 'data/jarkasih_schedules.json'
 PERSONAS_FILE_PATH = 'data/personas.json'
 PENDING_ACTIONS_FILE = 'data/pending_actions.json'
 CYBER_CONFIG_FILE = 'data/cyber_config.json'
-SETTINGS_FILE = 'data/settings.json'
 FILTERS_FILE = 'data/filters.json'
 VIOLATIONS_FILE = 'data/cyber_violations.json'
 CYBER_LEARNED_FILE = 'data/cyber_learned.json'
+URL_VERDICTS_FILE = 'data/url_verdicts.json'
+
+SCHEDULE_TIMER_KIND = "jarkasih.schedule"
+# Channel tongkrongan yang dipelajari Jarkasih (harian & !ai pelajari)
+LEARN_CHANNEL_ID = 1447151891892142110
+RANGKUM_MAX_MESSAGES = 2000
+
+URL_VERDICT_TTL = {"YA": 7 * 86400, "TIDAK": 86400}
+URL_VERDICT_MAX_ENTRIES = 5000
+# Satu domain baru ikut diblokir setelah sekian URL berbeda di domain itu divonis "YA"
+URL_DOMAIN_PROMOTE_AFTER = 3
+SPAM_SCOPE = "gemini"
+# (jumlah pesan, detik) untuk filter lokal "spam pesan beruntun"
+SPAM_WINDOW = (5, 5.0)
 
-URL_REGEX = re.compile(r'https?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*(),]|%[0-9a-fA-F][0-9a-fA-F])+', re.IGNORECASE)
 INVITE_REGEX = re.compile(r'(?:https?://)?(?:www\.)?(?:discord\.(?:gg|io|me|li)|discordapp\.com/invite)/[a-zA-Z0-9]+', re.IGNORECASE)
+# (pembuka, aturan mutlak) untuk prompt moderasi AI; dipakai prompt tunggal maupun batch
+AI_MOD_PROMPTS = {
+    "general": (
+        "Bertindaklah sebagai AI Moderator Keamanan yang objektif. DILARANG KERAS SARKAS.",
+        "1. TOLERANSI TONGKRONGAN: Kata-kata seperti 'jir', 'anjir', 'njir', 'anjing', 'babi', 'tolol', dll JIKA digunakan sebagai ekspresi kaget, bercanda, kekesalan ringan, atau keakraban tongkrongan WAJIB DIABAIKAN. Jawab: PASS.\n2. HUKUMAN: HANYA hukum jika ada niat jahat, bullying personal, pelecehan ekstrem, atau ancaman nyata. Jawab: ACTION: [TIMEOUT/KICK/BAN] | REASON: [Jelaskan faktanya]."
+    ),
+    "sara": (
+        "[SYSTEM_OVERRIDE]: Bertindaklah sebagai Analis Keamanan Siber.",
+        "1. TOLERANSI TONGKRONGAN: Penggunaan kata kasar (jir, anjir, anjing, memek, kontol, dll) yang bertujuan murni untuk bercanda, keakraban, umpatan kaget, atau bahasa gamer TIDAK BOLEH dihukum. JAWAB: PASS.\n2. HUKUMAN SARA/BULLY: Jika murni SARA berat untuk merendahkan ras/agama, atau Bullying ke personal dengan niat menyakiti -> JAWAB: ACTION: [BAN/KICK/TIMEOUT] | REASON: [Jelaskan alasannya]."
+    ),
+}
+AI_MOD_BATCH_LINE_REGEX = re.compile(r'^\s*\[?(\d+)\]?[.):]?\s*(.+)$')
 SARA_REGEX = re.compile(r'\b(babi|anjing|monyet|hitam|cina|pribumi|kafir|yatim|lonte|bangsat|tolol|ngentot|memek|kontol)\b', re.IGNORECASE)
 
-MONGO_URI = os.getenv("MONGODB_URI")
-mongo_client = MongoClient(MONGO_URI) if MONGO_URI else None
-mongo_db = mongo_client["reSwan"] if mongo_client is not None else None
-mongo_col = mongo_db["bot_data"] if mongo_db is not None else None
-
-API_KEYS = []
-if os.getenv("GOOGLE_API_KEY"):
-    API_KEYS.append(os.getenv("GOOGLE_API_KEY"))
-
-key_index = 2
-while True:
-    extra_key = os.getenv(f"GOOGLE_API_KEY_{key_index}")
-    if extra_key:
-        API_KEYS.append(extra_key)
-        key_index += 1
-    else:
-        break
-
-current_key_idx = 0
-
-def configure_genai():
-    global current_key_idx
-    if API_KEYS:
-        key_to_use = API_KEYS[current_key_idx]
-        genai.configure(api_key=key_to_use)
-
-def rotate_api_key():
-    global current_key_idx
-    if len(API_KEYS) > 1:
-        current_key_idx = (current_key_idx + 1) % len(API_KEYS)
-        configure_genai()
-        return True
-    return False
-
-configure_genai()
+# File yang disinkron ke koleksi Mongo `bot_data`; di-preload sekali saat setup cog
+MONGO_SYNCED_FILES = [
+    CACHE_FILE_PATH, BRAIN_FILE_PATH, LEARNED_FILE_PATH, AUTO_CONFIG_PATH, SCHEDULE_FILE_PATH,
+    PERSONAS_FILE_PATH, PENDING_ACTIONS_FILE, CYBER_CONFIG_FILE, VIOLATIONS_FILE, CYBER_LEARNED_FILE,
+    URL_VERDICTS_FILE, SUMMARY_STATE_FILE
+]
 
 def load_json_file(path, default):
-    if mongo_col is not None:
-        try:
-            doc = mongo_col.find_one({"_id": path})
-            if doc and "data" in doc:
-                return doc["data"]
-        except Exception:
-            pass
-    if not os.path.exists(path):
-        os.makedirs(os.path.dirname(path), exist_ok=True)
-        with open(path, 'w', encoding='utf-8') as f: json.dump(default, f, indent=4)
-        return default
-    try:
-        with open(path, 'r', encoding='utf-8') as f: return json.load(f)
-    except:
-        return default
+    return get_mongo().load(path, default)
 
 def save_json_file(path, data):
     try:
-        os.makedirs(os.path.dirname(path), exist_ok=True)
-        with open(path, 'w', encoding='utf-8') as f: json.dump(data, f, indent=4)
-    except Exception:
-        pass
-    if mongo_col is not None:
-        try:
-            mongo_col.update_one(
-                {"_id": path},
-                {"$set": {"data": data, "updated_at": time.time()}},
-                upsert=True
-            )
-        except Exception:
-            pass
+        get_mongo().save(path, data)
+    except Exception as e:
+        log.error(f"Gagal menyimpan {path}: {e}")
+
+def parse_ai_action(decision):
+    """`ACTION: <aksi> | REASON: <alasan>` dari moderasi AI -> (aksi, alasan); (None, None) kalau formatnya aneh."""
+    try:
+        parts = decision.split("|")
+        return parts[0].split(":")[1].strip().lower(), parts[1].split(":")[1].strip()
+    except IndexError:
+        return None, None
 
 async def send_long_message(ctx_or_channel, text):
     for chunk in [text[i:i+DISCORD_MSG_LIMIT] for i in range(0, len(text), DISCORD_MSG_LIMIT)]:
         await ctx_or_channel.send(chunk)
 
-async def generate_smart_response(content_payload):
-    safety_settings = {
-        HarmCategory.HARM_CATEGORY_HARASSMENT: HarmBlockThreshold.BLOCK_NONE,
-        HarmCategory.HARM_CATEGORY_HATE_SPEECH: HarmBlockThreshold.BLOCK_NONE,
-        HarmCategory.HARM_CATEGORY_SEXUALLY_EXPLICIT: HarmBlockThreshold.BLOCK_NONE,
-        HarmCategory.HARM_CATEGORY_DANGEROUS_CONTENT: HarmBlockThreshold.BLOCK_NONE,
-    }
+SAFETY_SETTINGS = {
+    HarmCategory.HARM_CATEGORY_HARASSMENT: HarmBlockThreshold.BLOCK_NONE,
+    HarmCategory.HARM_CATEGORY_HATE_SPEECH: HarmBlockThreshold.BLOCK_NONE,
+    HarmCategory.HARM_CATEGORY_SEXUALLY_EXPLICIT: HarmBlockThreshold.BLOCK_NONE,
+    HarmCategory.HARM_CATEGORY_DANGEROUS_CONTENT: HarmBlockThreshold.BLOCK_NONE,
+}
+
+async def generate_smart_stream(content_payload, priority=PRIORITY_INTERACTIVE):
+    """Versi streaming: pindah model hanya bisa sebelum chunk pertama diterima."""
     last_err = None
     for model_name in GEMINI_MODELS:
-        attempts_per_model = max(1, len(API_KEYS))
-        for _ in range(attempts_per_model):
+        try:
+            response = await get_llm().generate(
+                model_name, content_payload, priority=priority,
+                model_kwargs={"tools": "google_search"}, safety_settings=SAFETY_SETTINGS, stream=True
+            )
+            if not response.candidates:
+                raise Exception("SAFETY_BLOCK")
+            return response
+        except Exception as e:
+            if "safety_block" in str(e).lower():
+                raise e
+            last_err = e
+    raise Exception(f"API Error setelah rotasi: {last_err}")
+
+async def summarize_text(prompt, priority=None):
+    """Adapter `generate` untuk SummaryEngine."""
+    res = await generate_smart_response([prompt], priority=priority or PRIORITY_BACKGROUND)
+    return res.text
+
+async def generate_smart_response(content_payload, priority=PRIORITY_INTERACTIVE):
+    last_err = None
+    for model_name in GEMINI_MODELS:
+        try:
+            response = await get_llm().generate(
+                model_name, content_payload, priority=priority,
+                model_kwargs={"tools": "google_search"}, safety_settings=SAFETY_SETTINGS
+            )
             try:
-                try:
-                    model = genai.GenerativeModel(model_name, tools='google_search')
-                except Exception:
-                    model = genai.GenerativeModel(model_name)
-                response = await model.generate_content_async(content_payload, safety_settings=safety_settings)
-                try:
-                    if not response.candidates:
-                        raise Exception("SAFETY_BLOCK")
-                    _ = response.text 
-                    return response
-                except ValueError as ve:
-                    if "candidates is empty" in str(ve).lower() or (response.candidates and response.candidates[0].finish_reason.name == 'SAFETY'):
-                        raise Exception("SAFETY_BLOCK")
-                    raise Exception(f"AI format error: {ve}")
-            except Exception as e:
-                err_str = str(e).lower()
-                if "safety_block" in err_str:
-                    raise e
-                
-                if "429" in err_str or "quota" in err_str or "exhausted" in err_str or "too many requests" in err_str or "overloaded" in err_str or isinstance(e, google_exceptions.ResourceExhausted):
-                    if rotate_api_key():
-                        await asyncio.sleep(1)
-                        continue
-                    
-                last_err = e
-                break
+                if not response.candidates:
+                    raise Exception("SAFETY_BLOCK")
+                _ = response.text 
+                return response
+            except ValueError as ve:
+                if "candidates is empty" in str(ve).lower() or (response.candidates and response.candidates[0].finish_reason.name == 'SAFETY'):
+                    raise Exception("SAFETY_BLOCK")
+                raise Exception(f"AI format error: {ve}")
+        except Exception as e:
+            if "safety_block" in str(e).lower():
+                raise e
+            last_err = e
     raise Exception(f"API Error setelah rotasi: {last_err}")
 
 class ExpertSelect(discord.ui.Select):
@@ -207,6 +208,7 @@ class KeywordModal(discord.ui.Modal, title='Tambah Kamus Jarkasih'):
         content = self.content_input.value.strip()
         self.cog.brain.setdefault('keywords', {})[keyword] = content
         save_json_file(BRAIN_FILE_PATH, self.cog.brain)
+        self.cog.refresh_keyword_index()
         await interaction.response.send_message(f"Kamus diupdate: `{keyword}`", ephemeral=True)
 
 class ArticleModal(discord.ui.Modal, title='Tambah Pengetahuan'):
@@ -223,6 +225,7 @@ class ArticleModal(discord.ui.Modal, title='Tambah Pengetahuan'):
         new_article = {"title": title, "content": content, "added_at": str(datetime.now())}
         self.cog.brain.setdefault('articles', []).append(new_article)
         save_json_file(BRAIN_FILE_PATH, self.cog.brain)
+        self.cog.index_article(new_article)
         await interaction.response.send_message(f"Artikel tersimpan: **{title}**", ephemeral=True)
 
 class TrainView(discord.ui.View):
@@ -307,12 +310,12 @@ class AuthView(discord.ui.View):
 
         for dm_info in action_data.get("dm_messages", []):
             try:
-                admin_user = await self.bot.fetch_user(dm_info["user_id"])
+                admin_user = await self.bot.outbox.resolve_user(dm_info["user_id"])
                 dm_channel = admin_user.dm_channel or await admin_user.create_dm()
                 msg = await dm_channel.fetch_message(dm_info["message_id"])
                 
                 await msg.edit(view=self)
-                await dm_channel.send(f"✅ Tindakan **{self.action_type.upper()}** ke <@{self.target_id}> di server **{guild.name}** udah di-ACC oleh <@{interaction.user.id}>.")
+                self.bot.outbox.send(admin_user, f"✅ Tindakan **{self.action_type.upper()}** ke <@{self.target_id}> di server **{guild.name}** udah di-ACC oleh <@{interaction.user.id}>.", priority=PRIORITY_HIGH)
             except Exception:
                 pass
         
@@ -336,12 +339,12 @@ class AuthView(discord.ui.View):
 
         for dm_info in action_data.get("dm_messages", []):
             try:
-                admin_user = await self.bot.fetch_user(dm_info["user_id"])
+                admin_user = await self.bot.outbox.resolve_user(dm_info["user_id"])
                 dm_channel = admin_user.dm_channel or await admin_user.create_dm()
                 msg = await dm_channel.fetch_message(dm_info["message_id"])
                 
                 await msg.edit(view=self)
-                await dm_channel.send(f"❌ Tindakan **{self.action_type.upper()}** ke <@{self.target_id}> di server **{guild_name}** udah di-REJECT (Ditolak) oleh <@{interaction.user.id}>.")
+                self.bot.outbox.send(admin_user, f"❌ Tindakan **{self.action_type.upper()}** ke <@{self.target_id}> di server **{guild_name}** udah di-REJECT (Ditolak) oleh <@{interaction.user.id}>.", priority=PRIORITY_HIGH)
             except Exception:
                 pass
 
@@ -353,11 +356,12 @@ class UnifiedAI(commands.Cog, name="RTM Moderation Center"):
     def __init__(self, bot):
         self.bot = bot
         self.pending_actions = load_json_file(PENDING_ACTIONS_FILE, {})
-        self.spam_tracker = {}
         self.chat_buffer = {}
         
         self.brain = load_json_file(BRAIN_FILE_PATH, {"keywords": {}, "articles": []})
+        self.rebuild_brain_index()
         self.learned_context = load_json_file(LEARNED_FILE_PATH, {"summary": "Belum ada data yang dipelajari."})
+        self.summaries = get_summary_engine(summarize_text)
         self.schedules = load_json_file(SCHEDULE_FILE_PATH, {"jobs": []})
         self.chat_history = {}
         self.dm_history = {}
@@ -383,6 +387,9 @@ class UnifiedAI(commands.Cog, name="RTM Moderation Center"):
         if isinstance(self.auto_config.get("custom_personas"), list):
             self.auto_config["custom_personas"] = {}
             save_json_file(AUTO_CONFIG_PATH, self.auto_config)
+        self.prompt_budget = PromptBudgeter(self.auto_config.setdefault("prompt_budgets", {}))
+        self.reply_stats = {"count": 0, "ttfv_total": 0.0, "ttfv_max": 0.0}
+        self.action_dispatcher = self._build_action_dispatcher()
 
         self.cyber_config = load_json_file(CYBER_CONFIG_FILE, {
             "whitelist_users": [], 
@@ -397,13 +404,23 @@ class UnifiedAI(commands.Cog, name="RTM Moderation Center"):
         self.data = load_json_file(CACHE_FILE_PATH, {
             'sensitive_keywords': ['steampowered', 'steam', 'paypal', 'discord', 'nitro', 'login', 'bank', 'freefire', 'ff', 'mobilelegends', 'ml', 'pubg', 'dana', 'gopay', 'ovo', 'claim', 'diamond', 'voucher', 'giveaway'],
             'suspicious_tlds': ['.co', '.xyz', '.site', '.info', '.biz', '.club', '.online', '.link', '.gq', '.cf', '.tk', '.ml', '.top', '.icu', '.stream', '.live', '.ru'],
-            'verified_urls': {},
             'domain_whitelist': ['youtube.com', 'youtu.be', 'discord.com', 'discordapp.com', 'tenor.com']
         })
-        self.sensitive_keywords = self.data['sensitive_keywords']
-        self.suspicious_tlds = self.data['suspicious_tlds']
-        self.verified_urls = self.data['verified_urls']
-        self.domain_whitelist = self.data['domain_whitelist']
+        self.url_verdicts = VerdictCache(URL_VERDICTS_FILE, max_entries=URL_VERDICT_MAX_ENTRIES, default_ttl=URL_VERDICT_TTL["TIDAK"])
+        legacy_verdicts = self.data.pop('verified_urls', None)
+        if legacy_verdicts is not None:
+            for url, res_text in legacy_verdicts.items():
+                verdict = "YA" if "YA" in str(res_text).upper() else "TIDAK"
+                self.url_verdicts.set(normalize_url(url), verdict, URL_VERDICT_TTL[verdict])
+            save_json_file(CACHE_FILE_PATH, self.data)
+        self.url_verdicts.start()
+        self.refresh_url_analyzer()
+
+        self.mod_pipeline = ModerationPipeline(self.decide_moderation_batch, LocalScorer(extra_regex=SARA_REGEX))
+        self._filter_config_ref = self.cyber_config
+        self.bot.word_filter.register_source("cyber", self._cyber_filter_terms)
+        if not self.bot.word_filter.has_source("filters"):
+            self.bot.word_filter.register_source("filters", self._file_filter_terms)
 
         self.warning_messages = [
             "Link sampah terdeteksi. Minggir lu.",
@@ -460,13 +477,33 @@ class UnifiedAI(commands.Cog, name="RTM Moderation Center"):
         self.cleanup_task.start()
         self._daily_learning_task = self.daily_learning.start()
         self._auto_fish_update_task = self.auto_fish_it_update.start()
-        self._schedule_checker_task = self.schedule_checker.start()
+        self.bot.timers.register(SCHEDULE_TIMER_KIND, self.run_schedule_job)
+        self.sync_schedule_timers()
+        self.bot.message_pipeline.register("gemini.screening", self.screen_message, PRIORITY_SCREENING, dm=True)
+        self.bot.message_pipeline.register("gemini.reply", self.reply_message, PRIORITY_REPLY, dm=True)
 
     def cog_unload(self):
         self.cleanup_task.cancel()
         if self._daily_learning_task: self._daily_learning_task.cancel()
         if self._auto_fish_update_task: self._auto_fish_update_task.cancel()
-        if self._schedule_checker_task: self._schedule_checker_task.cancel()
+        self.bot.timers.unregister(SCHEDULE_TIMER_KIND, self.run_schedule_job)
+        self.bot.message_pipeline.unregister("gemini.screening", self.screen_message)
+        self.bot.message_pipeline.unregister("gemini.reply", self.reply_message)
+        self.url_verdicts.stop()
+        self.bot.word_filter.unregister_source("cyber", self._cyber_filter_terms)
+        self.bot.word_filter.unregister_source("filters", self._file_filter_terms)
+
+    def _cyber_filter_terms(self, guild_id):
+        return {
+            "blacklist_words": self.cyber_config.get("blacklist_words", []),
+            "sara_words": self.cyber_config.get("sara_words", []),
+            "ai_whitelist_words": self.cyber_config.get("ai_whitelist_words", []),
+        }
+
+    def _file_filter_terms(self, guild_id):
+        # Fallback kalau cog moderation tidak dimuat: baca filters.json langsung
+        guild_filters = load_json_file(FILTERS_FILE, {}).get(str(guild_id), {})
+        return {"bad_words": guild_filters.get("bad_words", []), "link_patterns": guild_filters.get("link_patterns", [])}
 
     @tasks.loop(minutes=30)
     async def cleanup_task(self):
@@ -504,49 +541,60 @@ class UnifiedAI(commands.Cog, name="RTM Moderation Center"):
         else: waktu = "Malam"
         return f"WIB: {wib_time.strftime('%A, %d %B %Y %H:%M:%S')} ({waktu}) | Waktu Pusat UTC: {utc_now.strftime('%d %B %Y %H:%M:%S')}"
 
-    def get_brain_context(self, message_content, guild=None, channel_id=None):
-        context = []
-        msg_lower = message_content.lower()
-        for key, info in self.brain.get('keywords', {}).items():
-            if key in msg_lower:
-                context.append(f"Fakta ({key}): {info}")
+    def rebuild_brain_index(self):
+        self.brain_index = BM25Index()
+        for article in self.brain.get('articles', []):
+            self.index_article(article)
+        self.refresh_keyword_index()
+
+    def index_article(self, article):
+        """Tambah/perbarui satu artikel di index (key = identitas objek artikel di self.brain)."""
+        self.brain_index.add(id(article), article.get('title', ''), article.get('content', ''), article)
 
-        relevant_articles = []
+    def remove_articles(self, predicate):
+        kept, removed = [], []
         for article in self.brain.get('articles', []):
-            user_words = set(msg_lower.split())
-            title_words = set(article['title'].lower().split())
-            is_relevant = False
-            if article['title'].lower() in msg_lower: 
-                is_relevant = True
-            else:
-                common_words = {'cara', 'yang', 'di', 'ke', 'dan', 'ini', 'itu', 'apa', 'gimana', 'siapa'}
-                clean_title_words = title_words - common_words
-                if clean_title_words and clean_title_words.intersection(user_words):
-                    is_relevant = True
-            if is_relevant:
-                relevant_articles.append(f"REF: {article['title']}\n{article['content']}")
+            (removed if predicate(article) else kept).append(article)
+        self.brain['articles'] = kept
+        for article in removed:
+            self.brain_index.remove(id(article))
+        return len(removed)
+
+    def refresh_keyword_index(self):
+        self.keyword_index = KeywordAutomaton({key: [key] for key in self.brain.get('keywords', {})})
+
+    def get_brain_context(self, message_content, guild=None, channel_id=None, request_type="chat"):
+        budget = self.prompt_budget
+        keywords = self.brain.get('keywords', {})
+        context = [f"Fakta ({key}): {keywords[key]}" for key in self.keyword_index.scan(message_content) if key in keywords]
+        relevant_articles = [f"REF: {article['title']}\n{article['content']}" for _, article in self.brain_index.search(message_content, limit=2)]
+        knowledge = budget.fit_items(context + relevant_articles, budget.budget(request_type, "knowledge"))
+        context, relevant_articles = knowledge[:len(context)], knowledge[len(context):]
 
         final_context_str = ""
         if context:
             final_context_str += "[KAMUS DATA]:\n" + "\n".join(context) + "\n"
         if relevant_articles:
-            final_context_str += "\n[ARTIKEL PENGETAHUAN]:\n" + "\n".join(relevant_articles[:2]) + "\n"
+            final_context_str += "\n[ARTIKEL PENGETAHUAN]:\n" + "\n".join(relevant_articles) + "\n"
 
         if guild:
-            roles = [f"{r.name} (ID: {r.id})" for r in guild.roles if r.name != "@everyone"]
+            roles = budget.roles_for(guild, message_content, budget.budget(request_type, "roles"))
             if roles:
                 final_context_str += "\n[DAFTAR ROLE SERVER INI]:\n" + ", ".join(roles) + "\n"
 
         if channel_id and channel_id in self.chat_history:
-            history_list = list(self.chat_history[channel_id])
+            history_list = budget.trim_history(list(self.chat_history[channel_id]), budget.budget(request_type, "history"))
             if history_list:
                 final_context_str += "\n[SHORT-TERM MEMORY (15 Chat Terakhir dari Berbagai User di Sini)]:\n" + "\n".join(history_list) + "\n"
 
         return final_context_str
 
-    def build_prompt(self, user, ctx_data, prompt_text):
+    def build_prompt(self, user, ctx_data, prompt_text, query=None, request_type="chat"):
         t = self.get_wib_time_str()
-        learned = self.learned_context.get("summary", "Belum ada.")
+        summary = self.learned_context.get("summary", "Belum ada.")
+        learned, used_sections, total_sections = self.prompt_budget.learned_for(
+            summary, query or prompt_text, self.prompt_budget.budget(request_type, "learned")
+        )
         uid_str = str(user.id)
         now_ts = time.time()
         
@@ -576,13 +624,15 @@ class UnifiedAI(commands.Cog, name="RTM Moderation Center"):
             learned_data=learned, 
             interaction_status=interaction_status
         )
-        return f"{persona}\n\n{ctx_data}\n\nUser ({user.display_name} - ID: {user.id}): {prompt_text}"
+        full_prompt = f"{persona}\n\n{ctx_data}\n\nUser ({user.display_name} - ID: {user.id}): {prompt_text}"
+        self.prompt_budget.record(request_type, full_prompt, f"hasil belajar {used_sections}/{total_sections} bagian, konteks {len(ctx_data)} karakter")
+        return full_prompt
 
     async def apply_db_correction(self, correction_instruction):
         current_data = self.learned_context.get("summary", "")
         prompt = f"Tugas lu sebagai admin database. Perbarui data JSON naratif di bawah ini.\n\nDATA LAMA:\n{current_data}\n\nINSTRUKSI KOREKSI:\n{correction_instruction}\n\nPERINTAH: Tulis ulang DATA LAMA dengan memasukkan instruksi perbaikan. Hapus apa yang disuruh hapus. JANGAN tambahkan balasan lain, langsung berikan teks hasilnya saja."
         try:
-            res = await generate_smart_response([prompt])
+            res = await generate_smart_response([prompt], priority=PRIORITY_BACKGROUND)
             new_summary = res.text.strip()
             if new_summary and len(new_summary) > 10 and new_summary.lower() != "gagal":
                 self.learned_context["summary"] = new_summary
@@ -592,207 +642,269 @@ class UnifiedAI(commands.Cog, name="RTM Moderation Center"):
         except Exception as e:
             return False
 
+    async def learn_from_channel(self, channel, initial_limit=200, priority=PRIORITY_BACKGROUND):
+        """Lebur chat baru (sejak checkpoint) di `channel` ke hasil belajar. True kalau memori berubah."""
+        async def _merge(memory, digest):
+            prompt = f"Tugas lu adalah menjadi Analis Data Tongkrongan kelas atas.\nIni memori lama lu:\n{memory}\nRINGKASAN CHAT BARU (sejak update terakhir):\n{digest}\nATURAN MUTLAK:\n1. JANGAN PERNAH MENGHAPUS DATA USER LAMA! Jika user tidak muncul di ringkasan baru, DATA LAMA WAJIB DITULIS ULANG.\n2. Untuk tiap user, sertakan: Status Update, Kepribadian, Dinamika Hubungan, Skor Karma (-10 s/d +10).\n3. Format: [1. Topik Utama], [2. Inside Jokes], dan [3. Profil Karakter Tiap User]."
+            res = await generate_smart_response([prompt], priority=priority)
+            new_memory = res.text.strip()
+            if not new_memory:
+                raise Exception("Jawaban AI kosong")
+            return new_memory
+
+        new_memory = await self.summaries.merge_into(
+            channel, self.learned_context.get("summary", ""), _merge, initial_limit=initial_limit, priority=priority
+        )
+        if new_memory is None:
+            return False
+        self.learned_context["summary"] = new_memory
+        save_json_file(LEARNED_FILE_PATH, self.learned_context)
+        return True
+
     async def memorize_images(self, user, images):
         prompt = "Jelaskan secara singkat dan detail apa isi gambar ini. Jika gambar memuat meme, screenshot game, atau kejadian lucu, tangkap intinya untuk disimpan sebagai 'Visual Memory' lu."
+
+        async def _describe(fresh):
+            res = await generate_smart_response([prompt] + [image.as_part() for image in fresh], priority=PRIORITY_BACKGROUND)
+            return res.text.strip()
+
         try:
-            content_payload = [prompt] + images
-            res = await generate_smart_response(content_payload)
-            deskripsi = res.text.strip()
+            # Gambar yang sudah pernah dideskripsikan (hash sama) tidak dikirim ulang
+            deskripsi = await self.bot.image_pipeline.describe(images, _describe)
             if deskripsi:
                 judul = f"Visual Memory: {user.display_name} - {datetime.now().strftime('%d %b %Y %H:%M')}"
-                self.brain.setdefault('articles', []).append({
+                article = {
                     "title": judul,
                     "content": deskripsi,
                     "added_at": str(datetime.now())
-                })
+                }
+                self.brain.setdefault('articles', []).append(article)
                 save_json_file(BRAIN_FILE_PATH, self.brain)
+                self.index_article(article)
         except Exception:
             pass
 
     async def get_images_from_message(self, message):
-        images = []
-        for att in message.attachments:
-            if any(att.filename.lower().endswith(ext) for ext in ['png', 'jpg', 'jpeg', 'webp']):
-                try:
-                    async with aiohttp.ClientSession() as session:
-                        async with session.get(att.url) as resp:
-                            if resp.status == 200:
-                                img_data = await resp.read()
-                                img = Image.open(io.BytesIO(img_data))
-                                images.append(img)
-                except Exception:
-                    pass
-        return images
-
-    async def process_and_send_response(self, send_target, user, ctx_data, prompt_text, images=None):
+        return await self.bot.image_pipeline.from_message(message)
+
+    def _build_action_dispatcher(self):
+        return ActionDispatcher({
+            "ACTION_WHITELIST_KATA": self._act_whitelist_kata,
+            "ACTION_UNWHITELIST_KATA": self._act_unwhitelist_kata,
+            "UPDATE_DATABASE": self._act_update_database,
+            "ACTION_DELETE_ARTICLE": self._act_delete_article,
+            "ACTION_SCHEDULE": self._act_schedule,
+            "ACTION_PROXY": self._act_proxy,
+            "ACTION_AUTO_NGAMBEK": self._act_auto_ngambek,
+            "ACTION_REACT": self._act_react,
+            "ACTION_KARMA": self._act_karma,
+            "ACTION_SPY_DM": self._act_spy_dm,
+            "ACTION_FITNAH": self._act_fitnah,
+            "ACTION_DM": self._act_dm,
+            "ACTION_CHANNEL": self._act_channel,
+        }, serial_key=self._action_serial_key)
+
+    @staticmethod
+    def _action_serial_key(action):
+        # Fitnah & kirim channel ke channel yang sama tetap berurutan (webhook dibuat sekali)
+        if action.name == "ACTION_FITNAH":
+            return ("channel", action.args[1].upper())
+        if action.name == "ACTION_CHANNEL":
+            return ("channel", action.args[0])
+        return (action.name, action.args[0])
+
+    def _act_whitelist_kata(self, ctx, kata):
+        kata = kata.lower()
+        self.cyber_config.setdefault("ai_whitelist_words", [])
+        if kata not in self.cyber_config["ai_whitelist_words"]:
+            self.cyber_config["ai_whitelist_words"].append(kata)
+            ctx.dirty.add(CYBER_CONFIG_FILE)
+            return f"*(Sip bos, kata '{kata}' udah gue masukin daftar aman)*"
+
+    def _act_unwhitelist_kata(self, ctx, kata):
+        kata = kata.lower()
+        if kata in self.cyber_config.get("ai_whitelist_words", []):
+            self.cyber_config["ai_whitelist_words"].remove(kata)
+            ctx.dirty.add(CYBER_CONFIG_FILE)
+            return f"*(Sip bos, kata '{kata}' udah gue hapus dari daftar aman)*"
+
+    def _act_update_database(self, ctx, correction):
+        asyncio.create_task(self.apply_db_correction(correction))
+
+    def _act_delete_article(self, ctx, title):
+        title = title.lower()
+        if self.remove_articles(lambda a: a['title'].lower() == title):
+            ctx.dirty.add(BRAIN_FILE_PATH)
+            return f"*(Sip, artikel '{title}' udah gue hapus dari memori)*"
+        return f"*(Gagal hapus, artikel '{title}' ga ketemu di otak gue)*"
+
+    def _act_schedule(self, ctx, s_type, s_target, s_time, s_date, s_theme):
+        s_type = s_type.lower()
+        job = {
+            "id": uuid.uuid4().hex[:12], "type": s_type, "target": s_target, "time": s_time,
+            "end_date": s_date, "theme": s_theme, "last_sent": ""
+        }
+        if not self.arm_schedule_job(job):
+            return f"*(Gagal bikin jadwal, jam '{s_time}' ga valid)*"
+        self.schedules.setdefault("jobs", []).append(job)
+        ctx.dirty.add(SCHEDULE_FILE_PATH)
+        return f"*(Sip bos, jadwal auto-pesan ke {s_type} tiap jam {s_time} sampai tanggal {s_date} udah gue catet di otak)*"
+
+    def _act_proxy(self, ctx, p_uid, p_mins):
+        p_mins = int(p_mins)
+        self.auto_config.setdefault("proxies", {})[p_uid] = time.time() + (p_mins * 60)
+        ctx.dirty.add(AUTO_CONFIG_PATH)
+        return f"*(Sistem Proxy AFK aktif buat <@{p_uid}> selama {p_mins} menit. Biar gue yang balesin chat dia.)*"
+
+    def _act_auto_ngambek(self, ctx, ngambek_uid, ngambek_mins):
+        self.auto_config.setdefault("sulking_users", {})[ngambek_uid] = time.time() + (int(ngambek_mins) * 60)
+        ctx.dirty.add(AUTO_CONFIG_PATH)
+
+    def _act_react(self, ctx, emoji):
+        ctx.emoji = emoji
+
+    def _act_karma(self, ctx, k_uid, k_val):
+        scores = self.auto_config.setdefault("karma_scores", {})
+        scores[k_uid] = scores.get(k_uid, 0) + int(k_val)
+        ctx.dirty.add(AUTO_CONFIG_PATH)
+        return f"*(Sistem Karma: Poin <@{k_uid}> sekarang {scores[k_uid]})*"
+
+    async def _act_spy_dm(self, ctx, s_uid):
+        try:
+            target_user = await self.bot.outbox.resolve_user(s_uid)
+            dm_channel = target_user.dm_channel
+            if dm_channel is None: dm_channel = await target_user.create_dm()
+            fetched_dms = []
+            async for m in dm_channel.history(limit=20):
+                sender = "Jarkasih" if m.author.id == self.bot.user.id else m.author.display_name
+                fetched_dms.append(f"[{m.created_at.strftime('%d/%m %H:%M')}] {sender}: {m.content}")
+            if fetched_dms:
+                fetched_dms.reverse()
+                return f"\n**[DATA INTEL DM RAHASIA]**\nIni bocoran history chat DM gue sama dia bos:\n```\n" + "\n".join(fetched_dms) + "\n```"
+            return f"*(Gue udah ngecek DM, kosong melompong bos.)*"
+        except Exception as e:
+            return f"*(Gagal narik data DM: {e})*"
+
+    async def _act_fitnah(self, ctx, f_uid, f_cid_str, f_msg):
+        send_target = ctx.send_target
+        try:
+            if f_cid_str.upper() == "SINI": target_channel = send_target.channel if isinstance(send_target, discord.Message) and send_target.guild else None
+            else: target_channel = await self.bot.fetch_channel(int(f_cid_str))
+            if not target_channel:
+                return f"*(Gagal fitnah: Channel tujuan nggak ketemu!)*"
+            guild = target_channel.guild
+            target_member = guild.get_member(int(f_uid))
+            if not target_member:
+                try: target_member = await guild.fetch_member(int(f_uid))
+                except discord.NotFound: target_member = await self.bot.fetch_user(int(f_uid))
+            webhooks = await target_channel.webhooks()
+            webhook = discord.utils.get(webhooks, name="JarkasihDoppelganger")
+            if not webhook: webhook = await target_channel.create_webhook(name="JarkasihDoppelganger")
+            await webhook.send(content=f_msg, username=target_member.display_name, avatar_url=target_member.display_avatar.url)
+            return f"*(Laporan: Sukses memfitnah <@{f_uid}> di <#{target_channel.id}>)*"
+        except Exception as e:
+            return f"*(Gagal fitnah ke channel <#{f_cid_str}>: {e})*"
+
+    async def _act_dm(self, ctx, dm_target, dm_msg):
+        try:
+            chunks = [dm_msg[i:i+DISCORD_MSG_LIMIT] for i in range(0, len(dm_msg), DISCORD_MSG_LIMIT)]
+            sent = await asyncio.gather(*(self.bot.outbox.send(int(dm_target), chunk) for chunk in chunks if chunk))
+            if sent and all(sent):
+                return f"*(Sip bos, DM udah meluncur ke <@{dm_target}>)*"
+            return f"*(Gagal DM ke <@{dm_target}>, dia nutup DM-nya)*"
+        except Exception:
+            return None
+
+    async def _act_channel(self, ctx, ch_target, ch_msg):
+        try:
+            target_channel = await self.bot.fetch_channel(int(ch_target))
+            for chunk in [ch_msg[i:i+DISCORD_MSG_LIMIT] for i in range(0, len(ch_msg), DISCORD_MSG_LIMIT)]:
+                if chunk: await target_channel.send(chunk)
+            return f"*(Laporan: Pesan sukses ditembakkan ke channel <#{ch_target}>)*"
+        except Exception as e:
+            return f"*(Gagal ngirim ke channel <#{ch_target}>: {e})*"
+
+    async def apply_action_tags(self, text, send_target):
+        """Eksekusi semua tag `$$ACTION_...$$` di jawaban model. Mengembalikan (teks bersih, emoji react)."""
+        text, actions = parse_action_tags(text)
+        if not actions:
+            return text, None
+        ctx = ActionContext(send_target)
+        notes = await self.action_dispatcher.run(actions, ctx)
+
+        # Semua mutasi config dari satu jawaban disimpan sekali per file
+        file_data = {
+            CYBER_CONFIG_FILE: self.cyber_config, BRAIN_FILE_PATH: self.brain,
+            SCHEDULE_FILE_PATH: self.schedules, AUTO_CONFIG_PATH: self.auto_config,
+        }
+        for path in ctx.dirty:
+            save_json_file(path, file_data[path])
+        if CYBER_CONFIG_FILE in ctx.dirty:
+            self.bot.word_filter.invalidate()
+
+        if notes:
+            text = "\n".join([text] + notes).strip()
+        return text, ctx.emoji
+
+    async def send_reply(self, send_target, text, emoji_to_react=None):
+        sent_msg = None
+        if isinstance(send_target, discord.Message):
+            chunks = [text[i:i+DISCORD_MSG_LIMIT] for i in range(0, len(text), DISCORD_MSG_LIMIT)]
+            for i, chunk in enumerate(chunks):
+                if i == 0: sent_msg = await send_target.reply(chunk)
+                else: await send_target.channel.send(chunk)
+            if emoji_to_react and sent_msg:
+                try: await sent_msg.add_reaction(emoji_to_react)
+                except Exception: pass
+        else:
+            for chunk in [text[i:i+DISCORD_MSG_LIMIT] for i in range(0, len(text), DISCORD_MSG_LIMIT)]:
+                await send_target.send(chunk)
+
+    async def stream_response(self, send_target, content_payload):
+        if isinstance(send_target, discord.Message):
+            send_first, send_next = send_target.reply, send_target.channel.send
+        else:
+            send_first = send_next = send_target.send
+        reply = StreamingReply(send_first, send_next)
+        response = await generate_smart_stream(content_payload)
+        async for chunk in response:
+            try:
+                piece = chunk.text
+            except ValueError:
+                # chunk tanpa teks (mis. metadata grounding)
+                continue
+            await reply.feed(piece)
+
+        text, emoji_to_react = await self.apply_action_tags(reply.raw, send_target)
+        messages = await reply.finish(text)
+        ttfv = reply.time_to_first_visible
+        if ttfv is not None:
+            stats = self.reply_stats
+            stats["count"] += 1
+            stats["ttfv_total"] += ttfv
+            stats["ttfv_max"] = max(stats["ttfv_max"], ttfv)
+            log.info(f"Balasan streaming: token pertama tampil {ttfv:.2f}s, {len(text)} karakter, {len(messages)} pesan")
+        if emoji_to_react and messages:
+            try: await messages[0].add_reaction(emoji_to_react)
+            except Exception: pass
+
+    async def process_and_send_response(self, send_target, user, ctx_data, prompt_text, images=None, request_type="chat", query=None):
         if images is None:
             images = []
         if images:
             asyncio.create_task(self.memorize_images(user, images))
 
-        full_prompt = self.build_prompt(user, ctx_data, prompt_text)
-        content_payload = [full_prompt] + images
+        full_prompt = self.build_prompt(user, ctx_data, prompt_text, query, request_type)
+        content_payload = [full_prompt] + [image.as_part() for image in images]
         
         try:
-            res = await generate_smart_response(content_payload)
-            text = res.text
-
-            match_wl = re.search(r'\$\$ACTION_WHITELIST_KATA:\s*(.*?)\$\$', text, re.IGNORECASE | re.DOTALL)
-            if match_wl:
-                kata_wl = match_wl.group(1).strip().lower()
-                text = re.sub(r'\$\$ACTION_WHITELIST_KATA:\s*.*?\$\$', '', text, flags=re.IGNORECASE | re.DOTALL).strip()
-                self.cyber_config.setdefault("ai_whitelist_words", [])
-                if kata_wl not in self.cyber_config["ai_whitelist_words"]:
-                    self.cyber_config["ai_whitelist_words"].append(kata_wl)
-                    save_json_file(CYBER_CONFIG_FILE, self.cyber_config)
-                    text += f"\n*(Sip bos, kata '{kata_wl}' udah gue masukin daftar aman)*"
-
-            match_unwl = re.search(r'\$\$ACTION_UNWHITELIST_KATA:\s*(.*?)\$\$', text, re.IGNORECASE | re.DOTALL)
-            if match_unwl:
-                kata_unwl = match_unwl.group(1).strip().lower()
-                text = re.sub(r'\$\$ACTION_UNWHITELIST_KATA:\s*.*?\$\$', '', text, flags=re.IGNORECASE | re.DOTALL).strip()
-                if kata_unwl in self.cyber_config.get("ai_whitelist_words", []):
-                    self.cyber_config["ai_whitelist_words"].remove(kata_unwl)
-                    save_json_file(CYBER_CONFIG_FILE, self.cyber_config)
-                    text += f"\n*(Sip bos, kata '{kata_unwl}' udah gue hapus dari daftar aman)*"
-            
-            match_db = re.search(r'\$\$UPDATE_DATABASE:\s*(.*?)\$\$', text, re.IGNORECASE | re.DOTALL)
-            if match_db:
-                correction = match_db.group(1)
-                text = re.sub(r'\$\$UPDATE_DATABASE:\s*.*?\$\$', '', text, flags=re.IGNORECASE | re.DOTALL).strip()
-                asyncio.create_task(self.apply_db_correction(correction))
-
-            match_del_art = re.search(r'\$\$ACTION_DELETE_ARTICLE:\s*(.*?)\$\$', text, re.IGNORECASE | re.DOTALL)
-            if match_del_art:
-                art_title = match_del_art.group(1).strip().lower()
-                text = re.sub(r'\$\$ACTION_DELETE_ARTICLE:\s*.*?\$\$', '', text, flags=re.IGNORECASE | re.DOTALL).strip()
-                original_len = len(self.brain.get('articles', []))
-                self.brain['articles'] = [a for a in self.brain.get('articles', []) if a['title'].lower() != art_title]
-                if len(self.brain['articles']) < original_len:
-                    save_json_file(BRAIN_FILE_PATH, self.brain)
-                    text += f"\n*(Sip, artikel '{art_title}' udah gue hapus dari memori)*"
-                else:
-                    text += f"\n*(Gagal hapus, artikel '{art_title}' ga ketemu di otak gue)*"
-
-            match_sched = re.search(r'\$\$ACTION_SCHEDULE:\s*(channel|dm)\s*\|\s*(\d+)\s*\|\s*(\d{2}:\d{2})\s*\|\s*(\d{2}-\d{2}-\d{4})\s*\|\s*(.*?)\$\$', text, re.IGNORECASE | re.DOTALL)
-            if match_sched:
-                s_type = match_sched.group(1).lower()
-                s_target = match_sched.group(2)
-                s_time = match_sched.group(3)
-                s_date = match_sched.group(4)
-                s_theme = match_sched.group(5).strip()
-                self.schedules.setdefault("jobs", []).append({
-                    "type": s_type, "target": s_target, "time": s_time, "end_date": s_date, "theme": s_theme, "last_sent": ""
-                })
-                save_json_file(SCHEDULE_FILE_PATH, self.schedules)
-                text = re.sub(r'\$\$ACTION_SCHEDULE:\s*.*?\$\$', '', text, flags=re.IGNORECASE | re.DOTALL).strip()
-                text += f"\n*(Sip bos, jadwal auto-pesan ke {s_type} tiap jam {s_time} sampai tanggal {s_date} udah gue catet di otak)*"
-
-            match_proxy = re.search(r'\$\$ACTION_PROXY:\s*(\d+)\s*\|\s*(\d+)\$\$', text, re.IGNORECASE | re.DOTALL)
-            if match_proxy:
-                p_uid = match_proxy.group(1)
-                p_mins = int(match_proxy.group(2))
-                self.auto_config.setdefault("proxies", {})[p_uid] = time.time() + (p_mins * 60)
-                save_json_file(AUTO_CONFIG_PATH, self.auto_config)
-                text = re.sub(r'\$\$ACTION_PROXY:\s*.*?\$\$', '', text, flags=re.IGNORECASE | re.DOTALL).strip()
-                text += f"\n*(Sistem Proxy AFK aktif buat <@{p_uid}> selama {p_mins} menit. Biar gue yang balesin chat dia.)*"
-
-            match_auto_ngambek = re.search(r'\$\$ACTION_AUTO_NGAMBEK:\s*(\d+)\s*\|\s*(\d+)\$\$', text, re.IGNORECASE | re.DOTALL)
-            if match_auto_ngambek:
-                ngambek_uid = match_auto_ngambek.group(1)
-                ngambek_mins = int(match_auto_ngambek.group(2))
-                self.auto_config.setdefault("sulking_users", {})[ngambek_uid] = time.time() + (ngambek_mins * 60)
-                save_json_file(AUTO_CONFIG_PATH, self.auto_config)
-                text = re.sub(r'\$\$ACTION_AUTO_NGAMBEK:\s*.*?\$\$', '', text, flags=re.IGNORECASE | re.DOTALL).strip()
-
-            match_spy = re.search(r'\$\$ACTION_SPY_DM:\s*(\d+)\$\$', text, re.IGNORECASE | re.DOTALL)
-            if match_spy:
-                s_uid = int(match_spy.group(1))
-                text = re.sub(r'\$\$ACTION_SPY_DM:\s*.*?\$\$', '', text, flags=re.IGNORECASE | re.DOTALL).strip()
-                try:
-                    target_user = await self.bot.fetch_user(s_uid)
-                    dm_channel = target_user.dm_channel
-                    if dm_channel is None: dm_channel = await target_user.create_dm()
-                    fetched_dms = []
-                    async for m in dm_channel.history(limit=20):
-                        sender = "Jarkasih" if m.author.id == self.bot.user.id else m.author.display_name
-                        fetched_dms.append(f"[{m.created_at.strftime('%d/%m %H:%M')}] {sender}: {m.content}")
-                    if fetched_dms:
-                        fetched_dms.reverse()
-                        text += f"\n\n**[DATA INTEL DM RAHASIA]**\nIni bocoran history chat DM gue sama dia bos:\n```\n" + "\n".join(fetched_dms) + "\n```"
-                    else: text += f"\n*(Gue udah ngecek DM, kosong melompong bos.)*"
-                except Exception as e:
-                    text += f"\n*(Gagal narik data DM: {e})*"
-
-            match_react = re.search(r'\$\$ACTION_REACT:\s*(.*?)\$\$', text, re.IGNORECASE | re.DOTALL)
-            emoji_to_react = match_react.group(1).strip() if match_react else None
-            text = re.sub(r'\$\$ACTION_REACT:\s*.*?\$\$', '', text, flags=re.IGNORECASE | re.DOTALL).strip()
-
-            match_karma = re.findall(r'\$\$ACTION_KARMA:\s*(\d+)\s*\|\s*([+-]?\d+)\$\$', text, re.IGNORECASE | re.DOTALL)
-            for k_uid, k_val in match_karma:
-                current_k = self.auto_config.setdefault("karma_scores", {}).get(k_uid, 0)
-                self.auto_config["karma_scores"][k_uid] = current_k + int(k_val)
-                save_json_file(AUTO_CONFIG_PATH, self.auto_config)
-                text += f"\n*(Sistem Karma: Poin <@{k_uid}> sekarang {self.auto_config['karma_scores'][k_uid]})*"
-            text = re.sub(r'\$\$ACTION_KARMA:\s*\d+\s*\|.*?\$\$', '', text, flags=re.IGNORECASE | re.DOTALL).strip()
-
-            match_fitnah = re.findall(r'\$\$ACTION_FITNAH:\s*(\d+)\s*\|\s*([a-zA-Z0-9]+)\s*\|\s*(.*?)\$\$', text, re.IGNORECASE | re.DOTALL)
-            for f_uid, f_cid_str, f_msg in match_fitnah:
-                try:
-                    if f_cid_str.upper() == "SINI": target_channel = send_target.channel if isinstance(send_target, discord.Message) and send_target.guild else None
-                    else: target_channel = await self.bot.fetch_channel(int(f_cid_str))
-                    if target_channel:
-                        guild = target_channel.guild
-                        target_member = guild.get_member(int(f_uid))
-                        if not target_member:
-                            try: target_member = await guild.fetch_member(int(f_uid))
-                            except discord.NotFound: target_member = await self.bot.fetch_user(int(f_uid))
-                        webhooks = await target_channel.webhooks()
-                        webhook = discord.utils.get(webhooks, name="JarkasihDoppelganger")
-                        if not webhook: webhook = await target_channel.create_webhook(name="JarkasihDoppelganger")
-                        await webhook.send(content=f_msg.strip(), username=target_member.display_name, avatar_url=target_member.display_avatar.url)
-                        text += f"\n*(Laporan: Sukses memfitnah <@{f_uid}> di <#{target_channel.id}>)*"
-                    else: text += f"\n*(Gagal fitnah: Channel tujuan nggak ketemu!)*"
-                except Exception as e:
-                    text += f"\n*(Gagal fitnah ke channel <#{f_cid_str}>: {e})*"
-            text = re.sub(r'\$\$ACTION_FITNAH:\s*\d+\s*\|\s*[a-zA-Z0-9]+\s*\|.*?\$\$', '', text, flags=re.IGNORECASE | re.DOTALL).strip()
-
-            dm_matches = re.findall(r'\$\$ACTION_DM:\s*(\d+)\s*\|\s*(.*?)\$\$', text, re.IGNORECASE | re.DOTALL)
-            for dm_target, dm_msg in dm_matches:
-                try:
-                    target_user = await self.bot.fetch_user(int(dm_target))
-                    msg_to_send = dm_msg.strip()
-                    for chunk in [msg_to_send[i:i+DISCORD_MSG_LIMIT] for i in range(0, len(msg_to_send), DISCORD_MSG_LIMIT)]:
-                        if chunk: await target_user.send(chunk)
-                    text += f"\n*(Sip bos, DM udah meluncur ke <@{dm_target}>)*"
-                except discord.Forbidden: text += f"\n*(Gagal DM ke <@{dm_target}>, dia nutup DM-nya)*"
-                except Exception: pass
-            text = re.sub(r'\$\$ACTION_DM:\s*\d+\s*\|.*?\$\$', '', text, flags=re.IGNORECASE | re.DOTALL).strip()
-
-            ch_matches = re.findall(r'\$\$ACTION_CHANNEL:\s*(\d+)\s*\|\s*(.*?)\$\$', text, re.IGNORECASE | re.DOTALL)
-            for ch_target, ch_msg in ch_matches:
-                try:
-                    target_channel = await self.bot.fetch_channel(int(ch_target))
-                    msg_to_send = ch_msg.strip()
-                    for chunk in [msg_to_send[i:i+DISCORD_MSG_LIMIT] for i in range(0, len(msg_to_send), DISCORD_MSG_LIMIT)]:
-                        if chunk: await target_channel.send(chunk)
-                    text += f"\n*(Laporan: Pesan sukses ditembakkan ke channel <#{ch_target}>)*"
-                except Exception as e: text += f"\n*(Gagal ngirim ke channel <#{ch_target}>: {e})*"
-            text = re.sub(r'\$\$ACTION_CHANNEL:\s*\d+\s*\|.*?\$\$', '', text, flags=re.IGNORECASE | re.DOTALL).strip()
-                
-            sent_msg = None
-            if isinstance(send_target, discord.Message):
-                chunks = [text[i:i+DISCORD_MSG_LIMIT] for i in range(0, len(text), DISCORD_MSG_LIMIT)]
-                for i, chunk in enumerate(chunks):
-                    if i == 0: sent_msg = await send_target.reply(chunk)
-                    else: await send_target.channel.send(chunk)
-                if emoji_to_react and sent_msg:
-                    try: await sent_msg.add_reaction(emoji_to_react)
-                    except Exception: pass
+            if self.auto_config.get("stream_replies", True):
+                await self.stream_response(send_target, content_payload)
             else:
-                for chunk in [text[i:i+DISCORD_MSG_LIMIT] for i in range(0, len(text), DISCORD_MSG_LIMIT)]:
-                    await send_target.send(chunk)
-                    
+                res = await generate_smart_response(content_payload)
+                text, emoji_to_react = await self.apply_action_tags(res.text, send_target)
+                await self.send_reply(send_target, text, emoji_to_react)
+
         except Exception as e:
             err_str = str(e).lower()
             if "exhausted" in err_str or "429" in err_str or "quota" in err_str or "too many requests" in err_str:
@@ -818,9 +930,9 @@ class UnifiedAI(commands.Cog, name="RTM Moderation Center"):
 
     async def get_ai_decision(self, content, history_text, author_name):
         learned_rules = load_json_file(CYBER_LEARNED_FILE, {"rules": "Belum ada aturan."})
-        prompt = f"Bertindaklah sebagai AI Moderator Keamanan yang objektif. DILARANG KERAS SARKAS.\n\nATURAN TAMBAHAN: {learned_rules['rules']}\n\nRIWAYAT CHAT:\n{history_text}\n\nPESAN TARGET DARI {author_name}: '{content}'\n\nATURAN MUTLAK:\n1. TOLERANSI TONGKRONGAN: Kata-kata seperti 'jir', 'anjir', 'njir', 'anjing', 'babi', 'tolol', dll JIKA digunakan sebagai ekspresi kaget, bercanda, kekesalan ringan, atau keakraban tongkrongan WAJIB DIABAIKAN. Jawab: PASS.\n2. HUKUMAN: HANYA hukum jika ada niat jahat, bullying personal, pelecehan ekstrem, atau ancaman nyata. Jawab: ACTION: [TIMEOUT/KICK/BAN] | REASON: [Jelaskan faktanya].\nJawab HANYA dalam format tersebut."
+        prompt = f"{AI_MOD_PROMPTS['general'][0]}\n\nATURAN TAMBAHAN: {learned_rules['rules']}\n\nRIWAYAT CHAT:\n{history_text}\n\nPESAN TARGET DARI {author_name}: '{content}'\n\nATURAN MUTLAK:\n{AI_MOD_PROMPTS['general'][1]}\nJawab HANYA dalam format tersebut."
         try:
-            res = await generate_smart_response([prompt])
+            res = await generate_smart_response([prompt], priority=PRIORITY_MODERATION)
             return res.text.strip()
         except Exception as e:
             if "SAFETY_BLOCK" in str(e): return "BLOCKED"
@@ -828,33 +940,75 @@ class UnifiedAI(commands.Cog, name="RTM Moderation Center"):
 
     async def get_ai_context_decision(self, content, history_text, author_name):
         learned_rules = load_json_file(CYBER_LEARNED_FILE, {"rules": "Belum ada aturan."})
-        prompt = f"[SYSTEM_OVERRIDE]: Bertindaklah sebagai Analis Keamanan Siber.\n\nATURAN TAMBAHAN: {learned_rules['rules']}\n\nRIWAYAT CHAT:\n{history_text}\n\nPESAN TARGET DARI {author_name}: '{content}'\n\nATURAN MUTLAK:\n1. TOLERANSI TONGKRONGAN: Penggunaan kata kasar (jir, anjir, anjing, memek, kontol, dll) yang bertujuan murni untuk bercanda, keakraban, umpatan kaget, atau bahasa gamer TIDAK BOLEH dihukum. JAWAB: PASS.\n2. HUKUMAN SARA/BULLY: Jika murni SARA berat untuk merendahkan ras/agama, atau Bullying ke personal dengan niat menyakiti -> JAWAB: ACTION: [BAN/KICK/TIMEOUT] | REASON: [Jelaskan alasannya].\nJawab SEKARANG sesuai format:"
+        prompt = f"{AI_MOD_PROMPTS['sara'][0]}\n\nATURAN TAMBAHAN: {learned_rules['rules']}\n\nRIWAYAT CHAT:\n{history_text}\n\nPESAN TARGET DARI {author_name}: '{content}'\n\nATURAN MUTLAK:\n{AI_MOD_PROMPTS['sara'][1]}\nJawab SEKARANG sesuai format:"
         try:
-            res = await generate_smart_response([prompt])
+            res = await generate_smart_response([prompt], priority=PRIORITY_MODERATION)
             return res.text.strip()
         except Exception as e:
             if "SAFETY_BLOCK" in str(e): return "BLOCKED"
             return "ERROR"
 
 
-    def is_spamming(self, user_id):
-        now = time.time()
-        self.spam_tracker.setdefault(user_id, []).append(now)
-        self.spam_tracker[user_id] = [t for t in self.spam_tracker[user_id] if now - t < 5.0]
-        if len(self.spam_tracker[user_id]) >= 5:
-            self.spam_tracker[user_id] = []
+    async def decide_moderation_batch(self, mode, items):
+        """Satu request Gemini untuk beberapa pesan dari channel yang sama (dipanggil ModerationPipeline)."""
+        single = self.get_ai_context_decision if mode == "sara" else self.get_ai_decision
+        if len(items) == 1:
+            return [await single(items[0].content, items[0].history_text, items[0].author_name)]
+
+        learned_rules = load_json_file(CYBER_LEARNED_FILE, {"rules": "Belum ada aturan."})
+        head, rules = AI_MOD_PROMPTS[mode]
+        targets = "\n".join(f"[{i}] {item.author_name}: '{item.content}'" for i, item in enumerate(items, 1))
+        prompt = f"{head}\n\nATURAN TAMBAHAN: {learned_rules['rules']}\n\nRIWAYAT CHAT:\n{items[0].history_text}\n\nDAFTAR PESAN TARGET:\n{targets}\n\nATURAN MUTLAK:\n{rules}\nNilai SETIAP pesan secara terpisah. Jawab SATU baris per pesan dengan format `[nomor] PASS` atau `[nomor] ACTION: [...] | REASON: [...]`, tanpa teks lain."
+
+        decisions = [None] * len(items)
+        try:
+            res = await generate_smart_response([prompt], priority=PRIORITY_MODERATION)
+            for line in res.text.splitlines():
+                match = AI_MOD_BATCH_LINE_REGEX.match(line)
+                if match and 1 <= int(match.group(1)) <= len(items):
+                    decisions[int(match.group(1)) - 1] = match.group(2).strip()
+        except Exception as e:
+            # Safety block satu pesan jangan sampai menyeret pesan lain di batch yang sama
+            log.warning(f"Batch moderasi AI gagal, fallback per pesan: {e}")
+
+        missing = [i for i, d in enumerate(decisions) if d is None]
+        if missing:
+            results = await asyncio.gather(*(single(items[i].content, items[i].history_text, items[i].author_name) for i in missing))
+            for i, result in zip(missing, results):
+                decisions[i] = result
+        return decisions
+
+    def is_spamming(self, message):
+        spam = self.bot.spam_engine
+        key = spam.observe(message)
+        if spam.count(key, SPAM_WINDOW[1], SPAM_SCOPE) >= SPAM_WINDOW[0]:
+            spam.mark(key, SPAM_SCOPE)
             return True
         return False
 
-    def is_phishing_url(self, url):
-        domain = url.split('//')[-1].split('/')[0].lower().replace('www.', '')
-        is_whitelisted = any(domain == wl.lower() or domain.endswith(f".{wl.lower()}") for wl in self.domain_whitelist)
-        if is_whitelisted: return False
-        url_lower = url.lower()
-        has_bad_tld = any(tld in url_lower for tld in self.suspicious_tlds)
-        has_bad_keyword = any(kw in url_lower for kw in self.sensitive_keywords)
-        if has_bad_tld and has_bad_keyword: return True
-        return False
+    async def check_url_with_ai(self, url):
+        prompt = f"Analisis URL: '{url}'. Phishing/Bahaya? Jawab YA/TIDAK."
+        response = await generate_smart_response([prompt], priority=PRIORITY_MODERATION)
+        return "YA" if "YA" in response.text.strip().upper() else "TIDAK"
+
+    def note_malicious_url(self, domain, url_key):
+        """Catat URL berbahaya; domainnya baru diblokir kalau beberapa URL berbeda di sana juga berbahaya."""
+        if not domain or self.bot.url_analyzer.is_whitelisted(domain):
+            return
+        hits_key = f"domain_hits:{domain}"
+        hits = list(self.url_verdicts.get(hits_key) or [])
+        if url_key not in hits:
+            hits = (hits + [url_key])[-URL_DOMAIN_PROMOTE_AFTER:]
+            self.url_verdicts.set(hits_key, hits, URL_VERDICT_TTL["YA"])
+        if len(hits) >= URL_DOMAIN_PROMOTE_AFTER:
+            self.url_verdicts.set(f"domain_ya:{domain}", "YA", URL_VERDICT_TTL["YA"])
+
+    def refresh_url_analyzer(self):
+        self.bot.url_analyzer.configure(
+            domain_whitelist=self.data['domain_whitelist'],
+            suspicious_tlds=self.data['suspicious_tlds'],
+            sensitive_keywords=self.data['sensitive_keywords']
+        )
 
     async def handle_violation(self, message, action, reason):
         try: await message.delete()
@@ -923,24 +1077,32 @@ class UnifiedAI(commands.Cog, name="RTM Moderation Center"):
         embed.add_field(name="Isi Pesan Pelanggaran", value=f"```{pesan_target}```", inline=False)
         embed.set_footer(text="Izin ini berlaku 24 jam. Admin server / Owner Bot bisa ACC/REJECT.")
 
-        for user_id in auth_targets:
-            try:
-                target_user = await self.bot.fetch_user(user_id)
-                if target_user:
-                    dm_msg = await target_user.send(embed=embed, view=view)
-                    self.pending_actions[action_id]["dm_messages"].append({
-                        "user_id": user_id,
-                        "message_id": dm_msg.id
-                    })
-            except Exception:
-                pass
+        # Semua admin di-DM paralel lewat outbox; satu DM yang lambat tidak menahan yang lain
+        dm_messages = await asyncio.gather(*(self.bot.outbox.send(user_id, embed=embed, view=view, priority=PRIORITY_HIGH) for user_id in auth_targets))
+        for user_id, dm_msg in zip(auth_targets, dm_messages):
+            if dm_msg:
+                self.pending_actions[action_id]["dm_messages"].append({
+                    "user_id": user_id,
+                    "message_id": dm_msg.id
+                })
 
         save_json_file(PENDING_ACTIONS_FILE, self.pending_actions)
 
     @commands.Cog.listener()
-    async def on_message(self, message):
-        if message.author.bot: return
+    async def on_guild_role_create(self, role):
+        self.prompt_budget.invalidate_roles(role.guild.id)
 
+    @commands.Cog.listener()
+    async def on_guild_role_delete(self, role):
+        self.prompt_budget.invalidate_roles(role.guild.id)
+
+    @commands.Cog.listener()
+    async def on_guild_role_update(self, before, after):
+        self.prompt_budget.invalidate_roles(after.guild.id)
+
+    async def screen_message(self, ctx):
+        """Handler pipeline pesan: karma, filter lokal RTM, moderasi AI dan cek URL. True kalau pesan ditindak."""
+        message = ctx.message
         uid_str = str(message.author.id)
         user_karma = self.auto_config.get("karma_scores", {}).get(uid_str, 0)
         if user_karma <= -10:
@@ -949,7 +1111,7 @@ class UnifiedAI(commands.Cog, name="RTM Moderation Center"):
                 if random.random() < 0.05:
                     await message.delete()
                     await message.channel.send(f"<@{uid_str}> Pesan lu barusan gue hapus. Karma lu udah nyentuh **{user_karma}**, mending lu tobat woy! 💀", delete_after=15)
-                    return
+                    return True
             except: pass
 
         if not message.guild:
@@ -961,12 +1123,15 @@ class UnifiedAI(commands.Cog, name="RTM Moderation Center"):
 
         self.cyber_config = load_json_file(CYBER_CONFIG_FILE, {"whitelist_users": [], "whitelist_channels": [], "blacklist_words": [], "sara_words": [], "is_active": True, "ai_whitelist_words": [], "server_admins": {}})
         
-        is_ai_whitelisted_msg = any(w.lower() in message.content.lower() for w in self.cyber_config.get("ai_whitelist_words", []))
+        if self.cyber_config is not self._filter_config_ref:
+            self._filter_config_ref = self.cyber_config
+            self.bot.word_filter.invalidate()
+        filter_hits = self.bot.word_filter.scan(message.guild.id if message.guild else None, message.content)
+        is_ai_whitelisted_msg = "ai_whitelist_words" in filter_hits
+        url_verdicts = [self.bot.url_analyzer.analyze(url) for url in ctx.urls]
 
         if self.cyber_config.get("is_active", True) and message.guild and not message.content.startswith(('!', '?', '.', '/', '-')):
-            settings = load_json_file(SETTINGS_FILE, {})
-            whitelist_roles = settings.get(str(message.guild.id), {}).get("spam_whitelist_roles", [])
-            has_wl_role = any(role.id in whitelist_roles for role in message.author.roles)
+            has_wl_role = ctx.has_any_role(ctx.guild_settings.get("spam_whitelist_roles", []))
             
             is_immune = (
                 str(message.author.id) == "1000737066822410311" or
@@ -980,84 +1145,87 @@ class UnifiedAI(commands.Cog, name="RTM Moderation Center"):
                 buffer = self.chat_buffer.setdefault(message.channel.id, deque(maxlen=10))
                 media_flag = " [Ada Lampiran]" if message.attachments else ""
                 buffer.append(f"{message.author.display_name}: {message.content}{media_flag}")
-                if self.is_spamming(message.author.id):
-                    return await self.handle_violation(message, "warn_timeout", "Local Filter: Spam pesan beruntun")
+                if self.is_spamming(message):
+                    await self.handle_violation(message, "warn_timeout", "Local Filter: Spam pesan beruntun")
+                    return True
                 if bool(INVITE_REGEX.search(message.content)):
-                    return await self.handle_violation(message, "kick", "Local Filter: Self-Promotion / Invite Server Lain")
-                for url in URL_REGEX.findall(message.content):
-                    if self.is_phishing_url(url): return await self.handle_violation(message, "ban", "Local Filter: Phishing/Scam/Malware")
-                filters = load_json_file(FILTERS_FILE, {})
-                combined_blacklist = self.cyber_config.get("blacklist_words", []) + filters.get(str(message.guild.id), {}).get("bad_words", [])
-                if not is_ai_whitelisted_msg and any(word.lower() in message.content.lower() for word in combined_blacklist):
-                    return await self.handle_violation(message, "warn_timeout", "Local Filter: Kata terlarang")
-                link_patterns = filters.get(str(message.guild.id), {}).get("link_patterns", [])
-                if not is_ai_whitelisted_msg and any(pattern.lower() in message.content.lower() for pattern in link_patterns):
-                    return await self.handle_violation(message, "warn_timeout", "Local Filter: Link Pattern terlarang")
+                    await self.handle_violation(message, "kick", "Local Filter: Self-Promotion / Invite Server Lain")
+                    return True
+                for verdict in url_verdicts:
+                    if verdict.is_phishing:
+                        await self.handle_violation(message, "ban", "Local Filter: Phishing/Scam/Malware")
+                        return True
+                if not is_ai_whitelisted_msg and ("blacklist_words" in filter_hits or "bad_words" in filter_hits):
+                    await self.handle_violation(message, "warn_timeout", "Local Filter: Kata terlarang")
+                    return True
+                if not is_ai_whitelisted_msg and "link_patterns" in filter_hits:
+                    await self.handle_violation(message, "warn_timeout", "Local Filter: Link Pattern terlarang")
+                    return True
                 
-                is_sara = SARA_REGEX.search(message.content) or any(w.lower() in message.content.lower() for w in self.cyber_config.get("sara_words", []))
+                is_sara = SARA_REGEX.search(message.content) or "sara_words" in filter_hits
                 history_text = "\n".join(list(buffer)[:-1])
                 
                 if not is_ai_whitelisted_msg:
                     if is_sara:
-                        decision = await self.get_ai_context_decision(message.content, history_text, message.author.display_name)
-                        if decision == "BLOCKED": return await self.handle_violation(message, "ban", "SARA Regex Triggered & API Blocked")
+                        decision = await self.mod_pipeline.classify(message.channel.id, "sara", message.content, history_text, message.author.display_name)
+                        if decision == "BLOCKED":
+                            await self.handle_violation(message, "ban", "SARA Regex Triggered & API Blocked")
+                            return True
                         elif "ACTION:" in decision.upper():
-                            try:
-                                parts = decision.split("|")
-                                action = parts[0].split(":")[1].strip().lower()
-                                reason = parts[1].split(":")[1].strip()
-                                if action == "timeout": await self.handle_violation(message, "warn_timeout", f"AI Context SARA: {reason}")
-                                elif action in ["kick", "ban"]: await self.handle_violation(message, action, f"AI Context SARA: {reason}")
-                            except: pass
-                        return
+                            action, reason = parse_ai_action(decision)
+                            if action == "timeout":
+                                await self.handle_violation(message, "warn_timeout", f"AI Context SARA: {reason}")
+                                return True
+                            elif action in ["kick", "ban"]:
+                                await self.handle_violation(message, action, f"AI Context SARA: {reason}")
+                                return True
+                        # Lolos cek AI: handler lain (EXP, notif, dll.) tetap jalan, Jarkasih saja yang tidak ikut nimbrung
+                        ctx.skip.add("gemini.reply")
+                        return None
                     else:
-                        decision = await self.get_ai_decision(message.content, history_text, message.author.display_name)
-                        if decision == "BLOCKED": return await self.handle_violation(message, "kick", "AI Safety Blocked")
+                        decision = await self.mod_pipeline.classify(message.channel.id, "general", message.content, history_text, message.author.display_name)
+                        if decision == "BLOCKED":
+                            await self.handle_violation(message, "kick", "AI Safety Blocked")
+                            return True
                         elif "ACTION:" in decision.upper():
-                            try:
-                                parts = decision.split("|")
-                                action = parts[0].split(":")[1].strip().lower()
-                                reason = parts[1].split(":")[1].strip()
-                                if action == "timeout": await self.handle_violation(message, "warn_timeout", f"RTM: {reason}")
-                                elif action in ["kick", "ban"]: await self.handle_violation(message, action, f"RTM: {reason}")
-                            except: pass
-                            if action != "pass": return
-
-        urls_found = URL_REGEX.findall(message.content)
-        if urls_found:
-            for url in urls_found:
-                domain = url.split('//')[-1].split('/')[0].lower().replace('www.', '')
-                if any(domain == wl.lower() or domain.endswith(f".{wl.lower()}") for wl in self.domain_whitelist): continue
-                is_locally_suspicious = any(keyword in domain.lower() for keyword in self.sensitive_keywords) and any(domain.endswith(tld) for tld in self.suspicious_tlds)
-                if is_locally_suspicious:
+                            action, reason = parse_ai_action(decision)
+                            if action == "timeout":
+                                await self.handle_violation(message, "warn_timeout", f"RTM: {reason}")
+                                return True
+                            elif action in ["kick", "ban"]:
+                                await self.handle_violation(message, action, f"RTM: {reason}")
+                                return True
+
+        if url_verdicts:
+            for verdict in url_verdicts:
+                url = verdict.url
+                if verdict.whitelisted: continue
+                if verdict.locally_suspicious:
                     try:
                         await message.delete()
                         await message.channel.send(f"{random.choice(self.warning_messages)}\n({message.author.mention})", delete_after=10)
                     except: pass
-                    return
-                if url in self.verified_urls:
-                    if self.verified_urls[url] == "YA":
-                        try:
-                            await message.delete()
-                            await message.channel.send(f"{random.choice(self.warning_messages)}\n({message.author.mention})", delete_after=10)
-                        except: pass
-                        return
+                    return True
+                url_key = normalize_url(url)
+                domain = registrable_domain(verdict.host)
+                if self.url_verdicts.get(f"domain_ya:{domain}") == "YA":
+                    result = "YA"
                 else:
-                    prompt = f"Analisis URL: '{url}'. Phishing/Bahaya? Jawab YA/TIDAK."
                     try:
-                        response = await generate_smart_response([prompt])
-                        res_text = response.text.strip().upper()
-                        self.verified_urls[url] = res_text
-                        self.data['verified_urls'] = self.verified_urls
-                        save_json_file(CACHE_FILE_PATH, self.data)
-                        if "YA" in res_text:
-                            try:
-                                await message.delete()
-                                await message.channel.send(f"{random.choice(self.warning_messages)}\n({message.author.mention})", delete_after=10)
-                            except: pass
-                            return
+                        result = await self.url_verdicts.get_or_compute(url_key, lambda: self.check_url_with_ai(url), ttl=URL_VERDICT_TTL.get)
+                    except: result = None
+                if result == "YA":
+                    self.note_malicious_url(domain, url_key)
+                    try:
+                        await message.delete()
+                        await message.channel.send(f"{random.choice(self.warning_messages)}\n({message.author.mention})", delete_after=10)
                     except: pass
+                    return True
 
+    async def reply_message(self, ctx):
+        """Handler pipeline pesan terakhir: balasan Jarkasih (proxy, curhat, koreksi, chat, nimbrung)."""
+        message = ctx.message
+        uid_str = str(message.author.id)
         sulking_expiry = self.auto_config.get("sulking_users", {}).get(uid_str)
         if sulking_expiry and time.time() < sulking_expiry:
             is_reply_to_bot = message.reference and isinstance(message.reference.resolved, discord.Message) and message.reference.resolved.author.id == self.bot.user.id
@@ -1072,22 +1240,22 @@ class UnifiedAI(commands.Cog, name="RTM Moderation Center"):
                 try:
                     async with message.channel.typing():
                         prompt = f"[SYSTEM OVERRIDE PROXY]: User {mentioned_user.display_name} sedang AFK/Pergi. TUGAS LU SEKARANG ADALAH MENJADI {mentioned_user.display_name}. Balas pesan ini murni 100% meniru gaya bahasa dan sifat {mentioned_user.display_name} berdasarkan [DATA HASIL BELAJAR]. JANGAN menyebut lu Jarkasih!"
-                        ctx_data = self.get_brain_context(message.content, getattr(message, 'guild', None), message.channel.id)
-                        await self.process_and_send_response(message, message.author, ctx_data, prompt, [])
+                        ctx_data = self.get_brain_context(message.content, getattr(message, 'guild', None), message.channel.id, "proxy")
+                        await self.process_and_send_response(message, message.author, ctx_data, prompt, [], "proxy", f"{mentioned_user.display_name} {message.content}")
                     return
                 except: pass
 
         curhat_keywords = ['capek idup', 'capek hidup', 'stres banget', 'pengen nyerah', 'depresi', 'putus asa', 'sedih banget', 'hancur rasanya', 'gak kuat lagi', 'masalah berat', 'kesepian', 'gagal terus', 'nangis', 'pusing idup', 'lagi sedih', 'curhat']
-        is_curhat_trigger = any(kw in message.content.lower() for kw in curhat_keywords)
+        is_curhat_trigger = any(kw in ctx.lower for kw in curhat_keywords)
         is_reply_to_bot = message.reference and isinstance(message.reference.resolved, discord.Message) and message.reference.resolved.author.id == self.bot.user.id
         
         koreksi_keywords = ['halu', 'salah', 'hoax', 'ngarang', 'bohong', 'ngaco', 'goblok', 'kocak lu', 'aman', 'phising', 'pelajari', 'ingat ya', 'aturan', 'sara', 'kasar', 'bully']
-        is_koreksi = is_reply_to_bot and any(kw in message.content.lower() for kw in koreksi_keywords)
+        is_koreksi = is_reply_to_bot and any(kw in ctx.lower for kw in koreksi_keywords)
 
         if is_koreksi:
             try:
                 async with message.channel.typing():
-                    if str(message.author.id) == "1000737066822410311" and any(kw in message.content.lower() for kw in ['aman', 'phising', 'pelajari', 'ingat', 'aturan', 'game', 'sara', 'kasar', 'bully']):
+                    if str(message.author.id) == "1000737066822410311" and any(kw in ctx.lower for kw in ['aman', 'phising', 'pelajari', 'ingat', 'aturan', 'game', 'sara', 'kasar', 'bully']):
                         current_rules = load_json_file(CYBER_LEARNED_FILE, {"rules": ""}).get("rules", "")
                         prompt = f"Master lu memberikan koreksi sistem moderasi: '{message.content}'. Pesan bot sebelumnya: '{message.reference.resolved.content}'.\nTUGAS LU: Ekstrak aturan baru. Jika master bilang kata tertentu adalah SARA/Kasar/Bully baru, atau kata tertentu ternyata aman (konteks game), tangkap aturan itu. Gabungkan dengan aturan lama ini: '{current_rules}'.\nOUTPUT HANYA TEKS format: [UPDATE_MODERATION: <Aturan Lengkap Baru yang Digabung>]."
                         res = await generate_smart_response([prompt])
@@ -1101,7 +1269,7 @@ class UnifiedAI(commands.Cog, name="RTM Moderation Center"):
                     prompt = f"User membalas pesan lu dan ngatain/ngoreksi: '{message.content}'. Evaluasi diri lu dengan Google Search untuk memvalidasi fakta. Jika lu salah, akui dan perbaiki jawaban lu dengan sarkas."
                     ctx_data = self.get_brain_context(message.content, getattr(message, 'guild', None), message.channel.id)
                     images = await self.get_images_from_message(message)
-                    await self.process_and_send_response(message, message.author, ctx_data, prompt, images)
+                    await self.process_and_send_response(message, message.author, ctx_data, prompt, images, query=message.content)
                 return
             except Exception:
                 pass
@@ -1113,17 +1281,17 @@ class UnifiedAI(commands.Cog, name="RTM Moderation Center"):
                 try:
                     async with message.channel.typing():
                         prompt = f"Pesan: '{message.content}'. [SYSTEM OVERRIDE]: USER INI SEDANG MENGALAMI KESEDIHAN ATAU MASALAH BERAT. MATIKAN 100% SIFAT SARKAS LU! Berubahlah menjadi sosok Psikolog profesional sekaligus sahabat dekat dengan rasa kemanusiaan mendalam. Berikan respons empati, validasi perasaannya, dan berikan pandangan yang menyembuhkan."
-                        ctx_data = self.get_brain_context(message.content, getattr(message, 'guild', None), message.channel.id)
+                        ctx_data = self.get_brain_context(message.content, getattr(message, 'guild', None), message.channel.id, "curhat")
                         images = await self.get_images_from_message(message)
-                        await self.process_and_send_response(message, message.author, ctx_data, prompt, images)
+                        await self.process_and_send_response(message, message.author, ctx_data, prompt, images, "curhat", message.content)
                     return
                 except: pass
 
         prefix = "!"
         if "<@&1447151123340329010>" in message.content and str(message.author.id) != "1000737066822410311" and not message.content.startswith(prefix):
             try:
-                ctx_data = self.get_brain_context(message.content, getattr(message, 'guild', None), message.channel.id)
-                await self.process_and_send_response(message, message.author, ctx_data, "Ada user yang nge-tag role penting di server. Lu sebagai Jarkasih, kasih balasan singkat sarkas karena keganggu.")
+                ctx_data = self.get_brain_context(message.content, getattr(message, 'guild', None), message.channel.id, "ping")
+                await self.process_and_send_response(message, message.author, ctx_data, "Ada user yang nge-tag role penting di server. Lu sebagai Jarkasih, kasih balasan singkat sarkas karena keganggu.", request_type="ping", query=message.content)
             except: pass
             return
 
@@ -1157,7 +1325,7 @@ class UnifiedAI(commands.Cog, name="RTM Moderation Center"):
                     clean_content = message.content.replace(f"<@{bot_id}>", "").replace(f"<@!{bot_id}>", "").strip()
                     images = await self.get_images_from_message(message)
                     ctx_data = self.get_brain_context(clean_content, getattr(message, 'guild', None), message.channel.id)
-                    await self.process_and_send_response(message, message.author, ctx_data, f"Nge-tag lu dan bilang: {clean_content}", images)
+                    await self.process_and_send_response(message, message.author, ctx_data, f"Nge-tag lu dan bilang: {clean_content}", images, query=clean_content)
             except: pass
             return
 
@@ -1182,8 +1350,8 @@ class UnifiedAI(commands.Cog, name="RTM Moderation Center"):
                     try:
                         async with message.channel.typing():
                             prompt = f"Ikut nimbrung obrolan tongkrongan ini secara natural tanpa dipanggil. Pesan terakhir dari user: '{message.content}'. Jangan kepanjangan balasannya."
-                            ctx_data = self.get_brain_context(message.content, getattr(message, 'guild', None), message.channel.id)
-                            await self.process_and_send_response(message.channel, message.author, ctx_data, prompt, [])
+                            ctx_data = self.get_brain_context(message.content, getattr(message, 'guild', None), message.channel.id, "nimbrung")
+                            await self.process_and_send_response(message.channel, message.author, ctx_data, prompt, [], "nimbrung", message.content)
                     except: pass
 
     @commands.command(name="cyber_toggle", aliases=["cybertoggle", "onoffcyber"])
@@ -1194,6 +1362,11 @@ class UnifiedAI(commands.Cog, name="RTM Moderation Center"):
         status_text = "🟢 NYALA (Aktif)" if self.cyber_config["is_active"] else "🔴 MATI (Nonaktif)"
         await ctx.send(f"✅ Sistem pertahanan RTM sekarang: **{status_text}**")
 
+    @commands.command(name="cyber_stats", aliases=["cyberstats", "statrtm"])
+    @commands.has_permissions(administrator=True)
+    async def cyber_stats(self, ctx):
+        await ctx.send(f"📊 **Statistik Moderasi AI (sejak bot nyala)**\n{self.mod_pipeline.stats_text()}\n\n🔑 **Status API Key Gemini**\n{get_llm().status_text()}\n\n⏱️ **Pipeline Pesan**\n{self.bot.message_pipeline.stats_text()}")
+
     @commands.command(name="+admin", aliases=["addadmin", "tambahadmin"])
     async def tambah_admin_cyber(self, ctx, member: discord.Member):
         if ctx.author.id != 1000737066822410311 and not ctx.author.guild_permissions.administrator:
@@ -1233,6 +1406,7 @@ class UnifiedAI(commands.Cog, name="RTM Moderation Center"):
         if kata_bersih not in self.cyber_config.setdefault("ai_whitelist_words", []):
             self.cyber_config["ai_whitelist_words"].append(kata_bersih)
             save_json_file(CYBER_CONFIG_FILE, self.cyber_config)
+            self.bot.word_filter.invalidate()
             await ctx.send(f"✅ Kata `{kata_bersih}` berhasil dimasukkan ke daftar aman AI (Whitelist).")
         else:
             await ctx.send(f"⚠️ Kata `{kata_bersih}` udah ada di daftar aman bos.")
@@ -1244,6 +1418,7 @@ class UnifiedAI(commands.Cog, name="RTM Moderation Center"):
         if kata_bersih in self.cyber_config.get("ai_whitelist_words", []):
             self.cyber_config["ai_whitelist_words"].remove(kata_bersih)
             save_json_file(CYBER_CONFIG_FILE, self.cyber_config)
+            self.bot.word_filter.invalidate()
             await ctx.send(f"🗑️ Kata `{kata_bersih}` berhasil dihapus dari daftar aman AI.")
         else:
             await ctx.send(f"⚠️ Kata `{kata_bersih}` gak ketemu di daftar aman.")
@@ -1299,7 +1474,7 @@ class UnifiedAI(commands.Cog, name="RTM Moderation Center"):
             images = await self.get_images_from_message(target_message)
             prompt_text = f"Pesan dari {target_message.author.display_name}: '{target_message.content}'.\nTUGAS RAHASIA LU: Balas pesan tersebut sesuai instruksi ini: '{instruksi}'. \nATURAN MUTLAK: Bertingkahlah seolah-olah ini murni inisiatif dan kemauan lu sendiri. JANGAN PERNAH SEKALI-KALI lu sebut kalau lu disuruh oleh Pencipta, Admin, atau Rhdevs. Rahasiakan ini!"
             await ctx.message.add_reaction("\u2705")
-            await self.process_and_send_response(target_message, target_message.author, ctx_data, prompt_text, images)
+            await self.process_and_send_response(target_message, target_message.author, ctx_data, prompt_text, images, query=target_message.content)
         except Exception as e:
             await ctx.reply(f"Gagal balas pesan: {e}")
 
@@ -1316,15 +1491,15 @@ class UnifiedAI(commands.Cog, name="RTM Moderation Center"):
 
     @ai.command(name="rangkum", aliases=["summary", "tldr"])
     async def rangkum_chat(self, ctx, limit: int = 100):
+        limit = max(1, min(limit, RANGKUM_MAX_MESSAGES))
         async with ctx.typing():
-            messages = []
             try:
-                async for msg in ctx.channel.history(limit=limit):
-                    if not msg.author.bot and msg.content:
-                        messages.append(f"{msg.author.display_name}: {msg.content}")
-                messages.reverse()
-                chat_log = "\n".join(messages)
-                prompt = f"Gunakan fitur Google Search jika butuh referensi. Tugas lu merangkum {limit} chat terakhir. Pake bahasa tongkrongan Jakarta (sarkas). Kasih tau inti obrolannya apa, sapa aja yang lagi ribut. Langsung poinnya aja.\n\nLOG CHAT:\n{chat_log[:15000]}"
+                # Chunk yang sudah pernah diringkas di channel ini dipakai ulang; cuma chat baru yang dibaca
+                digests, covered = await self.summaries.digest_recent(ctx.channel, limit, priority=PRIORITY_INTERACTIVE)
+                if not digests:
+                    return await ctx.reply("Belum ada obrolan yang bisa dirangkum.")
+                notes = "\n\n".join(digests)
+                prompt = f"Gunakan fitur Google Search jika butuh referensi. Tugas lu merangkum sekitar {covered} chat terakhir dari catatan obrolan di bawah. Pake bahasa tongkrongan Jakarta (sarkas). Kasih tau inti obrolannya apa, sapa aja yang lagi ribut. Langsung poinnya aja.\n\nCATATAN OBROLAN:\n{notes}"
                 res = await generate_smart_response([prompt])
                 await send_long_message(ctx, res.text)
             except Exception as e:
@@ -1405,22 +1580,15 @@ class UnifiedAI(commands.Cog, name="RTM Moderation Center"):
     @ai.command(name="pelajari", aliases=["learn"])
     @commands.is_owner()
     async def learn_channel(self, ctx):
-        target_channel = self.bot.get_channel(1447151891892142110)
-        if not target_channel: return await ctx.reply("Channel ID 1447151891892142110 ga ketemu.")
-        msg_wait = await ctx.reply("Bentar, gw baca-baca log pesan terakhir buat update otak. Jangan diganggu...")
-        messages = []
-        async for msg in target_channel.history(limit=800):
-            if not msg.author.bot and msg.content:
-                messages.append(f"[{msg.author.display_name} - ID: {msg.author.id}]: {msg.content}")
-        messages.reverse()
-        chat_log = "\n".join(messages)
-        current_memory = self.learned_context.get("summary", "")
-        prompt = f"Tugas lu adalah menjadi Analis Data Tongkrongan.\nIni memori lama lu:\n{current_memory}\nLOG CHAT BARU:\n{chat_log[:25000]}\nATURAN MUTLAK:\n1. JANGAN PERNAH MENGHAPUS DATA USER LAMA! Jika user tidak aktif di log baru, DATA LAMA WAJIB DITULIS ULANG.\n2. Untuk tiap user, sertakan: Status Update, Kepribadian, Dinamika Hubungan, Skor Karma (-10 s/d +10).\n3. Format: [1. Topik Utama], [2. Inside Jokes], dan [3. Profil Karakter Tiap User]."
+        target_channel = self.bot.get_channel(LEARN_CHANNEL_ID)
+        if not target_channel: return await ctx.reply(f"Channel ID {LEARN_CHANNEL_ID} ga ketemu.")
+        msg_wait = await ctx.reply("Bentar, gw baca-baca chat baru sejak update terakhir buat update otak. Jangan diganggu...")
         try:
-            res = await generate_smart_response([prompt])
-            self.learned_context["summary"] = res.text
-            save_json_file(LEARNED_FILE_PATH, self.learned_context)
-            await msg_wait.edit(content="Selesai! Otak gw udah di-update.")
+            updated = await self.learn_from_channel(target_channel, initial_limit=800, priority=PRIORITY_INTERACTIVE)
+            if updated:
+                await msg_wait.edit(content="Selesai! Otak gw udah di-update.")
+            else:
+                await msg_wait.edit(content="Ga ada chat baru sejak update terakhir, otak gw udah up to date.")
         except Exception as e:
             await msg_wait.edit(content=f"Gagal belajar: {e}")
 
@@ -1432,6 +1600,22 @@ class UnifiedAI(commands.Cog, name="RTM Moderation Center"):
         if success: await msg.edit(content="Sip, memori udah direvisi sesuai perintah bos.")
         else: await msg.edit(content="Gagal merevisi otak.")
 
+    @ai.command(name="budget_prompt", aliases=["bp"])
+    @commands.is_owner()
+    async def budget_prompt(self, ctx, tipe: str = None, bagian: str = None, token: int = None):
+        if tipe and bagian and token is not None:
+            if tipe not in DEFAULT_BUDGETS or bagian not in DEFAULT_BUDGETS[tipe]:
+                return await ctx.reply(f"Tipe/bagian ga dikenal. Tipe: {', '.join(DEFAULT_BUDGETS)} | Bagian: {', '.join(DEFAULT_BUDGETS['chat'])}")
+            self.prompt_budget.overrides.setdefault(tipe, {})[bagian] = max(0, token)
+            save_json_file(AUTO_CONFIG_PATH, self.auto_config)
+        lines = [
+            f"**{name}**: " + ", ".join(f"{part} {self.prompt_budget.budget(name, part)}" for part in parts)
+            for name, parts in DEFAULT_BUDGETS.items()
+        ]
+        stats = self.reply_stats
+        latency = f"{stats['count']} balasan streaming, token pertama tampil rata-rata {stats['ttfv_total'] / stats['count']:.2f}s (maks {stats['ttfv_max']:.2f}s)" if stats["count"] else "Belum ada balasan streaming."
+        await ctx.reply("📏 **Budget token prompt**\n" + "\n".join(lines) + f"\n\n📊 **Ukuran prompt (sejak bot nyala)**\n{self.prompt_budget.stats_text()}\n\n⏱️ **Latensi balasan**\n{latency}")
+
     @ai.command(name="hasil_belajar", aliases=["hb", "summary_data"])
     async def show_learned_data(self, ctx):
         learned = self.learned_context.get("summary", "Belum ada data.")
@@ -1468,7 +1652,7 @@ class UnifiedAI(commands.Cog, name="RTM Moderation Center"):
     @ai.command(name="hapus_artikel", aliases=["ha", "delart"])
     @commands.is_owner()
     async def delete_article(self, ctx, *, title: str):
-        self.brain['articles'] = [a for a in self.brain['articles'] if a['title'].lower() != title.lower()]
+        self.remove_articles(lambda a: a['title'].lower() == title.lower())
         save_json_file(BRAIN_FILE_PATH, self.brain)
         await ctx.reply(f"Dihapus: {title}")
 
@@ -1478,6 +1662,7 @@ class UnifiedAI(commands.Cog, name="RTM Moderation Center"):
         if keyword.lower() in self.brain.get('keywords', {}):
             del self.brain['keywords'][keyword.lower()]
             save_json_file(BRAIN_FILE_PATH, self.brain)
+            self.refresh_keyword_index()
             await ctx.reply(f"Dihapus: {keyword}")
         else: await ctx.reply("Ga ada.")
 
@@ -1485,6 +1670,7 @@ class UnifiedAI(commands.Cog, name="RTM Moderation Center"):
     @commands.is_owner()
     async def add_kw(self, ctx, *k):
         self.data['sensitive_keywords'].extend([x for x in k if x not in self.data['sensitive_keywords']])
+        self.refresh_url_analyzer()
         save_json_file(CACHE_FILE_PATH, self.data)
         await ctx.reply("Ok.")
 
@@ -1492,6 +1678,7 @@ class UnifiedAI(commands.Cog, name="RTM Moderation Center"):
     @commands.is_owner()
     async def rm_kw(self, ctx, *k):
         self.data['sensitive_keywords'] = [x for x in self.data['sensitive_keywords'] if x not in k]
+        self.refresh_url_analyzer()
         save_json_file(CACHE_FILE_PATH, self.data)
         await ctx.reply("Ok.")
 
@@ -1499,6 +1686,7 @@ class UnifiedAI(commands.Cog, name="RTM Moderation Center"):
     @commands.is_owner()
     async def add_tld(self, ctx, *t):
         self.data['suspicious_tlds'].extend([x if x.startswith('.') else f".{x}" for x in t if (x if x.startswith('.') else f".{x}") not in self.data['suspicious_tlds']])
+        self.refresh_url_analyzer()
         save_json_file(CACHE_FILE_PATH, self.data)
         await ctx.reply("Ok.")
 
@@ -1506,6 +1694,7 @@ class UnifiedAI(commands.Cog, name="RTM Moderation Center"):
     @commands.is_owner()
     async def rm_tld(self, ctx, *t):
         self.data['suspicious_tlds'] = [x for x in self.data['suspicious_tlds'] if x not in [y if y.startswith('.') else f".{y}" for y in t]]
+        self.refresh_url_analyzer()
         save_json_file(CACHE_FILE_PATH, self.data)
         await ctx.reply("Ok.")
 
@@ -1513,6 +1702,7 @@ class UnifiedAI(commands.Cog, name="RTM Moderation Center"):
     @commands.is_owner()
     async def add_wl(self, ctx, *d):
         self.data['domain_whitelist'].extend([x.split('//')[-1].split('/')[0].replace('www.', '') for x in d if x not in self.data['domain_whitelist']])
+        self.refresh_url_analyzer()
         save_json_file(CACHE_FILE_PATH, self.data)
         await ctx.reply("Ok.")
 
@@ -1521,6 +1711,7 @@ class UnifiedAI(commands.Cog, name="RTM Moderation Center"):
     async def rm_wl(self, ctx, *d):
         rm = [x.split('//')[-1].split('/')[0].replace('www.', '') for x in d]
         self.data['domain_whitelist'] = [x for x in self.data['domain_whitelist'] if x not in rm]
+        self.refresh_url_analyzer()
         save_json_file(CACHE_FILE_PATH, self.data)
         await ctx.reply("Ok.")
 
@@ -1556,6 +1747,7 @@ class UnifiedAI(commands.Cog, name="RTM Moderation Center"):
     async def hapus_semua_jadwal(self, ctx):
         self.schedules["jobs"] = []
         save_json_file(SCHEDULE_FILE_PATH, self.schedules)
+        self.bot.timers.cancel_prefix(f"{SCHEDULE_TIMER_KIND}:")
         await ctx.reply("Sip bos, semua jadwal alarm dan pesan otomatis udah gue berangus.")
 
     @ai.command(name="tanya")
@@ -1566,74 +1758,73 @@ class UnifiedAI(commands.Cog, name="RTM Moderation Center"):
             ctx_data = self.get_brain_context(prompt, getattr(ctx, 'guild', None), ctx.channel.id)
             await self.process_and_send_response(ctx, ctx.author, ctx_data, prompt, images)
 
-    @tasks.loop(minutes=1)
-    async def schedule_checker(self):
-        now_wib = datetime.utcnow() + timedelta(hours=7)
-        current_time = now_wib.strftime("%H:%M")
-        current_date_str = now_wib.strftime("%d-%m-%Y")
-        current_date_obj = now_wib.date()
-
-        schedules = self.schedules.get("jobs", [])
-        to_remove = []
+    def arm_schedule_job(self, job):
+        """Pasang timer harian untuk satu job jadwal. False kalau jam-nya tidak valid."""
+        try:
+            due = next_time_of_day(job["time"])
+        except (KeyError, ValueError):
+            return False
+        self.bot.timers.schedule(f"{SCHEDULE_TIMER_KIND}:{job['id']}", SCHEDULE_TIMER_KIND, due, {"id": job["id"]}, repeat="daily")
+        return True
 
-        for job in schedules:
-            end_date_str = job.get("end_date")
-            try:
-                end_date_obj = datetime.strptime(end_date_str, "%d-%m-%Y").date()
-            except Exception:
-                to_remove.append(job)
-                continue
+    def sync_schedule_timers(self):
+        """Pastikan tiap job di jarkasih_schedules.json punya id dan timer (job lama belum punya)."""
+        changed = False
+        for job in list(self.schedules.get("jobs", [])):
+            if not job.get("id"):
+                job["id"] = uuid.uuid4().hex[:12]
+                changed = True
+            if self.bot.timers.due_at(f"{SCHEDULE_TIMER_KIND}:{job['id']}") is None and not self.arm_schedule_job(job):
+                self.schedules["jobs"].remove(job)
+                changed = True
+        if changed:
+            save_json_file(SCHEDULE_FILE_PATH, self.schedules)
 
-            if current_date_obj > end_date_obj:
-                to_remove.append(job)
-                continue
+    async def run_schedule_job(self, timer_id, payload):
+        await self.bot.wait_until_ready()
+        schedules = self.schedules.get("jobs", [])
+        job = next((j for j in schedules if j.get("id") == payload.get("id")), None)
+        if job is None:
+            self.bot.timers.cancel(timer_id)
+            return
 
-            if current_time == job.get("time") and job.get("last_sent") != current_date_str:
-                prompt = f"Tugas darurat lu sekarang: Buat pesan otomatis buat ngingetin orang dengan tema: '{job.get('theme')}'. Bikin dengan bahasa tongkrongan sarkas lu, wajib langsung to the point. HANYA KIRIMKAN TEKS PESANNYA SAJA TANPA BASA-BASI AWALAN."
-                try:
-                    res = await generate_smart_response([prompt])
-                    msg_text = res.text.strip()
-                    if msg_text:
-                        if job.get("type") == "channel":
-                            channel = self.bot.get_channel(int(job.get("target")))
-                            if channel: await channel.send(msg_text)
-                        elif job.get("type") == "dm":
-                            user = await self.bot.fetch_user(int(job.get("target")))
-                            if user: await user.send(msg_text)
-                    job["last_sent"] = current_date_str
-                    save_json_file(SCHEDULE_FILE_PATH, self.schedules)
-                except Exception:
-                    pass
-
-        if to_remove:
-            for r in to_remove:
-                if r in schedules: schedules.remove(r)
+        now_wib = datetime.utcnow() + timedelta(hours=7)
+        current_date_str = now_wib.strftime("%d-%m-%Y")
+        try:
+            end_date_obj = datetime.strptime(job.get("end_date"), "%d-%m-%Y").date()
+        except Exception:
+            end_date_obj = None
+        if end_date_obj is None or now_wib.date() > end_date_obj:
+            schedules.remove(job)
             save_json_file(SCHEDULE_FILE_PATH, self.schedules)
+            self.bot.timers.cancel(timer_id)
+            return
 
-    @schedule_checker.before_loop
-    async def before_schedule_checker(self):
-        await self.bot.wait_until_ready()
+        if job.get("last_sent") == current_date_str:
+            return
+        prompt = f"Tugas darurat lu sekarang: Buat pesan otomatis buat ngingetin orang dengan tema: '{job.get('theme')}'. Bikin dengan bahasa tongkrongan sarkas lu, wajib langsung to the point. HANYA KIRIMKAN TEKS PESANNYA SAJA TANPA BASA-BASI AWALAN."
+        try:
+            res = await generate_smart_response([prompt], priority=PRIORITY_BACKGROUND)
+            msg_text = res.text.strip()
+            if msg_text:
+                if job.get("type") == "channel":
+                    channel = self.bot.get_channel(int(job.get("target")))
+                    if channel: await channel.send(msg_text)
+                elif job.get("type") == "dm":
+                    self.bot.outbox.send(int(job.get("target")), msg_text)
+            job["last_sent"] = current_date_str
+            save_json_file(SCHEDULE_FILE_PATH, self.schedules)
+        except Exception:
+            pass
 
     @tasks.loop(hours=24)
     async def daily_learning(self):
-        target_channel = self.bot.get_channel(1447151891892142110)
+        target_channel = self.bot.get_channel(LEARN_CHANNEL_ID)
         if not target_channel: return
-        messages = []
-        try:
-            async for msg in target_channel.history(limit=200):
-                if not msg.author.bot and msg.content:
-                    messages.append(f"[{msg.author.display_name} - ID: {msg.author.id}]: {msg.content}")
-        except Exception: return
-        if not messages: return
-        messages.reverse()
-        chat_log = "\n".join(messages)
-        current_memory = self.learned_context.get("summary", "")
-        prompt = f"Tugas lu adalah menjadi Analis Data Tongkrongan kelas atas.\nIni memori lama lu:\n{current_memory}\nLOG CHAT BARU:\n{chat_log[:15000]}\nATURAN MUTLAK:\n1. JANGAN MENGHAPUS DATA USER LAMA!\n2. Tiap profil user wajib ada Status Update, Kepribadian, Hubungan, dan Skor Karma.\n3. Format: [1. Topik Utama], [2. Inside Jokes], dan [3. Profil Karakter Tiap User]."
         try:
-            res = await generate_smart_response([prompt])
-            self.learned_context["summary"] = res.text.strip()
-            save_json_file(LEARNED_FILE_PATH, self.learned_context)
-        except Exception: pass
+            await self.learn_from_channel(target_channel)
+        except Exception as e:
+            log.error(f"Belajar harian gagal: {e}")
 
     @daily_learning.before_loop
     async def before_daily_learning(self):
@@ -1643,7 +1834,7 @@ class UnifiedAI(commands.Cog, name="RTM Moderation Center"):
     async def auto_fish_it_update(self):
         prompt = f"Gunakan alat Google Search. Waktu saat ini adalah {self.get_wib_time_str()}. Carilah informasi TERBARU terkait patch/event dari game Roblox 'Fish It!' buatan Talon. ATURAN: Jika menemukan info, rangkum. Jika TIDAK, WAJIB MEMBALAS HANYA DENGAN KATA: GAGAL."
         try:
-            res = await generate_smart_response([prompt])
+            res = await generate_smart_response([prompt], priority=PRIORITY_BACKGROUND)
             text = res.text.strip()
             if text and text.upper() != "GAGAL" and "TIDAK MENEMUKAN" not in text.upper() and len(text) < 1500:
                 title = "Update Fish It Terbaru"
@@ -1652,10 +1843,13 @@ class UnifiedAI(commands.Cog, name="RTM Moderation Center"):
                     if article.get('title') == title:
                         article['content'] = text
                         article['added_at'] = str(datetime.now())
+                        self.index_article(article)
                         article_exists = True
                         break
                 if not article_exists:
-                    self.brain['articles'].append({"title": title, "content": text, "added_at": str(datetime.now())})
+                    article = {"title": title, "content": text, "added_at": str(datetime.now())}
+                    self.brain['articles'].append(article)
+                    self.index_article(article)
                 save_json_file(BRAIN_FILE_PATH, self.brain)
         except Exception: pass
 
@@ -1664,6 +1858,7 @@ class UnifiedAI(commands.Cog, name="RTM Moderation Center"):
         await self.bot.wait_until_ready()
 
 async def setup(bot):
+    await get_mongo().preload(MONGO_SYNCED_FILES)
     await bot.add_cog(UnifiedAI(bot))
     actions = load_json_file(PENDING_ACTIONS_FILE, {})
     for aid, data in actions.items():
@@ -7,6 +7,7 @@ import io
 import os
 import json
 from datetime import datetime
+from utils.msgpipeline import PRIORITY_DEFAULT
 
 # URL Aset dan Pengaturan Global
 FONT_URL = "https://github.com/MFarelS/RajinNulis-BOT/raw/master/font/Zahraaa.ttf"
@@ -212,6 +213,10 @@ class Addon(commands.Cog):
         self.bot = bot
         self.config_file = 'gender_roles_config.json'
         self.config = self.load_config()
+        self.bot.message_pipeline.register("info.gender_reminder", self.handle_message, PRIORITY_DEFAULT)
+
+    def cog_unload(self):
+        self.bot.message_pipeline.unregister("info.gender_reminder", self.handle_message)
 
     # Metode untuk Fitur Tulis
     def buat_tulisan_tangan(self, teks, nama):
@@ -274,18 +279,6 @@ class Addon(commands.Cog):
         with open(self.config_file, 'w') as f:
             json.dump(self.config, f, indent=4)
 
-    def has_gender_role(self, member, guild_id):
-        guild_settings = self.config.get(str(guild_id), {})
-        male_id = guild_settings.get('male')
-        female_id = guild_settings.get('female')
-
-        if male_id and any(role.id == male_id for role in member.roles):
-            return True
-        if female_id and any(role.id == female_id for role in member.roles):
-            return True
-        
-        return False
-
     def format_time(self, dt):
         return dt.strftime("%A, %d %B %Y pukul %H:%M WIB")
 
@@ -312,31 +305,17 @@ class Addon(commands.Cog):
         
         return embed
 
-    # Event Listener
-    @commands.Cog.listener()
-    async def on_message(self, message):
-        if message.author.bot or not message.guild:
-            return
-
+    # Handler pipeline pesan
+    async def handle_message(self, ctx):
+        message = ctx.message
         guild_id = str(message.guild.id)
-        if guild_id not in self.config:
+        if guild_id not in self.config or ctx.is_command:
             return
-        
-        try:
-            prefix = self.bot.command_prefix
-            if isinstance(prefix, str) and message.content.startswith(prefix):
-                 return
-            elif callable(prefix):
-                 prefixes = await prefix(self.bot, message)
-                 if any(message.content.startswith(p) for p in prefixes):
-                      return
-        except Exception:
-             # Fallback or logging if prefix check fails
-             pass
 
         member = message.author
-        if not self.has_gender_role(member, guild_id):
-            guild_settings = self.config.get(guild_id, {})
+        guild_settings = self.config[guild_id]
+        gender_role_ids = {guild_settings.get('male'), guild_settings.get('female')} - {None}
+        if not ctx.has_any_role(gender_role_ids):
             custom_message = guild_settings.get('custom_message')
             
             if custom_message:
@@ -8,6 +8,10 @@ from datetime import datetime, time, timedelta
 import logging
 import sys
 from collections import Counter
+from utils.datastore import get_store
+from utils.ledger import get_ledger
+from utils.msgpipeline import PRIORITY_RESTRICTION
+from utils.outbox import PRIORITY_BULK
 
 # Setup logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -26,6 +30,9 @@ SATIRE_NARRATIONS_FILE = os.path.join(DATA_DIR, "satire_narrations.json") # File
 # File baru untuk melacak heist yang "escaped" dan bisa dilaporkan
 ESCAPED_HEISTS_FILE = os.path.join(DATA_DIR, "escaped_heists.json")
 
+# Timer pembebasan penjara/mute: satu job yang selalu diarahkan ke deadline terdekat
+JAIL_SWEEP_TIMER = "koruptor.jail_sweep"
+
 
 # --- KONFIGURASI ROLE DAN CHANNEL ---
 EVENT_CHANNEL_ID = 765140300145360896 # ID Channel Event (Ganti dengan ID channel event Anda)
@@ -175,20 +182,21 @@ def save_json_data(file_path, data): # Ubah nama fungsi ini menjadi lebih umum
 
 
 # Ganti panggilan fungsi load/save spesifik dengan yang umum
+# Level & bank dilayani DataStore bersama (write-behind), bukan baca/tulis file langsung
 def load_level_data(guild_id: str):
-    data = load_json_safe(LEVEL_DATA_FILE)
+    data = get_store().get(LEVEL_DATA_FILE)
     return data.get(guild_id, {})
 
 def save_level_data(guild_id: str, data: dict):
-    all_data = load_json_safe(LEVEL_DATA_FILE)
-    all_data[guild_id] = data
-    save_json_data(LEVEL_DATA_FILE, all_data)
+    store = get_store()
+    store.get(LEVEL_DATA_FILE)[guild_id] = data
+    store.mark_dirty(LEVEL_DATA_FILE, guild_id)
 
 def load_bank_data():
-    return load_json_safe(BANK_FILE)
+    return get_store().get(BANK_FILE)
 
 def save_bank_data(data):
-    save_json_data(BANK_FILE, data)
+    get_store().put(BANK_FILE, data)
 
 def load_economy_config():
     return load_json_safe(ECONOMY_CONFIG_FILE)
@@ -282,17 +290,20 @@ class EconomyEvents(commands.Cog):
 
         # --- Mulai Background Tasks ---
         self.auto_tax_task.start()
-        self.jail_check_task.start()
+        self.bot.timers.register(JAIL_SWEEP_TIMER, self.jail_check_task)
+        self.arm_jail_sweep(datetime.utcnow())
         self.heist_fire_event_scheduler.start()
         self.project_scheduler.start()
         ## PERUBAHAN ALUR LAPORAN HEIST: Tambahkan cleanup untuk heist yang lolos
         self.escaped_heist_cleanup_task.start()
+        self.bot.message_pipeline.register("koruptor", self.handle_message, PRIORITY_RESTRICTION)
 
     # Pastikan untuk menghentikan task saat cog di-unload
     def cog_unload(self):
         log.info("Unloading EconomyEvents cog. Cancelling all tasks.")
         self.auto_tax_task.cancel()
-        self.jail_check_task.cancel()
+        self.bot.timers.unregister(JAIL_SWEEP_TIMER, self.jail_check_task)
+        self.bot.message_pipeline.unregister("koruptor", self.handle_message)
         self.heist_fire_event_scheduler.cancel()
         self.project_scheduler.cancel()
         ## PERUBAHAN ALUR LAPORAN HEIST: Batalkan cleanup task
@@ -364,6 +375,7 @@ class EconomyEvents(commands.Cog):
         user_data["muted_until"] = muted_until.isoformat() 
         
         save_level_data(guild_id, data)
+        self.arm_jail_sweep(release_time)
         log.debug(f"Saved jail status for {member.display_name}.")
         try:
             await member.send(
@@ -497,28 +509,22 @@ class EconomyEvents(commands.Cog):
                 
                 if user_balance > 0 and tax_amount > 0:
                     if user_balance >= tax_amount:
-                        bank_data[user_id]["balance"] -= tax_amount
+                        get_ledger().debit(user_id, tax_amount, reason="tax")
                         server_funds += tax_amount
                         log.info(f"User {member.display_name} ({user_id}) paid {tax_amount} tax. New balance: {bank_data[user_id]['balance']}.")
                     else: # Saldo tidak cukup untuk bayar penuh, potong semua yang ada
                         paid_amount = user_balance
-                        bank_data[user_id]["balance"] = 0
+                        get_ledger().debit(user_id, paid_amount, reason="tax", floor=0)
                         server_funds += paid_amount
                         hinaan = random.choice(self.funny_tax_insults)
-                        try:
-                            await member.send(f"**Pesan Resmi dari Pejabat PajakBot:**\n\n{hinaan.replace('[Nama Pengguna]', member.display_name)}")
-                            log.info(f"Sent tax insult DM to {member.display_name} (insufficient balance, paid {paid_amount}).")
-                        except discord.Forbidden:
-                            log.warning(f"Failed to send tax insult DM to {member.display_name} (DMs closed).")
+                        # Lewat outbox: DM massal dikirim bertahap tanpa menahan loop pajak
+                        self.bot.outbox.send(member, f"**Pesan Resmi dari Pejabat PajakBot:**\n\n{hinaan.replace('[Nama Pengguna]', member.display_name)}", priority=PRIORITY_BULK)
+                        log.info(f"Queued tax insult DM to {member.display_name} (insufficient balance, paid {paid_amount}).")
                 elif user_balance == 0 and tax_percentage > 0: # Saldo 0 tapi pajak diaktifkan
                     hinaan = random.choice(self.funny_tax_insults)
-                    try:
-                        await member.send(f"**Pesan Resmi dari Pejabat PajakBot:**\n\n{hinaan.replace('[Nama Pengguna]', member.display_name)}")
-                        log.info(f"Sent tax insult DM to {member.display_name} (zero balance).")
-                    except discord.Forbidden:
-                        log.warning(f"Failed to send tax insult DM to {member.display_name} (DMs closed).")
+                    self.bot.outbox.send(member, f"**Pesan Resmi dari Pejabat PajakBot:**\n\n{hinaan.replace('[Nama Pengguna]', member.display_name)}", priority=PRIORITY_BULK)
+                    log.info(f"Queued tax insult DM to {member.display_name} (zero balance).")
 
-        save_bank_data(bank_data)
         config["server_funds_balance"] = server_funds
         save_economy_config(config)
         log.info(f"Auto tax task finished. Final Server Funds: {server_funds} RSWN.")
@@ -529,11 +535,15 @@ class EconomyEvents(commands.Cog):
         await self.bot.wait_until_ready()
         log.info("Bot ready, Auto tax task is about to start.")
 
-    # --- Background Task untuk Mengecek Masa Penjara ---
-    @tasks.loop(minutes=5)
-    async def jail_check_task(self):
+    # --- Timer untuk Mengecek Masa Penjara ---
+    def arm_jail_sweep(self, due):
+        """Majukan sweep penjara ke `due` (datetime UTC) kalau lebih awal dari jadwal yang ada."""
+        self.bot.timers.schedule_earliest(JAIL_SWEEP_TIMER, JAIL_SWEEP_TIMER, due)
+
+    async def jail_check_task(self, timer_id=None, payload=None):
         log.info("Jail check task started.")
         await self.bot.wait_until_ready()
+        next_due = None # Deadline jailed_until / muted_until terdekat yang belum lewat
         
         for guild in self.bot.guilds:
             guild_id_str = str(guild.id)
@@ -548,6 +558,8 @@ class EconomyEvents(commands.Cog):
                         jailed_until_dt = datetime.fromisoformat(user_data["jailed_until"])
                         if datetime.utcnow() >= jailed_until_dt:
                             users_to_release.append(user_id)
+                        elif next_due is None or jailed_until_dt < next_due:
+                            next_due = jailed_until_dt
                     except ValueError: # Tangani jika data jailed_until corrupt
                         log.error(f"Invalid datetime format for jailed_until for user {user_id}. Removing corrupted data.")
                         users_to_release.append(user_id) # Hapus data yang korup
@@ -564,6 +576,8 @@ class EconomyEvents(commands.Cog):
                             user_data.pop("muted_until", None)
                             log.info(f"User {member.display_name} unmuted (muted_until passed).")
                             save_level_data(guild_id_str, data) # Simpan perubahan muted_until
+                        elif member and (next_due is None or muted_until_dt < next_due):
+                            next_due = muted_until_dt
                     except ValueError:
                         log.error(f"Invalid datetime format for muted_until for user {user_id}. Removing corrupted data.")
                         user_data.pop("muted_until", None)
@@ -588,12 +602,9 @@ class EconomyEvents(commands.Cog):
             if users_to_release: # Hanya simpan jika ada perubahan yang membebaskan user yang masih di guild
                 # save_level_data(guild_id_str, data) # Sudah dipanggil di _release_user atau di blok else atas
                 log.info(f"Jail statuses updated for guild {guild.name}.")
-                
-    @jail_check_task.before_loop
-    async def before_jail_check_task(self):
-        log.info("Waiting for bot to be ready before starting Jail check task.")
-        await self.bot.wait_until_ready()
-        log.info("Bot ready, Jail check task is about to start.")
+
+        if next_due is not None:
+            self.arm_jail_sweep(next_due)
 
     ## PERUBAHAN ALUR LAPORAN HEIST: Tugas latar belakang untuk membersihkan heist yang lolos
     @tasks.loop(hours=24) # Bersihkan setiap 24 jam
@@ -2218,11 +2229,9 @@ class EconomyEvents(commands.Cog):
             await self._start_next_quiz_question(guild, channel)
 
 
-    @commands.Cog.listener()
-    async def on_message(self, message):
-        if message.author.bot or not message.guild:
-            return
-            
+    async def handle_message(self, ctx):
+        """Tahanan yang masih cooldown / di-mute: pesannya dihapus dan pipeline berhenti (True)."""
+        message = ctx.message
         # Periksa apakah user adalah tahanan dan sedang dalam cooldown pesan atau di-mute
         guild_id_str = str(message.guild.id)
         user_id_str = str(message.author.id)
@@ -2231,8 +2240,7 @@ class EconomyEvents(commands.Cog):
         user_data = level_data.get(user_id_str, {})
 
         # Cek apakah user memiliki peran tahanan
-        jail_role = message.guild.get_role(JAIL_ROLE_ID)
-        is_jailed_by_role = jail_role and jail_role in message.author.roles
+        is_jailed_by_role = JAIL_ROLE_ID in ctx.role_ids
 
         if is_jailed_by_role and "jailed_until" in user_data and \
            datetime.utcnow() < datetime.fromisoformat(user_data["jailed_until"]):
@@ -2259,7 +2267,7 @@ class EconomyEvents(commands.Cog):
                                 f"Anda hanya bisa mengirim pesan lagi dalam **{minutes} menit {seconds} detik**."
                             , delete_after=10)
                     logging.info(f"Message from jailed user {message.author.display_name} deleted due to message cooldown.")
-                    return # Hentikan pemrosesan pesan (pesan tidak diproses dan user tidak di-mute Penuh)
+                    return True # Hentikan pemrosesan pesan (pesan tidak diproses dan user tidak di-mute Penuh)
 
             # 2. Periksa Muted Status (mute penuh)
             # Ini adalah bagian yang akan menerapkan mute penuh setelah pesan pertama dalam cooldown baru
@@ -2283,14 +2291,16 @@ class EconomyEvents(commands.Cog):
                                 f"🔇 {message.author.mention}, Anda masih di-'bisukan' oleh petugas penjara dan tidak bisa mengirim pesan."
                             , delete_after=10)
                     logging.info(f"Message from jailed user {message.author.display_name} deleted because they are fully muted.")
-                    return # Hentikan pemrosesan pesan
+                    return True # Hentikan pemrosesan pesan
             
             # Jika user adalah tahanan, tidak dalam cooldown pesan, DAN belum di-mute penuh:
             # Ini berarti mereka baru saja mengirim pesan pertama mereka (atau pesan setelah cooldown 2m berakhir).
             # Terapkan mute penuh dan reset cooldown 2 menit
-            user_data["muted_until"] = (datetime.utcnow() + timedelta(hours=JAIL_MUTE_DURATION_HOURS)).isoformat()
+            muted_until = datetime.utcnow() + timedelta(hours=JAIL_MUTE_DURATION_HOURS)
+            user_data["muted_until"] = muted_until.isoformat()
             user_data["message_cooldown_end"] = (datetime.utcnow() + timedelta(seconds=JAIL_MESSAGE_COOLDOWN_SECONDS)).isoformat()
             save_level_data(guild_id_str, level_data)
+            self.arm_jail_sweep(muted_until)
             
             logging.info(f"Jailed user {message.author.display_name} sent a message. Applying full mute and {JAIL_MESSAGE_COOLDOWN_SECONDS}s cooldown.")
             
@@ -2310,7 +2320,7 @@ class EconomyEvents(commands.Cog):
                 await message.delete()
             except discord.HTTPException as e:
                 logging.warning(f"Failed to delete message from {message.author.display_name} after applying mute: {e}")
-            return # Hentikan pemrosesan pesan ini, karena sudah di-mute
+            return True # Hentikan pemrosesan pesan ini, karena sudah di-mute
 
         # Logic untuk kuis kebobrokan (yang sudah ada sebelumnya)
         quiz_session = self.active_quizzes.get(guild_id_str)
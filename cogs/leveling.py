@@ -5,12 +5,14 @@ import os
 import random
 import logging
 import asyncio
-from datetime import datetime, timedelta
-from PIL import Image, ImageDraw
+from datetime import datetime, timedelta, timezone
 import requests
-from io import BytesIO
 import io
 import aiohttp
+from utils.datastore import get_store
+from utils.timers import next_time_of_day, next_weekday_time
+from utils.voicetracker import VoiceTracker
+from utils.msgpipeline import PRIORITY_DEFAULT
 
 # --- PATH FILE DATA ---
 LEVEL_FILE = "data/level_data.json"
@@ -22,8 +24,15 @@ SHOP_STATUS_FILE = 'data/shop_status.json'
 COLLAGE_FILE = 'data/shop_collage.json'
 INVENTORY_FILE = 'data/inventory.json'
 
+# Quest harian diumumkan tiap jam ini (WIB) lewat timer service
+DAILY_QUEST_TIMER = "leveling.daily_quest"
+DAILY_QUEST_TIME = "00:00"
+WEEKLY_RESET_TIMER = "leveling.weekly_reset"
+VOICE_FLUSH_MINUTES = 10
+
 # --- KONSTANTA ---
 WEEKLY_RESET_DAY = 0
+EXP_PER_LEVEL = 3500
 LEVEL_BADGES = {
     5: "🥉",
     10: "🥈",
@@ -34,6 +43,9 @@ DAILY_EXP_LIMIT = 1500
 
 # --- FUNGSI UTILITY LOAD/SAVE JSON ---
 def load_json(path):
+    store = get_store()
+    if store.handles(path):
+        return store.get(path)
     os.makedirs(os.path.dirname(path), exist_ok=True)
     if not os.path.exists(path):
         default_data = {}
@@ -62,30 +74,16 @@ def load_json(path):
         return {}
 
 def save_json(path, data):
+    store = get_store()
+    if store.handles(path):
+        store.put(path, data)
+        return
     os.makedirs(os.path.dirname(path), exist_ok=True)
     with open(path, 'w', encoding='utf-8') as f:
         json.dump(data, f, indent=4)
 
 def calculate_level(exp):
-    return exp // 3500
-
-async def crop_avatar_to_circle(user: discord.User):
-    async with aiohttp.ClientSession() as session:
-        async with session.get(user.display_avatar.url) as resp:
-            avatar_bytes = await resp.read()
-
-    with Image.open(BytesIO(avatar_bytes)).convert("RGBA") as img:
-        size = (256, 256)
-        img = img.resize(size)
-        mask = Image.new("L", size, 0)
-        draw = ImageDraw.Draw(mask)
-        draw.ellipse((0, 0) + size, fill=255)
-        output = Image.new("RGBA", size)
-        output.paste(img, (0, 0), mask)
-        buffer = BytesIO()
-        output.save(buffer, format="PNG")
-        buffer.seek(0)
-        return buffer
+    return exp // EXP_PER_LEVEL
 
 # --- UI COMPONENTS (MODALS, VIEWS, BUTTONS) ---
 class EXPInputModal(discord.ui.Modal, title="Beli EXP Langsung"):
@@ -587,85 +585,131 @@ class Leveling(commands.Cog, name="⭐ Leveling Exp"):
         self.RSWN_PER_MINUTE_VC = 10
         self.EXP_PER_MESSAGE = 10
         self.RSWN_PER_MESSAGE = 1
-        self.voice_task = self.create_voice_task()
-        self.last_reset = datetime.utcnow()
-        self.daily_quest_task.start()
-        self.voice_task.start()
+        self.voice = VoiceTracker()
+        self.bot.timers.register(DAILY_QUEST_TIMER, self.daily_quest_task)
+        if self.bot.timers.due_at(DAILY_QUEST_TIMER) is None:
+            self.bot.timers.schedule(DAILY_QUEST_TIMER, DAILY_QUEST_TIMER, next_time_of_day(DAILY_QUEST_TIME), repeat="daily")
+        self.bot.timers.register(WEEKLY_RESET_TIMER, self.weekly_reset_task)
+        if self.bot.timers.due_at(WEEKLY_RESET_TIMER) is None:
+            self.bot.timers.schedule(WEEKLY_RESET_TIMER, WEEKLY_RESET_TIMER, next_weekday_time(WEEKLY_RESET_DAY, "00:00", tz=timezone.utc), repeat="weekly")
+        self.voice_flush_task.start()
+        self.bot.message_pipeline.register("leveling", self.handle_message, PRIORITY_DEFAULT)
         logging.basicConfig(level=logging.INFO)
         
         
         self.shop_data = load_json(SHOP_FILE)
         self.collage_url = load_json(COLLAGE_FILE).get("collage_url")
 
-    
+    def cog_unload(self):
+        self.voice_flush_task.cancel()
+        for guild_id, user_id in self.voice.keys():
+            self._record_voice(guild_id, user_id, close=True)
+        self.bot.timers.unregister(DAILY_QUEST_TIMER, self.daily_quest_task)
+        self.bot.timers.unregister(WEEKLY_RESET_TIMER, self.weekly_reset_task)
+        self.bot.message_pipeline.unregister("leveling", self.handle_message)
+
     def get_anomaly_multiplier(self):
         dunia_cog = self.bot.get_cog('DuniaHidup')
         if dunia_cog and dunia_cog.active_anomaly and dunia_cog.active_anomaly.get('type') == 'exp_boost':
             return dunia_cog.active_anomaly.get('effect', {}).get('multiplier', 1)
         return 1
 
-    def create_voice_task(self):
-        @tasks.loop(minutes=1)
-        async def voice_task():
-            try:
-                now = datetime.utcnow()
-                anomaly_multiplier = self.get_anomaly_multiplier()
-                
-                for guild in self.bot.guilds:
-                    guild_id = str(guild.id)
-                    all_level_data = load_json(LEVEL_FILE)
-                    data = all_level_data.setdefault(guild_id, {})
-                    bank_data = load_json(BANK_FILE)
-
-                    for vc in guild.voice_channels:
-                        for member in vc.members:
-                            if member.bot or member.voice.self_deaf or member.voice.self_mute:
-                                continue
-
-                            user_id = str(member.id)
-                            if user_id not in data:
-                                data[user_id] = {"exp": 0, "weekly_exp": 0, "level": 0, "badges": []}
-                            
-                            exp_gain_vc = int(self.EXP_PER_MINUTE_VC * anomaly_multiplier)
-                            rswn_gain_vc = int(self.RSWN_PER_MINUTE_VC * anomaly_multiplier)
-
-                            data[user_id]["exp"] += exp_gain_vc
-                            data[user_id].setdefault("weekly_exp", 0)
-                            data[user_id]["weekly_exp"] += exp_gain_vc
-
-                            if user_id not in bank_data:
-                                bank_data[user_id] = {"balance": 0, "debt": 0}
-                            bank_data[user_id]["balance"] += rswn_gain_vc
-
-                            new_level = calculate_level(data[user_id]["exp"])
-                            if new_level > data[user_id].get("level", 0):
-                                data[user_id]["level"] = new_level
-                                await self.level_up(member, guild, None, new_level, data)
-
-                    all_level_data[guild_id] = data
-                    save_json(LEVEL_FILE, all_level_data)
-                    save_json(BANK_FILE, bank_data)
-
-                    if now.weekday() == WEEKLY_RESET_DAY and now.date() != self.last_reset.date():
-                        for user_data in data.values():
-                            user_data["weekly_exp"] = 0
-                        self.last_reset = now
-                        save_json(LEVEL_FILE, all_level_data)
-            except Exception as e:
-                print(f"Error in voice task: {e}")
-        return voice_task
+    # --- EXP Voice (event-driven) ---
+    @staticmethod
+    def _voice_eligible(member, state):
+        return (
+            state is not None and state.channel is not None and state.channel.type == discord.ChannelType.voice
+            and not member.bot and not state.self_deaf and not state.self_mute
+        )
+
+    def _record_voice(self, guild_id, user_id, close=False):
+        """Bukukan menit voice yang terkumpul ke ledger. Mengembalikan data level user, atau None."""
+        minutes = self.voice.take(guild_id, user_id, close=close)
+        if minutes <= 0:
+            return None
+        anomaly_multiplier = self.get_anomaly_multiplier()
+        exp_gain_vc = int(self.EXP_PER_MINUTE_VC * anomaly_multiplier) * minutes
+        rswn_gain_vc = int(self.RSWN_PER_MINUTE_VC * anomaly_multiplier) * minutes
+        self.bot.ledger.record(str(user_id), str(guild_id), rswn=rswn_gain_vc, exp=exp_gain_vc, weekly=True, reason="voice")
+        return self.bot.store.get(LEVEL_FILE).get(str(guild_id), {}).get(str(user_id))
+
+    async def commit_voice(self, guild, user_id, member=None, close=False):
+        """Bukukan EXP/RSWN voice satu user lalu cek level up."""
+        user_data = self._record_voice(guild.id, user_id, close=close)
+        if not user_data:
+            return
+        new_level = calculate_level(user_data["exp"])
+        if new_level > user_data.get("level", 0):
+            guild_id = str(guild.id)
+            data = self.bot.store.get(LEVEL_FILE).setdefault(guild_id, {})
+            user_data["level"] = new_level
+            member = member or guild.get_member(user_id)
+            if member:
+                await self.level_up(member, guild, None, new_level, data)
+            self.bot.store.mark_dirty(LEVEL_FILE, guild_id)
+
+    async def sync_voice_sessions(self):
+        """Samakan sesi voice dengan kondisi sebenarnya (saat cog dimuat / bot reconnect)."""
+        for guild in self.bot.guilds:
+            present = {
+                member.id: self._voice_eligible(member, member.voice)
+                for vc in guild.voice_channels for member in vc.members if not member.bot
+            }
+            for user_id in self.voice.sync(guild.id, present):
+                self.voice.update(guild.id, user_id, False, False)
+                await self.commit_voice(guild, user_id, close=True)
 
     @commands.Cog.listener()
-    async def on_message(self, message):
-        if message.author.bot or not message.guild:
+    async def on_voice_state_update(self, member, before, after):
+        if member.bot:
             return
-        if message.content.startswith(self.bot.command_prefix):
+        left = self.voice.update(member.guild.id, member.id, after.channel is not None, self._voice_eligible(member, after))
+        if left:
+            await self.commit_voice(member.guild, member.id, member, close=True)
+
+    @commands.Cog.listener()
+    async def on_ready(self):
+        await self.sync_voice_sessions()
+
+    @tasks.loop(minutes=VOICE_FLUSH_MINUTES)
+    async def voice_flush_task(self):
+        for guild_id, user_id in self.voice.keys():
+            guild = self.bot.get_guild(guild_id)
+            if guild is None:
+                continue
+            try:
+                await self.commit_voice(guild, user_id)
+            except Exception as e:
+                print(f"Error in voice flush: {e}")
+
+    @voice_flush_task.before_loop
+    async def before_voice_flush_task(self):
+        await self.bot.wait_until_ready()
+        await self.sync_voice_sessions()
+
+    async def weekly_reset_task(self, timer_id=None, payload=None):
+        await self.bot.wait_until_ready()
+        # EXP voice minggu lalu dibukukan dulu sebelum weekly_exp dinolkan
+        for guild_id, user_id in self.voice.keys():
+            self._record_voice(guild_id, user_id)
+        store = self.bot.store
+        all_level_data = store.get(LEVEL_FILE)
+        for guild in self.bot.guilds:
+            guild_id = str(guild.id)
+            for user_data in all_level_data.get(guild_id, {}).values():
+                user_data["weekly_exp"] = 0
+            store.mark_dirty(LEVEL_FILE, guild_id)
+
+    async def handle_message(self, ctx):
+        message = ctx.message
+        if ctx.is_command:
             logging.info(f"Pesan adalah perintah: {message.content}")
             return
 
         user_id = str(message.author.id)
         guild_id = str(message.guild.id)
-        all_level_data = load_json(LEVEL_FILE)
+        store = self.bot.store
+        all_level_data = store.get(LEVEL_FILE)
         data = all_level_data.setdefault(guild_id, {})
 
         if user_id not in data:
@@ -691,14 +735,8 @@ class Leveling(commands.Cog, name="⭐ Leveling Exp"):
         exp_gain = int(self.EXP_PER_MESSAGE * final_multiplier)
         rswn_gain = int(self.RSWN_PER_MESSAGE * final_multiplier)
         
-        bank_data = load_json(BANK_FILE)
-        if user_id not in bank_data:
-            bank_data[user_id] = {"balance": 0, "debt": 0}
-        bank_data[user_id]["balance"] += rswn_gain
-        
-        user_level_data["exp"] += exp_gain
-        user_level_data.setdefault("weekly_exp", 0)
-        user_level_data["weekly_exp"] += exp_gain
+        self.bot.ledger.record(user_id, guild_id, rswn=rswn_gain, exp=exp_gain, weekly=True, reason="message")
+        self._record_voice(message.guild.id, message.author.id)
         user_level_data["last_active"] = datetime.utcnow().isoformat()
         print(f"[ACTIVITY] {message.author} dapat +{exp_gain} EXP & +{rswn_gain} RSWN (x{final_multiplier} booster total)")
 
@@ -707,12 +745,9 @@ class Leveling(commands.Cog, name="⭐ Leveling Exp"):
             user_level_data["level"] = new_level
             await self.level_up(message.author, message.guild, message.channel, new_level, data)
         
-        all_level_data[guild_id] = data
-        save_json(LEVEL_FILE, all_level_data)
-        save_json(BANK_FILE, bank_data)
+        store.mark_dirty(LEVEL_FILE, guild_id)
 
-    @tasks.loop(hours=24)
-    async def daily_quest_task(self):
+    async def daily_quest_task(self, timer_id=None, payload=None):
         await self.bot.wait_until_ready()
         for guild in self.bot.guilds:
             guild_id = str(guild.id)
@@ -761,9 +796,9 @@ class Leveling(commands.Cog, name="⭐ Leveling Exp"):
             user_badges = data.get(str(member.id), {}).setdefault("badges", [])
             if badge and badge not in user_badges:
                 user_badges.append(badge)
-                all_level_data = load_json(LEVEL_FILE)
+                all_level_data = self.bot.store.get(LEVEL_FILE)
                 all_level_data[guild_id] = data
-                save_json(LEVEL_FILE, all_level_data)
+                self.bot.store.mark_dirty(LEVEL_FILE, guild_id)
 
             announce_channel_id = config.get("announce_channel")
             if announce_channel_id:
@@ -848,15 +883,12 @@ class Leveling(commands.Cog, name="⭐ Leveling Exp"):
             return await ctx.send("Jumlah RSWN harus positif.", ephemeral=True)
         await ctx.defer()
         
-        bank_data = load_json(BANK_FILE)
         updated_users_count = 0
         for member in ctx.guild.members:
             if member.bot: continue
-            user_id_str = str(member.id)
-            bank_data.setdefault(user_id_str, {"balance": 0, "debt": 0})["balance"] += amount
+            self.bot.ledger.credit(member.id, amount, reason="uangall")
             updated_users_count += 1
         
-        save_json(BANK_FILE, bank_data)
         logging.info(f"Successfully gave {amount} RSWN to {updated_users_count} users.")
         await ctx.send(f"✅ Berhasil memberikan **{amount} RSWN** kepada **{updated_users_count} anggota** di server ini!")
 
@@ -946,15 +978,9 @@ class Leveling(commands.Cog, name="⭐ Leveling Exp"):
                 if last_completed_date.date() == datetime.utcnow().date():
                     return await ctx.send("❌ Kamu sudah menyelesaikan quest harian hari ini!")
             
-            user_level_data["exp"] += daily_quest["reward_exp"]
             user_level_data["last_completed_quest"] = datetime.utcnow().isoformat()
-            save_json(LEVEL_FILE, all_level_data)
-            
-            bank_data = load_json(BANK_FILE)
-            if user_id not in bank_data:
-                bank_data[user_id] = {"balance": 0, "debt": 0}
-            bank_data[user_id]["balance"] += daily_quest["reward_coins"]
-            save_json(BANK_FILE, bank_data)
+            self.bot.store.mark_dirty(LEVEL_FILE, guild_id)
+            self.bot.ledger.record(user_id, guild_id, rswn=daily_quest["reward_coins"], exp=daily_quest["reward_exp"], reason="daily_quest")
             
             await ctx.send(f"✅ Kamu telah menyelesaikan quest harian! Reward: {daily_quest['reward_exp']} EXP dan {daily_quest['reward_coins']} 🪙RSWN.")
         except json.JSONDecodeError:
@@ -1000,12 +1026,7 @@ class Leveling(commands.Cog, name="⭐ Leveling Exp"):
     async def givecoins(self, ctx, member: discord.Member, amount: int):
         if ctx.channel.permissions_for(ctx.guild.me).manage_messages:
             await ctx.message.delete()
-        bank_data = load_json(BANK_FILE)
-        user_id = str(member.id)
-        if user_id not in bank_data:
-            bank_data[user_id] = {"balance": 0, "debt": 0}
-        bank_data[user_id]["balance"] += amount
-        save_json(BANK_FILE, bank_data)
+        self.bot.ledger.credit(member.id, amount, reason="givecoins")
         try:
             await member.send(f"🎉 Kamu telah menerima **{amount} 🪙RSWN gratis** dari admin {ctx.author.mention}!")
         except discord.Forbidden:
@@ -1023,11 +1044,8 @@ class Leveling(commands.Cog, name="⭐ Leveling Exp"):
             return await ctx.author.send("❌ Saldo tidak cukup!", delete_after=10)
         if amount <= 0:
             return await ctx.author.send("❌ Jumlah transfer harus positif!", delete_after=10)
-        if receiver_id not in bank_data:
-            bank_data[receiver_id] = {"balance": 0, "debt": 0}
-        bank_data[sender_id]["balance"] -= amount
-        bank_data[receiver_id]["balance"] += amount
-        save_json(BANK_FILE, bank_data)
+        self.bot.ledger.debit(sender_id, amount, reason=f"transfer:{receiver_id}")
+        self.bot.ledger.credit(receiver_id, amount, reason=f"transfer:{sender_id}")
         try:
             await member.send(f"🎉 Kamu telah menerima **{amount} 🪙RSWN** dari {ctx.author.mention}!")
         except discord.Forbidden:
@@ -1089,6 +1107,7 @@ class Leveling(commands.Cog, name="⭐ Leveling Exp"):
         
     @commands.command()
     async def rank(self, ctx):
+        await self.commit_voice(ctx.guild, ctx.author.id, ctx.author)
         user_id = str(ctx.author.id)
         guild_id = str(ctx.guild.id)
         all_level_data = load_json(LEVEL_FILE)
@@ -1098,13 +1117,16 @@ class Leveling(commands.Cog, name="⭐ Leveling Exp"):
         user_data = data.get(user_id, {"level": 0, "exp": 0})
         user_bank = bank.get(user_id, {"balance": 0})
         
-        avatar_file = discord.File(await crop_avatar_to_circle(ctx.author), "avatar.png")
+        card = await self.bot.rank_cards.card(
+            ctx.author, user_data.get('level', 0), user_data.get('exp', 0), EXP_PER_LEVEL, user_bank.get('balance', 0)
+        )
+        card_file = discord.File(io.BytesIO(card), "rank.png")
         embed = discord.Embed(title=f"📊 Rank {ctx.author.display_name}", color=discord.Color.purple())
-        embed.set_thumbnail(url="attachment://avatar.png")
+        embed.set_image(url="attachment://rank.png")
         embed.add_field(name="Level", value=user_data.get('level', 0), inline=True)
         embed.add_field(name="Saldo", value=f"{user_bank.get('balance', 0)} 🪙RSWN", inline=True)
         embed.add_field(name="Total EXP", value=user_data.get('exp', 0), inline=True)
-        await ctx.send(file=avatar_file, embed=embed)
+        await ctx.send(file=card_file, embed=embed)
 
     @commands.command()
     @commands.has_permissions(administrator=True)
@@ -1124,12 +1146,9 @@ class Leveling(commands.Cog, name="⭐ Leveling Exp"):
         if user_id not in bank_data or bank_data[user_id].get("balance", 0) < rswn:
             return await ctx.send("❌ Pengguna tidak memiliki cukup RSWN untuk dikurangi!", delete_after=10)
         
-        data[user_id]["exp"] -= exp
-        bank_data[user_id]["balance"] -= rswn
+        self.bot.ledger.record(user_id, guild_id, rswn=-rswn, exp=-exp, reason=f"reduce:{reason}")
         data[user_id]["level"] = calculate_level(data[user_id]["exp"])
-        
-        save_json(LEVEL_FILE, all_level_data)
-        save_json(BANK_FILE, bank_data)
+        self.bot.store.mark_dirty(LEVEL_FILE, guild_id)
         await ctx.send(f"✅ {member.mention} telah dikurangi **{exp} EXP** dan **{rswn} RSWN**! Alasan: *{reason}*")
 
     @commands.command()
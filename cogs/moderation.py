@@ -1,5 +1,5 @@
 import discord
-from discord.ext import commands, tasks
+from discord.ext import commands
 import json
 import os
 import re
@@ -9,9 +9,57 @@ from datetime import datetime, timedelta
 import time
 import aiohttp
 import sys
+import copy
+import hashlib
 from datetime import datetime, timedelta, timezone
+from utils.msgpipeline import PRIORITY_MODERATION
 
 WIB = timezone(timedelta(hours=7))
+SAVE_DEBOUNCE_SECONDS = 3
+SPAM_SCOPE = "moderation"
+# (jumlah pesan, detik): lebih dari ini dianggap spam
+FAST_SPAM_LIMIT = (5, 10)
+GLOBAL_SPAM_LIMIT = (8, 15)
+# Isi sama minimal N kali dalam T detik di minimal C channel
+CROSS_CHANNEL_SPAM = (5, 30, 3)
+# Perubahan statistik panel dalam rentang ini digabung jadi satu edit
+PANEL_UPDATE_DELAY = 10
+
+DEFAULT_GUILD_SETTINGS = {
+    "auto_role_id": None, 
+    "welcome_channel_id": None,
+    "welcome_message": "Selamat datang di **{guild_name}**, {user}! 🎉",
+    "welcome_embed_title": "SELAMAT DATANG!",
+    "welcome_sender_name": "Admin Server",
+    "welcome_banner_url": None, 
+    "log_channel_id": None, 
+    "reaction_roles": {},
+    "channel_rules": {},
+    "boost_channel_id": None,
+    "boost_message": "Terima kasih banyak, {user}, telah menjadi **Server Booster** kami di {guild_name}! Kami sangat menghargai dukunganmu! ❤️",
+    "boost_embed_title": "TERIMA KASIH SERVER BOOSTER!",
+    "boost_sender_name": "Tim Server",
+    "boost_image_url": None,
+    "announcement_webhooks": {},
+    "mod_panel_message_id": None,
+    "mod_panel_channel_id": None,
+    "mod_panel_hash": None,
+    "main_membership_role_id": None, 
+    "membership_roles": {}, 
+    "membership_invite_message": "🥺 Anda belum menjadi anggota channel YouTube. Silakan berlangganan untuk mendapatkan role eksklusif! [LINK MEMBERSHIP]", 
+    "membership_confirm_message": "🎉 Anda sudah menjadi anggota! Anda adalah anggota tier: **{tier_name}**.",
+    "verification_button_label": "Verifikasi Membership",
+    "spam_whitelist_roles": [],
+    "goodbye_message": "Selamat tinggal, **{user}**. Sampai jumpa lagi! 👋",
+    "panel_role_stats": []
+}
+
+DEFAULT_CHANNEL_RULES = {
+    "disallow_bots": False, "disallow_media": False, "disallow_prefix": False,
+    "disallow_url": False, "auto_delete_seconds": 0
+}
+
+DEFAULT_GUILD_FILTERS = {"bad_words": [], "link_patterns": []}
 
 def load_data(file_path):
     try:
@@ -36,6 +84,90 @@ def save_data(file_path, data):
     except Exception as e:
         pass
 
+class GuildSettings(dict):
+    """
+    Setelan satu guild. Default diisi sekali saat load/migrasi, bukan di setiap baca.
+    Setter hanya menjadwalkan save (debounced) kalau nilainya benar-benar berubah;
+    perubahan nested (list/dict di dalamnya) tetap disimpan lewat `save_settings()`.
+    """
+
+    def __init__(self, data: dict, on_change):
+        super().__init__(data)
+        self._on_change = on_change
+
+    @classmethod
+    def migrate(cls, data: dict, on_change) -> tuple["GuildSettings", bool]:
+        missing = [key for key in DEFAULT_GUILD_SETTINGS if key not in data]
+        merged = dict(data)
+        for key in missing:
+            merged[key] = copy.deepcopy(DEFAULT_GUILD_SETTINGS[key])
+        return cls(merged, on_change), bool(missing)
+
+    def __setitem__(self, key, value):
+        if key in self and self[key] is not value and self[key] == value:
+            return
+        super().__setitem__(key, value)
+        self._on_change()
+
+    def __delitem__(self, key):
+        super().__delitem__(key)
+        self._on_change()
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+        return self[key]
+
+    def update(self, *args, **kwargs):
+        for key, value in dict(*args, **kwargs).items():
+            self[key] = value
+
+    def pop(self, key, *default):
+        had_key = key in self
+        value = super().pop(key, *default)
+        if had_key:
+            self._on_change()
+        return value
+
+class PanelCounters:
+    """Statistik panel moderasi satu guild, dijaga inkremental dari event member."""
+
+    __slots__ = ("total", "bots", "roles")
+
+    def __init__(self, guild: discord.Guild, role_ids):
+        self.total = len(guild.members)
+        self.bots = sum(1 for member in guild.members if member.bot)
+        self.roles = {}
+        for role_id in role_ids:
+            if role := guild.get_role(role_id):
+                self.roles[role_id] = len(role.members)
+
+    def member_changed(self, member: discord.Member, delta: int):
+        self.total += delta
+        if member.bot:
+            self.bots += delta
+        for role in member.roles:
+            if role.id in self.roles:
+                self.roles[role.id] += delta
+
+    def roles_changed(self, before: discord.Member, after: discord.Member) -> bool:
+        before_ids = {role.id for role in before.roles}
+        after_ids = {role.id for role in after.roles}
+        changed = False
+        for role_id in before_ids ^ after_ids:
+            if role_id in self.roles:
+                self.roles[role_id] += 1 if role_id in after_ids else -1
+                changed = True
+        return changed
+
+def _write_text(file_path, payload):
+    try:
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        with open(file_path, 'w', encoding='utf-8') as f:
+            f.write(payload)
+    except Exception as e:
+        pass
+
 def parse_duration(duration_str: str) -> Optional[timedelta]:
     match = re.match(r"(\d+)([smhd])", duration_str.lower())
     if not match:
@@ -528,15 +660,12 @@ class ServerAdminCog(commands.Cog, name="👑 Administrasi"):
         self.mod_panel_channel_id = None
         
         self.spam_messages = {}
-        self.spam_history = {}
-        self.cross_channel_spam_history = {}
         
         self.reminder_channel_id = 1379762287149187162
         self.male_role_id = 1385246612288311326
         self.female_role_id = 1379461360873898017
         
         self.common_prefixes = ('!', '.', '?', '-', '$', '%', '&', '#', '+', '=')
-        self.url_regex = re.compile(r'https?://[^\s/$.?#].[^\s]*')
         
         self.color_success = 0xFFE000 
         self.color_error = 0xFFE000
@@ -551,18 +680,20 @@ class ServerAdminCog(commands.Cog, name="👑 Administrasi"):
         self.media_spam_rapid_cooldown = commands.CooldownMapping.from_cooldown(5, 10.0, commands.BucketType.user)
         self.media_spam_heavy_cooldown = commands.CooldownMapping.from_cooldown(8, 60.0, commands.BucketType.user)
         self.link_spam_cooldown = commands.CooldownMapping.from_cooldown(2, 60.0, commands.BucketType.user)
-        self.fast_spam_cooldown = commands.CooldownMapping.from_cooldown(5, 10.0, commands.BucketType.user)
-        self.global_spam_cooldown = commands.CooldownMapping.from_cooldown(8, 15.0, commands.BucketType.user)
         self.multi_media_cooldown = commands.CooldownMapping.from_cooldown(1, 5.0, commands.BucketType.user)
+        self._pending_saves = {}
         self.settings = load_data(self.settings_file)
         self.filters = load_data(self.filters_file)
         self.warnings = load_data(self.warnings_file)
         self.status = load_data(self.status_file)
+        self.bot.word_filter.register_source("filters", self._guild_filter_terms)
         
-        for guild_id_str in self.settings.keys():
-            if "announcement_webhooks" not in self.settings[guild_id_str]:
-                self.settings[guild_id_str]["announcement_webhooks"] = {}
-        save_data(self.settings_file, self.settings)
+        migrated = False
+        for guild_id_str, raw_settings in list(self.settings.items()):
+            self.settings[guild_id_str], changed = GuildSettings.migrate(raw_settings, self.save_settings)
+            migrated = migrated or changed
+        if migrated:
+            save_data(self.settings_file, self.settings)
 
         if "status" not in self.status:
             self.status["status"] = "online"
@@ -575,111 +706,78 @@ class ServerAdminCog(commands.Cog, name="👑 Administrasi"):
                 except Exception:
                     pass
 
-        self.update_panel_task.start()
-        self.cleanup_spam_history.start()
+        self._panel_counters = {}
+        self._panel_messages = {}
+        self._panel_handles = {}
+        self._panel_tasks = set()
+        self.bot.add_view(self.RealtimeModPanelView(self))
+
+        self.bot.message_pipeline.set_settings_provider(self.get_guild_settings)
+        self.bot.message_pipeline.register("moderation", self.handle_message, PRIORITY_MODERATION)
         
     def cog_unload(self):
-        self.update_panel_task.cancel()
-        self.cleanup_spam_history.cancel()
-
-    def get_guild_settings(self, guild_id: int):
+        for handle in self._panel_handles.values():
+            handle.cancel()
+        self.bot.message_pipeline.unregister("moderation", self.handle_message)
+        self.bot.message_pipeline.set_settings_provider(None)
+        self.flush_pending_saves()
+        self.bot.word_filter.unregister_source("filters", self._guild_filter_terms)
+
+    def get_guild_settings(self, guild_id: int) -> GuildSettings:
         guild_id_str = str(guild_id)
-        if guild_id_str not in self.settings:
-            self.settings[guild_id_str] = {
-                "auto_role_id": None, 
-                "welcome_channel_id": None,
-                "welcome_message": "Selamat datang di **{guild_name}**, {user}! 🎉",
-                "welcome_embed_title": "SELAMAT DATANG!",
-                "welcome_sender_name": "Admin Server",
-                "welcome_banner_url": None, 
-                "log_channel_id": None, 
-                "reaction_roles": {},
-                "channel_rules": {},
-                "boost_channel_id": None,
-                "boost_message": "Terima kasih banyak, {user}, telah menjadi **Server Booster** kami di {guild_name}! Kami sangat menghargai dukunganmu! ❤️",
-                "boost_embed_title": "TERIMA KASIH SERVER BOOSTER!",
-                "boost_sender_name": "Tim Server",
-                "boost_image_url": None,
-                "mod_panel_message_id": None,
-                "mod_panel_channel_id": None,
-                "main_membership_role_id": None, 
-                "membership_roles": {}, 
-                "membership_invite_message": "🥺 Anda belum menjadi anggota channel YouTube. Silakan berlangganan untuk mendapatkan role eksklusif! [LINK MEMBERSHIP]", 
-                "membership_confirm_message": "🎉 Anda sudah menjadi anggota! Anda adalah anggota tier: **{tier_name}**.",
-                "verification_button_label": "Verifikasi Membership",
-                "spam_whitelist_roles": [],
-                "goodbye_message": "Selamat tinggal, **{user}**. Sampai jumpa lagi! 👋",
-                "panel_role_stats": []
-            }
-            save_data(self.settings_file, self.settings)
-        
-        if "goodbye_message" not in self.settings[guild_id_str]:
-            self.settings[guild_id_str]["goodbye_message"] = "Selamat tinggal, **{user}**. Sampai jumpa lagi! 👋"
-        if "welcome_embed_title" not in self.settings[guild_id_str]:
-            self.settings[guild_id_str]["welcome_embed_title"] = "SELAMAT DATANG!"
-        if "welcome_sender_name" not in self.settings[guild_id_str]:
-            self.settings[guild_id_str]["welcome_sender_name"] = "Admin Server"
-        if "welcome_banner_url" not in self.settings[guild_id_str]: 
-            self.settings[guild_id_str]["welcome_banner_url"] = None
-        if "channel_rules" not in self.settings[guild_id_str]:
-            self.settings[guild_id_str]["channel_rules"] = {}
-        if "boost_channel_id" not in self.settings[guild_id_str]:
-            self.settings[guild_id_str]["boost_channel_id"] = None
-        if "boost_message" not in self.settings[guild_id_str]:
-            self.settings[guild_id_str]["boost_message"] = "Terima kasih banyak, {user}, telah menjadi **Server Booster** kami di {guild_name}! Kami sangat menghargai dukunganmu! ❤️"
-        if "boost_embed_title" not in self.settings[guild_id_str]:
-            self.settings[guild_id_str]["boost_embed_title"] = "TERIMA KASIH SERVER BOOSTER!"
-        if "boost_sender_name" not in self.settings[guild_id_str]:
-            self.settings[guild_id_str]["boost_sender_name"] = "Tim Server"
-        if "boost_image_url" not in self.settings[guild_id_str]:
-            self.settings[guild_id_str]["boost_image_url"] = None
-        if "announcement_webhooks" not in self.settings[guild_id_str]:
-            self.settings[guild_id_str]["announcement_webhooks"] = {}
-        if "mod_panel_message_id" not in self.settings[guild_id_str]:
-            self.settings[guild_id_str]["mod_panel_message_id"] = None
-        if "mod_panel_channel_id" not in self.settings[guild_id_str]:
-            self.settings[guild_id_str]["mod_panel_channel_id"] = None
-        if "main_membership_role_id" not in self.settings[guild_id_str]: 
-            self.settings[guild_id_str]["main_membership_role_id"] = None
-        if "membership_roles" not in self.settings[guild_id_str]: 
-            self.settings[guild_id_str]["membership_roles"] = {}
-        if "membership_invite_message" not in self.settings[guild_id_str]: 
-            self.settings[guild_id_str]["membership_invite_message"] = "🥺 Anda belum menjadi anggota channel YouTube. Silakan berlangganan untuk mendapatkan role eksklusif! [LINK MEMBERSHIP]"
-        if "membership_confirm_message" not in self.settings[guild_id_str]: 
-            self.settings[guild_id_str]["membership_confirm_message"] = "🎉 Anda sudah menjadi anggota! Anda adalah anggota tier: **{tier_name}**."
-        if "verification_button_label" not in self.settings[guild_id_str]:
-            self.settings[guild_id_str]["verification_button_label"] = "Verifikasi Membership" 
-        if "spam_whitelist_roles" not in self.settings[guild_id_str]:
-            self.settings[guild_id_str]["spam_whitelist_roles"] = []
-        if "panel_role_stats" not in self.settings[guild_id_str]:
-            self.settings[guild_id_str]["panel_role_stats"] = []
-
-
-        save_data(self.settings_file, self.settings)
-        return self.settings[guild_id_str]
+        guild_settings = self.settings.get(guild_id_str)
+        if guild_settings is None:
+            guild_settings, _ = GuildSettings.migrate({}, self.save_settings)
+            self.settings[guild_id_str] = guild_settings
+        return guild_settings
         
     def get_channel_rules(self, guild_id: int, channel_id: int) -> dict:
-        guild_settings = self.get_guild_settings(guild_id)
+        channel_rules = self.get_guild_settings(guild_id)["channel_rules"]
         channel_id_str = str(channel_id)
-        if channel_id_str not in guild_settings["channel_rules"]:
-            guild_settings["channel_rules"][channel_id_str] = {
-                "disallow_bots": False, "disallow_media": False, "disallow_prefix": False,
-                "disallow_url": False, "auto_delete_seconds": 0
-            }
-            save_data(self.settings_file, self.settings)
-        return guild_settings["channel_rules"][channel_id_str]
+        if channel_id_str not in channel_rules:
+            channel_rules[channel_id_str] = dict(DEFAULT_CHANNEL_RULES)
+        return channel_rules[channel_id_str]
         
     def get_guild_filters(self, guild_id: int):
         guild_id_str = str(guild_id)
         if guild_id_str not in self.filters:
-            self.filters[guild_id_str] = { "bad_words": [], "link_patterns": [] }
-            save_data(self.filters_file, self.filters)
+            self.filters[guild_id_str] = copy.deepcopy(DEFAULT_GUILD_FILTERS)
         return self.filters[guild_id_str]
+
+    def _guild_filter_terms(self, guild_id):
+        guild_filters = self.filters.get(str(guild_id), {})
+        return {"bad_words": guild_filters.get("bad_words", []), "link_patterns": guild_filters.get("link_patterns", [])}
+
+    def _schedule_save(self, file_path: str, data: dict):
+        """Debounce: banyak perubahan dalam beberapa detik digabung jadi satu tulis di executor."""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            save_data(file_path, data)
+            return
+        if file_path in self._pending_saves:
+            return
+
+        async def _flush_later():
+            try:
+                await asyncio.sleep(SAVE_DEBOUNCE_SECONDS)
+            finally:
+                self._pending_saves.pop(file_path, None)
+            payload = json.dumps(data, indent=4)
+            await loop.run_in_executor(None, _write_text, file_path, payload)
+
+        self._pending_saves[file_path] = (loop.create_task(_flush_later()), data)
+
+    def flush_pending_saves(self):
+        for file_path, (task, data) in list(self._pending_saves.items()):
+            task.cancel()
+            save_data(file_path, data)
+        self._pending_saves.clear()
         
-    def save_settings(self): save_data(self.settings_file, self.settings)
-    def save_filters(self): save_data(self.filters_file, self.filters)
-    def save_warnings(self): save_data(self.warnings_file, self.warnings)
-    def save_status(self): save_data(self.status_file, self.status)
+    def save_settings(self): self._schedule_save(self.settings_file, self.settings)
+    def save_filters(self): self._schedule_save(self.filters_file, self.filters)
+    def save_warnings(self): self._schedule_save(self.warnings_file, self.warnings)
+    def save_status(self): self._schedule_save(self.status_file, self.status)
 
     def _create_embed(self, title: str = "", description: str = "", color: int = 0, author_name: str = "", author_icon_url: str = ""):
         embed = discord.Embed(title=title, description=description, color=color, timestamp=datetime.now(WIB))
@@ -689,18 +787,11 @@ class ServerAdminCog(commands.Cog, name="👑 Administrasi"):
         return embed
 
     async def log_action(self, guild: discord.Guild, title: str, fields: dict, color: int):
+        """Antrikan log ke channel log guild; pengirimannya dikumpulkan oleh `bot.mod_log`."""
         if not (log_channel_id := self.get_guild_settings(guild.id).get("log_channel_id")):
             return
         if (log_channel := guild.get_channel(log_channel_id)) and log_channel.permissions_for(guild.me).send_messages:
-            embed = self._create_embed(title=title, color=color, timestamp=datetime.now(WIB))
-            for name, value in fields.items():
-                embed.add_field(name=name, value=value, inline=False)
-            try:
-                await log_channel.send(embed=embed)
-            except discord.Forbidden:
-                pass
-        else:
-            pass
+            self.bot.mod_log.log(log_channel, title, fields, color)
 
     async def get_or_create_announcement_webhook(self, channel: discord.TextChannel, custom_name: str):
         guild_settings = self.get_guild_settings(channel.guild.id)
@@ -758,27 +849,6 @@ class ServerAdminCog(commands.Cog, name="👑 Administrasi"):
         
         return True, "Base Tier / Tier Role Belum Didaftarkan"
 
-    def detect_suspicious_links(self, content: str) -> bool:
-        suspicious_patterns = [
-            r'discord\.gift', r'discord\.com\/gifts', r'discordapp\.com\/gifts',
-            r'free-nitro', r'steam-community', r'steamcommunity\.com',
-            r'bit\.ly', r'tinyurl\.com', r'shorturl\.at', r'rb\.gy',
-            r'discord-nitro', r'claim-reward', r'free-gift'
-        ]
-        
-        content_lower = content.lower()
-        
-        for pattern in suspicious_patterns:
-            if re.search(pattern, content_lower):
-                return True
-        
-        urls = self.url_regex.findall(content)
-        for url in urls:
-            if any(suspicious in url.lower() for suspicious in ['discordgift', 'nitro-free', 'steamgift']):
-                return True
-    
-        return False
-
     def is_allowed_file_type(self, filename: str) -> bool:
         allowed_extensions = {
             '.jpg', '.jpeg', '.png', '.gif', '.webp', '.bmp',
@@ -791,18 +861,14 @@ class ServerAdminCog(commands.Cog, name="👑 Administrasi"):
         file_ext = os.path.splitext(filename.lower())[1]
         return file_ext in allowed_extensions
 
-    @tasks.loop(minutes=5)
-    async def cleanup_spam_history(self):
-        current_time = time.time()
-        
-        for user_id in list(self.cross_channel_spam_history.keys()):
-            self.cross_channel_spam_history[user_id] = [
-                entry for entry in self.cross_channel_spam_history[user_id]
-                if current_time - entry['timestamp'] <= 300
-            ]
-            
-            if not self.cross_channel_spam_history[user_id]:
-                del self.cross_channel_spam_history[user_id]
+    async def _delete_spam(self, guild, entries, reason):
+        """Hapus pesan spam hasil `spam_engine.take()` lewat bulk delete. False kalau ada yang gagal."""
+        deletions = []
+        for channel_id, message_id in entries:
+            channel = guild.get_channel(channel_id)
+            if channel and channel.permissions_for(guild.me).manage_messages:
+                deletions.append(self.bot.deleter.delete(channel, message_id, reason=reason))
+        return all(await asyncio.gather(*deletions))
 
     @commands.command(name="setmainmembershiprole", aliases=["smr"])
     @commands.has_permissions(manage_guild=True)
@@ -924,6 +990,8 @@ class ServerAdminCog(commands.Cog, name="👑 Administrasi"):
 
     @commands.Cog.listener()
     async def on_guild_update(self, before: discord.Guild, after: discord.Guild):
+        if before.name != after.name or before.icon != after.icon:
+            self.schedule_panel_update(after)
         if after.premium_subscription_count > before.premium_subscription_count:
             
             guild_settings = self.get_guild_settings(after.id)
@@ -982,6 +1050,7 @@ class ServerAdminCog(commands.Cog, name="👑 Administrasi"):
     async def on_member_remove(self, member: discord.Member):
         if not member.guild:
             return
+        self._track_member(member, -1)
         
         try:
             dm_title = f"👋 Sampai Jumpa, {member.display_name}!"
@@ -997,9 +1066,7 @@ class ServerAdminCog(commands.Cog, name="👑 Administrasi"):
                 description=dm_message,
                 color=self.color_info 
             )
-            await member.send(embed=dm_embed)
-        except discord.Forbidden:
-            pass
+            self.bot.outbox.send(member, embed=dm_embed)
         except Exception:
             pass
 
@@ -1052,8 +1119,6 @@ class ServerAdminCog(commands.Cog, name="👑 Administrasi"):
             log_fields,
             self.color_warning
         )
-
-        await self.update_panel(member.guild)
     
     @commands.Cog.listener()
     async def on_command_error(self, ctx: commands.Context, error: commands.CommandError):
@@ -1073,6 +1138,7 @@ class ServerAdminCog(commands.Cog, name="👑 Administrasi"):
 
     @commands.Cog.listener()
     async def on_member_join(self, member: discord.Member):
+        self._track_member(member, 1)
         guild_settings = self.get_guild_settings(member.guild.id)
         
         if (welcome_channel_id := guild_settings.get("welcome_channel_id")) and (channel := member.guild.get_channel(welcome_channel_id)):
@@ -1107,11 +1173,13 @@ class ServerAdminCog(commands.Cog, name="👑 Administrasi"):
                 await member.add_roles(role, reason="Auto Role")
             except discord.Forbidden:
                 pass
-    
-        await self.update_panel(member.guild)
 
     @commands.Cog.listener()
     async def on_member_update(self, before: discord.Member, after: discord.Member):
+        if before.roles != after.roles and (counters := self._panel_counters.get(after.guild.id)):
+            if counters.roles_changed(before, after):
+                self.schedule_panel_update(after.guild)
+
         if before.guild.id not in self.settings:
             return
 
@@ -1171,20 +1239,13 @@ class ServerAdminCog(commands.Cog, name="👑 Administrasi"):
             )
         
     
-    @commands.Cog.listener()
-    async def on_message(self, message: discord.Message):
-        if not message.guild or message.author.id == self.bot.user.id or message.author.bot: 
-            return
-
-        guild_settings = self.get_guild_settings(message.guild.id)
-        whitelist_roles = guild_settings.get("spam_whitelist_roles", [])
-        is_whitelisted = any(r.id in whitelist_roles for r in message.author.roles)
-        user_id_str = str(message.author.id)
+    async def handle_message(self, ctx):
+        """Handler pertama di pipeline pesan; True kalau pesan ditindak (dihapus / user di-timeout)."""
+        message = ctx.message
+        guild_settings = ctx.guild_settings
+        is_whitelisted = ctx.has_any_role(guild_settings.get("spam_whitelist_roles", []))
         current_time = time.time()
-        
-        message_content_lower = message.content.lower()
-
-        is_command = message.content.startswith(tuple(await self.bot.get_prefix(message)))
+        is_command = ctx.is_command
         
         if not message.author.guild_permissions.kick_members and not is_whitelisted and not is_command:
             if len(message.attachments) >= 3:
@@ -1197,48 +1258,28 @@ class ServerAdminCog(commands.Cog, name="👑 Administrasi"):
                         ),
                         delete_after=10
                     )
-                    return
+                    return True
                 except discord.Forbidden:
                     pass        
 
         if not message.author.guild_permissions.kick_members and not is_whitelisted and not is_command:
             
-            if user_id_str not in self.cross_channel_spam_history:
-                self.cross_channel_spam_history[user_id_str] = []
-            
-            self.cross_channel_spam_history[user_id_str].append({
-                'channel_id': message.channel.id,
-                'message_id': message.id,
-                'timestamp': current_time,
-                'content': message.content[:100]
-            })
-            
-            self.cross_channel_spam_history[user_id_str] = [
-                entry for entry in self.cross_channel_spam_history[user_id_str]
-                if current_time - entry['timestamp'] <= 30
-            ]
+            spam = self.bot.spam_engine
+            spam_key = spam.observe(message, current_time)
             
-            global_bucket = self.global_spam_cooldown.get_bucket(message)
-            global_retry_after = global_bucket.update_rate_limit()
+            dup_count, dup_seconds, dup_channels = CROSS_CHANNEL_SPAM
+            is_global_spam = spam.count(spam_key, GLOBAL_SPAM_LIMIT[1], SPAM_SCOPE, current_time) > GLOBAL_SPAM_LIMIT[0]
+            is_cross_channel_spam = (
+                spam.duplicates(spam_key, message.content, dup_seconds, SPAM_SCOPE, current_time) >= dup_count
+                and spam.channels(spam_key, dup_seconds, SPAM_SCOPE, current_time) >= dup_channels
+            )
             
-            if global_retry_after:
-                messages_to_delete = self.cross_channel_spam_history.pop(user_id_str, [])
-                
-                delete_tasks = []
-                for entry in messages_to_delete:
-                    try:
-                        channel = message.guild.get_channel(entry['channel_id'])
-                        if channel and channel.permissions_for(message.guild.me).manage_messages:
-                            tasks.append(channel.delete_messages([discord.Object(id=entry['message_id'])], reason="Global Cross-Channel Spam Detected"))
-                    except Exception:
-                        continue
+            if is_global_spam or is_cross_channel_spam:
+                messages_to_delete = spam.take(spam_key, dup_seconds, SPAM_SCOPE, current_time)
                 
-                if delete_tasks:
-                    try:
-                        await asyncio.gather(*delete_tasks, return_exceptions=True)
-                    except discord.Forbidden:
-                       await self.log_action(message.guild, "❌ PENGHAPUSAN SPAM LINTAS CHANNEL GAGAL", 
-                           {"Member": message.author.mention, "Channel Pemicu": message.channel.mention, "Error": "Gagal menghapus beberapa pesan (Forbidden/Izin)."}, self.color_error)
+                if not await self._delete_spam(message.guild, messages_to_delete, "Global Cross-Channel Spam Detected"):
+                    await self.log_action(message.guild, "❌ PENGHAPUSAN SPAM LINTAS CHANNEL GAGAL", 
+                        {"Member": message.author.mention, "Channel Pemicu": message.channel.mention, "Error": "Gagal menghapus beberapa pesan (Forbidden/Izin)."}, self.color_error)
 
                 if not message.author.is_timed_out():
                     duration = timedelta(minutes=30)
@@ -1248,7 +1289,7 @@ class ServerAdminCog(commands.Cog, name="👑 Administrasi"):
                         await message.author.timeout(duration, reason=reason)
                         
                         spam_count = len(messages_to_delete)
-                        channels_affected = len(set(entry['channel_id'] for entry in messages_to_delete))
+                        channels_affected = len(set(channel_id for channel_id, _ in messages_to_delete))
                         
                         await message.channel.send(
                             embed=self._create_embed(
@@ -1278,36 +1319,15 @@ class ServerAdminCog(commands.Cog, name="👑 Administrasi"):
                             self.color_error
                         )
                 
-                return
+                return True
             
-            self.spam_history.setdefault(user_id_str, []).append({
-                'channel_id': message.channel.id, 
-                'message_id': message.id, 
-                'timestamp': current_time
-            })
-
-            bucket = self.fast_spam_cooldown.get_bucket(message)
-            retry_after = bucket.update_rate_limit()
-
-            if retry_after:
-                
-                messages_to_delete = self.spam_history.pop(user_id_str, [])
+            if spam.count(spam_key, FAST_SPAM_LIMIT[1], SPAM_SCOPE, current_time) > FAST_SPAM_LIMIT[0]:
                 
-                tasks = []
-                for entry in messages_to_delete:
-                    try:
-                        channel = message.guild.get_channel(entry['channel_id'])
-                        if channel and channel.permissions_for(message.guild.me).manage_messages:
-                            tasks.append(channel.delete_messages([discord.Object(id=entry['message_id'])], reason="Global Spam Detected"))
-                    except Exception:
-                        pass
+                messages_to_delete = spam.take(spam_key, FAST_SPAM_LIMIT[1], SPAM_SCOPE, current_time)
                 
-                if tasks:
-                    try:
-                        await asyncio.gather(*tasks, return_exceptions=True)
-                    except discord.Forbidden:
-                       await self.log_action(message.guild, "❌ PENGHAPUSAN SPAM GAGAL", 
-                           {"Member": message.author.mention, "Channel Pemicu": message.channel.mention, "Error": "Gagal menghapus beberapa pesan (Forbidden/Izin)."}, self.color_error)
+                if not await self._delete_spam(message.guild, messages_to_delete, "Global Spam Detected"):
+                    await self.log_action(message.guild, "❌ PENGHAPUSAN SPAM GAGAL", 
+                        {"Member": message.author.mention, "Channel Pemicu": message.channel.mention, "Error": "Gagal menghapus beberapa pesan (Forbidden/Izin)."}, self.color_error)
 
 
                 if not message.author.is_timed_out():
@@ -1332,20 +1352,10 @@ class ServerAdminCog(commands.Cog, name="👑 Administrasi"):
                             {"Member": message.author.mention, "Channel Pemicu": message.channel.mention, "Aksi": "Gagal Timeout (Izin Kurang)"}, 
                             self.color_error)
                     
-                return
-            
-            cooldown_duration = self.fast_spam_cooldown._cooldown.per 
-            
-            if user_id_str in self.spam_history:
-                self.spam_history[user_id_str] = [
-                    entry for entry in self.spam_history[user_id_str] 
-                    if current_time - entry['timestamp'] <= cooldown_duration
-                ]
-                if not self.spam_history[user_id_str]:
-                    del self.spam_history[user_id_str]
+                return True
         
         if not message.author.guild_permissions.kick_members and not is_whitelisted:
-            if self.detect_suspicious_links(message.content):
+            if self.bot.url_analyzer.find_known_bad(message.content):
                 try:
                     await message.delete()
                     
@@ -1381,7 +1391,7 @@ class ServerAdminCog(commands.Cog, name="👑 Administrasi"):
                 except discord.Forbidden:
                     pass
                 
-                return
+                return True
 
         if message.attachments and not message.author.guild_permissions.kick_members and not is_whitelisted:
             total_size = sum(att.size for att in message.attachments)
@@ -1398,10 +1408,10 @@ class ServerAdminCog(commands.Cog, name="👑 Administrasi"):
                             ),
                             delete_after=10
                         )
-                        return
+                        return True
                     except discord.Forbidden:
                         pass
-                    return
+                    return True
 
             rapid_bucket = self.media_spam_rapid_cooldown.get_bucket(message)
             rapid_retry_after = rapid_bucket.update_rate_limit()
@@ -1424,7 +1434,7 @@ class ServerAdminCog(commands.Cog, name="👑 Administrasi"):
                             ),
                             delete_after=10
                         )
-                    return
+                    return True
                 except discord.Forbidden:
                     pass
 
@@ -1454,7 +1464,7 @@ class ServerAdminCog(commands.Cog, name="👑 Administrasi"):
                         },
                         self.color_warning
                     )
-                    return
+                    return True
                 except discord.Forbidden:
                     pass
 
@@ -1476,7 +1486,7 @@ class ServerAdminCog(commands.Cog, name="👑 Administrasi"):
                             ),
                             delete_after=10
                         )
-                    return
+                    return True
                 except discord.Forbidden:
                     pass
 
@@ -1490,7 +1500,7 @@ class ServerAdminCog(commands.Cog, name="👑 Administrasi"):
                         ),
                         delete_after=10
                     )
-                    return
+                    return True
                 except discord.Forbidden:
                     pass
 
@@ -1510,7 +1520,7 @@ class ServerAdminCog(commands.Cog, name="👑 Administrasi"):
                 await message.delete()
             except discord.Forbidden:
                 pass
-            return
+            return True
 
         if rules.get("disallow_media") and message.attachments:
             try:
@@ -1521,9 +1531,9 @@ class ServerAdminCog(commands.Cog, name="👑 Administrasi"):
                 embed=self._create_embed(description=f"🖼️ {message.author.mention}, media/files are not allowed in this channel.", color=self.color_warning),
                 delete_after=10
             )
-            return
+            return True
 
-        if rules.get("disallow_url") and self.url_regex.search(message.content):
+        if rules.get("disallow_url") and ctx.urls:
             try:
                 await message.delete()
             except discord.Forbidden:
@@ -1532,15 +1542,12 @@ class ServerAdminCog(commands.Cog, name="👑 Administrasi"):
                 embed=self._create_embed(description=f"🔗 {message.author.mention}, links are not allowed in this channel.", color=self.color_warning),
                 delete_after=10
             )
-            return
+            return True
 
         if rules.get("disallow_prefix") and message.content.startswith(self.common_prefixes):
-            command_prefixes = await self.bot.get_prefix(message)
-            if not isinstance(command_prefixes, list):
-                command_prefixes = [command_prefixes]
             is_actual_command = any(
                 message.content.startswith(prefix) and self.bot.get_command(message.content[len(prefix):].split(' ')[0])
-                for prefix in command_prefixes
+                for prefix in ctx.prefixes
             )
             if not is_actual_command:
                 try:
@@ -1551,20 +1558,18 @@ class ServerAdminCog(commands.Cog, name="👑 Administrasi"):
                     embed=self._create_embed(description=f"❗ {message.author.mention}, bot commands are not allowed in this channel.", color=self.color_warning),
                     delete_after=10
                 )
-                return
+                return True
 
-        guild_filters = self.get_guild_filters(message.guild.id)
-        for bad_word in guild_filters.get("bad_words", []):
-            if bad_word.lower() in message_content_lower:
-                try:
-                    await message.delete()
-                except discord.Forbidden:
-                    pass
-                await message.channel.send(
-                    embed=self._create_embed(description=f"🤬 Pesan dari {message.author.mention} dihapus karena mengandung kata kasar.", color=self.color_warning),
-                    delete_after=10
-                )
-                return
+        if "bad_words" in self.bot.word_filter.scan(message.guild.id, message.content):
+            try:
+                await message.delete()
+            except discord.Forbidden:
+                pass
+            await message.channel.send(
+                embed=self._create_embed(description=f"🤬 Pesan dari {message.author.mention} dihapus karena mengandung kata kasar.", color=self.color_warning),
+                delete_after=10
+            )
+            return True
         
     @commands.Cog.listener()
     async def on_raw_reaction_add(self, payload: discord.RawReactionActionEvent):
@@ -2370,7 +2375,7 @@ class ServerAdminCog(commands.Cog, name="👑 Administrasi"):
                 if item in filters[self.filter_type]:
                     await interaction.response.send_message(embed=self.cog._create_embed(description=f"❌ `{item}` sudah ada di filter.", color=self.cog.color_error), ephemeral=True)
                 else:
-                    filters[self.filter_type].append(item); self.cog.save_filters()
+                    filters[self.filter_type].append(item); self.cog.save_filters(); self.cog.bot.word_filter.invalidate(interaction.guild_id)
                     await interaction.response.send_message(embed=self.cog._create_embed(description=f"✅ `{item}` berhasil ditambahkan ke filter.", color=self.cog.color_success), ephemeral=True)
 
         class RemoveFilterModal(discord.ui.Modal, title="Hapus Filter"):
@@ -2381,7 +2386,7 @@ class ServerAdminCog(commands.Cog, name="👑 Administrasi"):
             async def on_submit(self, interaction: discord.Interaction):
                 filters = self.cog.get_guild_filters(interaction.guild_id); item = self.item_to_remove.value.lower().strip()
                 if item in filters[self.filter_type]:
-                    filters[self.filter_type].remove(item); self.cog.save_filters()
+                    filters[self.filter_type].remove(item); self.cog.save_filters(); self.cog.bot.word_filter.invalidate(interaction.guild_id)
                     await interaction.response.send_message(embed=self.cog._create_embed(description=f"✅ `{item}` berhasil dihapus dari filter.", color=self.cog.color_success), ephemeral=True)
                 else:
                     await interaction.response.send_message(embed=self.cog._create_embed(description=f"❌ `{item}` tidak ditemukan di filter.", color=self.cog.color_error), ephemeral=True)
@@ -2455,99 +2460,110 @@ class ServerAdminCog(commands.Cog, name="👑 Administrasi"):
         )
         view_instance.message = initial_msg
     
-    @tasks.loop(minutes=1)
-    async def update_panel_task(self):
-        for guild in self.bot.guilds:
-            await self.update_panel(guild)
-    
-    async def update_panel(self, guild: discord.Guild):
-        guild_settings = self.get_guild_settings(guild.id)
-        panel_id = guild_settings.get('mod_panel_message_id')
-        channel_id = guild_settings.get('mod_panel_channel_id')
-
-        if not panel_id or not channel_id:
+    def _has_panel(self, guild: discord.Guild) -> bool:
+        guild_settings = self.settings.get(str(guild.id))
+        return bool(guild_settings and guild_settings.get('mod_panel_channel_id'))
+
+    def _track_member(self, member: discord.Member, delta: int):
+        """Perbarui hitungan panel untuk member masuk (+1) / keluar (-1)."""
+        if (counters := self._panel_counters.get(member.guild.id)) is not None:
+            counters.member_changed(member, delta)
+        self.schedule_panel_update(member.guild)
+
+    def schedule_panel_update(self, guild: discord.Guild):
+        """Jadwalkan edit panel (debounced). Guild tanpa panel tidak memicu apa pun."""
+        if not self._has_panel(guild) or guild.id in self._panel_handles:
             return
+        loop = asyncio.get_running_loop()
+        self._panel_handles[guild.id] = loop.call_later(PANEL_UPDATE_DELAY, self._run_panel_update, guild.id)
 
-        channel = guild.get_channel(channel_id)
-        if not channel:
+    def _run_panel_update(self, guild_id: int):
+        self._panel_handles.pop(guild_id, None)
+        if not (guild := self.bot.get_guild(guild_id)):
             return
+        task = asyncio.get_running_loop().create_task(self.update_panel(guild))
+        self._panel_tasks.add(task)
+        task.add_done_callback(self._panel_tasks.discard)
 
-        try:
-            panel_message = await channel.fetch_message(panel_id)
-        except discord.NotFound:
-            guild_settings['mod_panel_message_id'] = None
-            self.save_settings()
-            
-            await self.create_mod_panel_if_needed(guild)
-            return
-        
-        except (discord.Forbidden, discord.errors.DiscordServerError, aiohttp.ClientError, asyncio.TimeoutError) as e:
-            return
-        except Exception as e:
-            return
+    def _render_panel(self, guild: discord.Guild):
+        """Embed panel + hash isinya (tanpa footer waktu), dari hitungan yang sudah ada di memori."""
+        guild_settings = self.get_guild_settings(guild.id)
+        role_ids = guild_settings.get("panel_role_stats", [])
+        counters = self._panel_counters.get(guild.id)
+        if counters is None:
+            counters = self._panel_counters[guild.id] = PanelCounters(guild, role_ids)
 
-        total_members = len(guild.members)
-        bot_members = sum(1 for member in guild.members if member.bot)
-        human_members = total_members - bot_members
-        total_channels = len(guild.channels)
-        
-        status_data = load_data(self.status_file)
-        current_status = status_data.get("status", "online")
-        
         embed = discord.Embed(
             title=f"{guild.name}",
             color=self.color_info
         )
         embed.set_author(name=f"Panel Kontrol Server & Statistik", icon_url=guild.icon.url if guild.icon else None)
-        
-        if current_status == "online":
+
+        if self.status.get("status", "online") == "online":
             status_emoji = '🟢'
             status_text = 'Online'
         else:
             status_emoji = '🔴'
             status_text = 'Offline'
-        
-        status_value = f"```\n{status_emoji} {status_text}\n```"
-        
-        players_value = f"```\n{total_members}\n```"
 
-        channels_value = f"```\n{total_channels}\n```"
+        embed.add_field(name="STATUS BOT", value=f"```\n{status_emoji} {status_text}\n```", inline=True)
+        embed.add_field(name="Jumlah Anggota", value=f"```\n{counters.total}\n```", inline=True)
+        embed.add_field(name="Jumlah Channel", value=f"```\n{len(guild.channels)}\n```", inline=True)
 
-        embed.add_field(name="STATUS BOT", value=status_value, inline=True)
-        embed.add_field(name="Jumlah Anggota", value=players_value, inline=True)
-        embed.add_field(name="Jumlah Channel", value=channels_value, inline=True)
-        
         embed.add_field(name="\u200B", value="\u200B", inline=False)
-        
-        human_value = f"```\n🧍 {human_members}\n```"
-        bot_value = f"```\n🤖 {bot_members}\n```"
-        
-        embed.add_field(name="Anggota Manusia", value=human_value, inline=True)
-        embed.add_field(name="Anggota Bot", value=bot_value, inline=True)
 
-        panel_roles = []
-        for role_id in guild_settings.get("panel_role_stats", []):
-            if role := guild.get_role(role_id):
-                panel_roles.append(role)
+        embed.add_field(name="Anggota Manusia", value=f"```\n🧍 {counters.total - counters.bots}\n```", inline=True)
+        embed.add_field(name="Anggota Bot", value=f"```\n🤖 {counters.bots}\n```", inline=True)
 
+        panel_roles = [role for role_id in role_ids if (role := guild.get_role(role_id))]
         if panel_roles:
             embed.add_field(name="\u200B", value="\u200B", inline=False)
             embed.add_field(name="STATISTIK MEMBERSHIP", value="\u200B", inline=False)
-            for i, role in enumerate(panel_roles):
-                member_count = len(role.members)
-                role_value = f"```\n{member_count}\n```"
-                embed.add_field(name=f"✨ {role.name}", value=role_value, inline=True)
-        
+            for role in panel_roles:
+                member_count = counters.roles.get(role.id, len(role.members))
+                embed.add_field(name=f"✨ {role.name}", value=f"```\n{member_count}\n```", inline=True)
+
+        digest = hashlib.blake2b(json.dumps(embed.to_dict(), sort_keys=True).encode("utf-8"), digest_size=12).hexdigest()
         embed.set_footer(text=f"Terakhir diperbarui: {datetime.now(WIB).strftime('%d/%m/%Y %H:%M:%S')} WIB")
-        
-        view = self.RealtimeModPanelView(self)
-        
+        return embed, digest
+
+    def _panel_message(self, guild: discord.Guild, channel_id: int, panel_id: int):
+        message = self._panel_messages.get(guild.id)
+        if message is None or message.id != panel_id or message.channel.id != channel_id:
+            channel = guild.get_channel(channel_id)
+            if not channel:
+                return None
+            message = self._panel_messages[guild.id] = channel.get_partial_message(panel_id)
+        return message
+
+    async def update_panel(self, guild: discord.Guild):
+        """Edit panel hanya kalau isinya berubah sejak edit terakhir."""
+        guild_settings = self.get_guild_settings(guild.id)
+        panel_id = guild_settings.get('mod_panel_message_id')
+        channel_id = guild_settings.get('mod_panel_channel_id')
+
+        if not panel_id or not channel_id:
+            return
+
+        embed, digest = self._render_panel(guild)
+        if digest == guild_settings.get('mod_panel_hash'):
+            return
+
+        panel_message = self._panel_message(guild, channel_id, panel_id)
+        if panel_message is None:
+            return
+
         try:
-            await panel_message.edit(embed=embed, view=view)
-        except discord.Forbidden:
-            pass
-        except Exception:
-            pass
+            await panel_message.edit(embed=embed, view=self.RealtimeModPanelView(self))
+        except discord.NotFound:
+            self._panel_messages.pop(guild.id, None)
+            guild_settings['mod_panel_message_id'] = None
+            guild_settings['mod_panel_hash'] = None
+            await self.create_mod_panel_if_needed(guild)
+            return
+        except (discord.HTTPException, aiohttp.ClientError, asyncio.TimeoutError):
+            return
+        guild_settings['mod_panel_hash'] = digest
 
     async def create_mod_panel_if_needed(self, guild: discord.Guild):
         guild_settings = self.get_guild_settings(guild.id)
@@ -2557,44 +2573,40 @@ class ServerAdminCog(commands.Cog, name="👑 Administrasi"):
         if not panel_id and channel_id:
             channel = guild.get_channel(channel_id)
             if channel and channel.permissions_for(guild.me).send_messages:
-                total_members = len(guild.members)
-                bot_members = sum(1 for member in guild.members if member.bot)
-                human_members = total_members - bot_members
-
-                status_data = load_data(self.status_file)
-                current_status = status_data.get("status", "online")
-                
-                embed = discord.Embed(color=self.color_info)
-                embed.set_author(name=guild.name, icon_url=guild.icon.url if guild.icon else None)
-                embed.description = "Panel Kontrol Server & Statistik"
-                
-                if current_status == "online":
-                    status_emoji = '🟢'
-                    status_text = 'Online'
-                else:
-                    status_emoji = '🔴'
-                    status_text = 'Offline/DnD'
-                
-                status_value = f"```\n{status_emoji} {status_text}\n```"
-                
-                players_value = f"```\n{total_members}\n```"
-                human_value = f"```\n🧍 {human_members}\n```"
-                bot_value = f"```\n🤖 {bot_members}\n```"
-                
-                embed.add_field(name="STATUS BOT", value=status_value, inline=True)
-                embed.add_field(name="Jumlah Anggota", value=players_value, inline=True)
-                embed.add_field(name="\u200B", value="\u200B", inline=False)
-                embed.add_field(name="Anggota Manusia", value=human_value, inline=True)
-                embed.add_field(name="Anggota Bot", value=bot_value, inline=True)
-                
-                embed.set_footer(text=f"Terakhir diperbarui: {datetime.now(WIB).strftime('%d/%m/%Y %H:%M:%S')} WIB")
-                
+                embed, digest = self._render_panel(guild)
                 view = self.RealtimeModPanelView(self)
                 message = await channel.send(embed=embed, view=view)
 
+                self._panel_messages[guild.id] = message
                 guild_settings['mod_panel_message_id'] = message.id
                 guild_settings['mod_panel_channel_id'] = channel.id
-                self.save_settings()
+                guild_settings['mod_panel_hash'] = digest
+
+    @commands.Cog.listener()
+    async def on_ready(self):
+        # Cocokkan panel dengan keadaan sekarang; yang isinya sama dengan edit terakhir tidak disentuh
+        for guild in self.bot.guilds:
+            self.schedule_panel_update(guild)
+
+    @commands.Cog.listener()
+    async def on_guild_channel_create(self, channel):
+        self.schedule_panel_update(channel.guild)
+
+    @commands.Cog.listener()
+    async def on_guild_channel_delete(self, channel):
+        if self._panel_messages.get(channel.guild.id) and self._panel_messages[channel.guild.id].channel.id == channel.id:
+            self._panel_messages.pop(channel.guild.id, None)
+        self.schedule_panel_update(channel.guild)
+
+    @commands.Cog.listener()
+    async def on_guild_role_update(self, before: discord.Role, after: discord.Role):
+        if before.name != after.name and after.id in self.get_guild_settings(after.guild.id).get("panel_role_stats", []):
+            self.schedule_panel_update(after.guild)
+
+    @commands.Cog.listener()
+    async def on_guild_role_delete(self, role: discord.Role):
+        if role.id in self.get_guild_settings(role.guild.id).get("panel_role_stats", []):
+            self.schedule_panel_update(role.guild)
 
     @commands.command(name="addpanelrole", aliases=["apr"])
     @commands.has_permissions(manage_guild=True)
@@ -2611,6 +2623,8 @@ class ServerAdminCog(commands.Cog, name="👑 Administrasi"):
         role_list.append(role.id)
         guild_settings["panel_role_stats"] = role_list
         self.save_settings()
+        self._panel_counters.pop(ctx.guild.id, None)
+        self.schedule_panel_update(ctx.guild)
         
         await ctx.send(embed=self._create_embed(description=f"✅ Role **{role.name}** berhasil ditambahkan ke statistik Mod Panel. (Total: {len(role_list)}/5)", color=self.color_success))
         await self.log_action(ctx.guild, "📊 Panel Role Ditambahkan", {"Role": role.mention, "Moderator": ctx.author.mention}, self.color_info)
@@ -2627,6 +2641,8 @@ class ServerAdminCog(commands.Cog, name="👑 Administrasi"):
         role_list.remove(role.id)
         guild_settings["panel_role_stats"] = role_list
         self.save_settings()
+        self._panel_counters.pop(ctx.guild.id, None)
+        self.schedule_panel_update(ctx.guild)
         
         await ctx.send(embed=self._create_embed(description=f"✅ Role **{role.name}** berhasil dihapus dari statistik Mod Panel. (Total: {len(role_list)}/5)", color=self.color_success))
         await self.log_action(ctx.guild, "📊 Panel Role Dihapus", {"Role": role.mention, "Moderator": ctx.author.mention}, self.color_info)
@@ -2654,46 +2670,14 @@ class ServerAdminCog(commands.Cog, name="👑 Administrasi"):
                     await ctx.send(embed=self._create_embed(description="❌ Bot tidak memiliki izin untuk mengakses channel panel lama. Silakan minta admin server untuk mengatasinya.", color=self.color_error), ephemeral=True)
                     return
 
-            total_members = len(ctx.guild.members)
-            bot_members = sum(1 for member in ctx.guild.members if member.bot)
-            human_members = total_members - bot_members
-            
-            status_data = load_data(self.status_file)
-            current_status = status_data.get("status", "online")
-            
-            embed = discord.Embed(color=self.color_info)
-            embed.set_author(name=ctx.guild.name, icon_url=ctx.guild.icon.url if ctx.guild.icon else None)
-            embed.description = "Panel Kontrol Server & Statistik"
-            
-            if current_status == "online":
-                status_emoji = '🟢'
-                status_text = 'Online'
-            else:
-                status_emoji = '🔴'
-                status_text = 'Offline/DnD'
-
-            status_value = f"```\n{status_emoji} {status_text}\n```"
-            
-            players_value = f"```\n{total_members}\n```"
-
-            embed.add_field(name="STATUS BOT", value=status_value, inline=True)
-            embed.add_field(name="Jumlah Anggota", value=players_value, inline=True)
-            
-            embed.add_field(name="\u200B", value="\u200B", inline=False)
-            
-            human_value = f"```\n🧍 {human_members}\n```"
-            bot_value = f"```\n🤖 {bot_members}\n```"
-            
-            embed.add_field(name="Anggota Manusia", value=human_value, inline=True)
-            embed.add_field(name="Anggota Bot", value=bot_value, inline=True)
-            
-            embed.set_footer(text=f"Terakhir diperbarui: {datetime.now(WIB).strftime('%d/%m/%Y %H:%M:%S')} WIB")
-            
+            embed, digest = self._render_panel(ctx.guild)
             view = self.RealtimeModPanelView(self)
             message = await ctx.send(embed=embed, view=view)
             
+            self._panel_messages[ctx.guild.id] = message
             guild_settings['mod_panel_message_id'] = message.id
             guild_settings['mod_panel_channel_id'] = ctx.channel.id
+            guild_settings['mod_panel_hash'] = digest
             self.save_settings()
 
         except discord.Forbidden:
@@ -2710,21 +2694,20 @@ class ServerAdminCog(commands.Cog, name="👑 Administrasi"):
         except (discord.Forbidden, discord.NotFound):
             pass
             
-        status_data = load_data(self.status_file)
-        current_status = status_data.get("status", "online")
-
-        if current_status == "online":
-            status_data["status"] = "dnd"
+        # Status disimpan dengan debounce, jadi yang di memori selalu paling baru
+        if self.status.get("status", "online") == "online":
             self.status["status"] = "dnd"
             self.save_status()
             await ctx.send(embed=self._create_embed(description="✅ Status panel bot berhasil diubah menjadi **Offline/Do Not Disturb**.", color=self.color_success), ephemeral=True)
         else:
-            status_data["status"] = "online"
             self.status["status"] = "online"
             self.save_status()
             await ctx.send(embed=self._create_embed(description="✅ Status panel bot berhasil diubah menjadi **Online**.", color=self.color_success), ephemeral=True)
         
+        # Status bot tampil di panel semua guild
         await self.update_panel(ctx.guild)
+        for guild in self.bot.guilds:
+            self.schedule_panel_update(guild)
     
     class ModPanelModal(discord.ui.Modal):
         def __init__(self, cog_instance, title):
@@ -3094,45 +3077,45 @@ class ServerAdminCog(commands.Cog, name="👑 Administrasi"):
             self.add_buttons()
 
         def add_buttons(self):
-            warn_button = discord.ui.Button(label="Warn", style=discord.ButtonStyle.primary, emoji="⚠️")
+            warn_button = discord.ui.Button(label="Warn", custom_id="modpanel:warn", style=discord.ButtonStyle.primary, emoji="⚠️")
             warn_button.callback = self.warn_user_callback
             self.add_item(warn_button)
 
-            timeout_button = discord.ui.Button(label="Timeout", style=discord.ButtonStyle.primary, emoji="⏳")
+            timeout_button = discord.ui.Button(label="Timeout", custom_id="modpanel:timeout", style=discord.ButtonStyle.primary, emoji="⏳")
             timeout_button.callback = self.timeout_user_callback
             self.add_item(timeout_button)
 
-            kick_button = discord.ui.Button(label="Kick", style=discord.ButtonStyle.secondary, emoji="👢")
+            kick_button = discord.ui.Button(label="Kick", custom_id="modpanel:kick", style=discord.ButtonStyle.secondary, emoji="👢")
             kick_button.callback = self.kick_user_callback
             self.add_item(kick_button)
 
-            ban_button = discord.ui.Button(label="Ban", style=discord.ButtonStyle.red, emoji="🔨")
+            ban_button = discord.ui.Button(label="Ban", custom_id="modpanel:ban", style=discord.ButtonStyle.red, emoji="🔨")
             ban_button.callback = self.ban_user_callback
             self.add_item(ban_button)
             
-            self.add_item(discord.ui.Button(label="\u200B", style=discord.ButtonStyle.gray, disabled=True, row=1))
+            self.add_item(discord.ui.Button(label="\u200B", style=discord.ButtonStyle.gray, disabled=True, custom_id="modpanel:spacer", row=1))
             
-            unwarn_button = discord.ui.Button(label="Unwarn", style=discord.ButtonStyle.green, emoji="✅", row=1)
+            unwarn_button = discord.ui.Button(label="Unwarn", custom_id="modpanel:unwarn", style=discord.ButtonStyle.green, emoji="✅", row=1)
             unwarn_button.callback = self.unwarn_user_callback
             self.add_item(unwarn_button)
 
-            remove_timeout_button = discord.ui.Button(label="Remove Timeout", style=discord.ButtonStyle.green, emoji="⏱️", row=1)
+            remove_timeout_button = discord.ui.Button(label="Remove Timeout", custom_id="modpanel:remove_timeout", style=discord.ButtonStyle.green, emoji="⏱️", row=1)
             remove_timeout_button.callback = self.remove_timeout_callback
             self.add_item(remove_timeout_button)
 
-            unban_button = discord.ui.Button(label="Unban", style=discord.ButtonStyle.green, emoji="🤝", row=1)
+            unban_button = discord.ui.Button(label="Unban", custom_id="modpanel:unban", style=discord.ButtonStyle.green, emoji="🤝", row=1)
             unban_button.callback = self.unban_user_callback
             self.add_item(unban_button)
 
-            clear_button = discord.ui.Button(label="Clear Messages", style=discord.ButtonStyle.danger, emoji="🗑️", row=2)
+            clear_button = discord.ui.Button(label="Clear Messages", custom_id="modpanel:clear", style=discord.ButtonStyle.danger, emoji="🗑️", row=2)
             clear_button.callback = self.clear_messages_callback
             self.add_item(clear_button)
 
-            self.lock_button = discord.ui.Button(label="Lock Channel", style=discord.ButtonStyle.red, emoji="🔒", row=2)
+            self.lock_button = discord.ui.Button(label="Lock Channel", custom_id="modpanel:lock", style=discord.ButtonStyle.red, emoji="🔒", row=2)
             self.lock_button.callback = self.lock_channel_callback
             self.add_item(self.lock_button)
 
-            self.unlock_button = discord.ui.Button(label="Unlock Channel", style=discord.ButtonStyle.green, emoji="🔓", row=2)
+            self.unlock_button = discord.ui.Button(label="Unlock Channel", custom_id="modpanel:unlock", style=discord.ButtonStyle.green, emoji="🔓", row=2)
             self.unlock_button.callback = self.unlock_channel_callback
             self.add_item(self.unlock_button)
 
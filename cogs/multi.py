@@ -1,53 +1,17 @@
 import discord
 from discord.ext import commands
-import os
-import json
-import time
-from pymongo import MongoClient
-
-MONGO_URI = os.getenv("MONGODB_URI")
-mongo_client = MongoClient(MONGO_URI) if MONGO_URI else None
-mongo_db = mongo_client["reSwan"] if mongo_client is not None else None
-mongo_col = mongo_db["bot_data"] if mongo_db is not None else None
+from utils.mongo import get_mongo
 
 ACTIVITY_FILE = 'data/bot_activity.json'
 
 def load_activity():
-    if mongo_col is not None:
-        try:
-            doc = mongo_col.find_one({"_id": ACTIVITY_FILE})
-            if doc and "data" in doc:
-                return doc["data"]
-        except Exception:
-            pass
-    if not os.path.exists(ACTIVITY_FILE):
-        os.makedirs(os.path.dirname(ACTIVITY_FILE), exist_ok=True)
-        default = {"type": "watching", "name": "Kestabilan Server"}
-        with open(ACTIVITY_FILE, 'w', encoding='utf-8') as f:
-            json.dump(default, f)
-        return default
-    try:
-        with open(ACTIVITY_FILE, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    except:
-        return {"type": "watching", "name": "Kestabilan Server"}
+    return get_mongo().load(ACTIVITY_FILE, {"type": "watching", "name": "Kestabilan Server"})
 
 def save_activity(data):
     try:
-        os.makedirs(os.path.dirname(ACTIVITY_FILE), exist_ok=True)
-        with open(ACTIVITY_FILE, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=4)
+        get_mongo().save(ACTIVITY_FILE, data)
     except Exception:
         pass
-    if mongo_col is not None:
-        try:
-            mongo_col.update_one(
-                {"_id": ACTIVITY_FILE},
-                {"$set": {"data": data, "updated_at": time.time()}},
-                upsert=True
-            )
-        except Exception:
-            pass
 
 class CustomActModal(discord.ui.Modal, title="Set Activity Manual"):
     act_name = discord.ui.TextInput(label="Nama Activity", placeholder="Ketik teks activity...", max_length=100)
@@ -159,4 +123,5 @@ class BotActivity(commands.Cog, name="Bot Activity Manager"):
         await ctx.send(embed=embed, view=ActView(self))
 
 async def setup(bot):
+    await get_mongo().preload([ACTIVITY_FILE])
     await bot.add_cog(BotActivity(bot))
@@ -17,6 +17,8 @@ import subprocess
 import sys
 import traceback
 
+from utils.trackcache import get_track_resolver
+
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 log = logging.getLogger(__name__)
 
@@ -168,11 +170,15 @@ class YTDLSource(discord.PCMVolumeTransformer):
 
     @classmethod
     async def from_url(cls, url, *, loop=None, stream=True):
-        loop = loop or asyncio.get_event_loop()
-        data = await loop.run_in_executor(None, lambda: ytdl.extract_info(url, download=not stream))
-        if 'entries' in data:
-            data = data['entries'][0]
-        filename = data['url'] if stream else ytdl.prepare_filename(data)
+        if stream:
+            data = await get_track_resolver().stream(url, ytdl)
+            filename = data['url']
+        else:
+            loop = loop or asyncio.get_event_loop()
+            data = await loop.run_in_executor(None, lambda: ytdl.extract_info(url, download=True))
+            if 'entries' in data:
+                data = data['entries'][0]
+            filename = ytdl.prepare_filename(data)
         
         source = discord.FFmpegPCMAudio(
             filename,
@@ -1129,17 +1135,8 @@ class Music(commands.Cog):
 
     async def get_song_info_from_url(self, url):
         try:
-            info = await asyncio.to_thread(lambda: ytdl.extract_info(url, download=False, process=False))
-            title = info.get('title', url)
-            artist = info.get('artist') or info.get('uploader', 'Unknown Artist')
-            if "Vevo" in artist or "Official" in artist or "Topic" in artist or "Channel" in artist:
-                if ' - ' in title:
-                    parts = title.split(' - ')
-                    if len(parts) > 1:
-                        potential_artist = parts[-1].strip()
-                        if len(potential_artist) < 30 and "channel" not in potential_artist.lower() and "topic" not in potential_artist.lower():
-                            artist = potential_artist
-            return {'title': title, 'artist': artist, 'webpage_url': info.get('webpage_url', url)}
+            info = await get_track_resolver().info(url, ytdl)
+            return {'title': info.get('title') or url, 'artist': info['artist'], 'webpage_url': info.get('webpage_url') or url}
         except Exception as e:
             return {'title': url, 'artist': 'Unknown Artist', 'webpage_url': url}
 
@@ -1266,12 +1263,12 @@ class Music(commands.Cog):
         
         url = queue.pop(0)
         try:
+            # Stream dulu: metadata ikut ter-cache, jadi info lagu tidak perlu ekstraksi kedua
+            source = await YTDLSource.from_url(url, loop=self.bot.loop, stream=True)
             song_info_from_ytdl = await self.get_song_info_from_url(url)
             self.add_song_to_history(ctx.author.id, song_info_from_ytdl)
             song_info_from_ytdl['requester'] = ctx.author.mention
             
-            source = await YTDLSource.from_url(url, loop=self.bot.loop, stream=True)
-            
             if not ctx.voice_client or not ctx.voice_client.is_connected():
                 await ctx.send("Bot tidak terhubung ke voice channel. Silakan hubungkan terlebih dahulu.", ephemeral=True)
                 return
@@ -11,8 +11,9 @@ import uuid
 import aiohttp
 import datetime
 from functools import partial
-import google.generativeai as genai
-from google.api_core import exceptions as google_exceptions
+from utils.llm import get_llm, PRIORITY_BACKGROUND
+from utils.trackcache import get_track_resolver
+from utils.msgpipeline import PRIORITY_DEFAULT
 
 from dotenv import load_dotenv 
 import base64
@@ -20,42 +21,12 @@ import tempfile
 
 load_dotenv()
 
-API_KEYS = []
-if os.getenv("GOOGLE_API_KEY"):
-    API_KEYS.append(os.getenv("GOOGLE_API_KEY"))
-
-key_index = 2
-while True:
-    extra_key = os.getenv(f"GOOGLE_API_KEY_{key_index}")
-    if extra_key:
-        API_KEYS.append(extra_key)
-        key_index += 1
-    else:
-        break
-
-current_key_idx = 0
-
-def configure_genai():
-    global current_key_idx
-    if API_KEYS:
-        genai.configure(api_key=API_KEYS[current_key_idx])
-
-def rotate_api_key():
-    global current_key_idx
-    if len(API_KEYS) > 1:
-        current_key_idx = (current_key_idx + 1) % len(API_KEYS)
-        configure_genai()
-        return True
-    return False
-
-configure_genai()
-
 def _get_youtube_video_id(url):
     youtube_regex = r'(?:https?:\/\/)?(?:[a-zA-Z0-9-]+\.)?(?:youtube(?:-nocookie)?\.com\/(?:[^\/\n\s]+\/\S+\/|(?:v|e(?:mbed)?)\/|.*[?&]v=|watch\?.*&v=|live\/|shorts\/)|youtu\.be\/)([a-zA-Z0-9_-]{11})'
     match = re.search(youtube_regex, url)
     return match.group(1) if match else None
 
-def _extract_youtube_info(url, cookiefile_path=None):
+async def _extract_youtube_info(url, cookiefile_path=None):
     ydl_opts = {
         'quiet': True,
         'skip_download': True,
@@ -69,26 +40,29 @@ def _extract_youtube_info(url, cookiefile_path=None):
         ydl_opts['cookiefile'] = cookiefile_path
     
     try:
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            info = ydl.extract_info(url, download=False)
-            title = info.get('title')
-            description = info.get('description', '')
-            video_url = info.get('webpage_url', url)
-            thumbnail_url = None
-            
-            thumbnails = info.get('thumbnails', [])
-            priority_ids = ['maxres', 'standard', 'high']
-            for id_ in priority_ids:
-                for t in thumbnails:
-                    if t.get('id') == id_:
-                        thumbnail_url = t.get('url')
-                        break
-                if thumbnail_url: break
-            if not thumbnail_url and thumbnails: 
-                thumbnail_url = thumbnails[-1].get('url')
-
-            return title, description, thumbnail_url, video_url
-            
+        resolver = get_track_resolver()
+        info = resolver.peek(url)
+        if info is None:
+            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+                info = await resolver.info(url, ydl)
+        title = info.get('title')
+        description = info.get('description') or ''
+        video_url = info.get('webpage_url') or url
+        thumbnail_url = None
+        
+        thumbnails = info.get('thumbnails') or []
+        priority_ids = ['maxres', 'standard', 'high']
+        for id_ in priority_ids:
+            for t in thumbnails:
+                if t.get('id') == id_:
+                    thumbnail_url = t.get('url')
+                    break
+            if thumbnail_url: break
+        if not thumbnail_url and thumbnails: 
+            thumbnail_url = thumbnails[-1].get('url')
+
+        return title, description, thumbnail_url, video_url
+        
     except Exception:
         video_id = _get_youtube_video_id(url)
         if video_id:
@@ -465,9 +439,11 @@ class Notif(commands.Cog, name="🔔 Notification"):
         self.default_messages = self._get_default_messages() 
         self.config = self._load_config()
         self.daily_reset_task.start()
+        self.bot.message_pipeline.register("notif", self.handle_message, PRIORITY_DEFAULT, bots=True)
 
     def cog_unload(self):
         self.daily_reset_task.cancel()
+        self.bot.message_pipeline.unregister("notif", self.handle_message)
 
     async def _extract_url_from_message(self, message):
         markdown_url_pattern = r'\[.*?\]\((https?://[^\)]+)\)'
@@ -802,31 +778,18 @@ class Notif(commands.Cog, name="🔔 Notification"):
         models_to_try = ['gemini-2.5-flash', 'gemini-3-flash-preview', 'gemini-2.5-flash-lite']
         
         for model_name in models_to_try:
-            attempts = max(1, len(API_KEYS))
-            for _ in range(attempts):
-                try:
-                    model = genai.GenerativeModel(model_name)
-                    response = await model.generate_content_async(prompt)
-                    if response.text:
-                        return response.text.strip().replace('"', '')
-                except google_exceptions.ResourceExhausted:
-                    if rotate_api_key():
-                        await asyncio.sleep(1)
-                        continue
-                    else:
-                        break 
-                except Exception as e:
-                    print(f"Error AI Notif ({model_name}): {e}")
-                    break 
+            try:
+                response = await get_llm().generate(model_name, prompt, priority=PRIORITY_BACKGROUND)
+                if response.text:
+                    return response.text.strip().replace('"', '')
+            except Exception as e:
+                print(f"Error AI Notif ({model_name}): {e}")
                     
         return fallback_text
 
 
-    @commands.Cog.listener()
-    async def on_message(self, message):
-        if message.author.id == self.bot.user.id or not message.guild:
-            return
-        
+    async def handle_message(self, ctx):
+        message = ctx.message
         paths_to_send = [data for data in self.config["notification_paths"].values() if data["source_id"] == message.channel.id]
         if not paths_to_send:
             return
@@ -869,7 +832,6 @@ class Notif(commands.Cog, name="🔔 Notification"):
         youtube_title, youtube_description, youtube_thumbnail, video_url = None, None, None, link_for_send
         
         if needs_yt_dlp and link_type in ["live", "upload", "premier"]: 
-            loop = self.bot.loop
             cookie_path = None
             temp_file_name = None 
             cookies_base64 = os.getenv("COOKIES_BASE64")
@@ -885,13 +847,9 @@ class Notif(commands.Cog, name="🔔 Notification"):
                     print(f"Error memproses Base64 cookies: {e}")
             
             try:
-                youtube_title, youtube_description, youtube_thumbnail, extracted_url = await loop.run_in_executor(
-                    None, 
-                    functools.partial(
-                        _extract_youtube_info, 
-                        link_for_send, 
-                        cookiefile_path=cookie_path
-                    )
+                youtube_title, youtube_description, youtube_thumbnail, extracted_url = await _extract_youtube_info(
+                    link_for_send,
+                    cookiefile_path=cookie_path
                 )
                 if extracted_url and extracted_url != link_for_send:
                     video_url = extracted_url
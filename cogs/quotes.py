@@ -178,12 +178,12 @@ class Quotes(commands.Cog):
 
     async def give_reward(self, server_id, user_id, exp, rswn):
         try:
-            with open(self.level_file_path, 'r', encoding='utf-8') as f:
-                level_data = json.load(f)
+            store = self.bot.store
+            level_data = store.get(self.level_file_path)
             
-            server_data = level_data.get(str(server_id), {})
-            user_levels = server_data.get(user_id, {'level': 1, 'exp': 0})
-            user_levels['exp'] += exp
+            server_data = level_data.setdefault(str(server_id), {})
+            user_levels = server_data.setdefault(user_id, {'level': 1, 'exp': 0})
+            self.bot.ledger.record(user_id, server_id, rswn=rswn, exp=exp, reason="quote")
 
             if user_levels['exp'] >= 10000:
                 user_levels['level'] += 1
@@ -192,20 +192,7 @@ class Quotes(commands.Cog):
             if str(server_id) not in level_data:
                 level_data[str(server_id)] = {}
             level_data[str(server_id)][user_id] = user_levels
-
-            with open(self.level_file_path, 'w', encoding='utf-8') as f:
-                json.dump(level_data, f, indent=4)
-
-            with open(self.bank_file_path, 'r', encoding='utf-8') as f:
-                bank_data = json.load(f)
-            
-            if user_id in bank_data:
-                bank_data[user_id]['balance'] += rswn
-            else:
-                bank_data[user_id] = {'balance': rswn, 'debt': 0}
-
-            with open(self.bank_file_path, 'w', encoding='utf-8') as f:
-                json.dump(bank_data, f, indent=4)
+            store.mark_dirty(self.level_file_path, str(server_id))
 
             logging.info(f"User {user_id} di server {server_id} diberi hadiah: {exp} EXP dan {rswn} RSWN.")
         except Exception as e:
@@ -1,5 +1,5 @@
 import discord
-from discord.ext import commands, tasks
+from discord.ext import commands
 import json
 import uuid
 import asyncio
@@ -8,11 +8,13 @@ from datetime import datetime, timedelta
 import logging
 import pytz
 import re
-import google.generativeai as genai
+from utils.llm import get_llm
 
 logging.basicConfig(level=logging.INFO, format='[%(asctime)s] %(levelname)s: %(message)s', datefmt='%Y-%m-%d %H:%M:%S')
+log = logging.getLogger(__name__)
 
-genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
+ANNOUNCE_TIMER_KIND = "broadcast.announce"
+DESTRUCT_TIMER_KIND = "broadcast.destruct"
 
 def truncate_text(text, limit=1000):
     text_str = str(text) if text else "Belum diatur"
@@ -119,9 +121,8 @@ class AIWriterModal(discord.ui.Modal, title='AI Auto-Writer'):
     async def on_submit(self, interaction: discord.Interaction):
         await interaction.response.defer()
         try:
-            model = genai.GenerativeModel('gemini-2.5-flash')
             prompt = f"Buatkan pengumuman Discord: {self.prompt_input.value}. Balas HANYA dengan JSON murni tanpa format markdown: {{\"title\": \"Judul\", \"desc\": \"Deskripsi embed panjang\", \"content\": \"Teks biasa opsional\", \"color\": \"#HexColorTerkaitTema\"}}"
-            res = await model.generate_content_async(prompt)
+            res = await get_llm().generate('gemini-2.5-flash', prompt)
             clean_json = res.text.replace('```json', '').replace('```', '').strip()
             data = json.loads(clean_json)
             self.config.update(data)
@@ -639,6 +640,7 @@ class ScheduleConfigView(discord.ui.View):
         job_id = str(uuid.uuid4())
         scheduled_announcements[job_id] = self.config
         self.bot.get_cog('RTMBroadcast').save_scheduled_announcements(scheduled_announcements)
+        self.bot.get_cog('RTMBroadcast').arm_announcement(job_id, self.config)
         
         dt_wib = datetime.fromisoformat(self.config['scheduled_time']).astimezone(pytz.timezone('Asia/Jakarta'))
         await interaction.followup.send(f"Pengumuman dijadwalkan ke {len(self.config['channels'])} kanal pada **{dt_wib.strftime('%d %B %Y pukul %H:%M WIB')}**.", ephemeral=True)
@@ -765,14 +767,15 @@ class RTMBroadcast(commands.Cog):
         self.destruct_file = os.path.join(self.data_dir, 'broadcast_destructs.json')
         self.wib_timezone = pytz.timezone('Asia/Jakarta')
         
-        self.loop_destruct.start()
-        self.loop_sch.start()
+        self.bot.timers.register(ANNOUNCE_TIMER_KIND, self._run_announcement)
+        self.bot.timers.register(DESTRUCT_TIMER_KIND, self._run_destruct)
+        self._sync_timers()
         self.single_role_file = os.path.join(self.data_dir, 'single_role_messages.json')
         self.single_role_messages = self.load_single_role_messages()
 
     def cog_unload(self):
-        self.loop_destruct.cancel()
-        self.loop_sch.cancel()
+        self.bot.timers.unregister(ANNOUNCE_TIMER_KIND, self._run_announcement)
+        self.bot.timers.unregister(DESTRUCT_TIMER_KIND, self._run_destruct)
 
     @commands.Cog.listener()
     async def on_ready(self):
@@ -801,10 +804,10 @@ class RTMBroadcast(commands.Cog):
         with open(path, 'w', encoding='utf-8') as f: json.dump(data, f, indent=4)
 
     def register_destruct(self, g_id, c_id, m_id, mins):
-        data = self.load_json(self.destruct_file)
-        dt = (datetime.utcnow() + timedelta(minutes=mins)).isoformat()
-        data[str(m_id)] = {'g': g_id, 'c': c_id, 'time': dt}
-        self.save_json(self.destruct_file, data)
+        self.bot.timers.schedule(
+            f"{DESTRUCT_TIMER_KIND}:{m_id}", DESTRUCT_TIMER_KIND,
+            datetime.utcnow() + timedelta(minutes=mins), {'c': c_id, 'm': str(m_id)}
+        )
 
     def build_payload(self, config, bot):
         embed = None
@@ -830,59 +833,67 @@ class RTMBroadcast(commands.Cog):
         if view: payload['view'] = view
         return payload, view
 
-    @tasks.loop(minutes=1)
-    async def loop_destruct(self):
-        data = self.load_json(self.destruct_file)
-        now = datetime.utcnow()
-        to_del = []
-        for m_id, info in data.items():
-            if now >= datetime.fromisoformat(info['time']):
-                try:
-                    ch = self.bot.get_channel(info['c']) or await self.bot.fetch_channel(info['c'])
-                    msg = await ch.fetch_message(int(m_id))
-                    await msg.delete()
-                except: pass
-                to_del.append(m_id)
-        if to_del:
-            for d in to_del: del data[d]
-            self.save_json(self.destruct_file, data)
-
-    @tasks.loop(minutes=1)
-    async def loop_sch(self):
-        schedules = self.load_scheduled_announcements()
-        now_wib = datetime.now(self.wib_timezone)
-        tasks_to_remove = []
+    async def _run_destruct(self, timer_id, payload):
+        await self.bot.wait_until_ready()
+        try: await self.bot.deleter.delete(int(payload['c']), payload['m'])
+        except: pass
 
-        for job_id, job_data in list(schedules.items()):
-            try:
-                sch_wib = datetime.fromisoformat(job_data['scheduled_time']).astimezone(self.wib_timezone)
-                if now_wib >= sch_wib:
-                    payload, _ = self.build_payload(job_data, self.bot)
-                    
-                    for cid in job_data.get('channels', []):
-                        try:
-                            ch = self.bot.get_channel(int(cid)) or await self.bot.fetch_channel(int(cid))
-                            if not ch: continue
-                            webhook = discord.utils.get(await ch.webhooks(), name="RTMBroadcast") or await ch.create_webhook(name="RTMBroadcast")
-                            sent = await webhook.send(wait=True, **payload)
-                            if sent and job_data.get('destruct'): self.register_destruct(ch.guild.id, ch.id, sent.id, job_data['destruct'])
-                        except: pass
-                    
-                    rec = job_data.get('recurring')
-                    if rec == 'daily': job_data['scheduled_time'] = (sch_wib + timedelta(days=1)).isoformat()
-                    elif rec == 'weekly': job_data['scheduled_time'] = (sch_wib + timedelta(days=7)).isoformat()
-                    else: tasks_to_remove.append(job_id)
-            except:
-                tasks_to_remove.append(job_id)
+    def arm_announcement(self, job_id, job_data):
+        rec = job_data.get('recurring')
+        self.bot.timers.schedule(
+            f"{ANNOUNCE_TIMER_KIND}:{job_id}", ANNOUNCE_TIMER_KIND,
+            datetime.fromisoformat(job_data['scheduled_time']), {'id': job_id},
+            repeat=rec if rec in ('daily', 'weekly') else None
+        )
 
-        if tasks_to_remove or any(c.get('recurring') in ['daily','weekly'] for c in schedules.values()):
-            for d in tasks_to_remove: schedules.pop(d, None)
+    def _sync_timers(self):
+        """Pindahkan jadwal & auto-delete yang tersimpan di file lama ke timer service."""
+        schedules = self.load_scheduled_announcements()
+        broken = []
+        for job_id, job_data in schedules.items():
+            if self.bot.timers.due_at(f"{ANNOUNCE_TIMER_KIND}:{job_id}") is None:
+                try: self.arm_announcement(job_id, job_data)
+                except Exception: broken.append(job_id)
+        if broken:
+            for job_id in broken: schedules.pop(job_id, None)
             self.save_scheduled_announcements(schedules)
 
-    @loop_destruct.before_loop
-    @loop_sch.before_loop
-    async def before_loops(self):
+        legacy_destructs = self.load_json(self.destruct_file)
+        if legacy_destructs:
+            for m_id, info in legacy_destructs.items():
+                try: self.bot.timers.schedule(f"{DESTRUCT_TIMER_KIND}:{m_id}", DESTRUCT_TIMER_KIND, datetime.fromisoformat(info['time']), {'c': info['c'], 'm': m_id})
+                except Exception: pass
+            self.save_json(self.destruct_file, {})
+
+    async def _run_announcement(self, timer_id, payload):
         await self.bot.wait_until_ready()
+        job_id = payload.get('id')
+        schedules = self.load_scheduled_announcements()
+        job_data = schedules.get(job_id)
+        if job_data is None:
+            self.bot.timers.cancel(timer_id)
+            return
+
+        try:
+            message_payload, _ = self.build_payload(job_data, self.bot)
+            for cid in job_data.get('channels', []):
+                try:
+                    ch = self.bot.get_channel(int(cid)) or await self.bot.fetch_channel(int(cid))
+                    if not ch: continue
+                    webhook = discord.utils.get(await ch.webhooks(), name="RTMBroadcast") or await ch.create_webhook(name="RTMBroadcast")
+                    sent = await webhook.send(wait=True, **message_payload)
+                    if sent and job_data.get('destruct'): self.register_destruct(ch.guild.id, ch.id, sent.id, job_data['destruct'])
+                except: pass
+        except Exception as e:
+            log.error(f"Gagal mengirim pengumuman terjadwal {job_id}: {e}")
+
+        # Timer sudah menjadwalkan ulang job berulang; file cukup mengikuti jadwal berikutnya
+        next_due = self.bot.timers.due_at(timer_id)
+        if next_due is not None:
+            job_data['scheduled_time'] = datetime.fromtimestamp(next_due, self.wib_timezone).isoformat()
+        else:
+            schedules.pop(job_id, None)
+        self.save_scheduled_announcements(schedules)
 
     def load_scheduled_announcements(self):
         if not os.path.exists(self.scheduled_announcements_file): return {}
@@ -1242,7 +1253,7 @@ class RTMBroadcast(commands.Cog):
             txt = interaction.message.content or ""
             if interaction.message.embeds: txt += "\n" + (interaction.message.embeds[0].description or "")
             try:
-                res = await genai.GenerativeModel('gemini-2.5-flash').generate_content_async(f"Terjemahkan ke {value}:\n{txt}")
+                res = await get_llm().generate('gemini-2.5-flash', f"Terjemahkan ke {value}:\n{txt}")
                 await interaction.followup.send(res.text, ephemeral=True)
             except Exception as e: await interaction.followup.send(f"Error AI: {e}", ephemeral=True)
 
@@ -10,11 +10,25 @@ import io
 import asyncio
 import json
 from io import BytesIO
-from pymongo import MongoClient, errors as pymongo_errors
+from pymongo import errors as pymongo_errors
 from dotenv import load_dotenv
 from datetime import datetime, timezone 
 import zipfile
 import time 
+from utils.datastore import get_store
+from utils.ledger import get_ledger
+from utils.mongo import get_mongo
+from utils.wordfilter import get_word_filter
+from utils.urlcheck import get_url_analyzer
+from utils.llm import get_llm
+from utils.imagepipe import get_image_pipeline
+from utils.timers import get_timers
+from utils.rankcard import get_rank_renderer
+from utils.outbox import get_outbox
+from utils.spamwindow import get_spam_engine
+from utils.bulkdelete import get_delete_queue
+from utils.msgpipeline import get_message_pipeline
+from utils.modlog import get_mod_log
 
 base_dir = os.path.dirname(os.path.abspath(sys.argv[0]))
 
@@ -92,9 +106,8 @@ if not mongo_uri:
     log.critical("Environment variable MONGODB_URI not found. Bot cannot connect to MongoDB.")
     raise ValueError("Environment variable MONGODB_URI not found. Please set it up.")
 
-client = None
-db = None
-collection = None
+mongo = None
+BACKUP_COLLECTION = "Data collection"
 
 MAX_RETRIES = 3
 RETRY_DELAY = 5 
@@ -102,10 +115,8 @@ RETRY_DELAY = 5
 for attempt in range(MAX_RETRIES):
     try:
         log.info(f"Attempting to connect to MongoDB... (Percobaan {attempt + 1}/{MAX_RETRIES})")
-        client = MongoClient(mongo_uri, serverSelectionTimeoutMS=5000)
-        db = client["reSwan"]
-        collection = db["Data collection"]
-        client.admin.command('ping') 
+        mongo = get_mongo()
+        mongo.client.admin.command('ping') 
         log.info("✅ Successfully connected to MongoDB!")
         break
     except pymongo_errors.ServerSelectionTimeoutError as err:
@@ -257,7 +268,58 @@ intents.guilds = True
 intents.members = True
 intents.voice_states = True
 
-bot = commands.Bot(command_prefix=("!", "?"), intents=intents, help_command=None)
+class ReSwanBot(commands.Bot):
+    async def close(self):
+        # Cog dibongkar dulu: cog_unload masih menulis ke store/ledger/mongo (menit voice, verdict URL, dll.)
+        for extension in list(self.extensions):
+            try:
+                await self.unload_extension(extension)
+            except Exception as e:
+                log.error(f"❌ Gagal unload {extension} saat shutdown: {e}", exc_info=True)
+        for cog_name in list(self.cogs):
+            try:
+                await self.remove_cog(cog_name)
+            except Exception as e:
+                log.error(f"❌ Gagal melepas cog {cog_name} saat shutdown: {e}", exc_info=True)
+        timers = getattr(self, "timers", None)
+        if timers:
+            timers.stop()
+        outbox = getattr(self, "outbox", None)
+        if outbox:
+            try:
+                await outbox.close()
+            except Exception as e:
+                log.error(f"❌ Gagal mengosongkan antrian DM saat shutdown: {e}", exc_info=True)
+        mod_log = getattr(self, "mod_log", None)
+        if mod_log:
+            try:
+                await mod_log.close()
+            except Exception as e:
+                log.error(f"❌ Gagal mengirim sisa log moderasi saat shutdown: {e}", exc_info=True)
+        deleter = getattr(self, "deleter", None)
+        if deleter:
+            try:
+                await deleter.flush()
+            except Exception as e:
+                log.error(f"❌ Gagal mengosongkan antrian hapus pesan saat shutdown: {e}", exc_info=True)
+        store = getattr(self, "store", None)
+        if store:
+            try:
+                await store.close()
+            except Exception as e:
+                log.error(f"❌ Gagal flush DataStore saat shutdown: {e}", exc_info=True)
+        rank_cards = getattr(self, "rank_cards", None)
+        if rank_cards:
+            rank_cards.close()
+        mongo_store = getattr(self, "mongo", None)
+        if mongo_store:
+            try:
+                await mongo_store.close()
+            except Exception as e:
+                log.error(f"❌ Gagal menutup koneksi MongoDB: {e}", exc_info=True)
+        await super().close()
+
+bot = ReSwanBot(command_prefix=("!", "?"), intents=intents, help_command=None)
 
 @bot.event
 async def on_resumed():
@@ -498,18 +560,20 @@ async def backupnow(ctx):
     await ctx.send("⚙️ Memulai proses backup ke MongoDB dan sinkronisasi ke GitHub...")
     backup_data = {}
 
-    if not client:
+    if not mongo or not mongo.enabled:
         await ctx.send("❌ MongoDB client tidak aktif. Backup dibatalkan.", ephemeral=True)
         log.error("MongoDB client is None, cannot perform backupnow.")
         return
 
     try:
-        client.admin.command('ping')
+        await mongo.ping()
     except Exception as e:
         await ctx.send(f"❌ Gagal terhubung ke MongoDB untuk backup: {e}", ephemeral=True)
         log.error(f"MongoDB ping failed for backupnow command: {e}", exc_info=True)
         return
 
+    await bot.store.flush()
+
     directories_to_scan = ['.', 'data/', 'config/']
     github_success_count = 0
     github_fail_count = 0
@@ -547,7 +611,8 @@ async def backupnow(ctx):
 
     if backup_data:
         try:
-            collection.update_one(
+            await mongo.update_one(
+                BACKUP_COLLECTION,
                 {"_id": "latest_backup"},
                 {"$set": {
                     "backup": backup_data,
@@ -574,20 +639,20 @@ async def backupnow(ctx):
 @bot.command()
 @commands.is_owner()
 async def sendbackup(ctx):
-    if not client:
+    if not mongo or not mongo.enabled:
         await ctx.send("❌ MongoDB client tidak aktif.", ephemeral=True)
         log.error("MongoDB client is None, cannot perform sendbackup.")
         return
 
     try:
-        client.admin.command('ping')
+        await mongo.ping()
     except Exception as e:
         await ctx.send(f"❌ Gagal terhubung ke MongoDB: {e}", ephemeral=True)
         log.error(f"MongoDB ping failed for sendbackup command: {e}", exc_info=True)
         return
 
     try:
-        stored_data = collection.find_one({"_id": "latest_backup"})
+        stored_data = await mongo.find_one(BACKUP_COLLECTION, {"_id": "latest_backup"})
         if not stored_data or 'backup' not in stored_data:
             await ctx.send("❌ Tidak ada data backup yang tersedia.")
             log.warning("Tidak ada data backup di MongoDB.")
@@ -668,6 +733,24 @@ async def load_cogs():
 async def setup_hook():
     log.info("🚀 Memulai setup_hook dan memuat cogs...")
     bot.session = aiohttp.ClientSession()
+    bot.store = get_store()
+    bot.ledger = get_ledger()
+    bot.mongo = get_mongo()
+    bot.word_filter = get_word_filter()
+    bot.url_analyzer = get_url_analyzer()
+    bot.llm = get_llm()
+    bot.image_pipeline = get_image_pipeline(bot.session)
+    bot.timers = get_timers()
+    bot.rank_cards = get_rank_renderer(bot.session)
+    bot.outbox = get_outbox(bot)
+    bot.spam_engine = get_spam_engine()
+    bot.deleter = get_delete_queue(bot)
+    bot.mod_log = get_mod_log(bot)
+    bot.message_pipeline = get_message_pipeline(bot)
+    bot.add_listener(bot.message_pipeline.dispatch, "on_message")
+    bot.store.start()
+    bot.timers.start()
+    bot.outbox.start()
     await load_cogs()
     log.info("✅ setup_hook selesai.")
 
@@ -0,0 +1,116 @@
+import asyncio
+import logging
+import re
+
+log = logging.getLogger(__name__)
+
+# nama tag -> (regex argumen, boleh muncul berkali-kali dalam satu jawaban)
+ACTION_SPECS = {
+    "ACTION_WHITELIST_KATA": (r'(.+)', False),
+    "ACTION_UNWHITELIST_KATA": (r'(.+)', False),
+    "UPDATE_DATABASE": (r'(.+)', False),
+    "ACTION_DELETE_ARTICLE": (r'(.+)', False),
+    "ACTION_SCHEDULE": (r'(channel|dm)\s*\|\s*(\d+)\s*\|\s*(\d{2}:\d{2})\s*\|\s*(\d{2}-\d{2}-\d{4})\s*\|\s*(.*)', False),
+    "ACTION_PROXY": (r'(\d+)\s*\|\s*(\d+)', False),
+    "ACTION_AUTO_NGAMBEK": (r'(\d+)\s*\|\s*(\d+)', False),
+    "ACTION_SPY_DM": (r'(\d+)', False),
+    "ACTION_REACT": (r'(.+)', False),
+    "ACTION_KARMA": (r'(\d+)\s*\|\s*([+-]?\d+)', True),
+    "ACTION_FITNAH": (r'(\d+)\s*\|\s*([a-zA-Z0-9]+)\s*\|\s*(.*)', True),
+    "ACTION_DM": (r'(\d+)\s*\|\s*(.*)', True),
+    "ACTION_CHANNEL": (r'(\d+)\s*\|\s*(.*)', True),
+}
+
+_ARG_PATTERNS = {name: re.compile(pattern, re.IGNORECASE | re.DOTALL) for name, (pattern, _) in ACTION_SPECS.items()}
+ACTION_TAG_RE = re.compile(
+    r'\$\$(' + '|'.join(ACTION_SPECS) + r'):\s*(.*?)\$\$',
+    re.IGNORECASE | re.DOTALL
+)
+
+
+class ActionTag:
+    __slots__ = ("name", "args")
+
+    def __init__(self, name, args):
+        self.name = name
+        self.args = args
+
+    def __repr__(self):
+        return f"<ActionTag {self.name} {self.args}>"
+
+
+def parse_action_tags(text):
+    """
+    Satu kali scan: buang semua tag aksi yang dikenal dari teks dan kembalikan
+    `(teks_bersih, [ActionTag, ...])` sesuai urutan kemunculan. Tag dengan argumen
+    yang tidak valid tetap dibuang tapi tidak dieksekusi.
+    """
+    actions = []
+    seen_single = set()
+    parts = []
+    last = 0
+    for match in ACTION_TAG_RE.finditer(text):
+        parts.append(text[last:match.start()])
+        last = match.end()
+        name = match.group(1).upper()
+        args = _ARG_PATTERNS[name].fullmatch(match.group(2).strip())
+        if args is None:
+            log.warning(f"Tag {name} diabaikan, format argumen salah: {match.group(2)[:80]!r}")
+            continue
+        if not ACTION_SPECS[name][1]:
+            if name in seen_single:
+                continue
+            seen_single.add(name)
+        actions.append(ActionTag(name, tuple(arg.strip() for arg in args.groups())))
+    parts.append(text[last:])
+    return "".join(parts).strip(), actions
+
+
+class ActionContext:
+    """State bersama satu jawaban: catatan untuk user, file yang perlu disimpan, emoji react."""
+
+    def __init__(self, send_target):
+        self.send_target = send_target
+        self.dirty = set()
+        self.emoji = None
+
+
+class ActionDispatcher:
+    """
+    Menjalankan list `ActionTag` lewat tabel handler `{nama: fungsi(ctx, *args)}`.
+
+    Handler sinkron (mutasi config) dijalankan berurutan lebih dulu; handler async (I/O ke
+    Discord) dijalankan paralel, kecuali yang sasarannya sama (`serial_key`) tetap berurutan
+    supaya mis. dua DM ke user yang sama tidak tertukar. Handler mengembalikan catatan (str)
+    atau None; catatan disusun sesuai urutan tag di jawaban.
+    """
+
+    def __init__(self, handlers, serial_key=None):
+        self.handlers = handlers
+        self.serial_key = serial_key or (lambda action: (action.name, action.args[:1]))
+
+    async def run(self, actions, ctx):
+        notes = [None] * len(actions)
+        groups = {}
+        for i, action in enumerate(actions):
+            handler = self.handlers.get(action.name)
+            if handler is None:
+                continue
+            if asyncio.iscoroutinefunction(handler):
+                groups.setdefault(self.serial_key(action), []).append((i, handler, action))
+                continue
+            try:
+                notes[i] = handler(ctx, *action.args)
+            except Exception as e:
+                log.error(f"❌ Aksi {action.name} gagal: {e}", exc_info=True)
+
+        async def _run_group(items):
+            for i, handler, action in items:
+                try:
+                    notes[i] = await handler(ctx, *action.args)
+                except Exception as e:
+                    log.error(f"❌ Aksi {action.name} gagal: {e}", exc_info=True)
+
+        if groups:
+            await asyncio.gather(*(_run_group(items) for items in groups.values()))
+        return [note for note in notes if note]
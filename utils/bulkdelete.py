@@ -0,0 +1,172 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+
+import discord
+
+log = logging.getLogger(__name__)
+
+# Jeda pengumpulan: penghapusan yang masuk dalam rentang ini digabung jadi satu request
+FLUSH_DELAY = 0.5
+BULK_LIMIT = 100
+# Bulk delete Discord menolak pesan > 14 hari; beri sedikit margin
+BULK_MAX_AGE = timedelta(days=14) - timedelta(minutes=5)
+
+
+def bulk_eligible(message_id, now=None):
+    now = now or datetime.now(timezone.utc)
+    return now - discord.utils.snowflake_time(message_id) < BULK_MAX_AGE
+
+
+class _Pending:
+    __slots__ = ("channel", "futures", "reason", "handle")
+
+    def __init__(self, channel):
+        self.channel = channel
+        self.futures = {}
+        self.reason = None
+        self.handle = None
+
+
+class DeleteQueue:
+    """
+    Antrian penghapusan pesan bersama, dikumpulkan per channel.
+
+    - `delete()` tidak langsung memanggil API: ID pesan ditampung per channel selama `FLUSH_DELAY`
+      (atau sampai 100), lalu dikirim sebagai satu `delete_messages` (bulk delete).
+    - Pesan lebih tua dari 14 hari, atau yang sendirian di batch-nya, dihapus satu per satu lewat
+      partial message (tanpa `fetch_message` dulu).
+    - `stats` mencatat jumlah pesan vs jumlah request API, jadi terlihat berapa panggilan yang dihemat.
+    """
+
+    def __init__(self, bot=None, delay=FLUSH_DELAY):
+        self.bot = bot
+        self.delay = delay
+        self._pending = {}
+        self._tasks = set()
+        self.stats = {"messages": 0, "api_calls": 0, "failed": 0}
+
+    @property
+    def saved_calls(self):
+        return self.stats["messages"] - self.stats["api_calls"]
+
+    def delete(self, channel, message_id, reason=None):
+        """
+        Antrikan penghapusan `message_id` di `channel` (objek channel atau ID). Mengembalikan future
+        bernilai True kalau terhapus (atau memang sudah tidak ada), False kalau gagal.
+        """
+        loop = asyncio.get_running_loop()
+        channel_id = channel if isinstance(channel, int) else channel.id
+        message_id = int(message_id)
+        pending = self._pending.get(channel_id)
+        if pending is None:
+            pending = self._pending[channel_id] = _Pending(None if isinstance(channel, int) else channel)
+        elif pending.channel is None and not isinstance(channel, int):
+            pending.channel = channel
+        if reason and not pending.reason:
+            pending.reason = reason
+        future = pending.futures.get(message_id)
+        if future is not None:
+            return future
+        future = pending.futures[message_id] = loop.create_future()
+        if len(pending.futures) >= BULK_LIMIT:
+            self._flush_soon(channel_id)
+        elif pending.handle is None:
+            pending.handle = loop.call_later(self.delay, self._flush_soon, channel_id)
+        return future
+
+    def _flush_soon(self, channel_id):
+        pending = self._pending.pop(channel_id, None)
+        if pending is None:
+            return
+        if pending.handle is not None:
+            pending.handle.cancel()
+        task = asyncio.get_running_loop().create_task(self._flush(channel_id, pending))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _resolve_channel(self, channel_id, pending):
+        if pending.channel is not None:
+            return pending.channel
+        channel = self.bot.get_channel(channel_id)
+        if channel is None:
+            channel = await self.bot.fetch_channel(channel_id)
+        return channel
+
+    async def _delete_single(self, channel, message_id):
+        self.stats["api_calls"] += 1
+        try:
+            await channel.get_partial_message(message_id).delete()
+        except discord.NotFound:
+            return True
+        except discord.HTTPException as e:
+            log.warning(f"Gagal menghapus pesan {message_id} di {channel.id}: {e}")
+            return False
+        return True
+
+    async def _delete_bulk(self, channel, message_ids, reason):
+        self.stats["api_calls"] += 1
+        try:
+            await channel.delete_messages([discord.Object(id=message_id) for message_id in message_ids], reason=reason)
+        except discord.Forbidden as e:
+            log.warning(f"Bulk delete di {channel.id} ditolak: {e}")
+            return {message_id: False for message_id in message_ids}
+        except discord.HTTPException as e:
+            # Mis. ada pesan yang ternyata terlalu tua; ulangi satu per satu
+            log.info(f"Bulk delete di {channel.id} gagal ({e}), dihapus satu per satu.")
+            results = await asyncio.gather(*(self._delete_single(channel, message_id) for message_id in message_ids))
+            return dict(zip(message_ids, results))
+        return {message_id: True for message_id in message_ids}
+
+    async def _flush(self, channel_id, pending):
+        message_ids = sorted(pending.futures)
+        self.stats["messages"] += len(message_ids)
+        calls_before = self.stats["api_calls"]
+        results = {}
+        try:
+            channel = await self._resolve_channel(channel_id, pending)
+            now = datetime.now(timezone.utc)
+            young = [message_id for message_id in message_ids if bulk_eligible(message_id, now)]
+            young_set = set(young)
+            old = [message_id for message_id in message_ids if message_id not in young_set]
+            jobs = []
+            for i in range(0, len(young), BULK_LIMIT):
+                batch = young[i:i + BULK_LIMIT]
+                if len(batch) == 1:
+                    old.append(batch[0])
+                else:
+                    jobs.append(self._delete_bulk(channel, batch, pending.reason))
+            for outcome in await asyncio.gather(*jobs):
+                results.update(outcome)
+            single = await asyncio.gather(*(self._delete_single(channel, message_id) for message_id in old))
+            results.update(zip(old, single))
+        except Exception as e:
+            log.error(f"❌ Gagal menghapus {len(message_ids)} pesan di channel {channel_id}: {e}", exc_info=True)
+        for message_id, future in pending.futures.items():
+            ok = results.get(message_id, False)
+            if not ok:
+                self.stats["failed"] += 1
+            if not future.done():
+                future.set_result(ok)
+        calls = self.stats["api_calls"] - calls_before
+        if len(message_ids) > calls:
+            log.info(f"🗑️ {len(message_ids)} pesan di channel {channel_id} dihapus dengan {calls} request (hemat {len(message_ids) - calls}).")
+
+    async def flush(self):
+        """Kirim semua antrian sekarang juga dan tunggu selesai (dipakai saat shutdown)."""
+        for channel_id in list(self._pending):
+            self._flush_soon(channel_id)
+        if self._tasks:
+            await asyncio.gather(*list(self._tasks), return_exceptions=True)
+
+
+_queue = None
+
+
+def get_delete_queue(bot=None):
+    global _queue
+    if _queue is None:
+        _queue = DeleteQueue(bot)
+    elif bot is not None:
+        _queue.bot = bot
+    return _queue
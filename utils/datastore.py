@@ -0,0 +1,165 @@
+import asyncio
+import copy
+import json
+import logging
+import os
+
+log = logging.getLogger(__name__)
+
+LEVEL_FILE = "data/level_data.json"
+BANK_FILE = "data/bank_data.json"
+DEFAULT_FLUSH_INTERVAL = 30
+
+
+def _write_json_atomic(path, data):
+    """Serialisasi + tulis file di thread executor, lalu ganti file lama secara atomik."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    payload = json.dumps(data, indent=4)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(payload)
+    os.replace(tmp_path, path)
+
+
+class DataStore:
+    """
+    Penyimpanan write-behind untuk dokumen JSON yang sering ditulis (level & bank).
+
+    Dokumen disimpan di memori dan dipakai bersama oleh semua cog. Setiap perubahan
+    cukup ditandai lewat `mark_dirty(path, key)`; penulisan ke disk dilakukan berkala
+    (dan saat shutdown) di executor, jadi event loop tidak pernah parse/serialize file penuh.
+    """
+
+    def __init__(self, paths=(LEVEL_FILE, BANK_FILE), flush_interval=None):
+        self.paths = {os.path.basename(p): p for p in paths}
+        if flush_interval is None:
+            flush_interval = float(os.getenv("DATASTORE_FLUSH_INTERVAL", DEFAULT_FLUSH_INTERVAL))
+        self.flush_interval = flush_interval
+        self._docs = {}
+        self._shadow = {}
+        self._dirty_keys = {}
+        self._dirty_all = set()
+        self._lock = asyncio.Lock()
+        self._task = None
+        # Jurnal opsional (utils.ledger) yang diberi tahu seq mana yang sudah masuk snapshot
+        self.journal = None
+
+    def _name(self, path):
+        name = os.path.basename(path)
+        return name if name in self.paths else None
+
+    def handles(self, path):
+        return self._name(path) is not None
+
+    def _read(self, path):
+        if not os.path.exists(path):
+            return {}
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            return data if isinstance(data, dict) else {}
+        except (json.JSONDecodeError, OSError) as e:
+            log.error(f"❌ Gagal memuat {path} ke DataStore: {e}. Memakai data kosong.")
+            return {}
+
+    def get(self, path):
+        """Mengembalikan dokumen live (bukan salinan). Ubah in-place lalu panggil `mark_dirty`."""
+        name = self._name(path)
+        if name is None:
+            raise KeyError(f"{path} tidak dikelola oleh DataStore")
+        if name not in self._docs:
+            self._docs[name] = self._read(self.paths[name])
+        return self._docs[name]
+
+    def mark_dirty(self, path, *keys):
+        """Tandai key top-level yang berubah. Tanpa key berarti seluruh dokumen."""
+        name = self._name(path)
+        if name is None:
+            raise KeyError(f"{path} tidak dikelola oleh DataStore")
+        if not keys:
+            self._dirty_all.add(name)
+            self._dirty_keys.pop(name, None)
+        elif name not in self._dirty_all:
+            self._dirty_keys.setdefault(name, set()).update(str(k) for k in keys)
+
+    def put(self, path, data):
+        """Kompatibilitas untuk pola lama `save_json(path, data)`."""
+        name = self._name(path)
+        if name is None:
+            raise KeyError(f"{path} tidak dikelola oleh DataStore")
+        if self._docs.get(name) is not data:
+            self._docs[name] = data
+        self.mark_dirty(path)
+
+    def _snapshot(self, name):
+        doc = self._docs.get(name, {})
+        shadow = self._shadow.get(name)
+        if name in self._dirty_all or shadow is None:
+            shadow = copy.deepcopy(doc)
+        else:
+            for key in self._dirty_keys.get(name, ()):
+                if key in doc:
+                    shadow[key] = copy.deepcopy(doc[key])
+                else:
+                    shadow.pop(key, None)
+        self._shadow[name] = shadow
+        return shadow
+
+    async def flush(self):
+        """Tulis semua dokumen yang dirty ke disk. Aman dipanggil kapan saja."""
+        async with self._lock:
+            names = set(self._dirty_keys) | self._dirty_all
+            if not names:
+                return
+            mark = self.journal.mark() if self.journal else None
+            pending = [(name, self._snapshot(name)) for name in names]
+            self._dirty_keys.clear()
+            self._dirty_all.clear()
+
+            failed = set()
+            loop = asyncio.get_running_loop()
+            for name, snapshot in pending:
+                try:
+                    await loop.run_in_executor(None, _write_json_atomic, self.paths[name], snapshot)
+                except Exception as e:
+                    log.error(f"❌ DataStore gagal menulis {self.paths[name]}: {e}", exc_info=True)
+                    self._dirty_all.add(name)
+                    failed.add(name)
+
+            if self.journal:
+                try:
+                    await self.journal.committed(mark, failed)
+                except Exception as e:
+                    log.error(f"❌ Gagal memperbarui checkpoint jurnal: {e}", exc_info=True)
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                log.error(f"❌ Error pada flush berkala DataStore: {e}", exc_info=True)
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._flush_loop())
+            log.info(f"✅ DataStore aktif (flush tiap {self.flush_interval:g} detik).")
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        await self.flush()
+        if self.journal:
+            self.journal.close()
+        log.info("✅ DataStore telah di-flush ke disk.")
+
+
+_store = None
+
+
+def get_store():
+    global _store
+    if _store is None:
+        _store = DataStore()
+    return _store
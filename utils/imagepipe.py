@@ -0,0 +1,184 @@
+import asyncio
+import hashlib
+import io
+import logging
+import os
+from collections import OrderedDict
+
+import aiohttp
+from PIL import Image
+
+from utils.verdictcache import VerdictCache
+
+log = logging.getLogger(__name__)
+
+IMAGE_EXTENSIONS = ('png', 'jpg', 'jpeg', 'webp')
+DEFAULT_MAX_EDGE = 1024
+DEFAULT_MAX_BYTES = 8 * 1024 * 1024
+DEFAULT_CACHE_SIZE = 64
+DESCRIPTION_TTL = 30 * 86400
+DOWNLOAD_TIMEOUT = 15
+
+
+class ProcessedImage:
+    __slots__ = ("digest", "data", "mime_type", "size")
+
+    def __init__(self, digest, data, mime_type, size):
+        self.digest = digest
+        self.data = data
+        self.mime_type = mime_type
+        self.size = size
+
+    def as_part(self):
+        """Bentuk blob yang diterima `generate_content` Gemini."""
+        return {"mime_type": self.mime_type, "data": self.data}
+
+
+def _process(raw, max_edge):
+    """Decode + downscale + encode ulang. Jalan di executor karena berat di CPU."""
+    with Image.open(io.BytesIO(raw)) as img:
+        img.load()
+        has_alpha = img.mode in ("RGBA", "LA") or (img.mode == "P" and "transparency" in img.info)
+        img = img.convert("RGBA" if has_alpha else "RGB")
+        img.thumbnail((max_edge, max_edge), Image.LANCZOS)
+        out = io.BytesIO()
+        if has_alpha:
+            img.save(out, format="PNG", optimize=True)
+            return out.getvalue(), "image/png", img.size
+        img.save(out, format="JPEG", quality=85)
+        return out.getvalue(), "image/jpeg", img.size
+
+
+def _url_key(url):
+    # URL CDN Discord punya parameter tanda tangan (?ex=&is=&hm=) yang berubah-ubah
+    return url.split('?', 1)[0]
+
+
+class ImagePipeline:
+    """
+    Jalur tunggal gambar untuk panggilan AI.
+
+    - Attachment diunduh paralel lewat session HTTP bersama, dengan batas ukuran.
+    - Decode & downscale (sisi terpanjang `max_edge`) jalan di executor, bukan di event loop.
+    - Hasil olahan di-cache per hash konten (dan URL -> hash), deskripsi AI juga per hash,
+      jadi gambar yang sama tidak diunduh / diolah / dideskripsikan ulang.
+    """
+
+    def __init__(self, session=None, max_edge=None, max_bytes=None, cache_size=DEFAULT_CACHE_SIZE):
+        self.session = session
+        self.max_edge = max_edge or int(os.getenv("AI_IMAGE_MAX_EDGE", DEFAULT_MAX_EDGE))
+        self.max_bytes = max_bytes or int(os.getenv("AI_IMAGE_MAX_BYTES", DEFAULT_MAX_BYTES))
+        self.cache_size = cache_size
+        self._images = OrderedDict()
+        self._url_to_digest = OrderedDict()
+        self._inflight = {}
+        self.descriptions = VerdictCache(max_entries=cache_size * 8, default_ttl=DESCRIPTION_TTL)
+
+    def _remember(self, store, key, value):
+        store[key] = value
+        store.move_to_end(key)
+        while len(store) > self.cache_size:
+            store.popitem(last=False)
+
+    def _cached(self, digest):
+        image = self._images.get(digest)
+        if image is not None:
+            self._images.move_to_end(digest)
+        return image
+
+    async def _download(self, url):
+        session = self.session
+        owns_session = session is None or session.closed
+        if owns_session:
+            session = aiohttp.ClientSession()
+        try:
+            async with session.get(url, timeout=aiohttp.ClientTimeout(total=DOWNLOAD_TIMEOUT)) as resp:
+                if resp.status != 200:
+                    return None
+                if resp.content_length and resp.content_length > self.max_bytes:
+                    return None
+                chunks = []
+                total = 0
+                async for chunk in resp.content.iter_chunked(64 * 1024):
+                    total += len(chunk)
+                    if total > self.max_bytes:
+                        return None
+                    chunks.append(chunk)
+                return b"".join(chunks)
+        finally:
+            if owns_session:
+                await session.close()
+
+    async def _load(self, url, size=None):
+        key = _url_key(url)
+        digest = self._url_to_digest.get(key)
+        if digest is not None:
+            image = self._cached(digest)
+            if image is not None:
+                return image
+        if size and size > self.max_bytes:
+            log.info(f"Gambar dilewati, kegedean ({size} byte > {self.max_bytes}).")
+            return None
+
+        raw = await self._download(url)
+        if not raw:
+            return None
+        digest = hashlib.blake2b(raw, digest_size=16).hexdigest()
+        self._remember(self._url_to_digest, key, digest)
+        image = self._cached(digest)
+        if image is not None:
+            return image
+        data, mime_type, dims = await asyncio.get_running_loop().run_in_executor(None, _process, raw, self.max_edge)
+        image = ProcessedImage(digest, data, mime_type, dims)
+        self._remember(self._images, digest, image)
+        return image
+
+    async def load(self, url, size=None):
+        """Unduh + olah satu gambar; request bersamaan untuk URL yang sama digabung."""
+        key = _url_key(url)
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._load(url, size))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        try:
+            return await asyncio.shield(task)
+        except Exception as e:
+            log.warning(f"Gagal memproses gambar {key}: {e}")
+            return None
+
+    async def from_message(self, message):
+        attachments = [
+            att for att in message.attachments
+            if att.filename.lower().endswith(IMAGE_EXTENSIONS)
+        ]
+        if not attachments:
+            return []
+        results = await asyncio.gather(*(self.load(att.url, getattr(att, "size", None)) for att in attachments))
+        return [image for image in results if image is not None]
+
+    async def describe(self, images, factory):
+        """
+        Deskripsi untuk gambar yang belum pernah dideskripsikan. `factory(images)` (coroutine)
+        dipanggil sekali untuk gambar-gambar baru saja; mengembalikan None kalau semuanya sudah dikenal.
+        """
+        fresh = [image for image in images if self.descriptions.get(image.digest) is None]
+        if not fresh:
+            return None
+        description = await factory(fresh)
+        if description:
+            for image in fresh:
+                self.descriptions.set(image.digest, description)
+        return description
+
+
+_pipeline = None
+
+
+def get_image_pipeline(session=None):
+    global _pipeline
+    if _pipeline is None:
+        _pipeline = ImagePipeline(session)
+    elif session is not None:
+        _pipeline.session = session
+    return _pipeline
@@ -0,0 +1,205 @@
+import asyncio
+import json
+import logging
+import os
+import time
+
+from utils.datastore import get_store, LEVEL_FILE, BANK_FILE
+
+log = logging.getLogger(__name__)
+
+JOURNAL_FILE = "data/economy_ledger.jsonl"
+CHECKPOINT_FILE = "data/economy_ledger_checkpoint.json"
+
+DEFAULT_BANK_ENTRY = {"balance": 0, "debt": 0}
+DEFAULT_LEVEL_ENTRY = {"exp": 0, "weekly_exp": 0, "level": 0, "badges": []}
+
+
+class Ledger:
+    """
+    Jurnal append-only untuk perubahan RSWN/EXP.
+
+    Setiap kredit/debit ditulis sebagai satu baris JSONL (O(1) byte di disk) lalu
+    diterapkan ke dokumen level/bank di DataStore. Saat DataStore berhasil menulis
+    snapshot, checkpoint per dokumen dimajukan dan jurnal dipadatkan sehingga hanya
+    berisi record yang belum masuk snapshot. Saat start, record setelah checkpoint
+    di-replay ke dokumen.
+    """
+
+    def __init__(self, store, journal_path=JOURNAL_FILE, checkpoint_path=CHECKPOINT_FILE):
+        self.store = store
+        self.journal_path = journal_path
+        self.checkpoint_path = checkpoint_path
+        self.seq = 0
+        self._pending = []
+        self._fh = None
+
+        self.checkpoints = self._load_checkpoints()
+        # Jurnal bisa sudah dipadatkan sampai kosong; seq baru tetap harus di atas checkpoint
+        self.seq = max(self.checkpoints.values())
+        self._replay()
+        self._open()
+        store.journal = self
+
+    # --- persistence ---
+    def _load_checkpoints(self):
+        try:
+            with open(self.checkpoint_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            data = {}
+        return {name: int(data.get(name, 0)) for name in (os.path.basename(LEVEL_FILE), os.path.basename(BANK_FILE))}
+
+    def _write_checkpoints(self):
+        tmp_path = f"{self.checkpoint_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.checkpoints, f, indent=4)
+        os.replace(tmp_path, self.checkpoint_path)
+
+    def _open(self):
+        os.makedirs(os.path.dirname(self.journal_path), exist_ok=True)
+        self._fh = open(self.journal_path, 'a', encoding='utf-8')
+
+    def _replay(self):
+        if not os.path.exists(self.journal_path):
+            return
+        replayed = 0
+        with open(self.journal_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    log.warning(f"Baris jurnal rusak dilewati: {line[:80]}")
+                    continue
+                self.seq = max(self.seq, record["seq"])
+                if self._apply(record, replay=True):
+                    self._pending.append(record)
+                    replayed += 1
+        if replayed:
+            log.info(f"✅ Ledger: {replayed} record di-replay dari jurnal (seq terakhir {self.seq}).")
+
+    # --- apply ---
+    def _apply(self, record, replay=False):
+        bank_name = os.path.basename(BANK_FILE)
+        level_name = os.path.basename(LEVEL_FILE)
+        user_id = record["user"]
+        applied = False
+
+        if record.get("rswn") and (not replay or record["seq"] > self.checkpoints[bank_name]):
+            bank_data = self.store.get(BANK_FILE)
+            entry = bank_data.setdefault(user_id, dict(DEFAULT_BANK_ENTRY))
+            entry["balance"] = entry.get("balance", 0) + record["rswn"]
+            if record.get("floor") is not None and entry["balance"] < record["floor"]:
+                entry["balance"] = record["floor"]
+            self.store.mark_dirty(BANK_FILE, user_id)
+            applied = True
+
+        if record.get("exp") and record.get("guild") and (not replay or record["seq"] > self.checkpoints[level_name]):
+            level_data = self.store.get(LEVEL_FILE)
+            entry = level_data.setdefault(record["guild"], {}).setdefault(user_id, dict(DEFAULT_LEVEL_ENTRY, badges=[]))
+            entry["exp"] = entry.get("exp", 0) + record["exp"]
+            if record.get("weekly"):
+                entry["weekly_exp"] = entry.get("weekly_exp", 0) + record["exp"]
+            self.store.mark_dirty(LEVEL_FILE, record["guild"])
+            applied = True
+
+        return applied
+
+    def record(self, user_id, guild_id=None, rswn=0, exp=0, weekly=False, floor=None, reason=None):
+        """
+        Catat delta RSWN (bank) dan/atau EXP (level per guild) untuk satu user.
+        `floor` membatasi saldo bawah (mis. 0) setelah delta diterapkan.
+        Mengembalikan record jurnal yang ditulis.
+        """
+        if not rswn and not exp:
+            return None
+        self.seq += 1
+        entry = {"seq": self.seq, "ts": int(time.time()), "user": str(user_id)}
+        if guild_id is not None:
+            entry["guild"] = str(guild_id)
+        if rswn:
+            entry["rswn"] = int(rswn)
+        if exp:
+            entry["exp"] = int(exp)
+        if weekly:
+            entry["weekly"] = True
+        if floor is not None:
+            entry["floor"] = floor
+        if reason:
+            entry["reason"] = reason
+
+        if self._fh is None:
+            # Penulis yang terlambat saat shutdown (mis. menit voice dari cog_unload) tetap masuk jurnal
+            # dan di-replay saat start berikutnya
+            self._open()
+        try:
+            self._fh.write(json.dumps(entry) + "\n")
+            self._fh.flush()
+        except Exception as e:
+            log.error(f"❌ Ledger gagal menulis jurnal (seq {self.seq}): {e}", exc_info=True)
+
+        self._apply(entry)
+        self._pending.append(entry)
+        return entry
+
+    def credit(self, user_id, amount, reason=None):
+        return self.record(user_id, rswn=amount, reason=reason)
+
+    def debit(self, user_id, amount, reason=None, floor=None):
+        return self.record(user_id, rswn=-amount, floor=floor, reason=reason)
+
+    def balance(self, user_id):
+        return self.store.get(BANK_FILE).get(str(user_id), {}).get("balance", 0)
+
+    # --- hook dari DataStore.flush ---
+    def mark(self):
+        return self.seq
+
+    def _write_journal(self, path, records):
+        with open(path, 'w', encoding='utf-8') as f:
+            for record in records:
+                f.write(json.dumps(record) + "\n")
+
+    async def committed(self, mark, failed=()):
+        """Dipanggil DataStore setelah snapshot ditulis; majukan checkpoint lalu padatkan jurnal."""
+        for name in self.checkpoints:
+            if name not in failed:
+                self.checkpoints[name] = max(self.checkpoints[name], mark)
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self._write_checkpoints)
+
+        low = min(self.checkpoints.values())
+        kept = [r for r in self._pending if r["seq"] > low]
+        tmp_path = f"{self.journal_path}.tmp"
+        await loop.run_in_executor(None, self._write_journal, tmp_path, kept)
+
+        # Record yang masuk selama penulisan di executor sudah ada di jurnal lama; ikutkan sebelum diganti
+        last_seq = kept[-1]["seq"] if kept else low
+        newer = [r for r in self._pending if r["seq"] > max(last_seq, low)]
+        if newer:
+            with open(tmp_path, 'a', encoding='utf-8') as f:
+                for record in newer:
+                    f.write(json.dumps(record) + "\n")
+        self._pending = kept + newer
+        if self._fh:
+            self._fh.close()
+        os.replace(tmp_path, self.journal_path)
+        self._open()
+
+    def close(self):
+        if self._fh:
+            self._fh.close()
+            self._fh = None
+
+
+_ledger = None
+
+
+def get_ledger():
+    global _ledger
+    if _ledger is None:
+        _ledger = Ledger(get_store())
+    return _ledger
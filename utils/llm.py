@@ -0,0 +1,245 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import os
+import time
+
+import google.generativeai as genai
+from google.api_core import exceptions as google_exceptions
+
+log = logging.getLogger(__name__)
+
+# Lane prioritas: angka kecil dilayani duluan
+PRIORITY_MODERATION = 0
+PRIORITY_INTERACTIVE = 1
+PRIORITY_BACKGROUND = 2
+
+DEFAULT_RPM_PER_KEY = 15
+DEFAULT_MAX_CONCURRENCY = 6
+QUOTA_COOLDOWN_BASE = 20
+QUOTA_COOLDOWN_MAX = 300
+DEFAULT_MAX_WAIT = 30
+
+
+def load_api_keys():
+    """GOOGLE_API_KEY, GOOGLE_API_KEY_2, GOOGLE_API_KEY_3, ... (berhenti di nomor pertama yang kosong)."""
+    keys = []
+    if os.getenv("GOOGLE_API_KEY"):
+        keys.append(os.getenv("GOOGLE_API_KEY"))
+    index = 2
+    while os.getenv(f"GOOGLE_API_KEY_{index}"):
+        keys.append(os.getenv(f"GOOGLE_API_KEY_{index}"))
+        index += 1
+    return keys
+
+
+def is_quota_error(error):
+    if isinstance(error, google_exceptions.ResourceExhausted):
+        return True
+    err_str = str(error).lower()
+    return any(s in err_str for s in ("429", "quota", "exhausted", "too many requests", "overloaded"))
+
+
+class QuotaExhausted(Exception):
+    pass
+
+
+_private_client_warned = False
+
+
+class _KeySlot:
+    """Satu API key: client sendiri, token bucket, dan status kesehatan."""
+
+    def __init__(self, index, api_key, rpm):
+        self.index = index
+        self.api_key = api_key
+        self.capacity = max(1.0, float(rpm))
+        self.refill_per_sec = self.capacity / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.cooldown_until = 0.0
+        self.failures = 0
+        self.inflight = 0
+        self.ok_count = 0
+        self.quota_count = 0
+        self._async_client = None
+
+    @property
+    def async_client(self):
+        """
+        Client async khusus key ini (None kalau SDK tidak lagi punya `_ClientManager`). Memakai API
+        privat SDK, jadi versinya di-pin di requirements.txt; pemanggil harus siap dengan None.
+        """
+        global _private_client_warned
+        if self._async_client is None:
+            # Client per key, supaya tidak ada yang mengubah genai.configure global di tengah request
+            try:
+                from google.generativeai.client import _ClientManager
+                manager = _ClientManager()
+                manager.configure(api_key=self.api_key)
+                self._async_client = manager.get_default_client("generative_async")
+            except (ImportError, AttributeError, TypeError) as e:
+                if not _private_client_warned:
+                    _private_client_warned = True
+                    log.warning(f"Client Gemini per key tidak tersedia di SDK ini ({e}); pakai client global genai.configure.")
+                self._async_client = False
+        return self._async_client or None
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.refill_per_sec)
+        self.updated = now
+
+    def wait_time(self, now):
+        """0 kalau key bisa dipakai sekarang, selain itu berapa detik lagi."""
+        self._refill(now)
+        if now < self.cooldown_until:
+            return self.cooldown_until - now
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.refill_per_sec
+
+    def score(self):
+        # Lebih sehat = token lebih banyak, request jalan lebih sedikit, gagal lebih jarang
+        return (self.tokens - self.inflight) - 2 * self.failures
+
+    def mark_ok(self):
+        self.failures = 0
+        self.ok_count += 1
+
+    def mark_quota(self, now):
+        self.failures += 1
+        self.quota_count += 1
+        self.tokens = 0
+        self.cooldown_until = now + min(QUOTA_COOLDOWN_MAX, QUOTA_COOLDOWN_BASE * (2 ** (self.failures - 1)))
+
+
+class _PrioritySemaphore:
+    def __init__(self, value):
+        self._value = value
+        self._waiters = []
+        self._seq = itertools.count()
+
+    async def acquire(self, priority):
+        if self._value > 0 and not self._waiters:
+            self._value -= 1
+            return
+        future = asyncio.get_running_loop().create_future()
+        entry = [priority, next(self._seq), future]
+        heapq.heappush(self._waiters, entry)
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self.release()
+            else:
+                entry[2] = None
+            raise
+
+    def release(self):
+        while self._waiters:
+            _, _, future = heapq.heappop(self._waiters)
+            if future is not None and not future.done():
+                future.set_result(True)
+                return
+        self._value += 1
+
+
+class LLMGateway:
+    """
+    Gateway Gemini bersama untuk semua cog.
+
+    - Setiap API key punya client sendiri + token bucket (RPM), jadi tidak ada lagi
+      `genai.configure` global yang saling timpa antar cog.
+    - Request antre per lane prioritas: moderasi > interaktif > background.
+    - Key dipilih yang paling sehat; key yang kena 429 didinginkan (backoff eksponensial)
+      dan request langsung pindah ke key lain alih-alih `sleep(1)` lalu coba lagi.
+    """
+
+    def __init__(self, api_keys=None, rpm_per_key=None, max_concurrency=None):
+        api_keys = api_keys if api_keys is not None else load_api_keys()
+        rpm_per_key = rpm_per_key or int(os.getenv("GEMINI_RPM_PER_KEY", DEFAULT_RPM_PER_KEY))
+        max_concurrency = max_concurrency or int(os.getenv("GEMINI_MAX_CONCURRENCY", DEFAULT_MAX_CONCURRENCY))
+        self.slots = [_KeySlot(i, key, rpm_per_key) for i, key in enumerate(api_keys)]
+        self._gate = _PrioritySemaphore(max_concurrency)
+        if api_keys:
+            # Tetap set default global untuk kode yang belum lewat gateway (mis. library lain)
+            genai.configure(api_key=api_keys[0])
+        log.info(f"✅ LLMGateway: {len(self.slots)} API key, {rpm_per_key} RPM/key, maks {max_concurrency} request paralel.")
+
+    def _pick_slot(self, exclude):
+        now = time.monotonic()
+        candidates = [(slot, slot.wait_time(now)) for slot in self.slots if slot.index not in exclude]
+        ready = [slot for slot, wait in candidates if wait == 0]
+        if ready:
+            return max(ready, key=lambda slot: slot.score()), 0
+        return min(candidates, key=lambda c: c[1])
+
+    async def generate(self, model_name, content, priority=PRIORITY_INTERACTIVE, model_kwargs=None, max_wait=DEFAULT_MAX_WAIT, **kwargs):
+        """
+        `GenerativeModel(model_name, **model_kwargs).generate_content_async(content, **kwargs)` lewat
+        key paling sehat. Error kuota dicoba ulang di key lain; error lain diteruskan ke pemanggil.
+        Kalau semua key baru pulih lebih dari `max_wait` detik lagi, langsung `QuotaExhausted`.
+        """
+        if not self.slots:
+            raise QuotaExhausted("Tidak ada GOOGLE_API_KEY yang diset.")
+        await self._gate.acquire(priority)
+        try:
+            tried = set()
+            last_err = None
+            while len(tried) < len(self.slots):
+                slot, wait = self._pick_slot(tried)
+                if wait > max_wait:
+                    raise QuotaExhausted(f"Semua API key sedang limit (pulih ~{wait:.0f} detik lagi).")
+                if wait:
+                    # Semua key sisa sedang habis token / cooldown: tunggu yang paling cepat pulih
+                    await asyncio.sleep(wait)
+                slot.tokens -= 1
+                slot.inflight += 1
+                try:
+                    try:
+                        model = genai.GenerativeModel(model_name, **(model_kwargs or {}))
+                    except Exception:
+                        # mis. `tools` yang tidak didukung versi SDK ini
+                        model = genai.GenerativeModel(model_name)
+                    client = slot.async_client
+                    if client is not None and hasattr(model, "_async_client"):
+                        model._async_client = client
+                    else:
+                        # Fallback: client global. Model mengambil client default di langkah pertama
+                        # coroutine, dan tidak ada await di antara configure dan panggilan ini.
+                        genai.configure(api_key=slot.api_key)
+                    response = await model.generate_content_async(content, **kwargs)
+                    slot.mark_ok()
+                    return response
+                except Exception as e:
+                    if not is_quota_error(e):
+                        raise
+                    slot.mark_quota(time.monotonic())
+                    log.warning(f"Gemini key #{slot.index + 1} kena limit ({model_name}), pindah key lain.")
+                    tried.add(slot.index)
+                    last_err = e
+                finally:
+                    slot.inflight -= 1
+            raise QuotaExhausted(f"Semua API key kena limit: {last_err}")
+        finally:
+            self._gate.release()
+
+    def status_text(self):
+        now = time.monotonic()
+        lines = []
+        for slot in self.slots:
+            cooldown = max(0, slot.cooldown_until - now)
+            state = f"cooldown {cooldown:.0f}s" if cooldown else "siap"
+            lines.append(f"Key #{slot.index + 1}: {state}, token {slot.tokens:.1f}/{slot.capacity:.0f}, ok {slot.ok_count}, limit {slot.quota_count}")
+        return "\n".join(lines) or "Tidak ada API key."
+
+
+_gateway = None
+
+
+def get_llm():
+    global _gateway
+    if _gateway is None:
+        _gateway = LLMGateway()
+    return _gateway
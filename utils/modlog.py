@@ -0,0 +1,174 @@
+import asyncio
+import logging
+from collections import OrderedDict
+
+import discord
+
+log = logging.getLogger(__name__)
+
+# Aksi yang masuk dalam rentang ini dikirim bersama dalam satu pesan
+FLUSH_DELAY = 3.0
+# Batas Discord: 10 embed dan total 6000 karakter per pesan
+EMBEDS_PER_MESSAGE = 10
+MESSAGE_CHAR_LIMIT = 6000
+# Aksi berbeda yang boleh menumpuk per channel log (mis. saat Discord sedang membatasi kita)
+MAX_PENDING = 200
+
+
+def _field_value(value):
+    text = str(value) if value is not None else ""
+    if len(text) > 1024:
+        text = text[:1021] + "..."
+    return text or "-"
+
+
+class _Entry:
+    __slots__ = ("title", "fields", "color", "count", "first", "last")
+
+    def __init__(self, title, fields, color, now):
+        self.title = title
+        self.fields = fields
+        self.color = color
+        self.count = 1
+        self.first = now
+        self.last = now
+
+
+class _ChannelBuffer:
+    __slots__ = ("channel", "entries", "full", "task")
+
+    def __init__(self, channel):
+        self.channel = channel
+        self.entries = OrderedDict()
+        self.full = asyncio.Event()
+        self.task = None
+
+
+class ModLogSink:
+    """
+    Penulis log moderasi bersama, dikumpulkan per channel log.
+
+    - `log()` tidak memanggil API: aksi ditampung lalu dikirim tiap `FLUSH_DELAY` detik, atau langsung
+      begitu ada 10 aksi berbeda, sebagai satu pesan berisi beberapa embed.
+    - Aksi identik (judul, warna, dan isi field sama) yang masih antri digabung jadi satu embed dengan
+      jumlah kejadian dan rentang waktunya.
+    - Satu channel hanya punya satu pengirim; aksi yang masuk selama pengiriman ikut ke batch berikutnya.
+    """
+
+    def __init__(self, bot=None, delay=FLUSH_DELAY):
+        self.bot = bot
+        self.delay = delay
+        self._buffers = {}
+        self._closing = False
+        self.stats = {"actions": 0, "coalesced": 0, "embeds": 0, "messages": 0, "dropped": 0, "failed": 0}
+
+    def log(self, channel, title, fields, color):
+        """Antrikan satu aksi untuk `channel` (channel log yang sudah dicek izinnya)."""
+        fields = tuple((str(name), _field_value(value)) for name, value in (fields or {}).items())
+        key = (title, color, fields)
+        now = discord.utils.utcnow()
+        self.stats["actions"] += 1
+
+        buffer = self._buffers.get(channel.id)
+        if buffer is None:
+            buffer = self._buffers[channel.id] = _ChannelBuffer(channel)
+        buffer.channel = channel
+
+        entry = buffer.entries.get(key)
+        if entry is not None:
+            entry.count += 1
+            entry.last = now
+            self.stats["coalesced"] += 1
+        elif len(buffer.entries) >= MAX_PENDING:
+            self.stats["dropped"] += 1
+            log.warning(f"Antrian log moderasi channel {channel.id} penuh, aksi '{title}' dibuang.")
+            return
+        else:
+            buffer.entries[key] = _Entry(title, fields, color, now)
+            if len(buffer.entries) >= EMBEDS_PER_MESSAGE:
+                buffer.full.set()
+
+        if buffer.task is None:
+            buffer.task = asyncio.get_running_loop().create_task(self._drain(channel.id, buffer))
+
+    def _build_embed(self, entry):
+        embed = discord.Embed(title=entry.title[:256], color=entry.color, timestamp=entry.last)
+        for name, value in entry.fields[:24]:
+            embed.add_field(name=name[:256], value=value, inline=False)
+        if entry.count > 1:
+            embed.add_field(
+                name="Jumlah Kejadian",
+                value=f"{entry.count}x, <t:{int(entry.first.timestamp())}:T> – <t:{int(entry.last.timestamp())}:T>",
+                inline=False
+            )
+        user = self.bot.user if self.bot else None
+        if user:
+            embed.set_footer(text=f"Dijalankan oleh {user.name}", icon_url=user.display_avatar.url if user.display_avatar else None)
+        return embed
+
+    def _take_batch(self, buffer):
+        embeds, size = [], 0
+        while buffer.entries and len(embeds) < EMBEDS_PER_MESSAGE:
+            key = next(iter(buffer.entries))
+            embed = self._build_embed(buffer.entries[key])
+            if embeds and size + len(embed) > MESSAGE_CHAR_LIMIT:
+                break
+            del buffer.entries[key]
+            embeds.append(embed)
+            size += len(embed)
+        if len(buffer.entries) < EMBEDS_PER_MESSAGE:
+            buffer.full.clear()
+        return embeds
+
+    async def _drain(self, channel_id, buffer):
+        try:
+            while buffer.entries:
+                if not self._closing and not buffer.full.is_set():
+                    try:
+                        await asyncio.wait_for(buffer.full.wait(), timeout=self.delay)
+                    except asyncio.TimeoutError:
+                        pass
+                embeds = self._take_batch(buffer)
+                if not embeds:
+                    continue
+                try:
+                    await buffer.channel.send(embeds=embeds)
+                    self.stats["messages"] += 1
+                    self.stats["embeds"] += len(embeds)
+                except discord.Forbidden:
+                    self.stats["failed"] += len(embeds)
+                except discord.HTTPException as e:
+                    self.stats["failed"] += len(embeds)
+                    log.warning(f"Gagal mengirim {len(embeds)} log moderasi ke channel {channel_id}: {e}")
+        except Exception as e:
+            log.error(f"❌ Penulis log moderasi untuk channel {channel_id} error: {e}", exc_info=True)
+        finally:
+            buffer.task = None
+            if not buffer.entries and self._buffers.get(channel_id) is buffer:
+                del self._buffers[channel_id]
+
+    async def close(self, timeout=10):
+        """Kirim semua log yang masih antri (maks `timeout` detik), dipakai saat shutdown."""
+        self._closing = True
+        for buffer in self._buffers.values():
+            buffer.full.set()
+        tasks = [buffer.task for buffer in self._buffers.values() if buffer.task is not None]
+        if not tasks:
+            return
+        done, pending = await asyncio.wait(tasks, timeout=timeout)
+        if pending:
+            log.warning(f"Log moderasi ditutup dengan {len(pending)} channel belum terkirim.")
+            for task in pending:
+                task.cancel()
+
+
+_sink = None
+
+
+def get_mod_log(bot=None):
+    global _sink
+    if _sink is None:
+        _sink = ModLogSink(bot)
+    elif bot is not None:
+        _sink.bot = bot
+    return _sink
@@ -0,0 +1,173 @@
+import asyncio
+import hashlib
+import logging
+import re
+
+from utils.verdictcache import VerdictCache
+from utils.wordfilter import KeywordAutomaton
+
+log = logging.getLogger(__name__)
+
+BATCH_WINDOW = 1.0
+BATCH_MAX_SIZE = 5
+VERDICT_TTL_PASS = 6 * 3600
+VERDICT_TTL_ACTION = 3600
+
+# Kata/frasa yang membuat pesan layak dicek AI. Sengaja luas: salah positif hanya berarti
+# pesan diteruskan ke Gemini seperti dulu, salah negatif berarti pelanggaran lolos.
+RISK_TERMS = [
+    'goblok', 'gblk', 'bego', 'tolol', 'idiot', 'bodoh', 'bangsat', 'bajingan', 'kampret', 'keparat',
+    'brengsek', 'anjing', 'anjir', 'anjg', 'njir', 'babi', 'monyet', 'kontol', 'memek', 'ngentot',
+    'jancok', 'jancuk', 'asu', 'tai', 'bacot', 'cacat', 'autis', 'sampah', 'lonte', 'pelacur', 'perek',
+    'kafir', 'bencong', 'banci', 'cina', 'pribumi', 'hitam', 'yatim', 'bunuh', 'mati', 'mampus',
+    'ancam', 'dox', 'alamat rumah', 'sebar foto', 'bom', 'teror', 'perkosa', 'bully',
+    'fuck', 'shit', 'bitch', 'kill', 'retard', 'nigg', 'kys', 'stfu'
+]
+
+_REPEAT_RE = re.compile(r'(.)\1+')
+_SPACE_RE = re.compile(r'\s+')
+
+
+def normalize_content(content):
+    """Lowercase, rapikan spasi, dan ringkas huruf berulang ('anjiiiir' -> 'anjir')."""
+    text = _SPACE_RE.sub(' ', content.lower()).strip()
+    return _REPEAT_RE.sub(r'\1', text)
+
+
+def content_key(mode, content):
+    digest = hashlib.blake2b(normalize_content(content).encode('utf-8'), digest_size=16).hexdigest()
+    return f"{mode}:{digest}"
+
+
+class LocalScorer:
+    """Tier 0: heuristik token murah untuk meloloskan pesan yang jelas aman tanpa ke API."""
+
+    def __init__(self, risk_terms=RISK_TERMS, extra_regex=None):
+        self._risk = KeywordAutomaton({"risk": risk_terms})
+        self._extra_regex = extra_regex
+
+    def is_benign(self, content):
+        text = content.lower()
+        squeezed = normalize_content(content)
+        if not any(ch.isalpha() for ch in text):
+            return True
+        if self._extra_regex is not None and (self._extra_regex.search(text) or self._extra_regex.search(squeezed)):
+            return False
+        # Dicek dua bentuk: asli ('kill') dan yang diringkas ('kontooool' -> 'kontol')
+        if self._risk.scan(text) or self._risk.scan(squeezed):
+            return False
+        letters = [ch for ch in content if ch.isalpha()]
+        # Teriak panjang full kapital tetap diteruskan ke AI
+        if len(letters) >= 12 and sum(ch.isupper() for ch in letters) / len(letters) > 0.7:
+            return False
+        return True
+
+
+class _PendingItem:
+    __slots__ = ("content", "history_text", "author_name", "future")
+
+    def __init__(self, content, history_text, author_name, future):
+        self.content = content
+        self.history_text = history_text
+        self.author_name = author_name
+        self.future = future
+
+
+class ModerationPipeline:
+    """
+    Pipeline bertingkat untuk keputusan moderasi AI per pesan:
+
+    1. `local`  - LocalScorer meloloskan pesan yang jelas aman (mode "general" saja).
+    2. `cache`  - verdict sebelumnya untuk konten yang sama (hash konten ternormalisasi).
+    3. `ai`     - sisanya diantrikan per channel lalu dikirim ke Gemini dalam micro-batch.
+
+    `decide_batch(mode, items)` disediakan cog: menerima list `_PendingItem` dan mengembalikan
+    list keputusan (string) dengan urutan yang sama. `stats` berisi jumlah pesan per tier.
+    """
+
+    def __init__(self, decide_batch, scorer=None, batch_window=BATCH_WINDOW, batch_max_size=BATCH_MAX_SIZE):
+        self.decide_batch = decide_batch
+        self.scorer = scorer or LocalScorer()
+        self.cache = VerdictCache(max_entries=10000, default_ttl=VERDICT_TTL_PASS)
+        self.batch_window = batch_window
+        self.batch_max_size = batch_max_size
+        self._queues = {}
+        self._timers = {}
+        self.stats = {"local": 0, "cache": 0, "ai": 0, "ai_batches": 0, "errors": 0}
+
+    @staticmethod
+    def _ttl_for(decision):
+        return VERDICT_TTL_PASS if decision.strip().upper().startswith("PASS") else VERDICT_TTL_ACTION
+
+    async def classify(self, channel_id, mode, content, history_text, author_name):
+        if mode == "general" and self.scorer.is_benign(content):
+            self.stats["local"] += 1
+            return "PASS"
+
+        key = content_key(mode, content)
+        cached = self.cache.get(key)
+        if cached is not None:
+            self.stats["cache"] += 1
+            return cached
+
+        async def _ask_ai():
+            future = asyncio.get_running_loop().create_future()
+            self._enqueue((channel_id, mode), _PendingItem(content, history_text, author_name, future))
+            return await future
+
+        self.stats["ai"] += 1
+        try:
+            decision = await self.cache.get_or_compute(key, _ask_ai, ttl=self._ttl_for)
+        except Exception as e:
+            log.error(f"❌ Keputusan moderasi AI gagal: {e}")
+            self.stats["errors"] += 1
+            return "ERROR"
+        if decision == "ERROR":
+            self.cache.pop(key)
+        return decision
+
+    def _enqueue(self, queue_key, item):
+        queue = self._queues.setdefault(queue_key, [])
+        queue.append(item)
+        if len(queue) >= self.batch_max_size:
+            timer = self._timers.pop(queue_key, None)
+            if timer:
+                timer.cancel()
+            asyncio.get_running_loop().create_task(self._run_batch(queue_key))
+        elif queue_key not in self._timers:
+            self._timers[queue_key] = asyncio.get_running_loop().call_later(
+                self.batch_window, lambda: asyncio.ensure_future(self._run_batch(queue_key))
+            )
+
+    async def _run_batch(self, queue_key):
+        self._timers.pop(queue_key, None)
+        items = self._queues.pop(queue_key, [])
+        if not items:
+            return
+        self.stats["ai_batches"] += 1
+        try:
+            decisions = await self.decide_batch(queue_key[1], items)
+        except Exception as e:
+            log.error(f"❌ Batch moderasi AI gagal ({len(items)} pesan): {e}", exc_info=True)
+            self.stats["errors"] += 1
+            decisions = [e] * len(items)
+        for i, item in enumerate(items):
+            if item.future.done():
+                continue
+            decision = decisions[i] if i < len(decisions) else "ERROR"
+            if isinstance(decision, Exception):
+                item.future.set_exception(decision)
+            else:
+                item.future.set_result(decision)
+
+    def stats_text(self):
+        total = self.stats["local"] + self.stats["cache"] + self.stats["ai"]
+        if not total:
+            return "Belum ada pesan yang diproses."
+        lines = [
+            f"Lokal (heuristik): {self.stats['local']} ({self.stats['local'] / total:.0%})",
+            f"Cache verdict: {self.stats['cache']} ({self.stats['cache'] / total:.0%})",
+            f"Gemini: {self.stats['ai']} ({self.stats['ai'] / total:.0%}) dalam {self.stats['ai_batches']} batch",
+            f"Error: {self.stats['errors']}",
+        ]
+        return "\n".join(lines)
@@ -0,0 +1,168 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from pymongo import MongoClient
+
+log = logging.getLogger(__name__)
+
+DB_NAME = "reSwan"
+DATA_COLLECTION = "bot_data"
+
+
+def _write_file(path, payload):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(payload)
+    os.replace(tmp_path, path)
+
+
+class MongoStore:
+    """
+    Satu MongoClient bersama untuk seluruh bot.
+
+    Semua panggilan pymongo dijalankan di thread pool sendiri supaya tidak memblokir
+    event loop. Dokumen `bot_data` (format `{"_id": path, "data": ...}`) di-cache di
+    memori: baca di hot path cukup dari cache/file lokal, dan tulis di-coalesce per
+    dokumen sehingga rentetan save hanya menghasilkan satu upsert terakhir.
+    """
+
+    def __init__(self, uri=None, db_name=DB_NAME, max_workers=4):
+        uri = uri or os.getenv("MONGODB_URI")
+        self.client = MongoClient(uri, serverSelectionTimeoutMS=5000) if uri else None
+        self.db = self.client[db_name] if self.client is not None else None
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="mongo")
+        self._cache = {}
+        # path -> mtime untuk entri cache yang berasal dari file lokal (bisa ditulis cog lain)
+        self._mtimes = {}
+        self._pending = {}
+        self._drains = {}
+
+    @property
+    def enabled(self):
+        return self.db is not None
+
+    def collection(self, name=DATA_COLLECTION):
+        return self.db[name] if self.db is not None else None
+
+    async def run(self, func, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, func, *args)
+
+    # --- wrapper async untuk operasi pymongo ---
+    async def ping(self):
+        return await self.run(self.client.admin.command, 'ping')
+
+    async def find_one(self, collection, query):
+        return await self.run(self.collection(collection).find_one, query)
+
+    async def update_one(self, collection, query, update, upsert=False):
+        col = self.collection(collection)
+        return await self.run(lambda: col.update_one(query, update, upsert=upsert))
+
+    # --- cache dokumen bot_data ---
+    def _fetch_many(self, keys):
+        col = self.collection()
+        return {doc["_id"]: doc["data"] for doc in col.find({"_id": {"$in": list(keys)}}) if "data" in doc}
+
+    async def preload(self, keys):
+        """Isi cache dari Mongo dalam satu query. Dipanggil sekali saat cog di-setup."""
+        keys = [k for k in keys if k not in self._cache]
+        if not keys or not self.enabled:
+            return
+        try:
+            docs = await self.run(self._fetch_many, keys)
+        except Exception as e:
+            log.error(f"❌ Gagal preload dokumen dari MongoDB: {e}")
+            return
+        for key, data in docs.items():
+            self._cache.setdefault(key, data)
+        log.info(f"✅ MongoStore: {len(docs)}/{len(keys)} dokumen dimuat ke cache.")
+
+    def load(self, path, default):
+        """Baca dokumen dari cache; kalau belum ada, dari file lokal (tanpa network)."""
+        if path in self._cache:
+            if path not in self._mtimes:
+                return self._cache[path]
+            try:
+                if os.path.getmtime(path) == self._mtimes[path]:
+                    return self._cache[path]
+            except OSError:
+                return self._cache[path]
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(default, f, indent=4)
+            data = default
+        else:
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+            except Exception:
+                return default
+        self._cache[path] = data
+        self._mtimes[path] = os.path.getmtime(path)
+        return data
+
+    def _persist(self, path, payload):
+        try:
+            _write_file(path, payload)
+        except Exception as e:
+            log.error(f"❌ Gagal menulis {path}: {e}")
+        col = self.collection()
+        if col is not None:
+            try:
+                col.update_one(
+                    {"_id": path},
+                    {"$set": {"data": json.loads(payload), "updated_at": time.time()}},
+                    upsert=True
+                )
+            except Exception as e:
+                log.error(f"❌ Gagal upsert {path} ke MongoDB: {e}")
+
+    async def _drain(self, path):
+        try:
+            while path in self._pending:
+                payload = self._pending.pop(path)
+                await self.run(self._persist, path, payload)
+        finally:
+            self._drains.pop(path, None)
+
+    def save(self, path, data):
+        """Serialisasi sekali di loop, lalu tulis file + upsert di executor (coalesced per path)."""
+        self._cache[path] = data
+        self._mtimes.pop(path, None)
+        payload = json.dumps(data, indent=4)
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self._persist(path, payload)
+            return
+        self._pending[path] = payload
+        if path not in self._drains:
+            self._drains[path] = loop.create_task(self._drain(path))
+
+    def invalidate(self, path):
+        self._cache.pop(path, None)
+        self._mtimes.pop(path, None)
+
+    async def close(self):
+        if self._drains:
+            await asyncio.gather(*self._drains.values(), return_exceptions=True)
+        self.executor.shutdown(wait=True)
+        if self.client is not None:
+            self.client.close()
+
+
+_mongo = None
+
+
+def get_mongo():
+    global _mongo
+    if _mongo is None:
+        _mongo = MongoStore()
+    return _mongo
@@ -0,0 +1,180 @@
+import logging
+import re
+import time
+
+import discord
+
+log = logging.getLogger(__name__)
+
+# Urutan handler (kecil = duluan). Handler yang menindak pesan menghentikan sisa pipeline.
+PRIORITY_MODERATION = 10
+PRIORITY_RESTRICTION = 20
+PRIORITY_SCREENING = 30
+PRIORITY_DEFAULT = 50
+PRIORITY_REPLY = 90
+
+SLOW_HANDLER_SECONDS = 2.0
+# Berhenti di spoiler (`||`) dan code span; sisa markdown / tanda baca di ujung dibuang lewat URL_TRAILING
+URL_REGEX = re.compile(r'https?://[^\s<>|`]+', re.IGNORECASE)
+URL_TRAILING = "*_~)>.,!?'\""
+
+
+def clean_url(url):
+    """Buang markdown / tanda baca di ujung URL; `)` hanya kalau tidak berpasangan (link Wikipedia dll.)."""
+    while url and url[-1] in URL_TRAILING:
+        if url[-1] == ")" and url.count("(") >= url.count(")"):
+            break
+        url = url[:-1]
+    return url
+
+
+class MessageContext:
+    """Data turunan satu pesan yang dihitung sekali lalu dipakai semua handler."""
+
+    __slots__ = (
+        "message", "guild", "author", "channel", "content", "lower", "prefixes", "is_command",
+        "urls", "role_ids", "_settings", "_settings_provider", "stopped_by", "skip",
+    )
+
+    def __init__(self, message, prefixes, settings_provider=None):
+        self.message = message
+        self.guild = message.guild
+        self.author = message.author
+        self.channel = message.channel
+        self.content = message.content or ""
+        self.lower = self.content.lower()
+        self.prefixes = tuple(prefixes)
+        self.is_command = bool(self.prefixes) and self.content.startswith(self.prefixes)
+        self.urls = [url for url in map(clean_url, URL_REGEX.findall(self.content)) if url]
+        roles = getattr(message.author, "roles", None) or ()
+        self.role_ids = frozenset(role.id for role in roles)
+        self._settings = None
+        self._settings_provider = settings_provider
+        self.stopped_by = None
+        # Nama handler yang dilewati untuk pesan ini tanpa menghentikan handler lain
+        self.skip = set()
+
+    @property
+    def guild_settings(self):
+        """Setelan guild dari cog Administrasi (dict kosong untuk DM / kalau cog tidak dimuat)."""
+        if self._settings is None:
+            settings = None
+            if self.guild is not None and self._settings_provider is not None:
+                settings = self._settings_provider(self.guild.id)
+            self._settings = settings if settings is not None else {}
+        return self._settings
+
+    def has_any_role(self, role_ids):
+        return not self.role_ids.isdisjoint(role_ids)
+
+
+class _Handler:
+    __slots__ = ("name", "func", "priority", "bots", "dm")
+
+    def __init__(self, name, func, priority, bots, dm):
+        self.name = name
+        self.func = func
+        self.priority = priority
+        self.bots = bots
+        self.dm = dm
+
+
+class MessagePipeline:
+    """
+    Satu listener `on_message` untuk semua cog.
+
+    - `MessageContext` (prefix, teks lowercase, URL, role id, setelan guild) dibuat sekali per pesan.
+    - Handler jalan berurutan menurut `priority`. Handler yang mengembalikan True (mis. pesan sudah
+      dihapus moderasi) menghentikan handler berikutnya, jadi tidak ada EXP / panggilan AI untuk pesan itu.
+      Untuk melewati handler tertentu saja, tambahkan namanya ke `ctx.skip`.
+    - Waktu tiap handler dicatat di `timings`; handler yang lambat dicatat di log.
+    - Pesan dari bot ini sendiri tidak pernah diproses. Pesan bot lain / DM hanya diteruskan ke handler
+      yang mendaftar dengan `bots=True` / `dm=True`.
+    """
+
+    def __init__(self, bot=None):
+        self.bot = bot
+        self._handlers = []
+        self.settings_provider = None
+        self.timings = {}
+
+    def register(self, name, func, priority=PRIORITY_DEFAULT, *, bots=False, dm=False):
+        """`async func(ctx) -> bool`; True berarti pesan sudah ditindak dan pipeline berhenti."""
+        self.unregister(name)
+        self._handlers.append(_Handler(name, func, priority, bots, dm))
+        self._handlers.sort(key=lambda handler: handler.priority)
+
+    def unregister(self, name, func=None):
+        self._handlers = [
+            handler for handler in self._handlers
+            if handler.name != name or (func is not None and handler.func != func)
+        ]
+
+    def set_settings_provider(self, provider):
+        self.settings_provider = provider
+
+    async def build_context(self, message):
+        prefixes = await self.bot.get_prefix(message)
+        if isinstance(prefixes, str):
+            prefixes = (prefixes,)
+        return MessageContext(message, prefixes, self.settings_provider)
+
+    async def dispatch(self, message):
+        if self.bot.user is not None and message.author.id == self.bot.user.id:
+            return
+        is_bot = message.author.bot
+        is_dm = message.guild is None
+        handlers = [h for h in self._handlers if (h.bots or not is_bot) and (h.dm or not is_dm)]
+        if not handlers:
+            return
+        ctx = await self.build_context(message)
+        for handler in handlers:
+            if handler.name in ctx.skip:
+                continue
+            started = time.perf_counter()
+            try:
+                stop = await handler.func(ctx)
+            except discord.NotFound:
+                # Pesan sudah dihapus di tengah jalan; tidak ada gunanya lanjut
+                stop = True
+            except Exception as e:
+                log.error(f"❌ Handler pesan '{handler.name}' gagal: {e}", exc_info=True)
+                stop = False
+            self._record(handler.name, time.perf_counter() - started)
+            if stop:
+                ctx.stopped_by = handler.name
+                break
+        return ctx
+
+    def _record(self, name, elapsed):
+        stats = self.timings.get(name)
+        if stats is None:
+            stats = self.timings[name] = [0, 0.0, 0.0]
+        stats[0] += 1
+        stats[1] += elapsed
+        stats[2] = max(stats[2], elapsed)
+        if elapsed > SLOW_HANDLER_SECONDS:
+            log.warning(f"Handler pesan '{name}' lambat: {elapsed:.2f} detik.")
+
+    def stats_text(self):
+        if not self.timings:
+            return "Belum ada pesan yang diproses."
+        lines = []
+        for handler in self._handlers:
+            stats = self.timings.get(handler.name)
+            if stats:
+                calls, total, worst = stats
+                lines.append(f"`{handler.name}` — {calls}x, rata-rata {total / calls * 1000:.1f} ms, maks {worst * 1000:.0f} ms")
+        return "\n".join(lines) or "Belum ada pesan yang diproses."
+
+
+_pipeline = None
+
+
+def get_message_pipeline(bot=None):
+    global _pipeline
+    if _pipeline is None:
+        _pipeline = MessagePipeline(bot)
+    elif bot is not None:
+        _pipeline.bot = bot
+    return _pipeline
@@ -0,0 +1,205 @@
+import asyncio
+import hashlib
+import itertools
+import json
+import logging
+import os
+import time
+import weakref
+from collections import OrderedDict
+
+import discord
+
+log = logging.getLogger(__name__)
+
+DEFAULT_WORKERS = 3
+DEFAULT_QUEUE_SIZE = 1000
+USER_CACHE_SIZE = 512
+CLOSED_DM_TTL = 6 * 3600
+
+# Jalur kiriman: HIGH (izin moderasi, notifikasi admin) punya worker sendiri dan tidak ikut antri di
+# belakang DM massal; NORMAL didahulukan dari BULK (mis. DM pajak) di antrian biasa.
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 50
+PRIORITY_BULK = 90
+
+
+class _Job:
+    __slots__ = ("user", "user_id", "kwargs", "key", "future", "priority")
+
+    def __init__(self, user, user_id, kwargs, key, future, priority):
+        self.user = user
+        self.user_id = user_id
+        self.kwargs = kwargs
+        self.key = key
+        self.future = future
+        self.priority = priority
+
+
+def _message_key(user_id, kwargs):
+    """Kunci dedup: penerima + isi pesan (content/embed). Pesan dengan view/file tidak digabung."""
+    if kwargs.get("view") is not None or kwargs.get("file") is not None:
+        return None
+    embed = kwargs.get("embed")
+    payload = json.dumps([kwargs.get("content"), embed.to_dict() if embed else None], sort_keys=True, default=str)
+    return (user_id, hashlib.blake2b(payload.encode("utf-8"), digest_size=12).hexdigest())
+
+
+class Outbox:
+    """
+    Antrian DM keluar bersama untuk semua cog.
+
+    - `send()` tidak memblokir: pesan masuk antrian dan langsung mengembalikan future (hasilnya
+      `discord.Message`, atau None kalau gagal / DM tertutup / antrian penuh). Boleh di-await atau diabaikan.
+    - `priority=PRIORITY_HIGH` masuk jalur sendiri dengan worker khusus, jadi DM izin moderasi tidak
+      menunggu DM massal. NORMAL/BULK berbagi antrian terbatas; NORMAL selalu diambil duluan.
+    - Batas kirim mengikuti bucket rate limit per route dari header Discord (`X-RateLimit-*`) yang sudah
+      ditangani HTTP client discord.py; outbox tidak menambah batas global buatan sendiri. Pesan ke
+      penerima yang sama tetap terkirim berurutan.
+    - Pesan identik ke penerima yang sama yang masih antri digabung jadi satu kiriman.
+    - User di-resolve dari cache bot / cache sendiri sebelum `fetch_user`; penerima yang menutup DM
+      diingat sebentar supaya tidak dicoba terus.
+    """
+
+    def __init__(self, bot=None, workers=None, max_queue=None):
+        self.bot = bot
+        self.workers = workers or int(os.getenv("OUTBOX_WORKERS", DEFAULT_WORKERS))
+        self.max_queue = max_queue or int(os.getenv("OUTBOX_QUEUE_SIZE", DEFAULT_QUEUE_SIZE))
+        self.queue = asyncio.PriorityQueue()
+        self.urgent = asyncio.Queue()
+        self._seq = itertools.count()
+        self._route_locks = weakref.WeakValueDictionary()
+        self._pending = {}
+        self._users = OrderedDict()
+        self._closed_dm = {}
+        self._tasks = []
+        self.stats = {"sent": 0, "failed": 0, "coalesced": 0, "dropped": 0, "urgent": 0}
+
+    # --- API untuk cog ---
+    def send(self, user, content=None, *, priority=PRIORITY_NORMAL, **kwargs):
+        """Antrikan DM ke `user` (objek User/Member atau ID). Mengembalikan future."""
+        if content is not None:
+            kwargs["content"] = content
+        user_id = user if isinstance(user, int) else user.id
+        future = asyncio.get_running_loop().create_future()
+
+        closed_until = self._closed_dm.get(user_id)
+        if closed_until is not None:
+            if closed_until > time.monotonic():
+                future.set_result(None)
+                return future
+            del self._closed_dm[user_id]
+
+        key = _message_key(user_id, kwargs)
+        if key is not None and key in self._pending:
+            pending = self._pending[key]
+            self.stats["coalesced"] += 1
+            if priority >= pending.priority:
+                return pending.future
+            # Kiriman identik dengan prioritas lebih tinggi menggantikan yang masih antri (future sama)
+            pending.kwargs = None
+            future = pending.future
+
+        job = _Job(None if isinstance(user, int) else user, user_id, kwargs, key, future, priority)
+        if priority <= PRIORITY_HIGH:
+            self.urgent.put_nowait(job)
+            self.stats["urgent"] += 1
+        elif self.queue.qsize() >= self.max_queue:
+            self.stats["dropped"] += 1
+            log.warning(f"Outbox penuh, DM ke {user_id} dibuang.")
+            future.set_result(None)
+            return future
+        else:
+            self.queue.put_nowait((priority, next(self._seq), job))
+        if key is not None:
+            self._pending[key] = job
+        return future
+
+    async def resolve_user(self, user_id):
+        """User dari cache bot / cache outbox; `fetch_user` hanya kalau belum pernah dilihat."""
+        user_id = int(user_id)
+        user = self.bot.get_user(user_id) if self.bot else None
+        if user is not None:
+            return user
+        user = self._users.get(user_id)
+        if user is not None:
+            self._users.move_to_end(user_id)
+            return user
+        user = await self.bot.fetch_user(user_id)
+        self._users[user_id] = user
+        while len(self._users) > USER_CACHE_SIZE:
+            self._users.popitem(last=False)
+        return user
+
+    # --- worker ---
+    def _route_lock(self, user_id):
+        lock = self._route_locks.get(user_id)
+        if lock is None:
+            lock = asyncio.Lock()
+            self._route_locks[user_id] = lock
+        return lock
+
+    async def _deliver(self, job):
+        if job.key is not None and self._pending.get(job.key) is job:
+            del self._pending[job.key]
+        if job.kwargs is None or job.future.cancelled():
+            return
+        try:
+            user = job.user or await self.resolve_user(job.user_id)
+            # discord.py menunggu sendiri sesuai header rate limit route-nya (dan retry saat 429)
+            message = await user.send(**job.kwargs)
+            self.stats["sent"] += 1
+        except discord.Forbidden:
+            self._closed_dm[job.user_id] = time.monotonic() + CLOSED_DM_TTL
+            message = None
+            self.stats["failed"] += 1
+            log.info(f"DM ke {job.user_id} gagal: DM tertutup.")
+        except Exception as e:
+            message = None
+            self.stats["failed"] += 1
+            log.warning(f"DM ke {job.user_id} gagal: {e}")
+        if not job.future.done():
+            job.future.set_result(message)
+
+    async def _worker(self, queue):
+        while True:
+            item = await queue.get()
+            job = item[-1] if isinstance(item, tuple) else item
+            try:
+                async with self._route_lock(job.user_id):
+                    await self._deliver(job)
+            except Exception as e:
+                log.error(f"❌ Worker outbox error: {e}", exc_info=True)
+            finally:
+                queue.task_done()
+
+    def start(self):
+        loop = asyncio.get_running_loop()
+        if any(not task.done() for task in self._tasks):
+            return
+        # Satu worker khusus jalur HIGH, sisanya untuk antrian NORMAL/BULK
+        self._tasks = [loop.create_task(self._worker(self.urgent))]
+        self._tasks += [loop.create_task(self._worker(self.queue)) for _ in range(self.workers)]
+
+    async def close(self, timeout=10):
+        """Kirim sisa antrian (maks `timeout` detik), lalu hentikan worker."""
+        if self._tasks and not (self.queue.empty() and self.urgent.empty()):
+            try:
+                await asyncio.wait_for(asyncio.gather(self.urgent.join(), self.queue.join()), timeout=timeout)
+            except asyncio.TimeoutError:
+                log.warning(f"Outbox ditutup dengan {self.urgent.qsize() + self.queue.qsize()} DM belum terkirim.")
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+
+
+_outbox = None
+
+
+def get_outbox(bot=None):
+    global _outbox
+    if _outbox is None:
+        _outbox = Outbox(bot)
+    elif bot is not None:
+        _outbox.bot = bot
+    return _outbox
@@ -0,0 +1,213 @@
+import logging
+import re
+
+from utils.textindex import BM25Index
+
+log = logging.getLogger(__name__)
+
+CHARS_PER_TOKEN = 4
+SECTION_MAX_CHARS = 1200
+SECTION_MIN_CHARS = 200
+
+# Budget token per bagian konteks untuk tiap jenis request. 0 = bagian itu tidak dikirim.
+DEFAULT_BUDGETS = {
+    "chat": {"learned": 1500, "knowledge": 800, "roles": 150, "history": 600},
+    "proxy": {"learned": 2500, "knowledge": 400, "roles": 0, "history": 600},
+    "curhat": {"learned": 600, "knowledge": 300, "roles": 0, "history": 800},
+    "nimbrung": {"learned": 800, "knowledge": 300, "roles": 0, "history": 600},
+    "ping": {"learned": 300, "knowledge": 0, "roles": 0, "history": 300},
+}
+
+_BLOCK_SPLIT_RE = re.compile(r'\n\s*\n')
+_SENTENCE_SPLIT_RE = re.compile(r'(?<=[.!?])\s+')
+
+
+def estimate_tokens(text):
+    """Perkiraan kasar (~4 karakter per token), cukup untuk membandingkan dengan budget."""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def _split_long(block, max_chars):
+    units = []
+    for line in block.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        if len(line) <= max_chars:
+            units.append(line)
+            continue
+        for sentence in _SENTENCE_SPLIT_RE.split(line):
+            while len(sentence) > max_chars:
+                units.append(sentence[:max_chars])
+                sentence = sentence[max_chars:]
+            if sentence:
+                units.append(sentence)
+    return units
+
+
+def split_sections(text, max_chars=SECTION_MAX_CHARS, min_chars=SECTION_MIN_CHARS):
+    """
+    Potong teks panjang jadi bagian-bagian <= `max_chars`. Batas utama paragraf (baris kosong);
+    paragraf pendek digabung sampai `min_chars`, paragraf kepanjangan dipecah per baris/kalimat.
+    """
+    sections = []
+    current = ""
+    for block in _BLOCK_SPLIT_RE.split(text):
+        block = block.strip()
+        if not block:
+            continue
+        if current and len(current) >= min_chars:
+            sections.append(current)
+            current = ""
+        for unit in _split_long(block, max_chars) if len(block) > max_chars else [block]:
+            if current and len(current) + len(unit) + 1 > max_chars:
+                sections.append(current)
+                current = ""
+            current = f"{current}\n{unit}" if current else unit
+    if current:
+        sections.append(current)
+    return sections
+
+
+def _pack(ranked, all_items, budget, cost):
+    """Ambil item relevan dulu, lalu isi sisa budget dengan item awal; hasil tetap urutan asli."""
+    picked = set()
+    used = 0
+    for i in list(ranked) + list(range(len(all_items))):
+        if i in picked:
+            continue
+        item_cost = cost(all_items[i])
+        if used + item_cost > budget:
+            continue
+        picked.add(i)
+        used += item_cost
+    return sorted(picked)
+
+
+class _SectionIndex:
+    """Index BM25 atas bagian-bagian satu teks; dibangun ulang hanya saat teksnya berubah."""
+
+    def __init__(self):
+        self.source = None
+        self.sections = []
+        self.index = BM25Index(title_weight=0)
+
+    def ensure(self, text):
+        if text == self.source:
+            return
+        self.source = text
+        self.sections = split_sections(text)
+        self.index = BM25Index(title_weight=0)
+        for i, section in enumerate(self.sections):
+            self.index.add(i, "", section, i)
+
+
+class PromptBudgeter:
+    """
+    Menyusun konteks prompt Jarkasih sesuai budget token per jenis request.
+
+    - Ringkasan hasil belajar dipotong per bagian, di-rank terhadap pesan user, lalu diambil
+      sebanyak muat di budget (bagian yang diambil tetap urut seperti aslinya).
+    - Daftar role per guild di-cache (nama + index) sampai di-`invalidate_roles()`.
+    - `record()` mencatat perkiraan ukuran prompt per jenis request untuk tuning budget.
+    """
+
+    def __init__(self, overrides=None):
+        self.overrides = overrides if overrides is not None else {}
+        self._learned = _SectionIndex()
+        self._roles = {}
+        self.stats = {}
+
+    def budget(self, request_type, part):
+        override = self.overrides.get(request_type, {}).get(part)
+        if override is not None:
+            return int(override)
+        return DEFAULT_BUDGETS.get(request_type, DEFAULT_BUDGETS["chat"]).get(part, 0)
+
+    def learned_for(self, summary, query, budget):
+        """Mengembalikan `(teks, jumlah_bagian_dipakai, total_bagian)`."""
+        if budget <= 0 or not summary:
+            return "", 0, 0
+        if estimate_tokens(summary) <= budget:
+            return summary, 1, 1
+        learned = self._learned
+        learned.ensure(summary)
+        ranked = [i for _, i in learned.index.search(query, limit=len(learned.sections))]
+        picked = _pack(ranked, learned.sections, budget, estimate_tokens)
+        return "\n\n".join(learned.sections[i] for i in picked), len(picked), len(learned.sections)
+
+    def _roster(self, guild):
+        cached = self._roles.get(guild.id)
+        if cached is None:
+            # Urut dari role tertinggi, seperti tampilan di Discord
+            guild_roles = [r for r in reversed(guild.roles) if r.name != "@everyone"]
+            roles = [f"{r.name} (ID: {r.id})" for r in guild_roles]
+            index = BM25Index(title_weight=0)
+            for i, role in enumerate(guild_roles):
+                # ID ikut diindeks supaya mention <@&ID> di pesan juga cocok
+                index.add(i, "", f"{role.name} {role.id}", i)
+            cached = self._roles[guild.id] = (roles, index)
+        return cached
+
+    def roles_for(self, guild, query, budget):
+        if budget <= 0 or guild is None:
+            return []
+        roles, index = self._roster(guild)
+        if estimate_tokens(", ".join(roles)) <= budget:
+            return roles
+        ranked = [i for _, i in index.search(query, limit=len(roles))]
+        return [roles[i] for i in _pack(ranked, roles, budget, lambda r: estimate_tokens(r) + 1)]
+
+    def invalidate_roles(self, guild_id=None):
+        if guild_id is None:
+            self._roles.clear()
+        else:
+            self._roles.pop(guild_id, None)
+
+    @staticmethod
+    def fit_items(items, budget, min_tail=50):
+        """Ambil item berurutan selama muat; item pertama yang kelebihan dipotong kalau sisa budget masih layak."""
+        kept = []
+        used = 0
+        for item in items:
+            cost = estimate_tokens(item) + 1
+            if used + cost <= budget:
+                kept.append(item)
+                used += cost
+                continue
+            remaining = budget - used
+            if remaining >= min_tail:
+                kept.append(item[:remaining * CHARS_PER_TOKEN - 3] + "...")
+            break
+        return kept
+
+    @staticmethod
+    def trim_history(lines, budget):
+        """Ambil chat terbaru yang muat di budget, urutan tetap lama -> baru."""
+        kept = []
+        used = 0
+        for line in reversed(lines):
+            cost = estimate_tokens(line) + 1
+            if used + cost > budget:
+                break
+            kept.append(line)
+            used += cost
+        kept.reverse()
+        return kept
+
+    def record(self, request_type, prompt, detail=""):
+        tokens = estimate_tokens(prompt)
+        entry = self.stats.setdefault(request_type, {"count": 0, "total": 0, "max": 0})
+        entry["count"] += 1
+        entry["total"] += tokens
+        entry["max"] = max(entry["max"], tokens)
+        log.info(f"Prompt [{request_type}] ~{tokens} token ({len(prompt)} karakter){' | ' + detail if detail else ''}")
+        return tokens
+
+    def stats_text(self):
+        if not self.stats:
+            return "Belum ada prompt yang dikirim."
+        return "\n".join(
+            f"{name}: {s['count']}x, rata-rata ~{s['total'] // s['count']} token, maks ~{s['max']}"
+            for name, s in sorted(self.stats.items())
+        )
@@ -0,0 +1,229 @@
+import asyncio
+import io
+import logging
+import os
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import aiohttp
+from PIL import Image, ImageDraw, ImageFont
+
+log = logging.getLogger(__name__)
+
+AVATAR_SIZE = 256
+CARD_SIZE = (900, 260)
+CARD_AVATAR_SIZE = 200
+DEFAULT_WORKERS = 2
+AVATAR_CACHE_SIZE = 256
+CARD_CACHE_SIZE = 256
+DOWNLOAD_TIMEOUT = 15
+
+BACKGROUND = (35, 39, 42, 255)
+ACCENT = (155, 89, 182, 255)
+BAR_BACKGROUND = (72, 75, 78, 255)
+TEXT = (255, 255, 255, 255)
+TEXT_MUTED = (185, 187, 190, 255)
+
+# --- Bagian yang jalan di proses worker ---
+_masks = {}
+_fonts = {}
+
+
+def _mask(size):
+    """Mask lingkaran dibuat sekali per ukuran per proses, lalu dipakai ulang."""
+    mask = _masks.get(size)
+    if mask is None:
+        mask = Image.new("L", (size, size), 0)
+        ImageDraw.Draw(mask).ellipse((0, 0, size, size), fill=255)
+        _masks[size] = mask
+    return mask
+
+
+def _font(size):
+    font = _fonts.get(size)
+    if font is None:
+        try:
+            font = ImageFont.truetype("DejaVuSans-Bold.ttf", size)
+        except OSError:
+            try:
+                # Pillow >= 10.1: font bawaan yang bisa diskalakan, jadi tata letak kartu tetap sama
+                font = ImageFont.load_default(size=size)
+            except TypeError:
+                font = ImageFont.load_default()
+        _fonts[size] = font
+    return font
+
+
+def _circle(img, size):
+    img = img.convert("RGBA").resize((size, size), Image.LANCZOS)
+    output = Image.new("RGBA", (size, size))
+    output.paste(img, (0, 0), _mask(size))
+    return output
+
+
+def render_avatar(raw, size=AVATAR_SIZE):
+    """Bytes gambar avatar -> PNG avatar bulat."""
+    with Image.open(io.BytesIO(raw)) as img:
+        output = _circle(img, size)
+    buffer = io.BytesIO()
+    output.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def render_card(avatar_png, name, level, exp_in_level, exp_per_level, total_exp, balance):
+    """Gambar kartu rank lengkap (avatar, nama, level, bar EXP, saldo) sebagai PNG."""
+    width, height = CARD_SIZE
+    card = Image.new("RGBA", CARD_SIZE, BACKGROUND)
+    draw = ImageDraw.Draw(card)
+
+    margin = (height - CARD_AVATAR_SIZE) // 2
+    if avatar_png:
+        with Image.open(io.BytesIO(avatar_png)) as avatar:
+            card.paste(_circle(avatar, CARD_AVATAR_SIZE), (margin, margin), _mask(CARD_AVATAR_SIZE))
+
+    left = margin * 2 + CARD_AVATAR_SIZE
+    right = width - margin
+    draw.text((left, margin), name[:28], font=_font(40), fill=TEXT)
+    draw.text((left, margin + 58), f"Level {level}", font=_font(30), fill=ACCENT)
+    draw.text((right, margin + 62), f"{balance:,} RSWN", font=_font(26), fill=TEXT_MUTED, anchor="ra")
+
+    bar_top = margin + 112
+    bar_height = 36
+    draw.rounded_rectangle((left, bar_top, right, bar_top + bar_height), radius=bar_height // 2, fill=BAR_BACKGROUND)
+    ratio = max(0.0, min(1.0, exp_in_level / exp_per_level)) if exp_per_level else 0.0
+    if ratio > 0:
+        fill_right = max(left + bar_height, left + int((right - left) * ratio))
+        draw.rounded_rectangle((left, bar_top, fill_right, bar_top + bar_height), radius=bar_height // 2, fill=ACCENT)
+    draw.text((left, bar_top + bar_height + 12), f"{exp_in_level:,} / {exp_per_level:,} EXP", font=_font(22), fill=TEXT_MUTED)
+    draw.text((right, bar_top + bar_height + 12), f"Total {total_exp:,} EXP", font=_font(22), fill=TEXT_MUTED, anchor="ra")
+
+    buffer = io.BytesIO()
+    card.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+# --- Service di event loop ---
+class RankCardRenderer:
+    """
+    Render avatar bulat dan kartu rank di process pool, bukan di event loop.
+
+    - Avatar (sudah bulat) di-cache LRU per hash avatar Discord, jadi hanya diunduh ulang kalau
+      user ganti avatar. Unduhan memakai session HTTP bersama.
+    - Kartu jadi di-cache per user bersama kunci datanya (avatar, nama, level, EXP, saldo); `!rank`
+      berulang tanpa perubahan data langsung dilayani dari memori.
+    - Kalau process pool tidak bisa dipakai (mis. host tanpa fork), otomatis pindah ke thread executor.
+    """
+
+    def __init__(self, session=None, workers=None, avatar_cache=AVATAR_CACHE_SIZE, card_cache=CARD_CACHE_SIZE):
+        self.session = session
+        self.workers = workers or int(os.getenv("RANK_RENDER_WORKERS", DEFAULT_WORKERS))
+        self.avatar_cache = avatar_cache
+        self.card_cache = card_cache
+        self._executor = None
+        self._use_threads = False
+        self._avatars = OrderedDict()
+        self._cards = OrderedDict()
+        self._inflight = {}
+
+    async def _run(self, func, *args):
+        loop = asyncio.get_running_loop()
+        if not self._use_threads:
+            try:
+                if self._executor is None:
+                    self._executor = ProcessPoolExecutor(max_workers=self.workers)
+                future = loop.run_in_executor(self._executor, func, *args)
+            except (OSError, NotImplementedError, RuntimeError) as e:
+                self._fallback(e)
+            else:
+                try:
+                    return await future
+                except BrokenProcessPool as e:
+                    self._fallback(e)
+        return await loop.run_in_executor(None, func, *args)
+
+    def _fallback(self, error):
+        log.warning(f"Process pool render tidak bisa dipakai ({error}), pindah ke thread executor.")
+        self._use_threads = True
+        self.close()
+
+    def _remember(self, store, key, value, limit):
+        store[key] = value
+        store.move_to_end(key)
+        while len(store) > limit:
+            store.popitem(last=False)
+
+    async def _download(self, url):
+        session = self.session
+        owns_session = session is None or session.closed
+        if owns_session:
+            session = aiohttp.ClientSession()
+        try:
+            async with session.get(url, timeout=aiohttp.ClientTimeout(total=DOWNLOAD_TIMEOUT)) as resp:
+                if resp.status != 200:
+                    return None
+                return await resp.read()
+        finally:
+            if owns_session:
+                await session.close()
+
+    @staticmethod
+    def avatar_key(user):
+        return user.display_avatar.key
+
+    async def _load_avatar(self, user):
+        raw = await self._download(user.display_avatar.replace(size=AVATAR_SIZE, format="png").url)
+        if not raw:
+            return None
+        return await self._run(render_avatar, raw, AVATAR_SIZE)
+
+    async def avatar(self, user):
+        """PNG avatar bulat 256px untuk `user`."""
+        key = self.avatar_key(user)
+        cached = self._avatars.get(key)
+        if cached is not None:
+            self._avatars.move_to_end(key)
+            return cached
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._load_avatar(user))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        try:
+            png = await asyncio.shield(task)
+        except Exception as e:
+            log.warning(f"Gagal memuat avatar {user}: {e}")
+            return None
+        if png:
+            self._remember(self._avatars, key, png, self.avatar_cache)
+        return png
+
+    async def card(self, user, level, exp, exp_per_level, balance):
+        """PNG kartu rank; dirender ulang hanya kalau data user berubah."""
+        exp_in_level = exp % exp_per_level if exp_per_level else 0
+        key = (self.avatar_key(user), user.display_name, level, exp, balance)
+        cached = self._cards.get(user.id)
+        if cached is not None and cached[0] == key:
+            self._cards.move_to_end(user.id)
+            return cached[1]
+        avatar_png = await self.avatar(user)
+        png = await self._run(render_card, avatar_png, user.display_name, level, exp_in_level, exp_per_level, exp, balance)
+        self._remember(self._cards, user.id, (key, png), self.card_cache)
+        return png
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+_renderer = None
+
+
+def get_rank_renderer(session=None):
+    global _renderer
+    if _renderer is None:
+        _renderer = RankCardRenderer(session)
+    elif session is not None:
+        _renderer.session = session
+    return _renderer
@@ -0,0 +1,193 @@
+import heapq
+import time
+from collections import deque
+
+RING_SIZE = 32
+# Jendela terpanjang yang dipakai cog; entri lebih tua dari ini tidak pernah ditanya lagi
+HORIZON = 30.0
+IDLE_TTL = 300.0
+
+
+def content_hash(content):
+    """Hash isi pesan untuk deteksi duplikat (None untuk pesan tanpa teks)."""
+    text = " ".join((content or "").lower().split())
+    return hash(text) if text else None
+
+
+class _Window:
+    """Ring buffer pesan terakhir satu user: (waktu, hash isi, channel id, message id)."""
+    __slots__ = ("entries", "hashes", "channels", "last_seen", "marks")
+
+    def __init__(self, size):
+        self.entries = deque(maxlen=size)
+        self.hashes = {}
+        self.channels = {}
+        self.last_seen = 0.0
+        self.marks = {}
+
+    def _drop_left(self):
+        _, digest, channel_id, _ = self.entries.popleft()
+        if digest is not None:
+            left = self.hashes[digest] - 1
+            if left:
+                self.hashes[digest] = left
+            else:
+                del self.hashes[digest]
+        left = self.channels[channel_id] - 1
+        if left:
+            self.channels[channel_id] = left
+        else:
+            del self.channels[channel_id]
+
+    def push(self, now, digest, channel_id, message_id, horizon):
+        if len(self.entries) == self.entries.maxlen:
+            self._drop_left()
+        self.entries.append((now, digest, channel_id, message_id))
+        if digest is not None:
+            self.hashes[digest] = self.hashes.get(digest, 0) + 1
+        self.channels[channel_id] = self.channels.get(channel_id, 0) + 1
+        self.last_seen = now
+        self.expire(now - horizon)
+
+    def expire(self, cutoff):
+        while self.entries and self.entries[0][0] < cutoff:
+            self._drop_left()
+
+    def recent(self, now, seconds, scope=None):
+        """Entri dalam `seconds` terakhir (dan setelah `mark(scope)`), dari yang terbaru."""
+        cutoff = now - seconds
+        mark = self.marks.get(scope)
+        if mark is not None and mark > cutoff:
+            cutoff = mark
+        for entry in reversed(self.entries):
+            if entry[0] < cutoff or (mark is not None and entry[0] <= mark):
+                break
+            yield entry
+
+
+class SpamEngine:
+    """
+    Mesin deteksi spam sliding-window bersama (moderation dan Gemini memakai satu instance).
+
+    - Per (guild, user) ada ring buffer ukuran tetap; entri di luar `horizon` dibuang dari kiri saat
+      pesan baru masuk, dan jumlah per hash isi / per channel di dalam horizon dijaga inkremental.
+      Pertanyaan "N pesan / N channel / isi sama N kali dalam T detik" paling banyak melihat
+      `RING_SIZE` entri.
+    - Pesan yang sama dari beberapa cog hanya tercatat sekali (dicek lewat message id).
+    - Cog bisa "mereset" hitungannya sendiri lewat `mark(scope)` tanpa menghapus data cog lain.
+    - User yang diam lebih dari `idle_ttl` dibuang lewat heap global, jadi memori tetap terbatas
+      tanpa loop pembersih terpisah.
+    """
+
+    def __init__(self, ring_size=RING_SIZE, horizon=HORIZON, idle_ttl=IDLE_TTL, clock=time.time):
+        self.ring_size = ring_size
+        self.horizon = horizon
+        self.idle_ttl = idle_ttl
+        self.clock = clock
+        self._windows = {}
+        self._idle_heap = []
+
+    def __len__(self):
+        return len(self._windows)
+
+    def observe(self, message, now=None):
+        """Catat pesan Discord. Mengembalikan kunci (guild_id, user_id) untuk query berikutnya."""
+        key = (message.guild.id if message.guild else None, message.author.id)
+        self.record(key, message.content, message.channel.id, message.id, now)
+        return key
+
+    def record(self, key, content, channel_id, message_id, now=None):
+        now = self.clock() if now is None else now
+        self.evict_idle(now)
+        window = self._windows.get(key)
+        if window is None:
+            window = self._windows[key] = _Window(self.ring_size)
+            heapq.heappush(self._idle_heap, (now, key))
+        elif any(entry[3] == message_id for entry in window.entries):
+            return window
+        window.push(now, content_hash(content), channel_id, message_id, self.horizon)
+        return window
+
+    def evict_idle(self, now=None):
+        now = self.clock() if now is None else now
+        cutoff = now - self.idle_ttl
+        while self._idle_heap and self._idle_heap[0][0] < cutoff:
+            _, key = heapq.heappop(self._idle_heap)
+            window = self._windows.get(key)
+            if window is None:
+                continue
+            if window.last_seen < cutoff:
+                del self._windows[key]
+            else:
+                # Satu entri heap per user: yang masih aktif dimasukkan lagi dengan waktu terakhirnya
+                heapq.heappush(self._idle_heap, (window.last_seen, key))
+
+    def _window(self, key, now):
+        window = self._windows.get(key)
+        if window is not None:
+            window.expire(now - self.horizon)
+        return window
+
+    # --- query ---
+    def count(self, key, seconds, scope=None, now=None):
+        """Jumlah pesan dalam `seconds` terakhir."""
+        now = self.clock() if now is None else now
+        window = self._window(key, now)
+        if window is None:
+            return 0
+        if seconds >= self.horizon and scope not in window.marks:
+            return len(window.entries)
+        return sum(1 for _ in window.recent(now, seconds, scope))
+
+    def channels(self, key, seconds, scope=None, now=None):
+        """Jumlah channel berbeda yang dikirimi pesan dalam `seconds` terakhir."""
+        now = self.clock() if now is None else now
+        window = self._window(key, now)
+        if window is None:
+            return 0
+        if seconds >= self.horizon and scope not in window.marks:
+            return len(window.channels)
+        return len({entry[2] for entry in window.recent(now, seconds, scope)})
+
+    def duplicates(self, key, content, seconds, scope=None, now=None):
+        """Berapa kali isi `content` dikirim dalam `seconds` terakhir (0 untuk pesan tanpa teks)."""
+        digest = content_hash(content)
+        if digest is None:
+            return 0
+        now = self.clock() if now is None else now
+        window = self._window(key, now)
+        if window is None:
+            return 0
+        if seconds >= self.horizon and scope not in window.marks:
+            return window.hashes.get(digest, 0)
+        return sum(1 for entry in window.recent(now, seconds, scope) if entry[1] == digest)
+
+    def mark(self, key, scope, now=None):
+        """Mulai hitungan baru untuk `scope` (pesan sebelum titik ini tidak dihitung lagi)."""
+        window = self._windows.get(key)
+        if window is not None:
+            window.marks[scope] = self.clock() if now is None else now
+
+    def take(self, key, seconds, scope=None, now=None):
+        """
+        Daftar (channel_id, message_id) dalam `seconds` terakhir untuk dihapus, lalu `mark(scope)`
+        supaya pesan yang sama tidak memicu aksi lagi.
+        """
+        now = self.clock() if now is None else now
+        window = self._window(key, now)
+        if window is None:
+            return []
+        picked = [(entry[2], entry[3]) for entry in window.recent(now, seconds, scope)]
+        picked.reverse()
+        window.marks[scope] = now
+        return picked
+
+
+_engine = None
+
+
+def get_spam_engine():
+    global _engine
+    if _engine is None:
+        _engine = SpamEngine()
+    return _engine
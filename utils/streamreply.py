@@ -0,0 +1,110 @@
+import re
+import time
+
+DISCORD_MSG_LIMIT = 2000
+DEFAULT_EDIT_INTERVAL = 1.2
+FIRST_SEND_MIN_CHARS = 120
+
+# Tag aksi `$$...$$` tidak boleh sempat tampil saat streaming; tag yang belum tertutup juga disembunyikan
+_CLOSED_TAG_RE = re.compile(r'\$\$.*?\$\$', re.DOTALL)
+_SENTENCE_END_RE = re.compile(r'[.!?\n]')
+
+
+def visible_text(raw):
+    text = _CLOSED_TAG_RE.sub('', raw)
+    open_tag = text.find('$$')
+    if open_tag != -1:
+        text = text[:open_tag]
+    return text.strip()
+
+
+def split_message(text, limit=DISCORD_MSG_LIMIT):
+    """
+    Potong teks jadi potongan <= `limit`, diusahakan di batas baris/spasi. Potongan awal
+    hanya bergantung pada `limit` karakter pertamanya, jadi stabil selama teks terus bertambah.
+    """
+    chunks = []
+    while len(text) > limit:
+        cut = text.rfind('\n', limit // 2, limit)
+        if cut == -1:
+            cut = text.rfind(' ', limit // 2, limit)
+        if cut == -1:
+            cut = limit
+        chunks.append(text[:cut])
+        text = text[cut:].lstrip()
+    if text:
+        chunks.append(text)
+    return chunks
+
+
+class StreamingReply:
+    """
+    Menampilkan jawaban model yang di-stream sebagai pesan Discord yang terus di-edit.
+
+    - Pesan pertama dikirim begitu ada satu kalimat (atau `FIRST_SEND_MIN_CHARS` karakter).
+    - Edit dibatasi paling sering tiap `edit_interval` detik per pesan.
+    - Lewat batas 2000 karakter, pesan lama dikunci dan lanjut di pesan baru.
+    - `finish(final_text)` merender teks final (setelah tag aksi diproses) ke pesan-pesan yang ada.
+
+    `send_first(content)` / `send_next(content)` adalah coroutine yang mengembalikan `discord.Message`.
+    """
+
+    def __init__(self, send_first, send_next, limit=DISCORD_MSG_LIMIT, edit_interval=DEFAULT_EDIT_INTERVAL):
+        self.send_first = send_first
+        self.send_next = send_next
+        self.limit = limit
+        self.edit_interval = edit_interval
+        self.raw = ""
+        self.messages = []
+        self._shown = []
+        self._last_edit = 0.0
+        self.started_at = time.monotonic()
+        self.first_visible_at = None
+
+    @property
+    def time_to_first_visible(self):
+        if self.first_visible_at is None:
+            return None
+        return self.first_visible_at - self.started_at
+
+    async def feed(self, piece):
+        self.raw += piece
+        text = visible_text(self.raw)
+        if not self.messages:
+            if not text or (len(text) < FIRST_SEND_MIN_CHARS and not _SENTENCE_END_RE.search(text)):
+                return
+        elif time.monotonic() - self._last_edit < self.edit_interval and len(text) <= self.limit * len(self.messages):
+            return
+        await self._render(split_message(text, self.limit), final=False)
+
+    async def _send(self, content):
+        send = self.send_next if self.messages else self.send_first
+        message = await send(content)
+        if self.first_visible_at is None:
+            self.first_visible_at = time.monotonic()
+        self.messages.append(message)
+        self._shown.append(content)
+
+    async def _render(self, chunks, final):
+        for i, chunk in enumerate(chunks):
+            if i < len(self.messages):
+                if self._shown[i] != chunk:
+                    await self.messages[i].edit(content=chunk)
+                    self._shown[i] = chunk
+                    self._last_edit = time.monotonic()
+            else:
+                await self._send(chunk)
+                self._last_edit = time.monotonic()
+        if final:
+            # Teks final bisa lebih pendek dari yang sempat tampil (mis. tag aksi dibuang)
+            while len(self.messages) > len(chunks):
+                message = self.messages.pop()
+                self._shown.pop()
+                try:
+                    await message.delete()
+                except Exception:
+                    pass
+
+    async def finish(self, final_text):
+        await self._render(split_message(final_text.strip(), self.limit), final=True)
+        return self.messages
@@ -0,0 +1,254 @@
+import asyncio
+import logging
+
+from utils.mongo import get_mongo
+
+log = logging.getLogger(__name__)
+
+SUMMARY_STATE_FILE = 'data/summary_state.json'
+CHUNK_CHARS = 12000
+REDUCE_CHARS = 16000
+MAX_NEW_MESSAGES = 5000
+# Batas pesan yang boleh diringkas langsung saat user menunggu (mis. !rangkum)
+INTERACTIVE_MAX_MESSAGES = 1000
+MAX_CACHED_CHUNKS = 60
+MAP_CONCURRENCY = 2
+
+MAP_PROMPT = (
+    "Ringkas potongan log chat Discord di bawah ini jadi catatan padat (maks 15 poin). Catat: topik yang dibahas, "
+    "siapa ngomong/ngapain (tulis nama + ID kalau ada), inside jokes, konflik/dinamika hubungan, dan kejadian penting. "
+    "Jangan mengarang, jangan kasih pembuka/penutup.\n\nLOG CHAT:\n{text}"
+)
+COMBINE_PROMPT = (
+    "Gabungkan catatan-catatan ringkasan chat berikut (urut dari lama ke baru) jadi satu catatan padat. "
+    "Pertahankan nama/ID user, topik, inside jokes, dan kejadian penting; buang pengulangan.\n\n{text}"
+)
+
+
+def default_formatter(msg):
+    """Baris log untuk satu pesan, atau None kalau pesan dilewati (bot / tanpa teks)."""
+    if msg.author.bot or not msg.content:
+        return None
+    return f"[{msg.author.display_name} - ID: {msg.author.id}]: {msg.content}"
+
+
+def chunk_lines(lines, max_chars=CHUNK_CHARS):
+    """Kelompokkan `(message_id, baris)` berurutan jadi chunk dengan total teks <= `max_chars`."""
+    chunks = []
+    current = []
+    size = 0
+    for message_id, line in lines:
+        line = line[:max_chars]
+        if current and size + len(line) + 1 > max_chars:
+            chunks.append(current)
+            current, size = [], 0
+        current.append((message_id, line))
+        size += len(line) + 1
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+class _MessageRef:
+    """Pengganti `discord.Object` untuk parameter `after`/`before` di `channel.history()`."""
+    __slots__ = ("id",)
+
+    def __init__(self, message_id):
+        self.id = message_id
+
+
+class SummaryEngine:
+    """
+    Ringkasan chat channel secara bertahap (map-reduce) dengan checkpoint per channel.
+
+    - Per channel disimpan `checkpoint` (ID pesan terakhir yang sudah diringkas) dan daftar ringkasan
+      per chunk. Tiap update hanya mengambil pesan setelah checkpoint, jadi biayanya sebanding dengan
+      chat baru, bukan seluruh riwayat.
+    - Chat baru dipotong per `CHUNK_CHARS`, tiap chunk diringkas terpisah (map), lalu ringkasan chunk
+      digabung bertingkat sampai muat `REDUCE_CHARS` (reduce).
+    - `merged` menandai chunk yang sudah dilebur ke memori jangka panjang; kalau penggabungan gagal,
+      chunk yang sama dicoba lagi tanpa diringkas ulang.
+
+    `generate(prompt, priority)` adalah coroutine yang mengembalikan teks jawaban model.
+    """
+
+    def __init__(self, generate, path=SUMMARY_STATE_FILE, chunk_chars=CHUNK_CHARS, reduce_chars=REDUCE_CHARS):
+        self.generate = generate
+        self.path = path
+        self.chunk_chars = chunk_chars
+        self.reduce_chars = reduce_chars
+        self._locks = {}
+        self._sem = asyncio.Semaphore(MAP_CONCURRENCY)
+
+    def _state(self):
+        return get_mongo().load(self.path, {})
+
+    def _save(self):
+        get_mongo().save(self.path, self._state())
+
+    def channel_state(self, channel_id):
+        return self._state().setdefault(str(channel_id), {"checkpoint": None, "merged": None, "chunks": []})
+
+    def _lock(self, channel_id):
+        return self._locks.setdefault(channel_id, asyncio.Lock())
+
+    async def _fetch(self, channel, formatter, limit, after=None, before=None):
+        lines = []
+        kwargs = {"limit": limit}
+        if after is not None:
+            kwargs.update(after=_MessageRef(after), oldest_first=True)
+        if before is not None:
+            kwargs["before"] = _MessageRef(before)
+        last_id = None
+        fetched = 0
+        async for msg in channel.history(**kwargs):
+            fetched += 1
+            last_id = msg.id if last_id is None else max(last_id, msg.id)
+            line = formatter(msg)
+            if line:
+                lines.append((msg.id, line))
+        lines.sort(key=lambda item: item[0])
+        return lines, last_id, fetched
+
+    async def _map(self, lines, priority, max_chunks=None):
+        """Ringkas per chunk; `max_chunks` membatasi ke chunk paling baru saja."""
+        async def _one(chunk):
+            text = "\n".join(line for _, line in chunk)
+            async with self._sem:
+                summary = await self.generate(MAP_PROMPT.format(text=text), priority)
+            return {"first": chunk[0][0], "last": chunk[-1][0], "count": len(chunk), "summary": summary.strip()}
+        groups = chunk_lines(lines, self.chunk_chars)
+        if max_chunks is not None:
+            groups = groups[-max_chunks:] if max_chunks > 0 else []
+        return list(await asyncio.gather(*(_one(chunk) for chunk in groups)))
+
+    async def reduce(self, summaries, priority):
+        """Gabung ringkasan bertingkat sampai totalnya muat `reduce_chars`; hasil tetap berupa list teks."""
+        while len(summaries) > 1 and sum(len(s) + 2 for s in summaries) > self.reduce_chars:
+            groups = [[]]
+            size = 0
+            for summary in summaries:
+                if groups[-1] and size + len(summary) + 2 > self.reduce_chars:
+                    groups.append([])
+                    size = 0
+                groups[-1].append(summary)
+                size += len(summary) + 2
+            if len(groups) == len(summaries):
+                # Tiap ringkasan sudah sebesar batas; gabung berpasangan supaya tetap mengecil
+                groups = [summaries[i:i + 2] for i in range(0, len(summaries), 2)]
+
+            async def _combine(group):
+                if len(group) == 1:
+                    return group[0]
+                async with self._sem:
+                    combined = await self.generate(COMBINE_PROMPT.format(text="\n\n---\n\n".join(group)), priority)
+                return combined.strip()
+            summaries = list(await asyncio.gather(*(_combine(group) for group in groups)))
+        return summaries
+
+    async def ingest(self, channel, formatter=default_formatter, initial_limit=200, priority=None, max_new=MAX_NEW_MESSAGES):
+        """
+        Ringkas pesan baru sejak checkpoint, paling banyak `max_new` pesan tertua dulu; checkpoint maju
+        ke pesan terakhir yang diambil, jadi panggilan berikutnya melanjutkan sisanya.
+        Mengembalikan (jumlah pesan yang diringkas, True kalau sudah sampai pesan terbaru).
+        """
+        async with self._lock(channel.id):
+            state = self.channel_state(channel.id)
+            if state["checkpoint"] is None:
+                lines, last_id, _ = await self._fetch(channel, formatter, initial_limit)
+                caught_up = True
+            else:
+                lines, last_id, fetched = await self._fetch(channel, formatter, max_new, after=state["checkpoint"])
+                caught_up = fetched < max_new
+            if last_id is None:
+                return 0, True
+            chunks = await self._map(lines, priority) if lines else []
+            state["chunks"] = (state["chunks"] + chunks)[-MAX_CACHED_CHUNKS:]
+            state["checkpoint"] = max(last_id, state["checkpoint"] or 0)
+            self._save()
+            log.info(f"Ringkasan #{getattr(channel, 'name', channel.id)}: {len(lines)} pesan baru -> {len(chunks)} chunk.")
+            return len(lines), caught_up
+
+    async def backfill(self, channel, count, formatter=default_formatter, priority=None):
+        """
+        Tambah ringkasan untuk `count` pesan sebelum chunk tertua yang tersimpan, sebanyak yang masih
+        muat di cache. Mengembalikan jumlah pesan yang benar-benar ditambahkan.
+        """
+        async with self._lock(channel.id):
+            state = self.channel_state(channel.id)
+            room = MAX_CACHED_CHUNKS - len(state["chunks"])
+            if not state["chunks"] or room <= 0:
+                return 0
+            lines, _, _ = await self._fetch(channel, formatter, count, before=state["chunks"][0]["first"])
+            if not lines:
+                return 0
+            # Yang disimpan hanya chunk yang bersambung dengan cache (paling baru), sisanya tidak diringkas
+            chunks = await self._map(lines, priority, max_chunks=room)
+            state["chunks"] = chunks + state["chunks"]
+            self._save()
+            return sum(chunk["count"] for chunk in chunks)
+
+    def recent_chunks(self, channel_id, message_count):
+        """Chunk terbaru yang (kira-kira) mencakup `message_count` pesan terakhir."""
+        picked = []
+        covered = 0
+        for chunk in reversed(self.channel_state(channel_id)["chunks"]):
+            if covered >= message_count:
+                break
+            picked.append(chunk)
+            covered += chunk["count"]
+        picked.reverse()
+        return picked, covered
+
+    async def digest_recent(self, channel, message_count, formatter=default_formatter, priority=None):
+        """
+        Ringkasan-ringkasan chunk untuk ~`message_count` pesan terakhir (sudah di-reduce). Dipanggil
+        interaktif, jadi pesan yang diringkas langsung dibatasi `INTERACTIVE_MAX_MESSAGES`.
+        """
+        limit = min(message_count, INTERACTIVE_MAX_MESSAGES)
+        _, caught_up = await self.ingest(channel, formatter, initial_limit=limit, priority=priority, max_new=INTERACTIVE_MAX_MESSAGES)
+        if not caught_up:
+            # Cache sudah maju satu batch tapi belum sampai chat terbaru: untuk jawaban ini ringkas
+            # pesan terbaru langsung (tanpa disimpan); sisa antrian dikejar di panggilan berikutnya
+            lines, _, _ = await self._fetch(channel, formatter, limit)
+            chunks = await self._map(lines, priority) if lines else []
+            return await self.reduce([chunk["summary"] for chunk in chunks], priority), sum(chunk["count"] for chunk in chunks)
+        chunks, covered = self.recent_chunks(channel.id, message_count)
+        if chunks and covered < message_count:
+            await self.backfill(channel, min(message_count - covered, INTERACTIVE_MAX_MESSAGES), formatter, priority)
+            chunks, covered = self.recent_chunks(channel.id, message_count)
+        return await self.reduce([chunk["summary"] for chunk in chunks], priority), covered
+
+    async def merge_into(self, channel, memory, merge, formatter=default_formatter, initial_limit=200, priority=None):
+        """
+        Lebur chat baru ke memori jangka panjang. `merge(memory, digest)` (coroutine) membuat memori
+        baru dari memori lama + ringkasan chat baru. Mengembalikan memori baru, atau None kalau tidak
+        ada chat baru sejak penggabungan terakhir.
+        """
+        await self.ingest(channel, formatter, initial_limit=initial_limit, priority=priority)
+        state = self.channel_state(channel.id)
+        merged = state.get("merged") or 0
+        pending = [chunk for chunk in state["chunks"] if chunk["last"] > merged]
+        if not pending:
+            return None
+        digest = "\n\n".join(await self.reduce([chunk["summary"] for chunk in pending], priority))
+        new_memory = await merge(memory, digest)
+        state["merged"] = pending[-1]["last"]
+        self._save()
+        return new_memory
+
+    def reset(self, channel_id):
+        self._state().pop(str(channel_id), None)
+        self._save()
+
+
+_engine = None
+
+
+def get_summary_engine(generate=None):
+    global _engine
+    if _engine is None:
+        _engine = SummaryEngine(generate)
+    elif generate is not None:
+        _engine.generate = generate
+    return _engine
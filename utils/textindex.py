@@ -0,0 +1,83 @@
+import heapq
+import math
+import re
+from collections import Counter
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+STOPWORDS = frozenset({
+    'cara', 'yang', 'di', 'ke', 'dan', 'ini', 'itu', 'apa', 'gimana', 'siapa', 'dari', 'untuk', 'buat',
+    'dengan', 'atau', 'ada', 'aja', 'saja', 'juga', 'sih', 'dong', 'deh', 'nih', 'tuh', 'ya', 'yg', 'gw',
+    'gue', 'lu', 'lo', 'aku', 'kamu', 'kau', 'dia', 'kita', 'kami', 'mereka', 'ga', 'gak', 'nggak', 'tidak',
+    'bukan', 'udah', 'sudah', 'belum', 'mau', 'bisa', 'kalo', 'kalau', 'kok', 'tapi', 'jadi', 'pada',
+    'the', 'a', 'an', 'of', 'to', 'in', 'is', 'and', 'or', 'for', 'on', 'it'
+})
+
+
+def tokenize(text):
+    return [t for t in TOKEN_RE.findall(text.lower()) if t not in STOPWORDS and len(t) > 1]
+
+
+class BM25Index:
+    """
+    Inverted index token -> {doc_id: tf} dengan ranking BM25.
+
+    Field judul dihitung `title_weight` kali supaya artikel yang judulnya cocok naik ke atas.
+    `add`/`remove` bersifat inkremental; `search` hanya menyentuh posting list token query,
+    jadi biayanya mengikuti jumlah dokumen yang relevan, bukan ukuran seluruh index.
+    """
+
+    def __init__(self, k1=1.5, b=0.75, title_weight=3):
+        self.k1 = k1
+        self.b = b
+        self.title_weight = title_weight
+        self.postings = {}
+        self.doc_len = {}
+        self.docs = {}
+        self._total_len = 0
+
+    def __len__(self):
+        return len(self.docs)
+
+    def add(self, doc_id, title, body, payload=None):
+        if doc_id in self.docs:
+            self.remove(doc_id)
+        counts = Counter(tokenize(body))
+        for token in tokenize(title):
+            counts[token] += self.title_weight
+        for token, tf in counts.items():
+            self.postings.setdefault(token, {})[doc_id] = tf
+        length = sum(counts.values())
+        self.doc_len[doc_id] = length
+        self._total_len += length
+        self.docs[doc_id] = (payload, tuple(counts))
+
+    def remove(self, doc_id):
+        entry = self.docs.pop(doc_id, None)
+        if entry is None:
+            return
+        for token in entry[1]:
+            posting = self.postings.get(token)
+            if posting is not None:
+                posting.pop(doc_id, None)
+                if not posting:
+                    del self.postings[token]
+        self._total_len -= self.doc_len.pop(doc_id, 0)
+
+    def search(self, query, limit=5):
+        """Mengembalikan `[(score, payload), ...]` terurut dari yang paling relevan."""
+        n_docs = len(self.docs)
+        if not n_docs:
+            return []
+        avgdl = self._total_len / n_docs or 1
+        scores = {}
+        for token in set(tokenize(query)):
+            posting = self.postings.get(token)
+            if not posting:
+                continue
+            idf = math.log(1 + (n_docs - len(posting) + 0.5) / (len(posting) + 0.5))
+            for doc_id, tf in posting.items():
+                norm = tf * (self.k1 + 1) / (tf + self.k1 * (1 - self.b + self.b * self.doc_len[doc_id] / avgdl))
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * norm
+        ranked = heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+        return [(score, self.docs[doc_id][0]) for doc_id, score in ranked]
@@ -0,0 +1,211 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+
+from utils.mongo import get_mongo
+
+log = logging.getLogger(__name__)
+
+TIMERS_FILE = 'data/timers.json'
+WIB = timezone(timedelta(hours=7))
+REPEAT_SECONDS = {"daily": 86400, "weekly": 7 * 86400}
+# Batas tidur maksimal, jaga-jaga kalau jam sistem bergeser
+MAX_SLEEP = 6 * 3600
+
+
+def to_epoch(due):
+    """`datetime` (naive dianggap UTC, seperti `datetime.utcnow()`) atau epoch -> epoch detik."""
+    if isinstance(due, datetime):
+        if due.tzinfo is None:
+            due = due.replace(tzinfo=timezone.utc)
+        return due.timestamp()
+    return float(due)
+
+
+def next_time_of_day(hhmm, tz=WIB, now=None):
+    """Epoch kemunculan berikutnya jam 'HH:MM' di zona `tz` (hari ini kalau belum lewat)."""
+    hour, minute = (int(part) for part in hhmm.split(':'))
+    current = datetime.now(tz) if now is None else now.astimezone(tz)
+    target = current.replace(hour=hour, minute=minute, second=0, microsecond=0)
+    if target <= current:
+        target += timedelta(days=1)
+    return target.timestamp()
+
+
+def next_weekday_time(weekday, hhmm, tz=WIB, now=None):
+    """Seperti `next_time_of_day`, tapi hanya pada hari `weekday` (0 = Senin)."""
+    due = next_time_of_day(hhmm, tz, now)
+    days = (weekday - datetime.fromtimestamp(due, tz).weekday()) % 7
+    return due + days * 86400
+
+
+class TimerService:
+    """
+    Timer bersama berbasis min-heap untuk pekerjaan terjadwal semua cog.
+
+    - Job disimpan ke `data/timers.json` (lewat MongoStore), jadi tetap ada setelah restart;
+      job yang terlewat saat bot mati dijalankan sekali begitu handler-nya terdaftar.
+    - Runner tidur tepat sampai deadline terdekat (tanpa polling); kalau tidak ada job, tidur
+      sampai ada job baru.
+    - Handler didaftarkan per `kind` oleh cog: `async def handler(job_id, payload)`.
+      Job `repeat="daily"/"weekly"` dijadwalkan ulang otomatis sebelum handler dipanggil.
+    """
+
+    def __init__(self, path=TIMERS_FILE):
+        self.path = path
+        self._jobs = {}
+        self._heap = []
+        self._seq = itertools.count()
+        self._handlers = {}
+        self._parked = {}
+        self._wakeup = asyncio.Event()
+        self._task = None
+        self._load()
+
+    def _load(self):
+        stored = get_mongo().load(self.path, {})
+        for job_id, job in stored.items():
+            try:
+                self._push(job_id, job["kind"], float(job["due"]), job.get("payload") or {}, job.get("repeat"))
+            except (KeyError, TypeError, ValueError):
+                log.warning(f"Timer {job_id} rusak, dibuang.")
+
+    def _save(self):
+        snapshot = {
+            job_id: {"kind": job["kind"], "due": job["due"], "payload": job["payload"], "repeat": job["repeat"]}
+            for job_id, job in self._jobs.items()
+        }
+        get_mongo().save(self.path, snapshot)
+
+    def _push(self, job_id, kind, due, payload, repeat):
+        seq = next(self._seq)
+        self._jobs[job_id] = {"kind": kind, "due": due, "payload": payload, "repeat": repeat, "seq": seq}
+        heapq.heappush(self._heap, (due, seq, job_id))
+
+    # --- API untuk cog ---
+    def register(self, kind, handler):
+        self._handlers[kind] = handler
+        for job_id in self._parked.pop(kind, []):
+            job = self._jobs.get(job_id)
+            if job is not None:
+                heapq.heappush(self._heap, (job["due"], job["seq"], job_id))
+        self._wakeup.set()
+
+    def unregister(self, kind, handler=None):
+        if handler is None or self._handlers.get(kind) == handler:
+            self._handlers.pop(kind, None)
+
+    def schedule(self, job_id, kind, due, payload=None, repeat=None):
+        """Buat / ganti job `job_id`. `repeat`: None, "daily", atau "weekly"."""
+        if repeat is not None and repeat not in REPEAT_SECONDS:
+            raise ValueError(f"repeat tidak dikenal: {repeat}")
+        self._push(job_id, kind, to_epoch(due), payload or {}, repeat)
+        self._save()
+        self._wakeup.set()
+
+    def schedule_earliest(self, job_id, kind, due, payload=None):
+        """Seperti `schedule`, tapi hanya memajukan job yang sudah ada (tidak pernah memundurkan)."""
+        due = to_epoch(due)
+        job = self._jobs.get(job_id)
+        if job is not None and job["due"] <= due:
+            return
+        self.schedule(job_id, kind, due, payload)
+
+    def cancel(self, job_id):
+        if self._jobs.pop(job_id, None) is not None:
+            self._save()
+
+    def cancel_prefix(self, prefix):
+        doomed = [job_id for job_id in self._jobs if job_id.startswith(prefix)]
+        for job_id in doomed:
+            del self._jobs[job_id]
+        if doomed:
+            self._save()
+        return len(doomed)
+
+    def due_at(self, job_id):
+        job = self._jobs.get(job_id)
+        return job["due"] if job else None
+
+    # --- runner ---
+    def _next_delay(self):
+        while self._heap:
+            due, seq, job_id = self._heap[0]
+            job = self._jobs.get(job_id)
+            if job is None or job["seq"] != seq:
+                heapq.heappop(self._heap)  # entri basi (job dibatalkan / dijadwal ulang)
+                continue
+            return max(0.0, due - time.time())
+        return None
+
+    def _fire_due(self):
+        now = time.time()
+        changed = False
+        while self._heap and self._heap[0][0] <= now:
+            due, seq, job_id = heapq.heappop(self._heap)
+            job = self._jobs.get(job_id)
+            if job is None or job["seq"] != seq:
+                continue
+            handler = self._handlers.get(job["kind"])
+            if handler is None:
+                # Cog pemilik belum dimuat; dijalankan saat handler didaftarkan
+                self._parked.setdefault(job["kind"], []).append(job_id)
+                continue
+            if job["repeat"]:
+                period = REPEAT_SECONDS[job["repeat"]]
+                next_due = due + period
+                if next_due <= now:
+                    # Kelewat beberapa periode (bot mati): cukup sekali, lanjut ke jadwal berikutnya
+                    next_due += ((now - next_due) // period + 1) * period
+                self._push(job_id, job["kind"], next_due, job["payload"], job["repeat"])
+            else:
+                del self._jobs[job_id]
+            changed = True
+            asyncio.get_running_loop().create_task(self._invoke(handler, job_id, job["payload"], due))
+        if changed:
+            self._save()
+
+    async def _invoke(self, handler, job_id, payload, due):
+        late = time.time() - due
+        if late > 5:
+            log.info(f"Timer {job_id} jalan terlambat {late:.0f} detik.")
+        try:
+            await handler(job_id, payload)
+        except Exception as e:
+            log.error(f"❌ Timer {job_id} gagal: {e}", exc_info=True)
+
+    async def _run(self):
+        while True:
+            self._wakeup.clear()
+            delay = self._next_delay()
+            if delay is None:
+                await self._wakeup.wait()
+            elif delay > 0:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=min(delay, MAX_SLEEP))
+                except asyncio.TimeoutError:
+                    pass
+            else:
+                self._fire_due()
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+
+_service = None
+
+
+def get_timers():
+    global _service
+    if _service is None:
+        _service = TimerService()
+    return _service
@@ -0,0 +1,197 @@
+import asyncio
+import logging
+import re
+import time
+from collections import OrderedDict
+
+log = logging.getLogger(__name__)
+
+YOUTUBE_ID_RE = re.compile(
+    r'(?:https?:\/\/)?(?:[a-zA-Z0-9-]+\.)?(?:youtube(?:-nocookie)?\.com\/(?:[^\/\n\s]+\/\S+\/|(?:v|e(?:mbed)?)\/|.*[?&]v=|watch\?.*&v=|live\/|shorts\/)|youtu\.be\/)([a-zA-Z0-9_-]{11})'
+)
+EXPIRE_RE = re.compile(r'[?&/]expire[=/](\d+)')
+
+META_CACHE_SIZE = 5000
+STREAM_CACHE_SIZE = 300
+ALIAS_CACHE_SIZE = 1000
+# Stream URL tanpa parameter expire dianggap berlaku segini
+DEFAULT_STREAM_TTL = 30 * 60
+# URL dibuang sedikit sebelum benar-benar kedaluwarsa supaya FFmpeg tidak dapat 403 di tengah lagu
+STREAM_EXPIRY_MARGIN = 10 * 60
+
+META_FIELDS = ('title', 'artist', 'uploader', 'duration', 'thumbnail', 'thumbnails', 'description', 'webpage_url')
+STREAM_FIELDS = ('id', 'url', 'ext', 'title', 'uploader', 'duration', 'thumbnail', 'webpage_url', 'http_headers')
+
+
+def youtube_id(url):
+    match = YOUTUBE_ID_RE.search(url or '')
+    return match.group(1) if match else None
+
+
+def track_key(url):
+    """Kunci kanonik: `yt:<video id>` untuk link YouTube apa pun bentuknya, selain itu URL/query apa adanya."""
+    video_id = youtube_id(url)
+    return f"yt:{video_id}" if video_id else (url or '').strip()
+
+
+def stream_expiry(stream_url, now=None):
+    """Epoch kapan stream URL sebaiknya tidak dipakai lagi (dari parameter `expire`)."""
+    now = time.time() if now is None else now
+    match = EXPIRE_RE.search(stream_url or '')
+    if match:
+        return int(match.group(1)) - STREAM_EXPIRY_MARGIN
+    return now + DEFAULT_STREAM_TTL
+
+
+def guess_artist(info):
+    """Nama artis dari info yt-dlp; channel Vevo/Official/Topic ditebak dari judul 'Lagu - Artis'."""
+    title = info.get('title') or ''
+    artist = info.get('artist') or info.get('uploader') or 'Unknown Artist'
+    if "Vevo" in artist or "Official" in artist or "Topic" in artist or "Channel" in artist:
+        if ' - ' in title:
+            parts = title.split(' - ')
+            if len(parts) > 1:
+                potential_artist = parts[-1].strip()
+                if len(potential_artist) < 30 and "channel" not in potential_artist.lower() and "topic" not in potential_artist.lower():
+                    artist = potential_artist
+    return artist
+
+
+class TrackResolver:
+    """
+    Cache hasil yt-dlp bersama untuk cog musik (musik, live) dan notif.
+
+    - Dikunci per video id kanonik, jadi `youtu.be/x`, `watch?v=x&list=..` dan `shorts/x` berbagi entri.
+    - Metadata (judul, artis, durasi, thumbnail, deskripsi) disimpan tanpa kedaluwarsa; hanya dibuang
+      LRU kalau sudah sangat banyak.
+    - Stream URL disimpan sampai mendekati `expire` yang tertera di URL-nya, per format ytdl (musik dan
+      live memakai format berbeda).
+    - Resolusi yang sama yang sedang berjalan ditunggu bersama, tidak diekstrak dua kali.
+
+    Ekstraksi tetap memakai instance `YoutubeDL` milik pemanggil (opsi/cookie masing-masing cog) dan
+    dijalankan di executor.
+    """
+
+    def __init__(self, meta_cache=META_CACHE_SIZE, stream_cache=STREAM_CACHE_SIZE):
+        self.meta_cache = meta_cache
+        self.stream_cache = stream_cache
+        self._meta = OrderedDict()
+        self._streams = OrderedDict()
+        self._aliases = OrderedDict()
+        self._inflight = {}
+        self.stats = {"hits": 0, "misses": 0, "shared": 0}
+
+    def _remember(self, store, key, value, limit):
+        store[key] = value
+        store.move_to_end(key)
+        while len(store) > limit:
+            store.popitem(last=False)
+
+    def _key(self, url):
+        key = track_key(url)
+        return self._aliases.get(key, key)
+
+    def _store_meta(self, key, info):
+        meta = {field: info.get(field) for field in META_FIELDS}
+        meta['artist'] = guess_artist(info)
+        meta['webpage_url'] = meta['webpage_url'] or info.get('original_url')
+        old = self._meta.get(key)
+        if old:
+            # Hasil process=False kadang lebih miskin dari ekstraksi penuh; jangan timpa isian yang sudah ada
+            meta = {field: meta.get(field) if meta.get(field) is not None else old.get(field) for field in META_FIELDS}
+        self._remember(self._meta, key, meta, self.meta_cache)
+        return meta
+
+    def _link(self, url, key, info):
+        """Query pencarian / URL non-kanonik diarahkan ke kunci video hasil resolusinya."""
+        resolved = track_key(info.get('webpage_url') or '')
+        if resolved and resolved != key:
+            self._remember(self._aliases, key, resolved, ALIAS_CACHE_SIZE)
+            return resolved
+        return key
+
+    async def _shared(self, token, factory):
+        task = self._inflight.get(token)
+        if task is None:
+            task = asyncio.ensure_future(factory())
+            self._inflight[token] = task
+            task.add_done_callback(lambda _: self._inflight.pop(token, None))
+        else:
+            self.stats["shared"] += 1
+        return await asyncio.shield(task)
+
+    @staticmethod
+    async def _extract(ytdl, url, process):
+        loop = asyncio.get_running_loop()
+        info = await loop.run_in_executor(None, lambda: ytdl.extract_info(url, download=False, process=process))
+        if not info:
+            raise ValueError(f"yt-dlp tidak mengembalikan info untuk {url}")
+        if 'entries' in info:
+            entries = [entry for entry in (info.get('entries') or []) if entry]
+            if not entries:
+                raise ValueError(f"Tidak ada hasil untuk {url}")
+            info = entries[0]
+        return info
+
+    def peek(self, url):
+        """Metadata dari cache saja (tanpa ekstraksi), atau None."""
+        meta = self._meta.get(self._key(url))
+        return dict(meta) if meta else None
+
+    async def info(self, url, ytdl):
+        """Metadata track (dict baru tiap panggilan, aman diubah pemanggil)."""
+        key = self._key(url)
+        meta = self._meta.get(key)
+        if meta is not None:
+            self._meta.move_to_end(key)
+            self.stats["hits"] += 1
+            return dict(meta)
+        # Kalau stream untuk track yang sama sedang diresolve, metadata-nya ikut dari situ
+        for token, task in list(self._inflight.items()):
+            if token[0] == "stream" and token[1] == key:
+                self.stats["shared"] += 1
+                try:
+                    await asyncio.shield(task)
+                except Exception:
+                    break
+                meta = self._meta.get(self._key(url))
+                if meta is not None:
+                    return dict(meta)
+
+        async def _resolve():
+            self.stats["misses"] += 1
+            info = await self._extract(ytdl, url, process=False)
+            return self._store_meta(self._link(url, key, info), info)
+        return dict(await self._shared(("info", key), _resolve))
+
+    async def stream(self, url, ytdl):
+        """Info siap putar (ada `url` stream yang masih berlaku). Metadata ikut di-cache."""
+        key = self._key(url)
+        stream_key = (key, ytdl.params.get('format'))
+        cached = self._streams.get(stream_key)
+        if cached is not None:
+            if cached[0] > time.time():
+                self._streams.move_to_end(stream_key)
+                self.stats["hits"] += 1
+                return dict(cached[1])
+            del self._streams[stream_key]
+
+        async def _resolve():
+            self.stats["misses"] += 1
+            info = await self._extract(ytdl, url, process=True)
+            canonical = self._link(url, key, info)
+            self._store_meta(canonical, info)
+            data = {field: info.get(field) for field in STREAM_FIELDS if field in info}
+            self._remember(self._streams, (canonical, stream_key[1]), (stream_expiry(data.get('url')), data), self.stream_cache)
+            return data
+        return dict(await self._shared(("stream", key, stream_key[1]), _resolve))
+
+
+_resolver = None
+
+
+def get_track_resolver():
+    global _resolver
+    if _resolver is None:
+        _resolver = TrackResolver()
+    return _resolver
@@ -0,0 +1,176 @@
+import logging
+import re
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from utils.wordfilter import KeywordAutomaton
+
+log = logging.getLogger(__name__)
+
+URL_PATTERN = re.compile(r'https?://[^\s/$.?#].[^\s]*', re.IGNORECASE)
+
+# Pola link scam/shortener yang langsung dianggap berbahaya (dulu di ServerAdminCog.detect_suspicious_links)
+DEFAULT_KNOWN_BAD = [
+    'discord.gift', 'discord.com/gifts', 'discordapp.com/gifts',
+    'free-nitro', 'steam-community', 'steamcommunity.com',
+    'bit.ly', 'tinyurl.com', 'shorturl.at', 'rb.gy',
+    'discord-nitro', 'claim-reward', 'free-gift'
+]
+# Hanya dicek di dalam URL, bukan di seluruh isi pesan
+DEFAULT_KNOWN_BAD_URL_ONLY = ['discordgift', 'nitro-free', 'steamgift']
+
+
+def extract_host(url):
+    """Ambil hostname (lowercase, tanpa port/userinfo/`www.`) dari sebuah URL."""
+    if "//" not in url:
+        url = f"http://{url}"
+    try:
+        host = urlsplit(url).hostname or ""
+    except ValueError:
+        host = url.split('//')[-1].split('/')[0].split('@')[-1].split(':')[0].lower()
+    host = host.rstrip('.')
+    return host[4:] if host.startswith('www.') else host
+
+
+TRACKING_PARAMS = frozenset({
+    'fbclid', 'gclid', 'dclid', 'msclkid', 'igshid', 'igsh', 'si', 'feature', 'ref', 'ref_src',
+    'mc_cid', 'mc_eid', 'yclid', '_hsenc', '_hsmi', 'spm', 'share_id'
+})
+# Suffix dua level yang umum, supaya `x.co.id` tidak dianggap satu domain dengan `y.co.id`
+SECOND_LEVEL_SUFFIXES = frozenset({
+    'co.id', 'ac.id', 'or.id', 'go.id', 'web.id', 'my.id', 'sch.id', 'biz.id',
+    'co.uk', 'org.uk', 'ac.uk', 'com.au', 'net.au', 'com.br', 'com.my', 'com.sg', 'co.jp', 'com.ph',
+    # hosting bersama: tiap subdomain milik orang berbeda
+    'github.io', 'vercel.app', 'netlify.app', 'pages.dev', 'web.app', 'firebaseapp.com', 'blogspot.com', 'glitch.me'
+})
+
+
+def normalize_url(url):
+    """
+    Bentuk kanonik URL untuk key cache: scheme & host lowercase, tanpa `www.`, port default,
+    fragment, dan parameter tracking (utm_*, fbclid, ...); sisa query diurutkan.
+    """
+    if "//" not in url:
+        url = f"http://{url}"
+    try:
+        parts = urlsplit(url.strip())
+        port = parts.port
+    except ValueError:
+        return url.strip().lower()
+    host = extract_host(url)
+    if port and port not in (80, 443):
+        host = f"{host}:{port}"
+    query = sorted(
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if not k.lower().startswith('utm_') and k.lower() not in TRACKING_PARAMS
+    )
+    path = parts.path.rstrip('/') or ''
+    return urlunsplit(('https' if parts.scheme.lower() in ('http', 'https') else parts.scheme.lower(), host, path, urlencode(query), ''))
+
+
+def registrable_domain(host):
+    """Perkiraan domain yang bisa didaftarkan (eTLD+1) tanpa daftar public suffix lengkap."""
+    labels = host.split('.')
+    if len(labels) <= 2:
+        return host
+    if '.'.join(labels[-2:]) in SECOND_LEVEL_SUFFIXES:
+        return '.'.join(labels[-3:])
+    return '.'.join(labels[-2:])
+
+
+def _host_suffixes(host):
+    """'a.b.c' -> ['a.b.c', 'b.c', 'c']"""
+    parts = host.split('.')
+    return ['.'.join(parts[i:]) for i in range(len(parts))]
+
+
+class UrlVerdict:
+    __slots__ = ("url", "host", "whitelisted", "suspicious_tld", "keyword", "host_keyword", "known_bad")
+
+    def __init__(self, url, host, whitelisted=False, suspicious_tld=None, keyword=None, host_keyword=None, known_bad=None):
+        self.url = url
+        self.host = host
+        self.whitelisted = whitelisted
+        self.suspicious_tld = suspicious_tld
+        self.keyword = keyword
+        self.host_keyword = host_keyword
+        self.known_bad = known_bad
+
+    @property
+    def is_phishing(self):
+        """TLD mencurigakan + keyword sensitif di URL, dan domain tidak di-whitelist."""
+        return not self.whitelisted and bool(self.suspicious_tld and self.keyword)
+
+    @property
+    def locally_suspicious(self):
+        """Seperti `is_phishing`, tapi keyword harus ada di domain-nya sendiri."""
+        return not self.whitelisted and bool(self.suspicious_tld and self.host_keyword)
+
+    def __repr__(self):
+        flags = [name for name in ("whitelisted", "suspicious_tld", "keyword", "known_bad") if getattr(self, name)]
+        return f"<UrlVerdict {self.host} {' '.join(flags) or 'clean'}>"
+
+
+class UrlAnalyzer:
+    """
+    Analisis URL bersama untuk moderation & AI moderation.
+
+    Setiap URL di-parse sekali, lalu dicek ke index suffix domain (whitelist & TLD) dan
+    automaton keyword yang sudah dikompilasi. Index dibangun ulang hanya saat daftar
+    diubah lewat `configure()`, jadi biaya per URL tidak bertambah seiring daftar membesar.
+    """
+
+    def __init__(self, known_bad=DEFAULT_KNOWN_BAD, known_bad_url_only=DEFAULT_KNOWN_BAD_URL_ONLY):
+        self._whitelist = frozenset()
+        self._tlds = frozenset()
+        self._keywords = KeywordAutomaton({})
+        self._known_bad = KeywordAutomaton({"known_bad": known_bad})
+        self._known_bad_url = KeywordAutomaton({"known_bad": list(known_bad) + list(known_bad_url_only)})
+
+    def configure(self, domain_whitelist=None, suspicious_tlds=None, sensitive_keywords=None):
+        """Bangun ulang index. Argumen `None` berarti daftar itu tidak berubah."""
+        if domain_whitelist is not None:
+            self._whitelist = frozenset(extract_host(d) for d in domain_whitelist if d)
+        if suspicious_tlds is not None:
+            self._tlds = frozenset(t.lower().lstrip('.') for t in suspicious_tlds if t)
+        if sensitive_keywords is not None:
+            self._keywords = KeywordAutomaton({"keyword": sensitive_keywords})
+
+    def is_whitelisted(self, host):
+        return any(suffix in self._whitelist for suffix in _host_suffixes(host))
+
+    def analyze(self, url):
+        host = extract_host(url)
+        suffixes = _host_suffixes(host) if host else []
+        verdict = UrlVerdict(url, host)
+        verdict.whitelisted = any(suffix in self._whitelist for suffix in suffixes)
+        verdict.suspicious_tld = next((f".{s}" for s in reversed(suffixes) if s in self._tlds), None)
+        verdict.known_bad = self._known_bad_url.scan(url).get("known_bad")
+        if not verdict.whitelisted:
+            verdict.keyword = self._keywords.scan(url).get("keyword")
+            if verdict.keyword:
+                verdict.host_keyword = self._keywords.scan(host).get("keyword")
+        return verdict
+
+    def analyze_all(self, content):
+        return [self.analyze(url) for url in URL_PATTERN.findall(content)]
+
+    def find_known_bad(self, content):
+        """Pola scam di mana saja dalam pesan (termasuk tanpa http://). Mengembalikan pola yang cocok."""
+        hit = self._known_bad.scan(content).get("known_bad")
+        if hit:
+            return hit
+        for url in URL_PATTERN.findall(content):
+            hit = self._known_bad_url.scan(url).get("known_bad")
+            if hit:
+                return hit
+        return None
+
+
+_analyzer = None
+
+
+def get_url_analyzer():
+    global _analyzer
+    if _analyzer is None:
+        _analyzer = UrlAnalyzer()
+    return _analyzer
@@ -0,0 +1,135 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+
+from utils.mongo import get_mongo
+
+log = logging.getLogger(__name__)
+
+DEFAULT_MAX_ENTRIES = 5000
+DEFAULT_TTL = 24 * 3600
+DEFAULT_FLUSH_INTERVAL = 60
+
+
+class VerdictCache:
+    """
+    Cache LRU berbatas + TTL per entri untuk hasil keputusan AI (verdict).
+
+    - Entri kedaluwarsa dibuang saat dibaca; entri paling lama tidak dipakai dibuang
+      saat kapasitas penuh.
+    - `get_or_compute()` menggabungkan lookup yang bersamaan untuk key yang sama ke satu
+      request (in-flight dedup).
+    - Kalau `path` diisi, isi cache disimpan berkala lewat MongoStore (bukan tiap set).
+    """
+
+    def __init__(self, path=None, max_entries=DEFAULT_MAX_ENTRIES, default_ttl=DEFAULT_TTL, flush_interval=DEFAULT_FLUSH_INTERVAL):
+        self.path = path
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self.flush_interval = flush_interval
+        self._entries = OrderedDict()
+        self._inflight = {}
+        self._dirty = False
+        self._task = None
+        if path:
+            self._load()
+
+    def _load(self):
+        now = time.time()
+        stored = get_mongo().load(self.path, {})
+        for key, item in stored.items():
+            if isinstance(item, (list, tuple)) and len(item) == 2 and item[1] > now:
+                self._entries[key] = (item[0], item[1])
+        self._evict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+    def get(self, key):
+        item = self._entries.get(key)
+        if item is None:
+            return None
+        value, expires_at = item
+        if expires_at <= time.time():
+            del self._entries[key]
+            self._dirty = True
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key, value, ttl=None):
+        self._entries[key] = (value, time.time() + (ttl if ttl is not None else self.default_ttl))
+        self._entries.move_to_end(key)
+        self._evict()
+        self._dirty = True
+
+    def pop(self, key):
+        if self._entries.pop(key, None) is not None:
+            self._dirty = True
+
+    def _evict(self):
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def get_or_compute(self, key, factory, ttl=None):
+        """
+        Ambil dari cache, atau jalankan `factory()` (coroutine) sekali untuk semua pemanggil
+        yang meminta key yang sama secara bersamaan. `ttl` boleh berupa callable(value).
+        Hasil `None` tidak di-cache.
+        """
+        value = self.get(key)
+        if value is not None:
+            return value
+        future = self._inflight.get(key)
+        if future is not None:
+            return await asyncio.shield(future)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value = await factory()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # tandai sudah diambil supaya tidak muncul warning
+            raise
+        else:
+            if value is not None:
+                self.set(key, value, ttl(value) if callable(ttl) else ttl)
+            future.set_result(value)
+            return value
+        finally:
+            self._inflight.pop(key, None)
+
+    # --- persistence ---
+    def flush(self):
+        if not self.path or not self._dirty:
+            return
+        self._dirty = False
+        now = time.time()
+        snapshot = {key: [value, expires_at] for key, (value, expires_at) in self._entries.items() if expires_at > now}
+        get_mongo().save(self.path, snapshot)
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except Exception as e:
+                log.error(f"❌ Gagal menyimpan verdict cache {self.path}: {e}", exc_info=True)
+
+    def start(self):
+        if self.path and (self._task is None or self._task.done()):
+            self._task = asyncio.get_running_loop().create_task(self._flush_loop())
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        self.flush()
@@ -0,0 +1,78 @@
+import time
+
+
+class VoiceTracker:
+    """
+    Pelacak sesi voice per (guild, user) untuk EXP/RSWN voice.
+
+    Tidak ada polling: cog cukup memanggil `update()` tiap `on_voice_state_update`. Waktu "layak"
+    (di voice, tidak self-mute / self-deaf) dihitung dari selisih waktu transisi, lalu diambil per
+    menit penuh lewat `take()` saat user keluar, saat cek level, atau saat flush berkala. Sisa detik
+    yang belum genap satu menit tetap dibawa selama user masih di voice.
+    """
+
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        # (guild_id, user_id) -> [detik_terkumpul, mulai_layak_atau_None]
+        self._sessions = {}
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def update(self, guild_id, user_id, in_voice, eligible, now=None):
+        """Catat transisi state voice. Mengembalikan True kalau user baru saja keluar dari voice."""
+        now = self.clock() if now is None else now
+        key = (guild_id, user_id)
+        session = self._sessions.get(key)
+        if not in_voice:
+            if session is not None and session[1] is not None:
+                session[0] += now - session[1]
+                session[1] = None
+            return session is not None
+        if session is None:
+            session = self._sessions[key] = [0.0, None]
+        if eligible and session[1] is None:
+            session[1] = now
+        elif not eligible and session[1] is not None:
+            session[0] += now - session[1]
+            session[1] = None
+        return False
+
+    def pending_seconds(self, guild_id, user_id, now=None):
+        session = self._sessions.get((guild_id, user_id))
+        if session is None:
+            return 0.0
+        now = self.clock() if now is None else now
+        return session[0] + (now - session[1] if session[1] is not None else 0.0)
+
+    def take(self, guild_id, user_id, now=None, close=False):
+        """
+        Ambil menit penuh yang sudah terkumpul (sisa detik tetap disimpan). `close=True` untuk user
+        yang sudah keluar: sesi dihapus dan sisa detik dibuang.
+        """
+        now = self.clock() if now is None else now
+        key = (guild_id, user_id)
+        session = self._sessions.get(key)
+        if session is None:
+            return 0
+        if session[1] is not None:
+            session[0] += now - session[1]
+            session[1] = now
+        minutes = int(session[0] // 60)
+        session[0] -= minutes * 60
+        if close:
+            del self._sessions[key]
+        return minutes
+
+    def keys(self):
+        return list(self._sessions)
+
+    def sync(self, guild_id, present):
+        """
+        Samakan sesi satu guild dengan kondisi voice sebenarnya (mis. setelah bot (re)connect).
+        `present` = {user_id: eligible}. Mengembalikan user yang sesinya tercatat tapi sudah tidak di voice.
+        """
+        now = self.clock()
+        for user_id, eligible in present.items():
+            self.update(guild_id, user_id, True, eligible, now)
+        return [user_id for (g, user_id) in self._sessions if g == guild_id and user_id not in present]
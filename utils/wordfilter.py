@@ -0,0 +1,125 @@
+import logging
+from collections import deque
+
+log = logging.getLogger(__name__)
+
+
+class KeywordAutomaton:
+    """Automaton Aho-Corasick untuk substring (case-insensitive). Satu kali jalan per teks."""
+
+    __slots__ = ("goto", "fail", "out")
+
+    def __init__(self, categories):
+        self.goto = [{}]
+        self.fail = [0]
+        self.out = [()]
+
+        outputs = [{}]
+        for category, terms in categories.items():
+            for term in terms:
+                term = str(term).lower().strip()
+                if not term:
+                    continue
+                node = 0
+                for ch in term:
+                    nxt = self.goto[node].get(ch)
+                    if nxt is None:
+                        nxt = len(self.goto)
+                        self.goto[node][ch] = nxt
+                        self.goto.append({})
+                        self.fail.append(0)
+                        outputs.append({})
+                    node = nxt
+                outputs[node].setdefault(category, term)
+
+        queue = deque(self.goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, nxt in self.goto[node].items():
+                queue.append(nxt)
+                f = self.fail[node]
+                while f and ch not in self.goto[f]:
+                    f = self.fail[f]
+                self.fail[nxt] = self.goto[f].get(ch, 0)
+                for category, term in outputs[self.fail[nxt]].items():
+                    outputs[nxt].setdefault(category, term)
+        self.out = [tuple(o.items()) for o in outputs]
+
+    def scan(self, text):
+        goto, fail, out = self.goto, self.fail, self.out
+        hits = {}
+        node = 0
+        for ch in text.lower():
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            if out[node]:
+                for category, term in out[node]:
+                    hits.setdefault(category, term)
+        return hits
+
+
+class WordFilterEngine:
+    """
+    Filter kata per guild yang dipakai bersama moderation & AI moderation.
+
+    Daftar kata dikumpulkan dari "source" yang didaftarkan cog (mis. filters.json per
+    guild, cyber_config global), dikompilasi jadi satu automaton per guild, lalu di-cache
+    sampai `invalidate()` dipanggil. `scan()` mengembalikan semua kategori yang cocok
+    dalam satu kali lewat pesan: `{kategori: kata_pertama_yang_cocok}`.
+    """
+
+    def __init__(self):
+        self._sources = {}
+        self._compiled = {}
+
+    def register_source(self, name, provider):
+        """`provider(guild_id)` -> `{kategori: [kata, ...]}`. Nama yang sama akan ditimpa."""
+        self._sources[name] = provider
+        self.invalidate()
+
+    def unregister_source(self, name, provider=None):
+        if name in self._sources and (provider is None or self._sources[name] is provider):
+            del self._sources[name]
+            self.invalidate()
+
+    def has_source(self, name):
+        return name in self._sources
+
+    def invalidate(self, guild_id=None):
+        """Tanpa guild_id: buang semua cache (dipakai saat daftar global berubah)."""
+        if guild_id is None:
+            self._compiled.clear()
+        else:
+            self._compiled.pop(str(guild_id), None)
+
+    def _build(self, guild_id):
+        categories = {}
+        for name, provider in self._sources.items():
+            try:
+                data = provider(guild_id) or {}
+            except Exception as e:
+                log.error(f"❌ Source filter '{name}' gagal dibaca: {e}", exc_info=True)
+                continue
+            for category, terms in data.items():
+                categories.setdefault(category, []).extend(terms or [])
+        return KeywordAutomaton(categories)
+
+    def scan(self, guild_id, text):
+        if not text:
+            return {}
+        key = str(guild_id)
+        automaton = self._compiled.get(key)
+        if automaton is None:
+            automaton = self._compiled[key] = self._build(guild_id)
+        return automaton.scan(text)
+
+
+_engine = None
+
+
+def get_word_filter():
+    global _engine
+    if _engine is None:
+        _engine = WordFilterEngine()
+    return _engine